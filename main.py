@@ -144,6 +144,7 @@ def _import_components(logger):
         from src.infrastructure.reporting.core.report_manager import ReportManager
         from src.infrastructure.sop.core.sop_manager import SOPManager
         from src.core.models.data_model import DataModel
+        from src.core.services.classification_store import ClassificationTableStore
 
         # НОВОЕ: Импорт конфигурации UI
         try:
@@ -177,6 +178,7 @@ def _import_components(logger):
             'ReportManager': ReportManager,
             'SOPManager': SOPManager,
             'DataModel': DataModel,
+            'ClassificationTableStore': ClassificationTableStore,
             'ui_config_available': ui_config_available,
             'use_cases_available': use_cases_available
         }
@@ -203,7 +205,8 @@ def _create_application_context_priority(components, logger):
         root.geometry("1400x900")  # Увеличенное окно для лучшего UX
 
         # Создание модели данных с приоритетной поддержкой
-        model = components['DataModel']()
+        # Таблица классификации сигналов сохраняется между запусками приложения
+        model = components['DataModel'](classification_store=components['ClassificationTableStore']())
         logger.info("[PRIORITY] DataModel создана с поддержкой изменяемых параметров")
 
         # ИСПРАВЛЯЕМ: Создание сервисов с правильными зависимостями
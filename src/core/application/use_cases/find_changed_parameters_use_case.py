@@ -28,6 +28,8 @@ except ImportError:
     FilterCriteria = None
     Parameter = None
 
+from ...services.analysis_cache import AnalysisCache
+
 # Импорты моделей
 try:
     from ...models.data_model import DataModel
@@ -73,13 +75,15 @@ class FindChangedParametersResponse:
 class FindChangedParametersUseCase:
     """🔥 ПРИОРИТЕТНЫЙ Use Case для поиска изменяемых параметров"""
 
+    CACHE_NAMESPACE = 'find_changed_parameters'
+
     def __init__(self, data_model: Optional[DataModel] = None):
         self.data_model = data_model
         self.logger = logging.getLogger(self.__class__.__name__)
         
-        # Кэш для производительности
-        self._cache: Dict[str, Dict[str, Any]] = {}
-        self._cache_timestamps: Dict[str, float] = {}
+        # Общий кэш анализа модели (ключи привязаны к отпечатку записи)
+        self._shared_cache = getattr(data_model, 'analysis_cache', None) or AnalysisCache()
+        self._cache = self._shared_cache.namespace(self.CACHE_NAMESPACE)
         self._cache_ttl = 300  # 5 минут
 
     def execute(self, request: FindChangedParametersRequest) -> FindChangedParametersResponse:
@@ -98,7 +102,7 @@ class FindChangedParametersUseCase:
             # Проверяем кэш
             cache_key = self._generate_cache_key(request)
             force_refresh = getattr(request, 'force_refresh', False)
-            if not force_refresh and self._is_cache_valid(cache_key):
+            if not force_refresh:
                 cached_response = self._get_cached_response(cache_key, start_time)
                 if cached_response:
                     self.logger.info("✅ Использован кэшированный результат")
@@ -122,6 +126,9 @@ class FindChangedParametersUseCase:
             
             # Преобразуем в словари для совместимости с main.py
             changed_dicts = [self._convert_to_dict(param) for param in filtered_changed]
+
+            # Если оценки окна уже посчитаны (перебор порогов), список упорядочивается по ним
+            changed_dicts = self._rank_by_change_score(changed_dicts)
             
             # Собираем детальную статистику
             statistics = self._collect_comprehensive_statistics(
@@ -283,21 +290,32 @@ class FindChangedParametersUseCase:
             changed_params = []
             data = telemetry_data.data
 
+            columns = []
             for param in parameters:
                 # Получаем имя столбца
                 if hasattr(param, 'full_column'):
-                    column_name = param.full_column
+                    columns.append(param.full_column)
                 elif hasattr(param, 'signal_code'):
-                    column_name = param.signal_code
+                    columns.append(param.signal_code)
                 else:
-                    continue
+                    columns.append(None)
 
-                if column_name in data.columns:
-                    series = data[column_name]
-                    
-                    # Простой анализ изменяемости
-                    if self._is_parameter_changed_simple(series, threshold):
+            change_engine = getattr(self.data_model, 'change_engine', None)
+            if change_engine:
+                # Простой анализ изменяемости одной векторной маской
+                stats = change_engine.compute(data, [c for c in columns if c is not None])
+                changed_mask = change_engine.uniqueness_mask(stats, threshold)
+
+                for param, column_name in zip(parameters, columns):
+                    position = stats.position(column_name) if column_name is not None else None
+                    if position is not None and changed_mask[position]:
                         changed_params.append(param)
+            else:
+                for param, column_name in zip(parameters, columns):
+                    if column_name is not None and column_name in data.columns:
+                        # Простой анализ изменяемости
+                        if self._is_parameter_changed_simple(data[column_name], threshold):
+                            changed_params.append(param)
 
             self.logger.info(f"Fallback анализ: найдено {len(changed_params)} изменяемых параметров")
             return changed_params
@@ -350,6 +368,26 @@ class FindChangedParametersUseCase:
             self.logger.error(f"Ошибка фильтрации по настройкам: {e}")
             return parameters
 
+    def _rank_by_change_score(self, changed_dicts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Сортировка по убыванию оценки изменяемости с добавлением поля change_score"""
+        try:
+            if not self.data_model or not hasattr(self.data_model, 'get_change_scores'):
+                return changed_dicts
+
+            scores = self.data_model.get_change_scores(compute=False)
+            if scores is None:
+                return changed_dicts
+
+            by_column = scores.as_dict()
+            ranked = [{**item, 'change_score': by_column.get(item.get('full_column'), 0.0)}
+                      for item in changed_dicts]
+            ranked.sort(key=lambda item: -item['change_score'])
+            return ranked
+
+        except Exception as e:
+            self.logger.error(f"Ошибка сортировки по оценке изменяемости: {e}")
+            return changed_dicts
+
     def _convert_to_dict(self, param) -> Dict[str, Any]:
         """Универсальное преобразование параметра в словарь для совместимости с main.py"""
         try:
@@ -474,40 +512,31 @@ class FindChangedParametersUseCase:
     # === МЕТОДЫ КЭШИРОВАНИЯ ===
 
     def _generate_cache_key(self, request: FindChangedParametersRequest) -> str:
-        """Генерация ключа кэша"""
+        """Ключ кэша по содержимому запроса; пустые границы заменяются текущим диапазоном модели"""
         try:
-            key_parts = [
+            range_key = None
+            if not (request.from_time and request.to_time) and self.data_model is not None \
+                    and hasattr(self.data_model, '_get_current_range_key'):
+                range_key = self.data_model._get_current_range_key()
+
+            return AnalysisCache.make_key(
                 request.session_id,
-                request.from_time or 'auto',
-                request.to_time or 'auto',
-                str(request.threshold),
-                str(request.include_timestamp_params),
-                str(request.include_problematic_params)
-            ]
-            return "_".join(key_parts)
+                request.from_time or range_key or 'auto',
+                request.to_time or range_key or 'auto',
+                threshold=request.threshold,
+                include_timestamp_params=request.include_timestamp_params,
+                include_problematic_params=request.include_problematic_params
+            )
         except Exception:
             return f"fallback_{time.time()}"
 
-    def _is_cache_valid(self, cache_key: str) -> bool:
-        """Проверка валидности кэша"""
-        try:
-            if cache_key not in self._cache_timestamps:
-                return False
-            
-            cache_time = self._cache_timestamps[cache_key]
-            current_time = time.time()
-            
-            return (current_time - cache_time) < self._cache_ttl
-        except Exception:
-            return False
-
     def _get_cached_response(self, cache_key: str, start_time: float) -> Optional[FindChangedParametersResponse]:
-        """Получение кэшированного ответа"""
+        """Получение кэшированного ответа (устаревшие по TTL записи не возвращаются)"""
         try:
-            if cache_key not in self._cache:
+            cached_data = self._shared_cache.get(self.CACHE_NAMESPACE, cache_key)
+            if cached_data is None:
                 return None
-            
-            cached_data = self._cache[cache_key]
+
             execution_time = (time.time() - start_time) * 1000
             
             # Создаем новый ответ на основе кэшированных данных
@@ -530,26 +559,16 @@ class FindChangedParametersUseCase:
             return None
 
     def _cache_response(self, cache_key: str, response: FindChangedParametersResponse):
-        """Кэширование ответа"""
+        """Кэширование ответа; вытеснение по объему выполняет общий кэш"""
         try:
-            self._cache[cache_key] = {
+            self._shared_cache.put(self.CACHE_NAMESPACE, cache_key, {
                 'changed_parameters': response.changed_parameters,
                 'total_parameters': response.total_parameters,
                 'changed_count': response.changed_count,
                 'time_range': response.time_range,
                 'analysis_statistics': response.analysis_statistics
-            }
-            
-            self._cache_timestamps[cache_key] = time.time()
-            
-            # Очистка старого кэша (оставляем только последние 10 записей)
-            if len(self._cache) > 10:
-                oldest_keys = sorted(self._cache_timestamps.keys(), 
-                                   key=lambda k: self._cache_timestamps[k])[:-10]
-                for old_key in oldest_keys:
-                    self._cache.pop(old_key, None)
-                    self._cache_timestamps.pop(old_key, None)
-                    
+            }, ttl_seconds=self._cache_ttl)
+
         except Exception as e:
             self.logger.error(f"Ошибка кэширования ответа: {e}")
 
@@ -575,7 +594,6 @@ class FindChangedParametersUseCase:
         """Очистка кэша"""
         try:
             self._cache.clear()
-            self._cache_timestamps.clear()
             self.logger.info("Кэш FindChangedParametersUseCase очищен")
         except Exception as e:
             self.logger.error(f"Ошибка очистки кэша: {e}")
@@ -583,16 +601,10 @@ class FindChangedParametersUseCase:
     def get_cache_statistics(self) -> Dict[str, Any]:
         """Получение статистики кэша"""
         try:
-            current_time = time.time()
-            valid_entries = sum(1 for timestamp in self._cache_timestamps.values() 
-                              if (current_time - timestamp) < self._cache_ttl)
-            
             return {
+                **self._shared_cache.get_cache_statistics(),
                 'total_entries': len(self._cache),
-                'valid_entries': valid_entries,
-                'expired_entries': len(self._cache) - valid_entries,
-                'cache_ttl_seconds': self._cache_ttl,
-                'memory_usage_estimate': len(str(self._cache))
+                'cache_ttl_seconds': self._cache_ttl
             }
         except Exception as e:
             return {'error': str(e)}
@@ -0,0 +1,55 @@
+"""
+Сохраненные запросы фильтрации (пресеты)
+"""
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+class FilterPresetStore:
+    """Именованные запросы фильтрации в JSON-файле пользователя"""
+
+    DEFAULT_FILE = Path.home() / '.tramm_filter_presets.json'
+
+    def __init__(self, file_path: Optional[Path] = None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.file_path = Path(file_path) if file_path else self.DEFAULT_FILE
+        self._presets: Dict[str, str] = self._load()
+
+    def _load(self) -> Dict[str, str]:
+        try:
+            if self.file_path.exists():
+                with open(self.file_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                return {str(name): str(query) for name, query in data.items()}
+        except Exception as e:
+            self.logger.error(f"Ошибка загрузки пресетов фильтров: {e}")
+        return {}
+
+    def _save(self) -> bool:
+        try:
+            with open(self.file_path, 'w', encoding='utf-8') as f:
+                json.dump(self._presets, f, indent=2, ensure_ascii=False)
+            return True
+        except Exception as e:
+            self.logger.error(f"Ошибка сохранения пресетов фильтров: {e}")
+            return False
+
+    def names(self) -> List[str]:
+        return sorted(self._presets)
+
+    def get(self, name: str) -> Optional[str]:
+        return self._presets.get(name)
+
+    def save(self, name: str, query: str) -> bool:
+        name = name.strip()
+        if not name or not query.strip():
+            return False
+        self._presets[name] = ' '.join(query.split())
+        return self._save()
+
+    def delete(self, name: str) -> bool:
+        if self._presets.pop(name, None) is None:
+            return False
+        return self._save()
@@ -7,6 +7,8 @@ from enum import Enum
 import re
 import logging
 
+from ..services.parameter_search_index import normalize_search_text, query_tokens
+
 logger = logging.getLogger(__name__)
 
 class DataType(Enum):
@@ -45,6 +47,7 @@ class Parameter:
     component_type: Optional[str] = None
     hardware_type: Optional[str] = None
     is_problematic: bool = False  # НОВОЕ: флаг проблемных параметров
+    is_virtual: bool = False  # виртуальный канал: значения вычисляются по выражению
     
     def __post_init__(self):
         """Расширенная валидация после создания"""
@@ -401,11 +404,12 @@ class Parameter:
                           for part in filter_criteria.signal_parts):
                     return False
             
-            # Фильтр по тексту поиска
+            # Фильтр по тексту поиска (те же правила, что у поискового индекса:
+            # каждое слово запроса - подстрока кода, описания или линии)
             if filter_criteria.search_text:
-                search_text = filter_criteria.search_text.upper()
-                searchable_text = f"{self.signal_code} {self.description} {self.line}".upper()
-                if search_text not in searchable_text:
+                searchable_text = '\n'.join(normalize_search_text(value)
+                                            for value in (self.signal_code, self.description, self.line))
+                if not all(token in searchable_text for token in query_tokens(filter_criteria.search_text)):
                     return False
             
             return True
@@ -454,7 +458,8 @@ class Parameter:
             'is_timestamp_related': self.is_timestamp_related,
             'component_type': self.component_type,
             'hardware_type': self.hardware_type,
-            'is_problematic': self.is_problematic
+            'is_problematic': self.is_problematic,
+            'is_virtual': self.is_virtual
         }
     
     @classmethod
@@ -472,7 +477,8 @@ class Parameter:
             is_timestamp_related=data.get('is_timestamp_related', False),
             component_type=data.get('component_type'),
             hardware_type=data.get('hardware_type'),
-            is_problematic=data.get('is_problematic', False)
+            is_problematic=data.get('is_problematic', False),
+            is_virtual=data.get('is_virtual', False)
         )
     
     def __str__(self) -> str:
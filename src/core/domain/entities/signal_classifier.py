@@ -3,15 +3,20 @@
 Классификатор сигналов телеметрии для диагностической фильтрации
 """
 import re
+import json
+import hashlib
 import logging
-from typing import Dict, List, Any, Optional, Set
+from typing import Dict, List, Any, Optional, Set, Tuple
 from dataclasses import dataclass
 from enum import Enum
 
+import numpy as np
+
 from ....config.diagnostic_filters_config import (
     CRITICAL_FILTERS, SYSTEM_FILTERS, FUNCTIONAL_FILTERS, 
     COMPONENT_MAPPING, SEVERITY_LEVELS
 )
+from ..services.diagnostic_category_index import get_pattern_matcher
 
 class SignalCriticality(Enum):
     CRITICAL = "critical"
@@ -41,81 +46,226 @@ class SignalClassification:
     severity_score: int
     related_signals: List[str]
 
+class SignalClassificationTable:
+    """Столбцовая таблица классификации сигналов
+
+    Строка - классификация пары (код сигнала, описание) для одной версии
+    конфигурации классификатора. Новые строки дописываются в списки, массивы
+    столбцов собираются при первом обращении после добавления, поэтому
+    отбор по критичности, системе или компоненту - операции над массивами.
+    """
+
+    COLUMNS = ('signal_code', 'criticality', 'system', 'component', 'function_type',
+               'wagon_number', 'is_train_level', 'severity_score', 'related_signals')
+    CRITICALITIES = list(SignalCriticality)
+    SYSTEMS = list(SignalSystem)
+    _DTYPES = {'criticality': np.int8, 'system': np.int8, 'wagon_number': np.int16,
+               'is_train_level': bool, 'severity_score': np.int16}
+
+    def __init__(self, version: str):
+        self.version = version
+        self.dirty = False
+        self._rows: Dict[Tuple[str, str], int] = {}
+        self._columns: Dict[str, List[Any]] = {name: [] for name in self.COLUMNS}
+        self._arrays: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._columns['signal_code'])
+
+    def find(self, signal_code: str, description: str = "") -> int:
+        """Номер строки классификации (-1 - сигнал еще не классифицирован)"""
+        return self._rows.get((signal_code, description or ""), -1)
+
+    def append(self, description: str, classification: SignalClassification) -> int:
+        row = len(self)
+        columns = self._columns
+        columns['signal_code'].append(classification.signal_code)
+        columns['criticality'].append(self.CRITICALITIES.index(classification.criticality))
+        columns['system'].append(self.SYSTEMS.index(classification.system))
+        columns['component'].append(classification.component)
+        columns['function_type'].append(classification.function_type)
+        columns['wagon_number'].append(-1 if classification.wagon_number is None else classification.wagon_number)
+        columns['is_train_level'].append(classification.is_train_level)
+        columns['severity_score'].append(classification.severity_score)
+        columns['related_signals'].append(tuple(classification.related_signals))
+        self._rows[(classification.signal_code, description or "")] = row
+        self._arrays.clear()
+        self.dirty = True
+        return row
+
+    def column(self, name: str) -> np.ndarray:
+        """Столбец таблицы как массив (коды критичности и системы - индексы CRITICALITIES/SYSTEMS)"""
+        array = self._arrays.get(name)
+        if array is None:
+            values = self._columns[name]
+            if name in self._DTYPES:
+                array = np.array(values, dtype=self._DTYPES[name])
+            else:
+                array = np.empty(len(values), dtype=object)
+                array[:] = values
+            self._arrays[name] = array
+        return array
+
+    def row(self, row: int) -> SignalClassification:
+        columns = self._columns
+        wagon_number = columns['wagon_number'][row]
+        return SignalClassification(
+            signal_code=columns['signal_code'][row],
+            criticality=self.CRITICALITIES[columns['criticality'][row]],
+            system=self.SYSTEMS[columns['system'][row]],
+            component=columns['component'][row],
+            function_type=columns['function_type'][row],
+            wagon_number=None if wagon_number < 0 else wagon_number,
+            is_train_level=columns['is_train_level'][row],
+            severity_score=columns['severity_score'][row],
+            related_signals=list(columns['related_signals'][row])
+        )
+
+    def clear(self):
+        self._rows.clear()
+        for values in self._columns.values():
+            values.clear()
+        self._arrays.clear()
+        self.dirty = True
+
+    # === СОХРАНЕНИЕ ===
+
+    def to_payload(self) -> Dict[str, Any]:
+        return {'version': self.version, 'descriptions': [key[1] for key in self._rows],
+                'columns': self._columns}
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any], version: str) -> Optional['SignalClassificationTable']:
+        """Таблица из сохраненных данных (None - данные другой версии конфигурации)"""
+        if not payload or payload.get('version') != version:
+            return None
+        table = cls(version)
+        columns = payload.get('columns')
+        descriptions = payload.get('descriptions')
+        if not isinstance(columns, dict) or set(columns) != set(cls.COLUMNS) or not isinstance(descriptions, list) \
+                or any(len(columns[name]) != len(descriptions) for name in cls.COLUMNS):
+            return None
+        table._columns = {name: list(columns[name]) for name in cls.COLUMNS}
+        # JSON хранит кортежи связанных сигналов списками
+        table._columns['related_signals'] = [tuple(related) for related in table._columns['related_signals']]
+        table._rows = {(code, description): row for row, (code, description)
+                       in enumerate(zip(table._columns['signal_code'], payload['descriptions']))}
+        return table
+
+
 class SignalClassifier:
-    """Классификатор сигналов телеметрии"""
+    """Классификатор сигналов телеметрии
+
+    Классификации хранятся в столбцовой таблице, ключ строки - код сигнала
+    и описание. При переданном хранилище таблица загружается при создании
+    и сохраняется save_table(), если версия конфигурации классификатора
+    (шаблоны фильтров, маппинг компонентов, RULES_VERSION) не изменилась.
+    """
+
+    # Увеличивается при изменении правил классификации в коде
+    RULES_VERSION = 1
     
-    def __init__(self):
+    def __init__(self, table_store=None):
         self.logger = logging.getLogger(self.__class__.__name__)
-        self._pattern_cache: Dict[str, SignalClassification] = {}
-        self._compiled_patterns = self._compile_patterns()
-        
-    def _compile_patterns(self) -> Dict[str, List[re.Pattern]]:
-        """Компиляция регулярных выражений для оптимизации"""
-        compiled = {}
-        
-        # Критичность
-        for crit_type, config in CRITICAL_FILTERS.items():
-            compiled[f"critical_{crit_type}"] = [
-                re.compile(pattern, re.IGNORECASE) 
-                for pattern in config['patterns']
-            ]
-        
-        # Системы
-        for system_type, config in SYSTEM_FILTERS.items():
-            compiled[f"system_{system_type}"] = [
-                re.compile(pattern, re.IGNORECASE)
-                for pattern in config['patterns']
-            ]
-        
-        # Функции
-        for func_type, config in FUNCTIONAL_FILTERS.items():
-            compiled[f"function_{func_type}"] = [
-                re.compile(pattern, re.IGNORECASE)
-                for pattern in config['patterns']
-            ]
-        
-        return compiled
+        # Все шаблоны критичности, систем и функций - один автомат, один проход по тексту
+        self._matcher = get_pattern_matcher()
+        self.config_version = self._compute_config_version()
+        self._table_store = table_store
+        self.table = self._load_table()
+
+    @classmethod
+    def _compute_config_version(cls) -> str:
+        config = [cls.RULES_VERSION, CRITICAL_FILTERS, SYSTEM_FILTERS, FUNCTIONAL_FILTERS, COMPONENT_MAPPING]
+        payload = json.dumps(config, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.md5(payload.encode('utf-8')).hexdigest()[:16]
+
+    def _load_table(self) -> SignalClassificationTable:
+        if self._table_store is not None:
+            table = SignalClassificationTable.from_payload(self._table_store.load(), self.config_version)
+            if table is not None:
+                self.logger.info(f"Загружена таблица классификации: {len(table)} сигналов")
+                return table
+        return SignalClassificationTable(self.config_version)
+
+    def save_table(self) -> bool:
+        """Сохранение новых строк таблицы классификации в хранилище"""
+        if self._table_store is None or not self.table.dirty:
+            return False
+        if self._table_store.save(self.table.to_payload()):
+            self.table.dirty = False
+            return True
+        return False
     
     def classify_signal(self, signal_code: str, 
                        description: str = "", 
                        additional_info: Dict[str, Any] = None) -> SignalClassification:
         """Классификация сигнала"""
         try:
-            # Проверяем кэш
-            cache_key = f"{signal_code}_{hash(description)}"
-            if cache_key in self._pattern_cache:
-                return self._pattern_cache[cache_key]
+            row = self.table.find(signal_code, description)
+            if row >= 0:
+                return self.table.row(row)
             
             # Выполняем классификацию
             classification = self._perform_classification(
                 signal_code, description, additional_info or {}
             )
             
-            # Сохраняем в кэш
-            self._pattern_cache[cache_key] = classification
+            # Сохраняем в таблицу
+            self.table.append(description, classification)
             
             return classification
             
         except Exception as e:
             self.logger.error(f"Ошибка классификации сигнала {signal_code}: {e}")
             return self._create_fallback_classification(signal_code)
+
+    def classify_rows(self, signals: List[Any], use_description: bool = True) -> np.ndarray:
+        """Строки таблицы классификации для списка сигналов за один проход
+
+        Уже встречавшиеся сигналы - поиск в словаре строк, новые
+        классифицируются и дописываются в таблицу. Сигналы без кода
+        получают строку -1.
+        """
+        rows = np.full(len(signals), -1, dtype=np.int64)
+        table = self.table
+        for i, signal in enumerate(signals):
+            if isinstance(signal, dict):
+                signal_code = signal.get('signal_code')
+                description = signal.get('description') if use_description else ""
+            else:
+                signal_code = getattr(signal, 'signal_code', None)
+                description = getattr(signal, 'description', None) if use_description else ""
+            if not signal_code:
+                continue
+            description = description or ""
+            row = table.find(signal_code, description)
+            if row < 0:
+                try:
+                    row = table.append(description, self._perform_classification(signal_code, description, {}))
+                except Exception as e:
+                    self.logger.error(f"Ошибка классификации сигнала {signal_code}: {e}")
+                    continue
+            rows[i] = row
+        return rows
     
     def _perform_classification(self, signal_code: str, 
                                description: str,
                                additional_info: Dict[str, Any]) -> SignalClassification:
         """Выполнение классификации сигнала"""
         
+        category_bits = self._matcher.signal_bits(signal_code, description)
+        
         # Определяем критичность
-        criticality = self._classify_criticality(signal_code, description)
+        criticality = self._classify_criticality(signal_code, description, category_bits)
         
         # Определяем систему
-        system = self._classify_system(signal_code, description)
+        system = self._classify_system(category_bits)
         
         # Извлекаем компонент
         component = self._extract_component(signal_code)
         
         # Определяем функциональный тип
-        function_type = self._classify_function(signal_code, description)
+        function_type = self._classify_function(signal_code, category_bits)
         
         # Извлекаем номер вагона
         wagon_number = self._extract_wagon_number(signal_code)
@@ -143,19 +293,17 @@ class SignalClassifier:
             related_signals=related_signals
         )
     
-    def _classify_criticality(self, signal_code: str, description: str) -> SignalCriticality:
+    def _classify_criticality(self, signal_code: str, description: str,
+                              category_bits: int) -> SignalCriticality:
         """Классификация по критичности"""
-        combined_text = f"{signal_code} {description}".upper()
-        
-        for crit_type, config in CRITICAL_FILTERS.items():
-            for pattern in config['patterns']:
-                if pattern.upper() in combined_text:
-                    if crit_type == 'emergency':
-                        return SignalCriticality.CRITICAL
-                    elif crit_type in ['safety', 'power_critical', 'brake_critical']:
-                        return SignalCriticality.HIGH
+        crit_type = self._matcher.first_key(category_bits, 'criticality')
+        if crit_type == 'emergency':
+            return SignalCriticality.CRITICAL
+        elif crit_type in ['safety', 'power_critical', 'brake_critical']:
+            return SignalCriticality.HIGH
         
         # Проверяем по функциональному типу
+        combined_text = f"{signal_code} {description}".upper()
         if any(pattern in combined_text for pattern in ['FAULT', 'FAIL', 'ERROR', 'ALARM']):
             return SignalCriticality.HIGH
         elif any(pattern in combined_text for pattern in ['WARNING', 'TEMP', 'PRESSURE']):
@@ -163,17 +311,13 @@ class SignalClassifier:
         
         return SignalCriticality.LOW
     
-    def _classify_system(self, signal_code: str, description: str) -> SignalSystem:
+    def _classify_system(self, category_bits: int) -> SignalSystem:
         """Классификация по системе"""
-        combined_text = f"{signal_code} {description}".upper()
-        
-        for system_type, config in SYSTEM_FILTERS.items():
-            for pattern in config['patterns']:
-                if pattern.upper() in combined_text:
-                    try:
-                        return SignalSystem(system_type)
-                    except ValueError:
-                        continue
+        for system_type in self._matcher.keys(category_bits, 'systems'):
+            try:
+                return SignalSystem(system_type)
+            except ValueError:
+                continue
         
         return SignalSystem.UNKNOWN
     
@@ -208,14 +352,11 @@ class SignalClassifier:
             self.logger.debug(f"Ошибка извлечения компонента: {e}")
             return "UNKNOWN"
     
-    def _classify_function(self, signal_code: str, description: str) -> str:
+    def _classify_function(self, signal_code: str, category_bits: int) -> str:
         """Классификация функционального типа"""
-        combined_text = f"{signal_code} {description}".upper()
-        
-        for func_type, config in FUNCTIONAL_FILTERS.items():
-            for pattern in config['patterns']:
-                if pattern.upper() in combined_text:
-                    return func_type
+        func_type = self._matcher.first_key(category_bits, 'functions')
+        if func_type:
+            return func_type
         
         # Дополнительная классификация по префиксу
         if signal_code.startswith('B_'):
@@ -352,15 +493,12 @@ class SignalClassifier:
     def classify_signals_batch(self, signals: List[Dict[str, Any]]) -> Dict[str, SignalClassification]:
         """Массовая классификация сигналов"""
         try:
+            rows = self.classify_rows(signals)
             results = {}
             
-            for signal in signals:
-                signal_code = signal.get('signal_code', '')
-                description = signal.get('description', '')
-                
-                if signal_code:
-                    classification = self.classify_signal(signal_code, description, signal)
-                    results[signal_code] = classification
+            for signal, row in zip(signals, rows.tolist()):
+                if row >= 0:
+                    results[signal.get('signal_code', '')] = self.table.row(row)
             
             self.logger.info(f"Классифицировано {len(results)} сигналов")
             return results
@@ -411,8 +549,8 @@ class SignalClassifier:
     
     def clear_cache(self):
         """Очистка кэша классификации"""
-        cache_size = len(self._pattern_cache)
-        self._pattern_cache.clear()
+        cache_size = len(self.table)
+        self.table.clear()
         self.logger.info(f"Очищен кэш классификации ({cache_size} элементов)")
     
     def get_classification_statistics(self, signals: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -0,0 +1,191 @@
+"""
+Матрица активности параметров по временным корзинам записи
+"""
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .change_point_index import ChangePointIndex
+
+# Метрики ячейки: число переходов значения или дисперсия значений в корзине
+ACTIVITY_METRICS = ('changes', 'variance')
+
+
+@dataclass
+class ActivityMatrix:
+    """Параметры x временные корзины фиксированной ширины
+
+    values[i, j] - активность столбца columns[i] в корзине j: число
+    переходов значения (metric='changes') или выборочная дисперсия
+    (metric='variance', NaN - в корзине нет значений).
+    """
+    columns: List[str]
+    bucket_starts: np.ndarray
+    bucket_seconds: float
+    values: np.ndarray
+    row_counts: np.ndarray
+    metric: str = 'changes'
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    @property
+    def bucket_count(self) -> int:
+        return len(self.bucket_starts)
+
+    @property
+    def totals(self) -> np.ndarray:
+        """Суммарная активность столбцов по всей записи"""
+        return np.nansum(self.values, axis=1)
+
+    def bucket_bounds(self, first: int, last: Optional[int] = None) -> Tuple[pd.Timestamp, pd.Timestamp]:
+        """Начало корзины first и конец корзины last (исключительно)"""
+        last = first if last is None else last
+        first, last = sorted((int(first), int(last)))
+        width = pd.Timedelta(seconds=self.bucket_seconds)
+        return pd.Timestamp(self.bucket_starts[first]), pd.Timestamp(self.bucket_starts[last]) + width
+
+    def time_range(self, first: int, last: Optional[int] = None,
+                   time_format: str = '%Y-%m-%d %H:%M:%S') -> Tuple[str, str]:
+        """Диапазон корзин в формате полей времени (обе границы включительно)"""
+        start, end = self.bucket_bounds(first, last)
+        end = end - pd.Timedelta(seconds=1) if self.bucket_seconds >= 1 else end
+        return start.strftime(time_format), max(start, end).strftime(time_format)
+
+    def top(self, count: int) -> 'ActivityMatrix':
+        """Столбцы с наибольшей суммарной активностью (по убыванию)"""
+        order = np.argsort(-self.totals, kind='stable')[:count]
+        return ActivityMatrix(
+            columns=[self.columns[i] for i in order],
+            bucket_starts=self.bucket_starts,
+            bucket_seconds=self.bucket_seconds,
+            values=self.values[order],
+            row_counts=self.row_counts,
+            metric=self.metric
+        )
+
+    def to_frame(self) -> pd.DataFrame:
+        """Матрица в виде DataFrame: строки - параметры, столбцы - начала корзин"""
+        return pd.DataFrame(self.values, index=self.columns, columns=pd.DatetimeIndex(self.bucket_starts))
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'metric': self.metric,
+            'bucket_seconds': self.bucket_seconds,
+            'bucket_starts': [str(pd.Timestamp(t)) for t in self.bucket_starts],
+            'columns': list(self.columns),
+            'values': self.values.tolist(),
+            'row_counts': self.row_counts.tolist()
+        }
+
+
+class ActivityMatrixBuilder:
+    """Построение матрицы активности одним проходом по строкам
+
+    Номер корзины каждой строки вычисляется один раз, после чего число
+    переходов по корзинам - один bincount по позициям переходов из
+    ChangePointIndex, а дисперсия - bincount сумм и квадратов значений.
+    Повторных проходов по окнам записи нет.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    @staticmethod
+    def bucket_rows(timestamps: pd.Series, bucket_seconds: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Номер корзины каждой строки (-1 для пустого времени) и начала корзин"""
+        if not pd.api.types.is_datetime64_any_dtype(timestamps):
+            timestamps = pd.to_datetime(timestamps, errors='coerce')
+
+        stamps = timestamps.to_numpy(dtype='datetime64[ns]')
+        valid = ~np.isnat(stamps)
+        buckets = np.full(len(stamps), -1, dtype=np.int64)
+        if not valid.any():
+            return buckets, np.array([], dtype='datetime64[ns]')
+
+        width = max(int(bucket_seconds * 1_000_000_000), 1)
+        origin = stamps[valid].min()
+        buckets[valid] = (stamps[valid] - origin).astype(np.int64) // width
+
+        count = int(buckets.max()) + 1
+        starts = origin + np.arange(count, dtype=np.int64) * np.timedelta64(width, 'ns')
+        return buckets, starts
+
+    def build(self, data: pd.DataFrame, columns: List[str], bucket_seconds: float = 60.0,
+              metric: str = 'changes', change_points: Optional[ChangePointIndex] = None,
+              numeric_values=None) -> Optional[ActivityMatrix]:
+        """Матрица активности столбцов data
+
+        change_points - индекс переходов записи (для metric='changes'),
+        numeric_values(column) - числовой ряд столбца (для metric='variance').
+        """
+        if data is None or 'timestamp' not in data.columns or bucket_seconds <= 0:
+            return None
+        if metric not in ACTIVITY_METRICS:
+            raise ValueError(f"Неизвестная метрика активности: {metric}")
+
+        columns = [c for c in dict.fromkeys(columns) if c in data.columns]
+        buckets, starts = self.bucket_rows(data['timestamp'], bucket_seconds)
+        n_buckets = len(starts)
+        if not n_buckets:
+            return None
+
+        row_counts = np.bincount(buckets[buckets >= 0], minlength=n_buckets)
+        if metric == 'changes':
+            values = self._change_counts(change_points or ChangePointIndex(data), columns, buckets, n_buckets)
+        else:
+            values = self._variances(data, columns, buckets, n_buckets, numeric_values)
+
+        return ActivityMatrix(columns=columns, bucket_starts=starts, bucket_seconds=float(bucket_seconds),
+                              values=values, row_counts=row_counts, metric=metric)
+
+    @staticmethod
+    def _change_counts(change_points: ChangePointIndex, columns: List[str],
+                       buckets: np.ndarray, n_buckets: int) -> np.ndarray:
+        """Переходы всех столбцов одним bincount по плоскому индексу (столбец, корзина)"""
+        flat = []
+        for i, column in enumerate(columns):
+            transitions = change_points.transitions(column)
+            if transitions is None or not len(transitions):
+                continue
+            cells = buckets[transitions.rows]
+            flat.append(cells[cells >= 0] + i * n_buckets)
+
+        if not flat:
+            return np.zeros((len(columns), n_buckets))
+        counts = np.bincount(np.concatenate(flat), minlength=len(columns) * n_buckets)
+        return counts.reshape(len(columns), n_buckets).astype(np.float64)
+
+    @staticmethod
+    def _variances(data: pd.DataFrame, columns: List[str], buckets: np.ndarray,
+                   n_buckets: int, numeric_values=None) -> np.ndarray:
+        """Выборочная дисперсия по корзинам из сумм и сумм квадратов"""
+        result = np.full((len(columns), n_buckets), np.nan)
+        for i, column in enumerate(columns):
+            values = numeric_values(column) if numeric_values else None
+            if values is None:
+                series = data[column]
+                if series.dtype.kind not in 'biuf':
+                    series = pd.to_numeric(series, errors='coerce')
+                values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+
+            valid = ~np.isnan(values) & (buckets >= 0)
+            if not valid.any():
+                continue
+
+            selected = values[valid]
+            # Сдвиг на среднее столбца сохраняет точность разности сумм
+            selected = selected - selected.mean()
+            cells = buckets[valid]
+            n = np.bincount(cells, minlength=n_buckets)
+            s = np.bincount(cells, weights=selected, minlength=n_buckets)
+            s2 = np.bincount(cells, weights=selected * selected, minlength=n_buckets)
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                variance = (s2 - s * s / n) / (n - 1)
+            variance = np.where(n > 1, np.maximum(variance, 0.0), np.where(n == 1, 0.0, np.nan))
+            result[i] = variance
+        return result
@@ -0,0 +1,140 @@
+"""
+Граф причинно-следственных связей сигналов для набора параметров записи
+"""
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ....config.diagnostic_filters_config import CAUSAL_RELATIONSHIPS
+
+# Сигналы-причины компонента: префикс + компонент + суффикс (B_BCU_READY, F_PSN_VOLTAGE, ...)
+COMPONENT_CAUSE_FORMS = (('B_', '_POWER_OK'), ('B_', '_READY'), ('B_', '_CONNECTED'),
+                         ('B_', '_FAULT'), ('F_', '_VOLTAGE'))
+
+
+class CausalGraphIndex:
+    """Связи сигналов, разрешенные по кодам одного набора параметров
+
+    Строится один раз на набор: смежность сигнал -> цепочки, причины и
+    следствия из CAUSAL_RELATIONSHIPS, множество присутствующих кодов,
+    разрешенные шаблоны с '*' (кэш) и обратный индекс компонент -> сигналы
+    вида B_<компонент>_READY. Запросы анализа одной неисправности - поиск в
+    словарях, обход на несколько звеньев - поиск в ширину по смежности.
+    """
+
+    def __init__(self, signals: List[Any], relationships: Dict[str, Dict[str, Any]] = CAUSAL_RELATIONSHIPS):
+        self.size = len(signals)
+        self._source = signals
+        self._first = signals[0] if signals else None
+        self._last = signals[-1] if signals else None
+
+        self.codes: List[str] = list(dict.fromkeys(code for code in map(self._code, signals) if code))
+        self.present = set(self.codes)
+        self.relationships = relationships
+        self._resolved: Dict[str, List[str]] = {}
+
+        self._chains: Dict[str, List[str]] = {}
+        self._causes: Dict[str, List[str]] = {}
+        self._effects: Dict[str, List[str]] = {}
+        self._chain_roles: Dict[str, Tuple[List[str], List[str]]] = {}
+        for chain_id, chain in relationships.items():
+            roots, effects = chain.get('root_causes', []), chain.get('effects', [])
+            for code in dict.fromkeys(roots + effects):
+                self._chains.setdefault(code, []).append(chain_id)
+            for effect in effects:
+                self._causes.setdefault(effect, []).extend(roots)
+            for root in roots:
+                self._effects.setdefault(root, []).extend(effects)
+            self._chain_roles[chain_id] = (self.resolve_all(roots), self.resolve_all(effects))
+
+        self._components = self._index_components(self.codes)
+
+    @staticmethod
+    def _code(signal: Any) -> str:
+        if isinstance(signal, dict):
+            return signal.get('signal_code') or ''
+        return getattr(signal, 'signal_code', None) or ''
+
+    def is_valid_for(self, signals: List[Any]) -> bool:
+        """Граф построен по этому же списку (без пересчета отпечатка)"""
+        return (signals is self._source and len(signals) == self.size
+                and (not signals or (signals[0] is self._first and signals[-1] is self._last)))
+
+    @staticmethod
+    def _index_components(codes: Iterable[str]) -> Dict[str, List[str]]:
+        """Компонент -> сигналы, содержащие <префикс><компонент><суффикс> для форм причин компонента"""
+        components: Dict[str, List[str]] = {}
+        for code in codes:
+            found = set()
+            for prefix, suffix in COMPONENT_CAUSE_FORMS:
+                starts = [i + len(prefix) for i in range(len(code)) if code.startswith(prefix, i)]
+                if not starts:
+                    continue
+                ends = [j for j in range(len(code)) if code.startswith(suffix, j)]
+                found.update(code[i:j] for i in starts for j in ends if j >= i)
+            for component in found:
+                components.setdefault(component, []).append(code)
+        return components
+
+    # === ЗАПРОСЫ ===
+
+    def resolve(self, pattern: str) -> List[str]:
+        """Присутствующие сигналы по коду или шаблону с '*' (подстрока без звездочек)"""
+        resolved = self._resolved.get(pattern)
+        if resolved is None:
+            if pattern in self.present:
+                resolved = [pattern]
+            elif '*' in pattern:
+                base = pattern.replace('*', '')
+                resolved = [code for code in self.codes if base in code]
+            else:
+                resolved = []
+            self._resolved[pattern] = resolved
+        return resolved
+
+    def resolve_all(self, patterns: Iterable[str]) -> List[str]:
+        return [code for pattern in patterns for code in self.resolve(pattern)]
+
+    def chains_of(self, signal_code: str) -> List[str]:
+        """Цепочки, в которых сигнал - причина или следствие"""
+        return self._chains.get(signal_code, [])
+
+    def chain_members(self, chain_id: str) -> List[str]:
+        """Присутствующие в записи сигналы цепочки"""
+        roots, effects = self.chain_roles(chain_id)
+        return roots + effects
+
+    def chain_roles(self, chain_id: str) -> Tuple[List[str], List[str]]:
+        """Присутствующие в записи причины и следствия цепочки"""
+        return self._chain_roles.get(chain_id, ([], []))
+
+    def linked_codes(self) -> List[str]:
+        """Присутствующие сигналы, входящие хотя бы в одну цепочку"""
+        return list(dict.fromkeys(code for chain_id in self._chain_roles for code in self.chain_members(chain_id)))
+
+    def causes_of(self, signal_code: str) -> List[str]:
+        return self._causes.get(signal_code, [])
+
+    def effects_of(self, signal_code: str) -> List[str]:
+        return self._effects.get(signal_code, [])
+
+    def component_signals(self, component: str) -> List[str]:
+        return self._components.get(component, [])
+
+    def traverse(self, signal_code: str, upstream: bool = True,
+                 max_depth: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Сигналы, достижимые по связям причина/следствие, с числом звеньев (поиск в ширину)"""
+        adjacency = self._causes if upstream else self._effects
+        depths = {signal_code: 0}
+        queue = deque([signal_code])
+        reached = []
+        while queue:
+            code = queue.popleft()
+            depth = depths[code]
+            if max_depth is not None and depth >= max_depth:
+                continue
+            for neighbour in adjacency.get(code, []):
+                if neighbour not in depths:
+                    depths[neighbour] = depth + 1
+                    reached.append((neighbour, depth + 1))
+                    queue.append(neighbour)
+        return reached
@@ -0,0 +1,792 @@
+"""
+Векторизованный движок анализа изменяемости параметров
+"""
+import logging
+import weakref
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .activity_matrix import ActivityMatrix, ActivityMatrixBuilder
+from .change_point_index import ChangePointIndex
+from .column_parallel_backend import ColumnParallelBackend, RESULT_FIELDS
+from .range_statistics_index import (RangeStatisticsIndex, SlidingWindowAccumulator,
+                                     WindowStatistics, DECISION_TOLERANCE)
+
+RowSelector = Union[slice, np.ndarray]
+
+
+@dataclass
+class ColumnChangeStatistics:
+    """Статистика изменяемости по набору столбцов (массивы выровнены по columns)"""
+    columns: List[str]
+    total_values: np.ndarray
+    valid_values: np.ndarray
+    unique_values: np.ndarray
+    change_count: np.ndarray
+    mean: np.ndarray
+    std: np.ndarray
+    variance: np.ndarray
+    min_value: np.ndarray
+    max_value: np.ndarray
+    is_numeric: np.ndarray
+    is_float_or_int64: np.ndarray
+    _positions: Dict[str, int] = field(default_factory=dict, repr=False)
+
+    def __post_init__(self):
+        self._positions = {column: i for i, column in enumerate(self.columns)}
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def position(self, column: str) -> Optional[int]:
+        """Позиция столбца в массивах статистики"""
+        return self._positions.get(column)
+
+    @property
+    def unique_ratio(self) -> np.ndarray:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.valid_values > 0,
+                            self.unique_values / np.maximum(self.valid_values, 1), 0.0)
+
+    @property
+    def coefficient_of_variation(self) -> np.ndarray:
+        """std / |mean| (inf при нулевом среднем и ненулевом разбросе)"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self.std / np.abs(self.mean)
+
+
+@dataclass
+class ChangeScores:
+    """Пороговонезависимые оценки изменяемости окна (массивы выровнены по columns)
+
+    Столбец изменяем при пороге t тогда и только тогда, когда score > t,
+    поэтому смена порога - векторное сравнение без повторного расчета.
+    -inf - столбец не изменяем ни при каком пороге, inf - при любом.
+    """
+    columns: List[str]
+    score: np.ndarray
+    coefficient_of_variation: np.ndarray
+    unique_ratio: np.ndarray
+    change_count: np.ndarray
+    rule: str = 'variation'
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def mask(self, threshold: float) -> np.ndarray:
+        return self.score > threshold
+
+    def changed(self, threshold: float) -> List[str]:
+        """Изменяемые столбцы в исходном порядке"""
+        return [self.columns[i] for i in np.flatnonzero(self.mask(threshold))]
+
+    def ranked(self, threshold: float) -> List[Tuple[str, float]]:
+        """Изменяемые столбцы по убыванию оценки"""
+        selected = np.flatnonzero(self.mask(threshold))
+        order = selected[np.argsort(-self.score[selected], kind='stable')]
+        return [(self.columns[i], float(self.score[i])) for i in order]
+
+    def as_dict(self) -> Dict[str, float]:
+        return {column: float(score) for column, score in zip(self.columns, self.score)}
+
+    def concat(self, other: 'ChangeScores') -> 'ChangeScores':
+        """Оценки двух наборов столбцов одного окна (например, записи и виртуальных каналов)"""
+        return ChangeScores(
+            columns=self.columns + other.columns,
+            score=np.concatenate([self.score, other.score]),
+            coefficient_of_variation=np.concatenate([self.coefficient_of_variation,
+                                                     other.coefficient_of_variation]),
+            unique_ratio=np.concatenate([self.unique_ratio, other.unique_ratio]),
+            change_count=np.concatenate([self.change_count, other.change_count]),
+            rule=self.rule
+        )
+
+
+class NumericMatrix:
+    """Числовые столбцы записи одной матрицей float64 в порядке Fortran
+
+    Строится один раз на запись: срезы строк по диапазону становятся
+    представлениями без копирования, а редукции идут по непрерывным столбцам.
+    """
+
+    def __init__(self, data: pd.DataFrame, allocate=None):
+        self.source_columns = data.columns
+        self.dtypes = {column: data[column].dtype for column in data.columns}
+        self.columns = [c for c, dtype in self.dtypes.items() if dtype.kind in 'biuf']
+        self.positions = {column: i for i, column in enumerate(self.columns)}
+
+        # allocate - размещение матрицы вне кучи процесса (разделяемая память пула)
+        shape = (len(data), len(self.columns))
+        self.values = allocate(shape) if allocate else np.empty(shape, dtype=np.float64, order='F')
+        for j, column in enumerate(self.columns):
+            self.values[:, j] = data[column].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.values.shape
+
+    def block(self, positions: np.ndarray, rows: RowSelector) -> np.ndarray:
+        """Блок строки x столбцы; для среза подряд идущих столбцов - представление"""
+        selected = self.values[rows] if isinstance(rows, slice) else self.values.take(rows, axis=0)
+        if len(positions) and positions[-1] - positions[0] == len(positions) - 1:
+            return np.asfortranarray(selected[:, positions[0]:positions[-1] + 1])
+        return np.asfortranarray(selected[:, positions])
+
+
+class FrameColumns:
+    """Числовые столбцы записи без общей матрицы: блоки читаются из DataFrame по запросу
+
+    Интерфейс NumericMatrix (columns, positions, dtypes, shape, block) для
+    записей, матрица которых не укладывается в бюджет памяти. Запись
+    держится слабой ссылкой, как и в кэше матрицы движка.
+    """
+
+    def __init__(self, data: pd.DataFrame):
+        self.source_columns = data.columns
+        self.dtypes = {column: data[column].dtype for column in data.columns}
+        self.columns = [c for c, dtype in self.dtypes.items() if dtype.kind in 'biuf']
+        self.positions = {column: i for i, column in enumerate(self.columns)}
+        self.shape = (len(data), len(self.columns))
+        self._data = weakref.ref(data)
+
+    def block(self, positions: np.ndarray, rows: RowSelector) -> np.ndarray:
+        data = self._data()
+        if data is None:
+            raise ValueError("Запись для чтения столбцов уже выгружена")
+        n_rows = ChangeAnalysisEngine.count_rows(rows) if isinstance(rows, slice) else len(rows)
+        block = np.empty((n_rows, len(positions)), dtype=np.float64, order='F')
+        for j, position in enumerate(positions):
+            block[:, j] = data[self.columns[position]].iloc[rows].to_numpy(dtype=np.float64, na_value=np.nan)
+        return block
+
+
+class ChangeAnalysisEngine:
+    """Расчет CV, доли уникальных значений и числа переключений матричными операциями NumPy
+
+    Статистика считается блоками столбцов по срезу строк, после чего
+    правила изменяемости всех потребителей применяются как векторные маски.
+    """
+
+    def __init__(self, column_chunk_size: int = 256, matrix_budget_mb: float = 512.0,
+                 parallel_backend: Optional[ColumnParallelBackend] = None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.column_chunk_size = column_chunk_size
+        self.matrix_budget_bytes = int(matrix_budget_mb * 1024 * 1024)
+        # Пул процессов для широких записей (None - расчет только в текущем процессе)
+        self.parallel_backend = parallel_backend
+
+        # Кэш числовой матрицы текущей записи (None, если запись не укладывается в бюджет)
+        self._matrix: Optional[NumericMatrix] = None
+        self._matrix_source = None
+        self._source_shape: Optional[Tuple[pd.Index, int]] = None
+        # Матрица копии движка (fork) принадлежит исходному движку и им же освобождается
+        self._owns_matrix = True
+        # Префиксный индекс поверх матрицы или, без нее, поверх столбцов DataFrame
+        self._range_index: Optional[RangeStatisticsIndex] = None
+        self._range_source: Optional[Union[NumericMatrix, FrameColumns]] = None
+        # Суммы последнего окна для инкрементального сдвига
+        self._window_accumulator: Optional[SlidingWindowAccumulator] = None
+        # Индекс точек изменения (переходы считаются по столбцам по требованию)
+        self._change_points: Optional[ChangePointIndex] = None
+
+    # === ЧИСЛОВАЯ МАТРИЦА ЗАПИСИ ===
+
+    def get_matrix(self, data: pd.DataFrame) -> Optional[NumericMatrix]:
+        """Числовая матрица для data (строится при первом обращении, если укладывается в бюджет)"""
+        if data is None:
+            return None
+
+        if self._is_current(data):
+            return self._matrix
+
+        self.invalidate()
+        self._matrix_source = weakref.ref(data)
+        self._source_shape = (data.columns, len(data))
+
+        numeric_count = sum(1 for dtype in data.dtypes if dtype.kind in 'biuf')
+        if len(data) * numeric_count * 8 > self.matrix_budget_bytes:
+            self.logger.debug("Числовая матрица превышает бюджет, используется постолбцовое извлечение")
+            return None
+
+        # В разделяемой памяти размещаются только матрицы, которые будут считаться пулом
+        backend = self.parallel_backend
+        allocate = backend.allocate if backend and backend.should_parallelize(len(data), numeric_count) else None
+        self._matrix = NumericMatrix(data, allocate)
+        self.logger.debug(f"Построена числовая матрица {self._matrix.values.shape} "
+                          f"({self._matrix.nbytes / 1024 / 1024:.1f} МБ)")
+        return self._matrix
+
+    def _is_current(self, data: pd.DataFrame) -> bool:
+        """Кэш построен для этого же объекта data с теми же столбцами и числом строк"""
+        source = self._matrix_source() if self._matrix_source is not None else None
+        return source is data and self._source_shape is not None \
+            and self._source_shape[0] is data.columns and self._source_shape[1] == len(data)
+
+    def get_range_index(self, data: pd.DataFrame) -> Optional[RangeStatisticsIndex]:
+        """Префиксный индекс окон для data (строится при первом обращении)
+
+        Если числовая матрица не укладывается в бюджет, индекс строится
+        группами столбцов прямо из DataFrame: в памяти одновременно только
+        группа и сами префиксы (блок префиксов укрупняется под тот же бюджет).
+        """
+        if data is None:
+            return None
+        matrix = self.get_matrix(data)
+
+        if self._range_index is None:
+            try:
+                source = matrix if matrix is not None else FrameColumns(data)
+                n_rows, n_columns = source.shape
+                chunk_size = self.column_chunk_size
+                if matrix is None:
+                    # Группа столбцов и ее временные копии при построении (~4 размера группы)
+                    chunk_size = int(max(1, min(chunk_size, self.matrix_budget_bytes // max(n_rows * 8 * 4, 1))))
+                    self.logger.info(f"Числовая матрица {n_rows}x{n_columns} превышает бюджет: "
+                                     f"индекс окон строится группами по {chunk_size} столбцов")
+
+                self._range_index = RangeStatisticsIndex(source, self._range_block_size(n_rows, n_columns),
+                                                         chunk_size)
+                self._range_source = source
+                self._window_accumulator = SlidingWindowAccumulator(self._range_index)
+                self.logger.debug(f"Построен индекс окон ({self._range_index.nbytes / 1024 / 1024:.1f} МБ, "
+                                  f"блок {self._range_index.block_size} строк)")
+            except Exception as e:
+                self.logger.error(f"Ошибка построения индекса окон: {e}")
+                self._range_index = self._range_source = self._window_accumulator = None
+                return None
+        return self._range_index
+
+    def _range_block_size(self, n_rows: int, n_columns: int, block_size: int = 256) -> int:
+        """Размер блока префиксов: 256 строк или крупнее, чтобы префиксы (24 байта на ячейку) уложились в бюджет"""
+        while block_size < n_rows and (n_rows // block_size + 1) * n_columns * 24 > self.matrix_budget_bytes:
+            block_size *= 2
+        return block_size
+
+    def get_change_points(self, data: pd.DataFrame) -> Optional[ChangePointIndex]:
+        """Индекс переходов значений для data (один на запись)"""
+        if data is None:
+            return None
+        if self._change_points is None or not self._change_points.is_valid_for(data):
+            self._change_points = ChangePointIndex(data)
+        return self._change_points
+
+    def fork(self, data: pd.DataFrame) -> 'ChangeAnalysisEngine':
+        """Движок той же записи для фонового потока
+
+        Матрица и префиксный индекс строятся (или берутся из кэша) в
+        вызывающем потоке и дальше только читаются; накопитель сдвига окна и
+        кэши у копии свои, поэтому расчет копии не пересекается со сменой
+        диапазона, перерисовкой и загрузкой другой записи в исходном движке.
+        """
+        self.get_range_index(data)
+        engine = ChangeAnalysisEngine(self.column_chunk_size, self.matrix_budget_bytes / 1024 / 1024,
+                                      self.parallel_backend)
+        if self._is_current(data):
+            engine._matrix, engine._matrix_source, engine._source_shape = \
+                self._matrix, self._matrix_source, self._source_shape
+            engine._owns_matrix = False
+            engine._range_index, engine._range_source = self._range_index, self._range_source
+            if self._range_index is not None:
+                engine._window_accumulator = SlidingWindowAccumulator(self._range_index)
+        return engine
+
+    def get_window_statistics(self) -> Dict[str, Any]:
+        """Счетчики инкрементального сдвига окна"""
+        if self._window_accumulator is None:
+            return {}
+        return dict(self._window_accumulator.stats)
+
+    def invalidate(self):
+        """Сброс кэша матрицы (после загрузки другой записи или изменения данных на месте)"""
+        if self.parallel_backend and self._matrix is not None and self._owns_matrix:
+            self.parallel_backend.release(self._matrix.values)
+        self._owns_matrix = True
+        self._matrix = None
+        self._matrix_source = None
+        self._source_shape = None
+        self._range_index = None
+        self._range_source = None
+        self._window_accumulator = None
+        self._change_points = None
+
+    def shutdown(self):
+        """Освобождение матрицы и остановка пула процессов"""
+        self.invalidate()
+        if self.parallel_backend:
+            self.parallel_backend.shutdown()
+
+    def get_parallel_statistics(self) -> Dict[str, Any]:
+        """Счетчики параллельного расчета"""
+        if self.parallel_backend is None:
+            return {}
+        return {**self.parallel_backend.stats, 'workers': self.parallel_backend.max_workers,
+                'enabled': self.parallel_backend.enabled}
+
+    # === ВЫБОР СТРОК ===
+
+    def resolve_rows(self, data: pd.DataFrame, start_time: Optional[datetime] = None,
+                     end_time: Optional[datetime] = None) -> RowSelector:
+        """Позиции строк в диапазоне [start_time, end_time] по столбцу timestamp"""
+        if data is None or 'timestamp' not in data.columns or (start_time is None and end_time is None):
+            return slice(0, len(data) if data is not None else 0)
+
+        timestamps = data['timestamp']
+        if not pd.api.types.is_datetime64_any_dtype(timestamps):
+            timestamps = pd.to_datetime(timestamps, errors='coerce')
+
+        start = pd.Timestamp(start_time) if start_time is not None else None
+        end = pd.Timestamp(end_time) if end_time is not None else None
+
+        # Отсортированный timestamp - двоичный поиск вместо маски
+        if timestamps.is_monotonic_increasing:
+            lo = int(timestamps.searchsorted(start, side='left')) if start is not None else 0
+            hi = int(timestamps.searchsorted(end, side='right')) if end is not None else len(timestamps)
+            return slice(lo, max(lo, hi))
+
+        mask = np.ones(len(timestamps), dtype=bool)
+        if start is not None:
+            mask &= (timestamps >= start).to_numpy()
+        if end is not None:
+            mask &= (timestamps <= end).to_numpy()
+        return np.flatnonzero(mask)
+
+    @staticmethod
+    def count_rows(rows: RowSelector) -> int:
+        if isinstance(rows, slice):
+            return max(0, rows.stop - rows.start)
+        return len(rows)
+
+    # === РАСЧЕТ СТАТИСТИКИ ===
+
+    def compute(self, data: pd.DataFrame, columns: List[str],
+                rows: Optional[RowSelector] = None, count_unique: bool = True) -> ColumnChangeStatistics:
+        """Статистика изменяемости для столбцов data на срезе строк rows
+
+        count_unique=False пропускает сортировку для подсчета уникальных значений
+        числовых столбцов (unique_values остается оценкой change_count + 1).
+        """
+        columns = [c for c in dict.fromkeys(columns) if c in data.columns]
+        if rows is None:
+            rows = slice(0, len(data))
+
+        count = len(columns)
+        stats = self._empty_statistics(columns, self.count_rows(rows))
+        if count == 0:
+            return stats
+
+        matrix = self.get_matrix(data)
+
+        numeric_positions = []
+        for i, column in enumerate(columns):
+            dtype = matrix.dtypes[column] if matrix is not None else data[column].dtype
+            stats.is_numeric[i] = dtype.kind in 'biufc'
+            stats.is_float_or_int64[i] = dtype in ('float64', 'int64')
+            if dtype.kind in 'biuf':
+                numeric_positions.append(i)
+            else:
+                self._compute_object_column(data[column], rows, stats, i)
+
+        if count_unique and self._compute_parallel(data, columns, numeric_positions, rows, matrix, stats):
+            return stats
+
+        for chunk_start in range(0, len(numeric_positions), self.column_chunk_size):
+            chunk = numeric_positions[chunk_start:chunk_start + self.column_chunk_size]
+            if matrix is not None:
+                block = matrix.block(np.array([matrix.positions[columns[i]] for i in chunk]), rows)
+            else:
+                block = self._extract_block(data, [columns[i] for i in chunk], rows)
+            self._compute_numeric_block(block, np.asarray(chunk), stats, count_unique)
+
+        return stats
+
+    def compute_block(self, block: np.ndarray, columns: List[str],
+                      count_unique: bool = True) -> ColumnChangeStatistics:
+        """Статистика изменяемости готового блока строки x столбцы (производные сигналы вне записи)"""
+        stats = self._empty_statistics(list(columns), block.shape[0])
+        stats.is_numeric[:] = True
+        stats.is_float_or_int64[:] = True
+        if len(columns):
+            self._compute_numeric_block(np.asfortranarray(block, dtype=np.float64),
+                                        np.arange(len(columns)), stats, count_unique)
+        return stats
+
+    @staticmethod
+    def _empty_statistics(columns: List[str], total_rows: int) -> ColumnChangeStatistics:
+        count = len(columns)
+        return ColumnChangeStatistics(
+            columns=columns,
+            total_values=np.full(count, total_rows, dtype=np.int64),
+            valid_values=np.zeros(count, dtype=np.int64),
+            unique_values=np.zeros(count, dtype=np.int64),
+            change_count=np.zeros(count, dtype=np.int64),
+            mean=np.full(count, np.nan),
+            std=np.full(count, np.nan),
+            variance=np.full(count, np.nan),
+            min_value=np.full(count, np.nan),
+            max_value=np.full(count, np.nan),
+            is_numeric=np.zeros(count, dtype=bool),
+            is_float_or_int64=np.zeros(count, dtype=bool)
+        )
+
+    def compute_for_range(self, data: pd.DataFrame, columns: List[str],
+                          start_time: Optional[datetime] = None,
+                          end_time: Optional[datetime] = None) -> ColumnChangeStatistics:
+        """Статистика изменяемости для временного диапазона"""
+        return self.compute(data, columns, self.resolve_rows(data, start_time, end_time))
+
+    def _compute_parallel(self, data: pd.DataFrame, columns: List[str], numeric_positions: List[int],
+                          rows: RowSelector, matrix: Optional[NumericMatrix],
+                          stats: ColumnChangeStatistics) -> bool:
+        """Расчет числовых столбцов в пуле процессов; False - считать в текущем процессе"""
+        backend = self.parallel_backend
+        n_rows = self.count_rows(rows)
+        if backend is None or not backend.should_parallelize(n_rows, len(numeric_positions)):
+            if backend is not None:
+                backend.stats['inline_runs'] += 1
+            return False
+
+        targets = np.asarray(numeric_positions)
+        if matrix is not None:
+            # Матрица вне разделяемой памяти (нет места в /dev/shm) считается в текущем процессе
+            if not backend.is_shared(matrix.values):
+                backend.stats['inline_runs'] += 1
+                return False
+            results = backend.compute(matrix.values, rows,
+                                      np.array([matrix.positions[columns[i]] for i in numeric_positions]))
+            if results is None:
+                return False
+            self._apply_results(results, targets, stats)
+            return True
+
+        # Матрица не уложилась в бюджет: столбцы выгружаются в разделяемую память группами по бюджету
+        group_size = max(self.matrix_budget_bytes // max(n_rows * 8, 1),
+                         backend.min_columns_per_worker * backend.max_workers)
+        for group_start in range(0, len(targets), group_size):
+            group = targets[group_start:group_start + group_size]
+            block = backend.allocate((n_rows, len(group)))
+            if not backend.is_shared(block):
+                # Сегмент не выделен: выгрузка столбцов была бы лишней, сразу расчет в текущем процессе
+                del block
+                backend.stats['inline_runs'] += 1
+                return False
+            try:
+                self._extract_block(data, [columns[i] for i in group], rows, out=block)
+                results = backend.compute(block, slice(0, n_rows), np.arange(len(group)))
+            finally:
+                backend.release(block)
+                del block
+                backend.collect()
+            if results is None:
+                return False
+            self._apply_results(results, group, stats)
+        return True
+
+    @staticmethod
+    def _apply_results(results: Dict[str, np.ndarray], positions: np.ndarray, stats: ColumnChangeStatistics):
+        for name in RESULT_FIELDS:
+            getattr(stats, name)[positions] = results[name]
+        stats.std[positions] = np.sqrt(results['variance'])
+
+    def _extract_block(self, data: pd.DataFrame, columns: List[str], rows: RowSelector,
+                       out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Числовой блок (строки x столбцы) в порядке Fortran для редукций по столбцам"""
+        block = out if out is not None else np.empty((self.count_rows(rows), len(columns)),
+                                                     dtype=np.float64, order='F')
+        for j, column in enumerate(columns):
+            block[:, j] = data[column].iloc[rows].to_numpy(dtype=np.float64, na_value=np.nan)
+        return block
+
+    def _compute_numeric_block(self, block: np.ndarray, positions: np.ndarray,
+                               stats: ColumnChangeStatistics, count_unique: bool = True):
+        """Матричные редукции по блоку числовых столбцов"""
+        n_rows = block.shape[0]
+        if n_rows == 0:
+            return
+
+        missing = np.isnan(block)
+        valid_count = n_rows - np.count_nonzero(missing, axis=0)
+        stats.valid_values[positions] = valid_count
+
+        # Полные столбцы (без пропусков) считаются матричными редукциями целиком
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = block.sum(axis=0) / n_rows
+            centered = block - mean
+            np.multiply(centered, centered, out=centered)
+            variance = centered.sum(axis=0) / (n_rows - 1) if n_rows > 1 \
+                else np.full(block.shape[1], np.nan)
+            del centered
+            change_count = np.count_nonzero(block[1:] != block[:-1], axis=0)
+            min_value = np.fmin.reduce(block, axis=0)
+            max_value = np.fmax.reduce(block, axis=0)
+
+        # Уникальные значения: при 0-1 переключениях их число известно без сортировки
+        complete = valid_count == n_rows
+        unique_values = change_count + 1
+        to_sort = np.flatnonzero(complete & (change_count > 1)) if count_unique else []
+        if len(to_sort):
+            ordered = np.sort(block[:, to_sort], axis=0)
+            unique_values[to_sort] = np.count_nonzero(ordered[1:] != ordered[:-1], axis=0) + 1
+
+        # Столбцы с пропусками считаются по сжатым значениям: порядок суммирования
+        # (и округление) совпадает с Series.dropna().mean()/std(), а пропуски
+        # не создают ложных переключений и уникальных значений
+        for j in np.flatnonzero(~complete):
+            values = block[~missing[:, j], j]
+            count = len(values)
+            if count == 0:
+                mean[j] = variance[j] = np.nan
+                change_count[j] = unique_values[j] = 0
+                continue
+
+            mean[j] = values.sum() / count
+            change_count[j] = np.count_nonzero(values[1:] != values[:-1])
+            if count_unique:
+                ordered = np.sort(values)
+                unique_values[j] = np.count_nonzero(ordered[1:] != ordered[:-1]) + 1
+            else:
+                unique_values[j] = change_count[j] + 1
+            if count > 1:
+                deviations = values - mean[j]
+                variance[j] = (deviations * deviations).sum() / (count - 1)
+            else:
+                variance[j] = np.nan
+
+        stats.mean[positions] = mean
+        stats.variance[positions] = variance
+        stats.std[positions] = np.sqrt(variance)
+        stats.min_value[positions] = min_value
+        stats.max_value[positions] = max_value
+        stats.change_count[positions] = change_count
+        stats.unique_values[positions] = unique_values
+
+    def _compute_object_column(self, series: pd.Series, rows: RowSelector,
+                               stats: ColumnChangeStatistics, position: int):
+        """Нечисловой столбец: только счетчики без моментов распределения"""
+        clean = series.iloc[rows].dropna()
+        stats.valid_values[position] = len(clean)
+        stats.unique_values[position] = len(clean.unique())
+        if len(clean) > 1:
+            values = clean.to_numpy()
+            stats.change_count[position] = int((values[1:] != values[:-1]).sum())
+
+    # === ПРАВИЛА ИЗМЕНЯЕМОСТИ ===
+
+    def variation_mask(self, stats: ColumnChangeStatistics, threshold: float) -> np.ndarray:
+        """Правило TimeRangeService: CV (или std при нулевом среднем), затем доля уникальных"""
+        enough = stats.valid_values >= 2
+        mean = np.nan_to_num(stats.mean)
+        std = np.nan_to_num(stats.std)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            by_variation = np.where(mean != 0, std / np.abs(mean) > threshold, std > threshold)
+        by_variation &= stats.is_numeric
+        return enough & (by_variation | (stats.unique_ratio > threshold))
+
+    def uniqueness_mask(self, stats: ColumnChangeStatistics, threshold: float) -> np.ndarray:
+        """Простое правило DataModel: доля уникальных для чисел, диапазон уникальности для категорий"""
+        enough = stats.valid_values >= 2
+        numeric_rule = stats.unique_ratio > threshold
+        categorical_rule = (stats.unique_values > 1) & (stats.unique_values < stats.valid_values * 0.9)
+        return enough & np.where(stats.is_numeric, numeric_rule, categorical_rule)
+
+    def loader_mask(self, stats: ColumnChangeStatistics, threshold: float) -> np.ndarray:
+        """Правило CSVDataLoader: CV для float64/int64, доля уникальных для прочих типов"""
+        enough = (stats.valid_values > 1) & (stats.unique_values > 1)
+        mean = np.nan_to_num(stats.mean)
+        std = np.nan_to_num(stats.std)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            numeric_rule = np.where(mean != 0, std / np.abs(mean) > threshold, std > 0)
+        return enough & np.where(stats.is_float_or_int64, numeric_rule, stats.unique_ratio > threshold)
+
+    def score_vector(self, stats: ColumnChangeStatistics, rule: str = 'variation') -> np.ndarray:
+        """Оценка, превышение которой порогом эквивалентно маске правила rule"""
+        mean = np.nan_to_num(stats.mean)
+        std = np.nan_to_num(stats.std)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cv = std / np.abs(mean)
+
+        if rule == 'variation':
+            enough = stats.valid_values >= 2
+            by_variation = np.where(stats.is_numeric, np.where(mean != 0, cv, std), -np.inf)
+            score = np.maximum(by_variation, stats.unique_ratio)
+        elif rule == 'loader':
+            enough = (stats.valid_values > 1) & (stats.unique_values > 1)
+            # При нулевом среднем правило не зависит от порога: std > 0
+            numeric_score = np.where(mean != 0, cv, np.where(std > 0, np.inf, -np.inf))
+            score = np.where(stats.is_float_or_int64, numeric_score, stats.unique_ratio)
+        else:
+            enough = stats.valid_values >= 2
+            categorical = (stats.unique_values > 1) & (stats.unique_values < stats.valid_values * 0.9)
+            score = np.where(stats.is_numeric, stats.unique_ratio, np.where(categorical, np.inf, -np.inf))
+
+        return np.where(enough, score, -np.inf)
+
+    def compute_scores(self, data: pd.DataFrame, columns: List[str], rows: Optional[RowSelector] = None,
+                       rule: str = 'variation') -> ChangeScores:
+        """Оценки изменяемости окна: один проход по данным для любого числа порогов"""
+        return self.scores(self.compute(data, columns, rows), rule)
+
+    def scores(self, stats: ColumnChangeStatistics, rule: str = 'variation') -> ChangeScores:
+        """Оценки изменяемости по готовой статистике"""
+        mean = np.nan_to_num(stats.mean)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cv = np.where(mean != 0, np.nan_to_num(stats.std) / np.abs(mean), 0.0)
+
+        return ChangeScores(
+            columns=stats.columns,
+            score=self.score_vector(stats, rule),
+            coefficient_of_variation=cv,
+            unique_ratio=stats.unique_ratio,
+            change_count=stats.change_count.copy(),
+            rule=rule
+        )
+
+    # === ПОИСК ПО ИНДЕКСУ ОКОН ===
+
+    def changed_columns(self, data: pd.DataFrame, columns: List[str], rows: RowSelector,
+                        threshold: float, rule: str = 'variation') -> set:
+        """Изменяемые столбцы окна по правилу 'variation' или 'loader'
+
+        Для непрерывного окна решение принимается по префиксному индексу за
+        O(столбцов), а при небольшом сдвиге предыдущего окна - за O(сдвига); столбцы с пропусками, нечисловые и пограничные по порогу
+        пересчитываются точно через compute, поэтому результат совпадает с маской
+        по полной статистике.
+        """
+        rule_mask = self.variation_mask if rule == 'variation' else self.loader_mask
+        columns = [c for c in dict.fromkeys(columns) if c in data.columns]
+        changed = set()
+        pending = columns
+
+        index = self.get_range_index(data) if isinstance(rows, slice) and threshold > 0 else None
+        if index is not None and columns:
+            source = self._range_source
+            indexed = [c for c in columns if c in source.positions and index.indexed[source.positions[c]]]
+            # Соседнее окно - сдвиг накопленных сумм на разность окон, иначе запрос к индексу
+            window = self._window_accumulator.statistics(
+                rows.start, rows.stop, np.array([source.positions[c] for c in indexed], dtype=np.intp))
+
+            if window is not None:
+                exact_types = np.array([source.dtypes[c] in ('float64', 'int64') for c in indexed], dtype=bool)
+                decided_true, decided_false = self._decide_window(window, exact_types, threshold, rule)
+
+                changed.update(c for c, flag in zip(indexed, decided_true) if flag)
+                resolved = {c for c, t, f in zip(indexed, decided_true, decided_false) if t or f}
+                pending = [c for c in columns if c not in resolved]
+
+        if pending:
+            stats = self.compute(data, pending, rows)
+            mask = rule_mask(stats, threshold)
+            changed.update(c for c, flag in zip(stats.columns, mask) if flag)
+
+        return changed
+
+    def _decide_window(self, window: WindowStatistics, exact_types: np.ndarray,
+                       threshold: float, rule: str):
+        """Однозначные решения правила по статистике индекса: (точно да, точно нет)"""
+        count = window.count
+        changes = window.change_count
+
+        # Число уникальных значений окна без пропусков: 1 без переключений, иначе от 2 до changes + 1
+        unique_low = np.where(changes > 0, 2, 1)
+        unique_high = changes + 1
+        unique_true = unique_low / count > threshold
+        unique_false = unique_high / count <= threshold
+
+        # CV с запасом на погрешность индекса; при среднем около нуля правило
+        # переключается на std, что по индексу не различить - решает точный расчет
+        margin = 4 * DECISION_TOLERANCE
+        cv = window.coefficient_of_variation
+        known = window.reliable & window.mean_reliable
+        cv_true = known & (cv > threshold * (1 + margin))
+        cv_false = (known & (cv < threshold * (1 - margin))) | (changes == 0)
+
+        if rule == 'variation':
+            enough = count >= 2
+            decided_true = enough & (cv_true | unique_true)
+            decided_false = ~enough | (cv_false & unique_false)
+        else:
+            enough = (count > 1) & (changes > 0)
+            decided_true = enough & np.where(exact_types, cv_true, unique_true)
+            decided_false = ~enough | np.where(exact_types, cv_false, unique_false)
+
+        decided_true = np.broadcast_to(decided_true, changes.shape)
+        decided_false = np.broadcast_to(decided_false, changes.shape) & ~decided_true
+        return decided_true, decided_false
+
+    # === ПЕРЕХОДЫ ЗНАЧЕНИЙ ===
+
+    def query_transitions(self, data: pd.DataFrame, columns: List[str],
+                          start_time: Optional[datetime] = None,
+                          end_time: Optional[datetime] = None) -> pd.DataFrame:
+        """Переходы столбцов во временном диапазоне в хронологическом порядке"""
+        return self.get_change_points(data).query(columns, self.resolve_rows(data, start_time, end_time))
+
+    def count_transitions(self, data: pd.DataFrame, columns: List[str],
+                          start_time: Optional[datetime] = None,
+                          end_time: Optional[datetime] = None) -> Dict[str, int]:
+        """Число переходов каждого столбца во временном диапазоне"""
+        return self.get_change_points(data).count(columns, self.resolve_rows(data, start_time, end_time))
+
+    # === КАРТА АКТИВНОСТИ ===
+
+    def activity_matrix(self, data: pd.DataFrame, columns: List[str], bucket_seconds: float = 60.0,
+                        metric: str = 'changes') -> Optional[ActivityMatrix]:
+        """Активность столбцов по временным корзинам всей записи (переходы или дисперсия)"""
+        if data is None:
+            return None
+
+        numeric_values = None
+        if metric == 'variance':
+            matrix = self.get_matrix(data)
+            if matrix is not None:
+                # Столбцы уже построенной матрицы берутся без повторного преобразования
+                def numeric_values(column: str) -> Optional[np.ndarray]:
+                    position = matrix.positions.get(column)
+                    return matrix.values[:, position] if position is not None else None
+
+        return ActivityMatrixBuilder().build(data, columns, bucket_seconds, metric,
+                                             change_points=self.get_change_points(data),
+                                             numeric_values=numeric_values)
+
+    # === ДЕТАЛЬНАЯ СТАТИСТИКА ===
+
+    def parameter_statistics(self, stats: ColumnChangeStatistics, column: str) -> Dict[str, Any]:
+        """Статистика параметра в формате DataModel._calculate_parameter_statistics"""
+        i = stats.position(column)
+        if i is None or stats.valid_values[i] == 0:
+            return {'error': 'no_data', 'change_score': 0}
+
+        result = {
+            'total_values': int(stats.total_values[i]),
+            'valid_values': int(stats.valid_values[i]),
+            'null_values': int(stats.total_values[i] - stats.valid_values[i]),
+            'unique_values': int(stats.unique_values[i]),
+            'unique_ratio': float(stats.unique_values[i] / stats.valid_values[i])
+        }
+
+        if stats.is_numeric[i]:
+            mean = float(stats.mean[i])
+            std = float(stats.std[i])
+            value_range = float(stats.max_value[i] - stats.min_value[i])
+            result.update({
+                'min_value': float(stats.min_value[i]),
+                'max_value': float(stats.max_value[i]),
+                'mean_value': mean,
+                'std_value': std,
+                'variance': float(stats.variance[i]),
+                'range': value_range,
+                'coefficient_of_variation': float(std / mean) if mean != 0 else 0
+            })
+            result['change_score'] = min(result['unique_ratio'] * result['coefficient_of_variation'], 1.0) \
+                if value_range > 0 else 0
+        else:
+            result['change_score'] = result['unique_ratio']
+
+        return result
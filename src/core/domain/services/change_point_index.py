@@ -0,0 +1,209 @@
+"""
+Индекс точек изменения значений параметров
+"""
+import logging
+import weakref
+from dataclasses import dataclass
+from typing import List, Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+RowSelector = Union[slice, np.ndarray]
+
+
+@dataclass
+class ColumnTransitions:
+    """Переходы одного столбца: строка изменения, строка предыдущего значения, старое и новое значение
+
+    first_row и first_value - первое непустое значение столбца (-1 и NaN для пустого столбца):
+    вместе с переходами они задают значение в любой строке без обращения к данным.
+    categorical - нечисловой столбец (строки, состояния): значения - исходные метки,
+    сравнение с нулем для них не имеет смысла.
+    """
+    rows: np.ndarray
+    previous_rows: np.ndarray
+    old_values: np.ndarray
+    new_values: np.ndarray
+    has_gaps: bool = False
+    first_row: int = -1
+    first_value: float = np.nan
+    categorical: bool = False
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @property
+    def nbytes(self) -> int:
+        return (self.rows.nbytes + self.previous_rows.nbytes
+                + self.old_values.nbytes + self.new_values.nbytes)
+
+
+class ChangePointIndex:
+    """Отсортированные позиции переходов значений по столбцам записи
+
+    Переход - строка, значение в которой отличается от предыдущего
+    непустого значения столбца (пропуски пропускаются, как в отчетах).
+    Переходы столбца вычисляются одним векторным сравнением при первом
+    обращении и хранятся до смены записи.
+    """
+
+    def __init__(self, data: pd.DataFrame):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._source = weakref.ref(data)
+        self.source_columns = data.columns
+        self.row_count = len(data)
+        self._transitions: Dict[str, ColumnTransitions] = {}
+
+    def is_valid_for(self, data: pd.DataFrame) -> bool:
+        return self._source() is data and self.source_columns is data.columns and self.row_count == len(data)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(t.nbytes for t in self._transitions.values())
+
+    # === ПОСТРОЕНИЕ ===
+
+    def transitions(self, column: str) -> Optional[ColumnTransitions]:
+        """Переходы столбца (вычисляются при первом обращении)"""
+        cached = self._transitions.get(column)
+        if cached is not None:
+            return cached
+
+        data = self._source()
+        if data is None or column not in data.columns:
+            return None
+
+        transitions = self._build_column(data[column])
+        self._transitions[column] = transitions
+        return transitions
+
+    def build(self, columns: List[str]):
+        """Предварительный расчет переходов для набора столбцов"""
+        for column in columns:
+            self.transitions(column)
+
+    @staticmethod
+    def _build_column(series: pd.Series) -> ColumnTransitions:
+        labels = None
+        if series.dtype.kind in 'biuf':
+            values = series.to_numpy()
+        else:
+            values, labels = ChangePointIndex._encode(series)
+
+        if values.dtype.kind == 'f':
+            valid_rows = np.flatnonzero(~np.isnan(values))
+            compact = values[valid_rows]
+        else:
+            valid_rows = np.arange(len(values))
+            compact = values
+
+        changed = np.flatnonzero(compact[1:] != compact[:-1])
+        if labels is not None:
+            # Переходы найдены по кодам, в результат попадают исходные метки
+            compact = labels[compact.astype(np.int64)]
+        return ColumnTransitions(
+            rows=valid_rows[changed + 1],
+            previous_rows=valid_rows[changed],
+            old_values=compact[changed],
+            new_values=compact[changed + 1],
+            has_gaps=len(valid_rows) != len(values),
+            first_row=int(valid_rows[0]) if len(valid_rows) else -1,
+            first_value=compact[0] if len(compact) else np.nan,
+            categorical=labels is not None
+        )
+
+    @staticmethod
+    def _encode(series: pd.Series):
+        """Числовое представление нечислового столбца и метки кодов (None для числового)
+
+        Столбец, все непустые значения которого - числа в виде строк, остается
+        числовым; иначе значения заменяются кодами pd.factorize (пропуск - NaN),
+        чтобы смены строковых и перечислимых состояний не терялись при приведении.
+        """
+        numeric = pd.to_numeric(series, errors='coerce')
+        if numeric.notna().sum() == series.notna().sum():
+            return numeric.to_numpy(), None
+
+        codes, labels = pd.factorize(series)
+        values = codes.astype(np.float64)
+        values[codes < 0] = np.nan
+        return values, np.asarray(labels, dtype=object)
+
+    # === ЗАПРОСЫ ===
+
+    def column_window(self, column: str, rows: RowSelector) -> Optional[ColumnTransitions]:
+        """Переходы столбца, у которых и новое, и предыдущее значение лежат в окне rows"""
+        transitions = self.transitions(column)
+        if transitions is None:
+            return None
+
+        if isinstance(rows, slice):
+            first = int(np.searchsorted(transitions.previous_rows, rows.start, side='left'))
+            last = int(np.searchsorted(transitions.rows, rows.stop, side='left'))
+            selected = slice(first, max(first, last))
+        else:
+            selected = np.flatnonzero(np.isin(transitions.rows, rows) & np.isin(transitions.previous_rows, rows))
+
+        return ColumnTransitions(
+            rows=transitions.rows[selected],
+            previous_rows=transitions.previous_rows[selected],
+            old_values=transitions.old_values[selected],
+            new_values=transitions.new_values[selected],
+            has_gaps=transitions.has_gaps,
+            first_row=transitions.first_row,
+            first_value=transitions.first_value
+        )
+
+    def count(self, columns: List[str], rows: RowSelector) -> Dict[str, int]:
+        """Число переходов каждого столбца в окне"""
+        result = {}
+        for column in columns:
+            window = self.column_window(column, rows)
+            if window is not None:
+                result[column] = len(window)
+        return result
+
+    def query(self, columns: List[str], rows: RowSelector) -> pd.DataFrame:
+        """Все переходы столбцов в окне, объединенные в хронологическом порядке
+
+        Столбцы результата: row, timestamp (если есть), column, old_value, new_value.
+        При одинаковой строке порядок следует порядку columns.
+        """
+        parts = []
+        for order, column in enumerate(dict.fromkeys(columns)):
+            window = self.column_window(column, rows)
+            if window is None or len(window) == 0:
+                continue
+            parts.append(pd.DataFrame({
+                'row': window.rows,
+                'order': np.full(len(window), order),
+                'column': column,
+                'old_value': pd.Series(window.old_values, dtype=object),
+                'new_value': pd.Series(window.new_values, dtype=object)
+            }))
+
+        if not parts:
+            return pd.DataFrame(columns=['row', 'timestamp', 'column', 'old_value', 'new_value'])
+
+        events = pd.concat(parts, ignore_index=True)
+        events = events.sort_values(['row', 'order'], kind='stable', ignore_index=True)
+        events = events.drop(columns='order')
+
+        data = self._source()
+        if data is not None and 'timestamp' in data.columns:
+            events.insert(1, 'timestamp', data['timestamp'].to_numpy()[events['row'].to_numpy()])
+        return events
+
+    def step_rows(self, column: str, rows: slice) -> Optional[np.ndarray]:
+        """Опорные строки ступенчатого графика: начало окна, переходы и конец окна
+
+        Для столбцов с пропусками возвращается None - разрывы линии
+        должны сохраниться, поэтому нужен полный ряд.
+        """
+        transitions = self.transitions(column)
+        if transitions is None or transitions.has_gaps or rows.stop <= rows.start:
+            return None
+
+        window = self.column_window(column, rows)
+        return np.unique(np.concatenate(([rows.start], window.rows, [rows.stop - 1])))
@@ -0,0 +1,60 @@
+"""
+Задание поиска изменяемых параметров окна для выполнения вне потока UI
+"""
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Tuple
+
+import pandas as pd
+
+from .change_analysis_engine import ChangeAnalysisEngine, RowSelector
+from .virtual_channels import VirtualChannelSnapshot
+
+
+@dataclass(frozen=True, eq=False)
+class ChangedParametersJob:
+    """Неизменяемые входы расчета изменяемых параметров одного окна
+
+    Строится в потоке UI: диапазон уже установлен и разрешен в окно строк
+    rows, матрица и префиксный индекс записи готовы. run() не обращается к
+    DataModel и к общему движку: у задания своя копия движка (fork) и
+    снимок виртуальных каналов, поэтому параллельная смена диапазона,
+    перерисовка или загрузка другой записи в потоке UI его не затрагивают.
+    rule - правило изменяемости, то же, что у DataModel.find_changed_parameters_in_range.
+    result - готовый список из кэша модели (расчет не нужен).
+    """
+    cache_key: str
+    data: pd.DataFrame
+    parameters: Tuple[Any, ...]
+    rows: RowSelector
+    threshold: float
+    engine: ChangeAnalysisEngine
+    virtual: Optional[VirtualChannelSnapshot] = None
+    result: Optional[Tuple[Any, ...]] = None
+    rule: str = 'variation'
+
+    def run(self, token=None, report_progress: Optional[Callable[[float], None]] = None) -> List[Any]:
+        """Изменяемые параметры окна (порядок parameters); token - CancellationToken или None"""
+        if self.result is not None:
+            return list(self.result)
+        if ChangeAnalysisEngine.count_rows(self.rows) == 0:
+            logging.getLogger(self.__class__.__name__).warning("Нет данных в выбранном диапазоне")
+            return []
+
+        # Решение по префиксному индексу окон; спорные столбцы досчитываются точно
+        changed = self.engine.changed_columns(
+            self.data, [parameter.full_column for parameter in self.parameters], self.rows,
+            self.threshold, rule=self.rule)
+        if token is not None:
+            token.raise_if_cancelled()
+        if report_progress:
+            report_progress(0.7)
+
+        if self.virtual is not None:
+            columns = self.virtual.columns
+            stats = self.engine.compute_block(self.virtual.values_block(self.rows), columns)
+            changed.update(self.engine.scores(stats, self.rule).changed(self.threshold))
+            if token is not None:
+                token.raise_if_cancelled()
+
+        return [parameter for parameter in self.parameters if parameter.full_column in changed]
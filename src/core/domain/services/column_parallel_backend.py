@@ -0,0 +1,234 @@
+"""
+Параллельный расчет статистики столбцов в пуле процессов через разделяемую память
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+try:
+    from multiprocessing import get_context
+    from multiprocessing.shared_memory import SharedMemory
+except ImportError as e:
+    logging.warning(f"Разделяемая память недоступна: {e}")
+    get_context = None
+    SharedMemory = None
+
+RowSelector = Union[slice, np.ndarray]
+
+# Верхняя граница числа рабочих процессов по умолчанию: дальше выигрыш съедают
+# запуск spawn-процессов и пропускная способность памяти
+MAX_DEFAULT_WORKERS = 8
+
+# Поля результата рабочего процесса (массивы по столбцам его диапазона)
+RESULT_FIELDS = ('valid_values', 'unique_values', 'change_count', 'mean', 'variance', 'min_value', 'max_value')
+
+
+def _compute_columns_worker(segment_name: str, shape: tuple, rows: RowSelector,
+                            positions: np.ndarray) -> Dict[str, np.ndarray]:
+    """Статистика столбцов positions матрицы из сегмента segment_name (выполняется в рабочем процессе)"""
+    segment = SharedMemory(name=segment_name)
+    try:
+        # Представления сегмента живут только внутри вызова, иначе сегмент не закрыть
+        return _compute_columns(np.ndarray(shape, dtype=np.float64, buffer=segment.buf, order='F'),
+                                rows, positions)
+    finally:
+        segment.close()
+
+
+def _compute_columns(values: np.ndarray, rows: RowSelector, positions: np.ndarray) -> Dict[str, np.ndarray]:
+    from .change_analysis_engine import ChangeAnalysisEngine, ColumnChangeStatistics
+
+    # Сначала выбираются столбцы диапазона (представление), затем строки окна
+    if positions[-1] - positions[0] == len(positions) - 1:
+        columns = values[:, positions[0]:positions[-1] + 1]
+        block = columns[rows] if isinstance(rows, slice) else columns.take(rows, axis=0)
+    elif isinstance(rows, slice):
+        block = values[rows][:, positions]
+    else:
+        block = values[np.ix_(rows, positions)]
+    block = np.asfortranarray(block)
+
+    count = len(positions)
+    stats = ColumnChangeStatistics(
+        columns=[str(p) for p in positions],
+        total_values=np.full(count, block.shape[0], dtype=np.int64),
+        valid_values=np.zeros(count, dtype=np.int64),
+        unique_values=np.zeros(count, dtype=np.int64),
+        change_count=np.zeros(count, dtype=np.int64),
+        mean=np.full(count, np.nan),
+        std=np.full(count, np.nan),
+        variance=np.full(count, np.nan),
+        min_value=np.full(count, np.nan),
+        max_value=np.full(count, np.nan),
+        is_numeric=np.ones(count, dtype=bool),
+        is_float_or_int64=np.ones(count, dtype=bool)
+    )
+    ChangeAnalysisEngine()._compute_numeric_block(block, np.arange(count), stats)
+    return {name: getattr(stats, name) for name in RESULT_FIELDS}
+
+
+class ColumnParallelBackend:
+    """Пул процессов, считающий статистику непересекающихся диапазонов столбцов
+
+    Числовая матрица размещается в разделяемой памяти (allocate), рабочие
+    процессы подключаются к сегменту по имени без копирования и возвращают
+    только компактные массивы по своим столбцам. Небольшие входы считаются в
+    текущем процессе: запуск и обмен с пулом дороже самого расчета.
+    Пул создается при первом расчете выше порога min_cells (строки x столбцы),
+    число процессов ограничено MAX_DEFAULT_WORKERS.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, min_cells: int = 20_000_000,
+                 min_columns_per_worker: int = 16):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.max_workers = max_workers or min(os.cpu_count() or 1, MAX_DEFAULT_WORKERS)
+        self.min_cells = min_cells
+        self.min_columns_per_worker = min_columns_per_worker
+        self.enabled = SharedMemory is not None and get_context is not None
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Пул запрашивают поток UI и фоновый поток анализа
+        self._executor_lock = threading.Lock()
+        self._segments: Dict[int, SharedMemory] = {}
+        self._orphans: List[SharedMemory] = []
+        self._lock = threading.Lock()
+
+        self.stats = {'parallel_runs': 0, 'inline_runs': 0, 'columns_dispatched': 0, 'failures': 0}
+
+    # === РАЗДЕЛЯЕМАЯ ПАМЯТЬ ===
+
+    def allocate(self, shape: tuple) -> np.ndarray:
+        """Матрица float64 в порядке Fortran, размещенная в разделяемой памяти"""
+        nbytes = int(np.prod(shape)) * 8
+        if not self.enabled or not self._has_room(nbytes):
+            return np.empty(shape, dtype=np.float64, order='F')
+
+        self.collect()
+        segment = SharedMemory(create=True, size=max(nbytes, 1))
+        array = np.ndarray(shape, dtype=np.float64, buffer=segment.buf, order='F')
+        with self._lock:
+            self._segments[self._address(array)] = segment
+        return array
+
+    @staticmethod
+    def _has_room(nbytes: int) -> bool:
+        """Хватает ли места в /dev/shm (в контейнерах он часто ограничен 64 МБ)"""
+        if not hasattr(os, 'statvfs') or not os.path.isdir('/dev/shm'):
+            return True
+        try:
+            st = os.statvfs('/dev/shm')
+            return st.f_bavail * st.f_frsize > nbytes * 1.1
+        except OSError:
+            return False
+
+    def is_shared(self, array: np.ndarray) -> bool:
+        return self._address(array) in self._segments
+
+    def release(self, array: Optional[np.ndarray]):
+        """Освобождение сегмента массива (сегмент закрывается, когда на него не останется ссылок)"""
+        if array is None:
+            return
+        with self._lock:
+            segment = self._segments.pop(self._address(array), None)
+            if segment is not None:
+                self._unlink(segment)
+                self._orphans.append(segment)
+            self._close_orphans()
+
+    def release_all(self):
+        with self._lock:
+            for segment in self._segments.values():
+                self._unlink(segment)
+                self._orphans.append(segment)
+            self._segments.clear()
+            self._close_orphans()
+
+    def collect(self):
+        """Закрытие освобожденных сегментов, на которые больше нет ссылок"""
+        with self._lock:
+            self._close_orphans()
+
+    def _close_orphans(self):
+        """Закрытие отвязанных сегментов, массивы которых уже удалены"""
+        remaining = []
+        for segment in self._orphans:
+            try:
+                segment.close()
+            except BufferError:
+                remaining.append(segment)
+        self._orphans = remaining
+
+    @staticmethod
+    def _unlink(segment: SharedMemory):
+        try:
+            segment.unlink()
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _address(array: np.ndarray) -> int:
+        return array.__array_interface__['data'][0]
+
+    # === РАСЧЕТ ===
+
+    def should_parallelize(self, n_rows: int, n_columns: int) -> bool:
+        return (self.enabled and self.max_workers > 1
+                and n_rows * n_columns >= self.min_cells
+                and n_columns >= 2 * self.min_columns_per_worker)
+
+    def compute(self, values: np.ndarray, rows: RowSelector,
+                positions: np.ndarray) -> Optional[Dict[str, np.ndarray]]:
+        """Статистика столбцов positions матрицы values (из allocate) по строкам rows
+
+        Возвращает массивы RESULT_FIELDS, выровненные по positions, или None,
+        если пул недоступен - тогда расчет выполняется в текущем процессе.
+        """
+        segment = self._segments.get(self._address(values))
+        if segment is None or not len(positions):
+            return None
+
+        chunks = self._split(np.asarray(positions, dtype=np.intp))
+        try:
+            executor = self._get_executor()
+            futures = [executor.submit(_compute_columns_worker, segment.name, values.shape, rows, chunk)
+                       for chunk in chunks]
+            parts = [future.result() for future in futures]
+        except Exception as e:
+            self.logger.error(f"Ошибка параллельного расчета, используется расчет в текущем процессе: {e}")
+            self.stats['failures'] += 1
+            self.shutdown_pool()
+            if self.stats['failures'] >= 3:
+                self.enabled = False
+            return None
+
+        self.stats['parallel_runs'] += 1
+        self.stats['columns_dispatched'] += len(positions)
+        return {name: np.concatenate([part[name] for part in parts]) for name in RESULT_FIELDS}
+
+    def _split(self, positions: np.ndarray) -> List[np.ndarray]:
+        """Смежные диапазоны столбцов: по два на процесс для выравнивания нагрузки"""
+        n_chunks = min(2 * self.max_workers, max(1, len(positions) // self.min_columns_per_worker))
+        return [chunk for chunk in np.array_split(positions, n_chunks) if len(chunk)]
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                # spawn: рабочие процессы не наследуют потоки и состояние Tk
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     mp_context=get_context('spawn'))
+            return self._executor
+
+    def shutdown_pool(self):
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        """Остановка пула и освобождение разделяемой памяти"""
+        self.shutdown_pool()
+        self.release_all()
@@ -0,0 +1,173 @@
+"""
+Диагностические категории параметров (критичность, система, функция) за один проход
+"""
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from ....config.diagnostic_filters_config import CRITICAL_FILTERS, SYSTEM_FILTERS, FUNCTIONAL_FILTERS
+
+# Группы категорий в терминах критериев диагностической фильтрации
+CATEGORY_GROUPS = (
+    ('criticality', CRITICAL_FILTERS),
+    ('systems', SYSTEM_FILTERS),
+    ('functions', FUNCTIONAL_FILTERS)
+)
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """Регулярное выражение-бор: на позиции текста совпадает самый длинный шаблон"""
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def render(node: Dict[str, Any]) -> str:
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        return f"(?:{body})?" if '' in node else body
+
+    return render(trie)
+
+
+class DiagnosticPatternMatcher:
+    """Все шаблоны диагностических фильтров в одном автомате
+
+    Шаблоны всех категорий объединены в бор, скомпилированный в одно
+    регулярное выражение с опережающей проверкой, поэтому текст сигнала
+    просматривается один раз. На каждой позиции находится самый длинный
+    совпавший шаблон; все более короткие совпадения в той же позиции - его
+    префиксы, и их категории заранее добавлены к его битовой маске.
+    Категория - бит маски, результат проверки сигнала - целое число.
+    """
+
+    CACHE_LIMIT = 200_000
+
+    def __init__(self, groups: Tuple[Tuple[str, Dict[str, Dict[str, Any]]], ...] = CATEGORY_GROUPS):
+        self.categories: List[Tuple[str, str]] = [(group, key) for group, config in groups for key in config]
+        self._bit = {category: 1 << i for i, category in enumerate(self.categories)}
+
+        pattern_bits: Dict[str, int] = {}
+        for group, config in groups:
+            for key, conf in config.items():
+                for pattern in conf.get('patterns', []):
+                    pattern = pattern.upper()
+                    pattern_bits[pattern] = pattern_bits.get(pattern, 0) | self._bit[(group, key)]
+        # Совпадение шаблона влечет совпадение всех его префиксов
+        self._pattern_bits: Dict[str, int] = {}
+        for pattern in pattern_bits:
+            bits = 0
+            for other, other_bits in pattern_bits.items():
+                if pattern.startswith(other):
+                    bits |= other_bits
+            self._pattern_bits[pattern] = bits
+        self._regex = re.compile(f"(?=({_trie_pattern(pattern_bits)}))") if pattern_bits else None
+        self._cache: Dict[str, int] = {}
+
+    def match_bits(self, text: str) -> int:
+        """Маска категорий, шаблоны которых встречаются в тексте (без учета регистра)"""
+        bits = self._cache.get(text)
+        if bits is None:
+            bits = 0
+            if self._regex is not None:
+                for pattern in set(self._regex.findall(text.upper())):
+                    bits |= self._pattern_bits[pattern]
+            if len(self._cache) >= self.CACHE_LIMIT:
+                self._cache.clear()
+            self._cache[text] = bits
+        return bits
+
+    def signal_bits(self, signal_code: str, description: str = '') -> int:
+        return self.match_bits(f"{signal_code or ''} {description or ''}")
+
+    def group_bits(self, group: str, keys: Optional[Iterable[str]] = None) -> int:
+        """Маска выбранных категорий группы (все категории группы, если keys=None)"""
+        bits = 0
+        for category_group, key in self.categories:
+            if category_group == group and (keys is None or key in keys):
+                bits |= self._bit[(category_group, key)]
+        return bits
+
+    def criteria_bits(self, criteria: Dict[str, Iterable[str]]) -> int:
+        bits = 0
+        for group, keys in criteria.items():
+            if keys:
+                bits |= self.group_bits(group, set(keys))
+        return bits
+
+    def keys(self, bits: int, group: str) -> List[str]:
+        """Категории группы из маски в порядке конфигурации"""
+        return [key for category_group, key in self.categories
+                if category_group == group and bits & self._bit[(category_group, key)]]
+
+    def first_key(self, bits: int, group: str) -> Optional[str]:
+        """Первая по порядку конфигурации категория группы"""
+        for category_group, key in self.categories:
+            if category_group == group and bits & self._bit[(category_group, key)]:
+                return key
+        return None
+
+
+@lru_cache(maxsize=1)
+def get_pattern_matcher() -> DiagnosticPatternMatcher:
+    """Общий автомат шаблонов конфигурации диагностических фильтров"""
+    return DiagnosticPatternMatcher()
+
+
+class DiagnosticCategoryIndex:
+    """Маски диагностических категорий для набора параметров
+
+    Категории каждого параметра вычисляются один раз при построении;
+    отбор по любому набору отмеченных категорий - одна операция И над
+    массивом масок.
+    """
+
+    def __init__(self, parameters: List[Any], matcher: Optional[DiagnosticPatternMatcher] = None):
+        self.matcher = matcher or get_pattern_matcher()
+        self.size = len(parameters)
+        self._source = parameters
+        self._first = parameters[0] if parameters else None
+        self._last = parameters[-1] if parameters else None
+        self._bits = np.fromiter(
+            (self.matcher.signal_bits(self._field(p, 'signal_code'), self._field(p, 'description'))
+             for p in parameters),
+            dtype=np.uint64, count=self.size)
+
+    @staticmethod
+    def _field(parameter: Any, name: str) -> str:
+        if isinstance(parameter, dict):
+            return parameter.get(name) or ''
+        return getattr(parameter, name, None) or ''
+
+    def is_valid_for(self, parameters: List[Any]) -> bool:
+        """Индекс построен по этому же списку (без пересчета отпечатка)"""
+        return (parameters is self._source and len(parameters) == self.size
+                and (not parameters or (parameters[0] is self._first and parameters[-1] is self._last)))
+
+    def bits(self, position: int) -> int:
+        return int(self._bits[position])
+
+    def _bits_mask(self, bits: int) -> np.ndarray:
+        return (self._bits & np.uint64(bits)) != 0
+
+    def category_mask(self, group: str, keys: Optional[Iterable[str]] = None) -> np.ndarray:
+        """Маска параметров, попадающих хотя бы в одну из категорий группы (любую, если keys=None)"""
+        return self._bits_mask(self.matcher.group_bits(group, None if keys is None else set(keys)))
+
+    def mask(self, criteria: Dict[str, Iterable[str]]) -> np.ndarray:
+        """Маска параметров, попадающих хотя бы в одну отмеченную категорию любой группы"""
+        return self._bits_mask(self.matcher.criteria_bits(criteria))
+
+    def positions(self, criteria: Dict[str, Iterable[str]]) -> np.ndarray:
+        return np.flatnonzero(self.mask(criteria))
+
+    def counts(self, group: str) -> Dict[str, int]:
+        """Число параметров в каждой категории группы"""
+        return {key: int(np.count_nonzero(self.category_mask(group, [key])))
+                for category_group, key in self.matcher.categories if category_group == group}
@@ -0,0 +1,276 @@
+"""
+Наработка дискретных сигналов: число переключений, скважность и длительности состояний
+
+По каждому B_ сигналу в окне записи: переключения и включения (циклы
+контактора, двери), доля времени во включенном состоянии, суммарные и
+наибольшие длительности включенного и выключенного состояний, частота
+переключений в час. Состояние «включено» - значение не ноль; пропуски
+удерживают последнее значение, как в индексе переходов.
+"""
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .change_point_index import ChangePointIndex, RowSelector
+from .event_correlation import timestamps_ns
+from .signal_family_index import SignalFamilyIndex
+
+# Префикс кода дискретных сигналов
+BOOLEAN_PREFIX = 'B_'
+
+
+@dataclass
+class DutyCycleReport:
+    """Показатели наработки по столбцам окна (массивы выровнены по columns)
+
+    covered_seconds - время от первого известного значения в окне до конца
+    окна; интервалы, начатые до окна или не закрытые к его концу, обрезаются
+    границами окна. Столбцы без значений в окне дают NaN.
+    """
+    columns: List[str]
+    signal_codes: List[str]
+    base_codes: List[str]
+    wagons: List[Optional[int]]
+    wagon_names: List[str]
+    start: Optional[np.datetime64]
+    end: Optional[np.datetime64]
+    switches: np.ndarray
+    on_switches: np.ndarray
+    on_seconds: np.ndarray
+    off_seconds: np.ndarray
+    longest_on_seconds: np.ndarray
+    longest_off_seconds: np.ndarray
+    covered_seconds: np.ndarray
+    elapsed_seconds: float = 0.0
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    @property
+    def duty_cycle(self) -> np.ndarray:
+        """Доля времени во включенном состоянии"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.covered_seconds > 0, self.on_seconds / self.covered_seconds, np.nan)
+
+    @property
+    def switches_per_hour(self) -> np.ndarray:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.covered_seconds > 0, self.switches * 3600.0 / self.covered_seconds, np.nan)
+
+    @property
+    def on_switches_per_hour(self) -> np.ndarray:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.covered_seconds > 0, self.on_switches * 3600.0 / self.covered_seconds, np.nan)
+
+    def as_frame(self) -> pd.DataFrame:
+        """Таблица для экспорта: строка на сигнал вагона"""
+        return pd.DataFrame({
+            'signal_code': self.signal_codes,
+            'base_code': self.base_codes,
+            'wagon': pd.array(self.wagons, dtype='Int64'),
+            'wagon_name': self.wagon_names,
+            'switches': self.switches,
+            'on_switches': self.on_switches,
+            'duty_cycle': self.duty_cycle,
+            'on_seconds': self.on_seconds,
+            'off_seconds': self.off_seconds,
+            'longest_on_seconds': self.longest_on_seconds,
+            'longest_off_seconds': self.longest_off_seconds,
+            'switches_per_hour': self.switches_per_hour,
+            'on_switches_per_hour': self.on_switches_per_hour,
+            'covered_seconds': self.covered_seconds,
+            'column': self.columns
+        })
+
+    def pivot(self, metric: str = 'on_switches') -> pd.DataFrame:
+        """Показатель по сигналам (строки) и вагонам (столбцы); сигналы без вагона не входят"""
+        frame = self.as_frame()
+        frame = frame[frame['wagon'].notna()]
+        table = frame.pivot_table(index='base_code', columns='wagon', values=metric, aggfunc='first')
+        names = dict(zip(frame['wagon'], frame['wagon_name']))
+        return table.rename(columns=names)
+
+    def ranked(self, metric: str = 'switches', top_n: Optional[int] = None) -> pd.DataFrame:
+        """Сигналы по убыванию показателя (например, самые часто переключающиеся контакторы)"""
+        frame = self.as_frame().sort_values(metric, ascending=False, kind='stable', na_position='last')
+        return frame.head(top_n) if top_n else frame
+
+    def as_dict(self, column: str) -> Dict[str, Any]:
+        row = self.as_frame().set_index('column').loc[column]
+        return {key: (value.item() if hasattr(value, 'item') else value) for key, value in row.items()}
+
+
+class DutyCycleAnalyzer:
+    """Векторный расчет наработки по индексу переходов
+
+    Для каждого столбца берутся только его переходы внутри окна (бинарный
+    поиск по индексу), состояние на начало окна - по последнему переходу
+    до него. Дальше все столбцы обрабатываются одним набором массивов:
+    смены состояния, длительности интервалов между ними и свертки по
+    столбцам (bincount, maximum.at) без прохода по строкам записи.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    @staticmethod
+    def _field(parameter: Any, name: str) -> Any:
+        if isinstance(parameter, dict):
+            return parameter.get(name)
+        return getattr(parameter, name, None)
+
+    @staticmethod
+    def _wagon_name(wagon_name: Optional[Callable[[int], str]], wagon: Optional[int]) -> str:
+        if wagon is None:
+            return ''
+        try:
+            return str(wagon_name(wagon)) if wagon_name else str(wagon)
+        except Exception:
+            return str(wagon)
+
+    @classmethod
+    def select_parameters(cls, parameters: List[Any], data: pd.DataFrame) -> List[Any]:
+        """Дискретные (B_) записанные параметры"""
+        return [p for p in parameters
+                if not cls._field(p, 'is_problematic') and not cls._field(p, 'is_virtual')
+                and (cls._field(p, 'signal_code') or '').startswith(BOOLEAN_PREFIX)
+                and cls._field(p, 'full_column') in data.columns]
+
+    @staticmethod
+    def window_slice(rows: Optional[RowSelector], n_rows: int) -> slice:
+        """Окно строк как непрерывный срез (набор строк заменяется охватывающим диапазоном)"""
+        if rows is None:
+            return slice(0, n_rows)
+        if isinstance(rows, slice):
+            start, stop, _ = rows.indices(n_rows)
+            return slice(start, max(start, stop))
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        return slice(int(rows[0]), int(rows[-1]) + 1) if len(rows) else slice(0, 0)
+
+    def analyze(self, data: pd.DataFrame, parameters: List[Any], rows: Optional[RowSelector] = None,
+                change_points: Optional[ChangePointIndex] = None,
+                wagon_name: Optional[Callable[[int], str]] = None) -> DutyCycleReport:
+        """Показатели наработки дискретных параметров в окне строк rows"""
+        started = time.perf_counter()
+        parameters = self.select_parameters(parameters, data)
+        columns = [self._field(p, 'full_column') for p in parameters]
+        codes = [self._field(p, 'signal_code') for p in parameters]
+        splits = [SignalFamilyIndex.split_code(code) for code in codes]
+        wagons = [split[1] if split else None for split in splits]
+
+        window = self.window_slice(rows, len(data))
+        timestamps = timestamps_ns(data)
+        if timestamps is None:
+            raise ValueError("В записи нет столбца timestamp")
+        if change_points is None:
+            change_points = ChangePointIndex(data)
+
+        report = DutyCycleReport(
+            columns=columns,
+            signal_codes=codes,
+            base_codes=[split[0] if split else code for split, code in zip(splits, codes)],
+            wagons=wagons,
+            wagon_names=[self._wagon_name(wagon_name, w) for w in wagons],
+            start=np.datetime64(int(timestamps[window.start]), 'ns') if window.stop > window.start else None,
+            end=np.datetime64(int(timestamps[window.stop - 1]), 'ns') if window.stop > window.start else None,
+            **self._compute(change_points, columns, timestamps, window)
+        )
+        report.elapsed_seconds = time.perf_counter() - started
+        self.logger.info(f"Наработка дискретных сигналов: {len(columns)} столбцов, "
+                         f"{int(report.switches.sum())} переключений за {report.elapsed_seconds:.2f} с")
+        return report
+
+    def _compute(self, change_points: ChangePointIndex, columns: List[str], timestamps: np.ndarray,
+                 window: slice) -> Dict[str, np.ndarray]:
+        count = len(columns)
+        result = {
+            'switches': np.zeros(count, dtype=np.int64),
+            'on_switches': np.zeros(count, dtype=np.int64),
+            'on_seconds': np.full(count, np.nan),
+            'off_seconds': np.full(count, np.nan),
+            'longest_on_seconds': np.full(count, np.nan),
+            'longest_off_seconds': np.full(count, np.nan),
+            'covered_seconds': np.full(count, np.nan)
+        }
+        if window.stop <= window.start or not count:
+            return result
+
+        # Переходы каждого столбца внутри окна и состояние в первой известной строке
+        known = np.zeros(count, dtype=bool)
+        start_rows = np.zeros(count, dtype=np.int64)
+        initial = np.zeros(count, dtype=bool)
+        lengths = np.zeros(count, dtype=np.int64)
+        transition_rows, transition_states = [], []
+        unsupported = []
+        for j, column in enumerate(columns):
+            transitions = change_points.transitions(column)
+            if transitions is not None and transitions.categorical:
+                # Включенное состояние определено только для числовых значений
+                unsupported.append(column)
+                continue
+            if transitions is None or transitions.first_row < 0 or transitions.first_row >= window.stop:
+                continue
+            start_row = max(window.start, transitions.first_row)
+            first = int(np.searchsorted(transitions.rows, start_row, side='right'))
+            last = int(np.searchsorted(transitions.rows, window.stop, side='left'))
+            value = transitions.new_values[first - 1] if first else transitions.first_value
+            known[j], start_rows[j], initial[j], lengths[j] = True, start_row, value != 0, last - first
+            transition_rows.append(transitions.rows[first:last])
+            transition_states.append(transitions.new_values[first:last] != 0)
+
+        if unsupported:
+            self.logger.warning(f"Нечисловые столбцы пропущены при расчете наработки: {', '.join(unsupported)}")
+        known_columns = np.flatnonzero(known)
+        if not len(known_columns):
+            return result
+        rows = np.concatenate(transition_rows).astype(np.int64, copy=False)
+        states = np.concatenate(transition_states).astype(bool, copy=False)
+        owners = np.repeat(np.arange(count), lengths)
+
+        # Смена состояния: переход, после которого «включено» отличается от предыдущего
+        previous = np.empty_like(states)
+        previous[1:] = states[:-1]
+        offsets = np.cumsum(lengths) - lengths
+        has_transitions = lengths > 0
+        previous[offsets[has_transitions]] = initial[has_transitions]
+        changed = states != previous
+        change_rows, change_owner, change_state = rows[changed], owners[changed], states[changed]
+        change_times = timestamps[change_rows]
+
+        # Интервалы до каждой смены: от предыдущей смены столбца или от начала окна
+        first_of_column = np.ones(len(change_owner), dtype=bool)
+        first_of_column[1:] = change_owner[1:] != change_owner[:-1]
+        interval_start = np.empty_like(change_times)
+        interval_start[1:] = change_times[:-1]
+        interval_start[first_of_column] = timestamps[start_rows[change_owner[first_of_column]]]
+
+        # Последний интервал столбца - до конца окна
+        last_of_column = np.ones(len(change_owner), dtype=bool)
+        last_of_column[:-1] = change_owner[:-1] != change_owner[1:]
+        final_start = timestamps[start_rows]
+        final_state = initial.copy()
+        final_start[change_owner[last_of_column]] = change_times[last_of_column]
+        final_state[change_owner[last_of_column]] = change_state[last_of_column]
+        end_time = timestamps[window.stop - 1]
+
+        owner = np.concatenate([change_owner, known_columns])
+        duration = np.concatenate([change_times - interval_start,
+                                   end_time - final_start[known_columns]]) / 1e9
+        state_on = np.concatenate([~change_state, final_state[known_columns]])
+
+        result['switches'] = np.bincount(change_owner, minlength=count).astype(np.int64)
+        result['on_switches'] = np.bincount(change_owner[change_state], minlength=count).astype(np.int64)
+        for key, mask in (('on', state_on), ('off', ~state_on)):
+            total = np.bincount(owner[mask], weights=duration[mask], minlength=count)
+            longest = np.zeros(count)
+            np.maximum.at(longest, owner[mask], duration[mask])
+            result[f'{key}_seconds'][known] = total[known]
+            result[f'longest_{key}_seconds'][known] = longest[known]
+        result['covered_seconds'][known] = (end_time - timestamps[start_rows[known]]) / 1e9
+        return result
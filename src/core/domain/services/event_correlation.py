@@ -0,0 +1,202 @@
+"""
+Поиск сигналов, переключающихся вокруг срабатываний сигналов неисправности
+"""
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .change_point_index import ChangePointIndex
+
+# Сигналы неисправности: B_*FAULT (B_INVERTER1_FAULT, B_BCU_FAULT, ...)
+FAULT_SIGNAL_PATTERN = re.compile(r'^B_.*FAULT', re.IGNORECASE)
+
+
+def timestamps_ns(data: pd.DataFrame) -> Optional[np.ndarray]:
+    """Столбец timestamp как int64 наносекунд (пустое время - минимальное int64)"""
+    if 'timestamp' not in data.columns:
+        return None
+    timestamps = data['timestamp']
+    if not pd.api.types.is_datetime64_any_dtype(timestamps):
+        timestamps = pd.to_datetime(timestamps, errors='coerce')
+    return timestamps.to_numpy(dtype='datetime64[ns]').astype(np.int64)
+
+
+@dataclass
+class PrecursorCandidate:
+    """Сигнал, переключавшийся в окне ±Δt вокруг срабатываний неисправности"""
+    column: str
+    preceded_events: int
+    followed_events: int
+    support: float
+    chance_support: float
+    consistency: float
+    median_lead_seconds: Optional[float] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'column': self.column,
+            'preceded_events': self.preceded_events,
+            'followed_events': self.followed_events,
+            'support': round(self.support, 4),
+            'chance_support': round(self.chance_support, 4),
+            'consistency': round(self.consistency, 4),
+            'median_lead_seconds': self.median_lead_seconds
+        }
+
+
+@dataclass
+class FaultCorrelation:
+    """Кандидаты для одного сигнала неисправности по всем его срабатываниям
+
+    precursors - по убыванию согласованности предшествования (consistency),
+    followers - сигналы, переключавшиеся после срабатывания в пределах Δt.
+    """
+    fault_column: str
+    event_times: np.ndarray
+    window_seconds: float
+    precursors: List[PrecursorCandidate] = field(default_factory=list)
+    followers: List[PrecursorCandidate] = field(default_factory=list)
+
+    @property
+    def event_count(self) -> int:
+        return len(self.event_times)
+
+    def top(self, count: int = 10, min_consistency: float = 0.0) -> List[PrecursorCandidate]:
+        return [c for c in self.precursors if c.consistency > min_consistency][:count]
+
+
+class EventCorrelationEngine:
+    """Корреляция переходов сигналов с передними фронтами сигналов неисправности
+
+    Моменты переходов каждого столбца берутся из ChangePointIndex и
+    сортируются один раз; окна ±Δt вокруг всех срабатываний находятся
+    двоичным поиском (np.searchsorted) сразу для всего массива событий,
+    без просмотра строк. Предшественники ранжируются по доле срабатываний,
+    которым предшествовал их переход, с поправкой на случайное совпадение
+    для часто переключающихся сигналов.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    # === СОБЫТИЯ ===
+
+    @staticmethod
+    def fault_columns(parameters: List[Any]) -> List[str]:
+        """Столбцы сигналов неисправности B_*FAULT"""
+        columns = []
+        for parameter in parameters:
+            if isinstance(parameter, dict):
+                code, column = parameter.get('signal_code', ''), parameter.get('full_column')
+            else:
+                code, column = parameter.signal_code, parameter.full_column
+            if column and FAULT_SIGNAL_PATTERN.match(code or ''):
+                columns.append(column)
+        return columns
+
+    @staticmethod
+    def _transition_times(change_points: ChangePointIndex, column: str,
+                          times: np.ndarray) -> Optional[np.ndarray]:
+        """Отсортированные моменты переходов столбца (без строк с пустым временем)"""
+        transitions = change_points.transitions(column)
+        if transitions is None:
+            return None
+        moments = times[transitions.rows]
+        moments = moments[moments != np.iinfo(np.int64).min]
+        return np.sort(moments)
+
+    def rising_edges(self, change_points: ChangePointIndex, column: str, times: np.ndarray) -> np.ndarray:
+        """Моменты передних фронтов сигнала: переход из 0 в ненулевое значение"""
+        transitions = change_points.transitions(column)
+        if transitions is None or not len(transitions) or transitions.categorical:
+            return np.array([], dtype=np.int64)
+        rising = (transitions.old_values == 0) & (transitions.new_values != 0)
+        moments = times[transitions.rows[rising]]
+        return np.sort(moments[moments != np.iinfo(np.int64).min])
+
+    # === КОРРЕЛЯЦИЯ ===
+
+    def correlate(self, data: pd.DataFrame, fault_columns: List[str], candidate_columns: List[str],
+                  window_seconds: float = 5.0,
+                  change_points: Optional[ChangePointIndex] = None) -> Dict[str, FaultCorrelation]:
+        """Кандидаты-предшественники для каждого сигнала неисправности из fault_columns"""
+        times = timestamps_ns(data) if data is not None else None
+        if times is None or not len(times):
+            return {}
+
+        change_points = change_points or ChangePointIndex(data)
+        window = int(window_seconds * 1_000_000_000)
+        valid_times = times[times != np.iinfo(np.int64).min]
+        duration = max(int(valid_times.max() - valid_times.min()), 1) if len(valid_times) else 1
+
+        # Моменты переходов кандидатов считаются один раз для всех неисправностей
+        candidates = {}
+        for column in dict.fromkeys(candidate_columns):
+            moments = self._transition_times(change_points, column, times)
+            if moments is not None and len(moments):
+                candidates[column] = moments
+
+        results = {}
+        for fault_column in dict.fromkeys(fault_columns):
+            events = self.rising_edges(change_points, fault_column, times)
+            if not len(events):
+                continue
+            results[fault_column] = self._correlate_events(fault_column, events, candidates,
+                                                           window, duration)
+
+        self.logger.info(f"Корреляция событий: {len(results)} сигналов неисправности, "
+                         f"{len(candidates)} кандидатов, окно ±{window_seconds}с")
+        return results
+
+    def _correlate_events(self, fault_column: str, events: np.ndarray, candidates: Dict[str, np.ndarray],
+                          window: int, duration: int) -> FaultCorrelation:
+        precursors, followers = [], []
+        for column, moments in candidates.items():
+            if column == fault_column:
+                continue
+
+            lo = np.searchsorted(moments, events - window, side='left')
+            mid = np.searchsorted(moments, events, side='left')
+            hi = np.searchsorted(moments, events + window, side='right')
+            preceded = mid > lo
+            followed = hi > mid
+            if not preceded.any() and not followed.any():
+                continue
+
+            # Вероятность случайного перехода в окне длины Δt при средней частоте сигнала
+            chance = float(-np.expm1(-len(moments) / duration * window))
+            preceded_count, followed_count = int(preceded.sum()), int(followed.sum())
+
+            if preceded_count:
+                # Упреждение - от ближайшего перехода до срабатывания
+                leads = (events[preceded] - moments[mid[preceded] - 1]) / 1e9
+                precursors.append(self._candidate(column, preceded_count, followed_count, preceded_count,
+                                                  len(events), chance, float(np.median(leads))))
+            if followed_count:
+                followers.append(self._candidate(column, preceded_count, followed_count, followed_count,
+                                                 len(events), chance))
+
+        return FaultCorrelation(fault_column=fault_column, event_times=events.astype('datetime64[ns]'),
+                                window_seconds=window / 1e9,
+                                precursors=sorted(precursors, key=self._rank_key),
+                                followers=sorted(followers, key=self._rank_key))
+
+    @staticmethod
+    def _candidate(column: str, preceded: int, followed: int, matched: int, event_count: int,
+                   chance: float, median_lead: Optional[float] = None) -> PrecursorCandidate:
+        """Кандидат с долей срабатываний matched / event_count и поправкой на случайность"""
+        support = matched / event_count
+        # Превышение доли над ожидаемой случайно: у сигналов, переключающихся в
+        # каждом окне, совпадения ничего не говорят о причине
+        consistency = max(0.0, support - chance)
+        return PrecursorCandidate(column=column, preceded_events=preceded, followed_events=followed,
+                                  support=support, chance_support=chance, consistency=consistency,
+                                  median_lead_seconds=median_lead)
+
+    @staticmethod
+    def _rank_key(candidate: PrecursorCandidate):
+        return (-candidate.consistency, -candidate.support, candidate.median_lead_seconds or 0.0, candidate.column)
@@ -0,0 +1,314 @@
+"""
+Активность сигналов неисправности в окне записи: интервалы, фронты, длительность
+"""
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .change_point_index import ChangePointIndex, RowSelector
+from .event_correlation import timestamps_ns
+
+_NAT = np.iinfo(np.int64).min
+
+# Типы данных битовых и байтовых сигналов: ненулевое значение - неисправность активна
+FAULT_DATA_TYPES = ('B', 'BY')
+
+
+@dataclass
+class FaultActivity:
+    """Срабатывания одного сигнала неисправности в окне
+
+    intervals - пары (начало, конец) активного состояния в datetime64[ns];
+    интервал, открытый на границе окна, обрезается границей.
+    rising_edges - моменты передних фронтов внутри окна (переход 0 -> не 0).
+    classification_row - строка таблицы классификации, по которой сигнал
+    отобран (-1, если отбор шел без классификации).
+    """
+    column: str
+    signal_code: str
+    intervals: np.ndarray
+    rising_edges: np.ndarray
+    active_seconds: float
+    active_at_start: bool
+    active_at_end: bool
+    classification_row: int = -1
+
+    @property
+    def occurrence_count(self) -> int:
+        return len(self.rising_edges)
+
+    @property
+    def was_active(self) -> bool:
+        return len(self.intervals) > 0
+
+    @property
+    def first_activation(self) -> Optional[datetime]:
+        """Начало первого активного интервала в окне"""
+        if not len(self.intervals):
+            return None
+        return pd.Timestamp(self.intervals[0, 0]).to_pydatetime()
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'column': self.column,
+            'signal_code': self.signal_code,
+            'occurrence_count': self.occurrence_count,
+            'active_seconds': round(self.active_seconds, 3),
+            'active_at_start': self.active_at_start,
+            'active_at_end': self.active_at_end,
+            'first_activation': self.first_activation.isoformat() if self.first_activation else None,
+            'rising_edges': [pd.Timestamp(t).isoformat() for t in self.rising_edges]
+        }
+
+
+@dataclass
+class FaultActivityReport:
+    """Активность всех просмотренных сигналов неисправности в окне [start, end]
+
+    context - активность прочих сигналов причинно-следственных цепочек
+    (не неисправностей), нужна только для временного порядка цепочек.
+    """
+    start: Optional[np.datetime64]
+    end: Optional[np.datetime64]
+    activities: Dict[str, FaultActivity]
+    context: Dict[str, FaultActivity] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.activities)
+
+    def active(self) -> List[FaultActivity]:
+        """Сработавшие в окне неисправности, от ранних к поздним"""
+        active = [activity for activity in self.activities.values() if activity.was_active]
+        return sorted(active, key=lambda activity: activity.intervals[0, 0])
+
+    def by_signal_code(self) -> Dict[str, FaultActivity]:
+        return {activity.signal_code: activity for activity in self.activities.values()}
+
+    @property
+    def start_time(self) -> Optional[datetime]:
+        return pd.Timestamp(self.start).to_pydatetime() if self.start is not None else None
+
+
+class FaultActivityScanner:
+    """Сканер активности сигналов неисправности по индексу переходов
+
+    Состояние сигнала - ступенчатая функция номера строки, заданная его
+    переходами из ChangePointIndex: состояние на начало окна берется из
+    последнего перехода до окна (двоичный поиск), фронты и спады внутри
+    окна - сравнение соседних значений массива переходов. Строки записи
+    не просматриваются, стоимость на сигнал - O(число переходов в окне).
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    @staticmethod
+    def _field(parameter: Any, name: str) -> Any:
+        if isinstance(parameter, dict):
+            return parameter.get(name)
+        return getattr(parameter, name, None)
+
+    @classmethod
+    def classification_rows(cls, parameters: List[Any], classifier) -> Dict[str, int]:
+        """Строки таблицы классификации параметров по коду и описанию (столбец -> строка)"""
+        rows = classifier.classify_rows(parameters)
+        return {cls._field(parameter, 'full_column'): row for parameter, row in zip(parameters, rows.tolist())}
+
+    @classmethod
+    def fault_columns(cls, parameters: List[Any], classifier,
+                      classification_rows: Optional[Dict[str, int]] = None) -> Dict[str, str]:
+        """Столбцы сигналов неисправности (столбец -> код) по таблице классификации
+
+        Неисправность - функция 'faults' у битового или байтового сигнала.
+        classification_rows - уже найденные строки classification_rows().
+        """
+        if classification_rows is None:
+            classification_rows = cls.classification_rows(parameters, classifier)
+        if not len(classifier.table):
+            return {}
+        rows = np.array([classification_rows.get(cls._field(parameter, 'full_column'), -1)
+                         for parameter in parameters], dtype=np.int64)
+        function_types = classifier.table.column('function_type')
+        is_fault = (rows >= 0) & (function_types[rows] == 'faults')
+
+        return cls._state_columns(parameters[position] for position in np.flatnonzero(is_fault))
+
+    @classmethod
+    def signal_columns(cls, parameters: List[Any], signal_codes: Iterable[str]) -> Dict[str, str]:
+        """Столбцы битовых и байтовых сигналов с кодами из signal_codes (столбец -> код)"""
+        codes = set(signal_codes)
+        return cls._state_columns(parameter for parameter in parameters
+                                  if cls._field(parameter, 'signal_code') in codes)
+
+    @classmethod
+    def _state_columns(cls, parameters: Iterable[Any]) -> Dict[str, str]:
+        columns = {}
+        for parameter in parameters:
+            data_type = cls._field(parameter, 'data_type')
+            column = cls._field(parameter, 'full_column')
+            if column and str(getattr(data_type, 'value', data_type) or '').upper() in FAULT_DATA_TYPES:
+                columns[column] = cls._field(parameter, 'signal_code')
+        return columns
+
+    @staticmethod
+    def _window_bounds(rows: RowSelector, row_count: int) -> tuple:
+        if isinstance(rows, slice):
+            start = rows.start or 0
+            stop = row_count if rows.stop is None else rows.stop
+            return start, min(stop, row_count)
+        if not len(rows):
+            return 0, 0
+        return int(rows.min()), int(rows.max()) + 1
+
+    def scan(self, data: pd.DataFrame, columns: Dict[str, str], rows: Optional[RowSelector] = None,
+             change_points: Optional[ChangePointIndex] = None,
+             context_columns: Optional[Dict[str, str]] = None,
+             classification_rows: Optional[Dict[str, int]] = None) -> FaultActivityReport:
+        """Активность столбцов columns (столбец -> код сигнала) в окне строк rows
+
+        context_columns - столбцы сигналов цепочек, сканируются в report.context.
+        classification_rows - строки таблицы классификации (столбец -> строка),
+        сохраняются в FaultActivity.classification_row.
+        """
+        times = timestamps_ns(data) if data is not None else None
+        if times is None or not len(times):
+            return FaultActivityReport(None, None, {})
+
+        lo, hi = self._window_bounds(rows if rows is not None else slice(0, len(data)), len(data))
+        window_times = times[lo:hi]
+        window_times = window_times[window_times != _NAT]
+        if hi <= lo or not len(window_times):
+            return FaultActivityReport(None, None, {})
+        start, end = int(window_times[0]), int(window_times[-1])
+
+        change_points = change_points or ChangePointIndex(data)
+        scanned, unsupported = [], []
+        for scan_columns in (columns, context_columns or {}):
+            activities = {}
+            for column, signal_code in scan_columns.items():
+                transitions = change_points.transitions(column)
+                if transitions is None:
+                    continue
+                if transitions.categorical:
+                    # Состояние «сработал» определено только для числовых значений
+                    unsupported.append(column)
+                    continue
+                activity = self._scan_column(data[column], transitions, times, lo, hi, start, end)
+                if activity is not None:
+                    activities[column] = FaultActivity(column, signal_code, *activity,
+                                                       (classification_rows or {}).get(column, -1))
+            scanned.append(activities)
+
+        if unsupported:
+            self.logger.warning(f"Нечисловые столбцы пропущены при анализе активности: {', '.join(unsupported)}")
+        activities, context = scanned
+        context = {column: activity for column, activity in context.items() if column not in activities}
+        report = FaultActivityReport(np.datetime64(start, 'ns'), np.datetime64(end, 'ns'), activities, context)
+        self.logger.info(f"Активность неисправностей: {len(report.active())} из {len(activities)} сработали в окне")
+        return report
+
+    @staticmethod
+    def _scan_column(series: pd.Series, transitions, times: np.ndarray, lo: int, hi: int,
+                     start: int, end: int) -> Optional[tuple]:
+        # Переходы строго внутри окна; переход в первой строке окна задает начальное состояние
+        first = int(np.searchsorted(transitions.rows, lo, side='right'))
+        last = int(np.searchsorted(transitions.rows, hi, side='left'))
+
+        if first:
+            initial = transitions.new_values[first - 1] != 0
+        elif len(transitions):
+            initial = transitions.old_values[0] != 0
+        else:
+            valid = series.iloc[lo:hi].dropna()
+            if not len(valid):
+                return None
+            initial = pd.to_numeric(valid.iloc[:1], errors='coerce').fillna(0).iloc[0] != 0
+
+        moments = times[transitions.rows[first:last]]
+        states = transitions.new_values[first:last] != 0
+        known = moments != _NAT
+        moments, states = moments[known], states[known]
+
+        previous = np.concatenate(([initial], states[:-1]))
+        rising = moments[~previous & states]
+        falling = moments[previous & ~states]
+        final = bool(states[-1]) if len(states) else bool(initial)
+
+        # Фронты и спады чередуются: начала - фронты (и начало окна), концы - спады (и конец окна)
+        starts = np.concatenate(([start] if initial else [], rising)).astype(np.int64)
+        ends = np.concatenate((falling, [end] if final else [])).astype(np.int64)
+        intervals = np.stack([starts, ends], axis=1).astype('datetime64[ns]')
+        active_seconds = float((ends - starts).sum()) / 1e9
+
+        return intervals, rising.astype('datetime64[ns]'), active_seconds, bool(initial), final
+
+
+class ActivationTimeline:
+    """Моменты срабатываний сигналов в отсортированных массивах для запросов по времени
+
+    По каждому коду сигнала (все вагоны вместе) хранятся отсортированные
+    начала и отдельно отсортированные концы интервалов активности. Число
+    интервалов, накрывающих момент t, - (начал <= t) - (концов < t), то есть
+    два двоичных поиска; ближайшее к t срабатывание - соседи позиции t в
+    массиве начал. Запрос стоит O(log n) при любом числе интервалов записи.
+    """
+
+    def __init__(self, activities: Iterable[FaultActivity]):
+        intervals: Dict[str, List[np.ndarray]] = {}
+        for activity in activities:
+            if activity.was_active:
+                intervals.setdefault(activity.signal_code, []).append(activity.intervals.astype(np.int64))
+
+        self._starts: Dict[str, np.ndarray] = {}
+        self._ends: Dict[str, np.ndarray] = {}
+        for signal_code, parts in intervals.items():
+            merged = np.concatenate(parts)
+            self._starts[signal_code] = np.sort(merged[:, 0])
+            self._ends[signal_code] = np.sort(merged[:, 1])
+
+    @classmethod
+    def from_report(cls, report: Optional[FaultActivityReport]) -> 'ActivationTimeline':
+        if report is None:
+            return cls([])
+        return cls(list(report.activities.values()) + list(report.context.values()))
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __contains__(self, signal_code: str) -> bool:
+        return signal_code in self._starts
+
+    @staticmethod
+    def _ns(moment) -> int:
+        return int(pd.Timestamp(moment).value)
+
+    def active_at(self, signal_code: str, moment) -> bool:
+        """Сигнал активен в момент moment хотя бы в одном вагоне"""
+        starts = self._starts.get(signal_code)
+        if starts is None:
+            return False
+        t = self._ns(moment)
+        return int(np.searchsorted(starts, t, side='right')) > int(np.searchsorted(self._ends[signal_code], t))
+
+    def onset(self, signal_code: str, moment, horizon_seconds: float) -> Optional[int]:
+        """Начало срабатывания, относящегося к моменту moment, в нс (None - нет в пределах horizon)
+
+        Активный в moment сигнал - последнее начало не позже moment; иначе
+        ближайшее к moment начало не дальше horizon_seconds.
+        """
+        starts = self._starts.get(signal_code)
+        if starts is None:
+            return None
+        t = self._ns(moment)
+        position = int(np.searchsorted(starts, t, side='right'))
+        if position and position > int(np.searchsorted(self._ends[signal_code], t)):
+            return int(starts[position - 1])
+
+        horizon = int(horizon_seconds * 1e9)
+        candidates = [int(starts[i]) for i in (position - 1, position) if 0 <= i < len(starts)]
+        candidates = [start for start in candidates if abs(start - t) <= horizon]
+        return min(candidates, key=lambda start: abs(start - t)) if candidates else None
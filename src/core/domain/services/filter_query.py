@@ -0,0 +1,475 @@
+"""
+Язык запросов фильтрации параметров по метаданным и поведению сигналов
+
+Пример: type:B wagon:3..5 line:L_CAN_* changed>0.2 system:brakes
+
+- термы через пробел объединяются по И, OR (или |) - ИЛИ, скобки группируют;
+- NOT или минус перед термом - отрицание (-line:L_MVB);
+- поле:значение[,значение] - метаданные: type, wagon (в т.ч. диапазон 3..5),
+  line, component, hardware, code (шаблоны * и ?), категории диагностики
+  system, crit, func и признаки is:problematic, is:normal, is:changed;
+- поле>число - поведение в текущем окне: changed/score, cv, unique, changes;
+- остальные слова (и строки в кавычках) - поиск подстроки в коде, описании, линии.
+"""
+import fnmatch
+import logging
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .diagnostic_category_index import DiagnosticCategoryIndex
+from .parameter_index import ParameterBitsetIndex
+from .parameter_search_index import ParameterSearchIndex
+from ....config.diagnostic_filters_config import CRITICAL_FILTERS, SYSTEM_FILTERS, FUNCTIONAL_FILTERS
+
+# Поля метаданных (псевдоним -> измерение индекса)
+METADATA_FIELDS = {
+    'type': 'type', 't': 'type',
+    'wagon': 'wagon', 'w': 'wagon',
+    'line': 'line', 'l': 'line',
+    'component': 'component', 'comp': 'component',
+    'hardware': 'hardware', 'hw': 'hardware',
+    'code': 'code'
+}
+
+# Диагностические категории (псевдоним -> (категория, конфигурация))
+CATEGORY_FIELDS = {
+    'system': ('system', SYSTEM_FILTERS), 'sys': ('system', SYSTEM_FILTERS),
+    'crit': ('crit', CRITICAL_FILTERS), 'criticality': ('crit', CRITICAL_FILTERS),
+    'func': ('func', FUNCTIONAL_FILTERS), 'function': ('func', FUNCTIONAL_FILTERS)
+}
+# Категория запроса -> группа индекса диагностических категорий
+_CATEGORY_GROUPS = {'system': 'systems', 'crit': 'criticality', 'func': 'functions'}
+
+# Поведенческие показатели окна (псевдоним -> массив ChangeScores)
+BEHAVIOUR_FIELDS = {
+    'changed': 'score', 'score': 'score',
+    'cv': 'coefficient_of_variation',
+    'unique': 'unique_ratio',
+    'changes': 'change_count'
+}
+
+FLAG_VALUES = ('problematic', 'normal', 'changed')
+
+# Порядок вычисления термов в И/ИЛИ: сначала дешевые маски индекса
+TERM_COSTS = {'meta': 0, 'flag': 0, 'category': 1, 'text': 2, 'behaviour': 3}
+
+_TOKEN = re.compile(r'\(|\)|-?"[^"]*"?|[^\s()]+')
+_COMPARISON = re.compile(r'^([a-z_]+)(>=|<=|!=|>|<|=)(-?\d+(?:\.\d*)?|-?\.\d+)$', re.IGNORECASE)
+_RANGE = re.compile(r'^(\d+)\.\.(\d+)$')
+_COMPARATORS = {
+    '>': np.greater, '>=': np.greater_equal, '<': np.less,
+    '<=': np.less_equal, '=': np.equal, '!=': np.not_equal
+}
+
+
+class FilterQueryError(ValueError):
+    """Ошибка разбора или вычисления запроса фильтрации"""
+
+
+@dataclass(frozen=True)
+class QueryTerm:
+    """Элементарное условие запроса"""
+    kind: str
+    field: str
+    values: Tuple[Any, ...] = ()
+    operator: str = ''
+
+    @property
+    def cost(self) -> int:
+        return TERM_COSTS[self.kind]
+
+    def describe(self) -> str:
+        if self.kind == 'text':
+            return f'"{self.values[0]}"'
+        if self.kind == 'behaviour':
+            return f"{self.field}{self.operator}{self.values[0]:g}"
+        values = ','.join('..'.join(map(str, v)) if isinstance(v, tuple) else str(v) for v in self.values)
+        return f"{self.field}:{values}"
+
+
+@dataclass(frozen=True)
+class QueryNode:
+    """Узел плана: терм или логическая операция над дочерними узлами"""
+    operator: str
+    children: Tuple['QueryNode', ...] = ()
+    term: Optional[QueryTerm] = None
+
+    @property
+    def cost(self) -> int:
+        if self.term is not None:
+            return self.term.cost
+        return max(child.cost for child in self.children)
+
+    def terms(self) -> List[QueryTerm]:
+        if self.term is not None:
+            return [self.term]
+        return [term for child in self.children for term in child.terms()]
+
+    def describe(self) -> str:
+        if self.term is not None:
+            return self.term.describe()
+        if self.operator == 'not':
+            return f"NOT {self.children[0].describe()}"
+        parts = [child.describe() if child.term is not None or child.operator == 'not'
+                 else f"({child.describe()})" for child in self.children]
+        return (' OR ' if self.operator == 'or' else ' ').join(parts)
+
+
+@dataclass
+class CompiledFilterQuery:
+    """Скомпилированный запрос: дерево условий в порядке вычисления"""
+    query: str
+    root: Optional[QueryNode]
+    terms: List[QueryTerm] = field(default_factory=list)
+
+    @property
+    def is_empty(self) -> bool:
+        return self.root is None
+
+    @property
+    def uses_change_scores(self) -> bool:
+        return any(t.kind == 'behaviour' or (t.kind == 'flag' and 'changed' in t.values) for t in self.terms)
+
+    def describe(self) -> str:
+        return self.root.describe() if self.root is not None else ''
+
+
+class FilterQueryCompiler:
+    """Разбор запроса в план с кэшем планов по строке запроса"""
+
+    def __init__(self, cache_size: int = 256):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.cache_size = cache_size
+        self._plans: 'OrderedDict[str, CompiledFilterQuery]' = OrderedDict()
+        self.statistics = {'hits': 0, 'misses': 0}
+
+    def compile(self, query: str) -> CompiledFilterQuery:
+        """План запроса (повторная компиляция той же строки берется из кэша)"""
+        key = ' '.join((query or '').split())
+        plan = self._plans.get(key)
+        if plan is not None:
+            self._plans.move_to_end(key)
+            self.statistics['hits'] += 1
+            return plan
+
+        self.statistics['misses'] += 1
+        plan = self._compile(key)
+        self._plans[key] = plan
+        if len(self._plans) > self.cache_size:
+            self._plans.popitem(last=False)
+        return plan
+
+    def clear_cache(self):
+        self._plans.clear()
+
+    def _compile(self, query: str) -> CompiledFilterQuery:
+        tokens = _TOKEN.findall(query)
+        if not tokens:
+            return CompiledFilterQuery(query=query, root=None)
+
+        parser = _QueryParser(tokens)
+        root = parser.parse()
+        root = self._optimize(root)
+        return CompiledFilterQuery(query=query, root=root, terms=root.terms())
+
+    def _optimize(self, node: QueryNode) -> QueryNode:
+        """Уплощение вложенных И/ИЛИ и сортировка условий по стоимости вычисления"""
+        if node.term is not None:
+            return node
+        children = [self._optimize(child) for child in node.children]
+        if node.operator == 'not':
+            child = children[0]
+            # Двойное отрицание снимается
+            return child.children[0] if child.operator == 'not' else QueryNode('not', (child,))
+
+        flat = []
+        for child in children:
+            flat.extend(child.children if child.operator == node.operator else (child,))
+        if len(flat) == 1:
+            return flat[0]
+        flat.sort(key=lambda child: child.cost)
+        return QueryNode(node.operator, tuple(flat))
+
+
+class _QueryParser:
+    """Рекурсивный спуск: or_expr := and_expr (OR and_expr)*, and_expr := unary+"""
+
+    def __init__(self, tokens: List[str]):
+        self.tokens = tokens
+        self.position = 0
+
+    def parse(self) -> QueryNode:
+        node = self._or_expression()
+        if self.position < len(self.tokens):
+            raise FilterQueryError(f"Лишняя закрывающая скобка или '{self.tokens[self.position]}'")
+        return node
+
+    def _peek(self) -> Optional[str]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def _or_expression(self) -> QueryNode:
+        children = [self._and_expression()]
+        while self._peek() is not None and self._peek().upper() in ('OR', '|'):
+            self.position += 1
+            children.append(self._and_expression())
+        return children[0] if len(children) == 1 else QueryNode('or', tuple(children))
+
+    def _and_expression(self) -> QueryNode:
+        children = []
+        while True:
+            token = self._peek()
+            if token is None or token == ')' or token.upper() in ('OR', '|'):
+                break
+            if token.upper() in ('AND', '&'):
+                self.position += 1
+                continue
+            children.append(self._unary())
+        if not children:
+            raise FilterQueryError("Пустое условие в запросе")
+        return children[0] if len(children) == 1 else QueryNode('and', tuple(children))
+
+    def _unary(self) -> QueryNode:
+        token = self.tokens[self.position]
+        if token.upper() == 'NOT':
+            self.position += 1
+            if self._peek() is None:
+                raise FilterQueryError("После NOT нет условия")
+            return QueryNode('not', (self._unary(),))
+        if token == '(':
+            self.position += 1
+            node = self._or_expression()
+            if self._peek() != ')':
+                raise FilterQueryError("Не закрыта скобка")
+            self.position += 1
+            return node
+        self.position += 1
+        if token.startswith('-') and len(token) > 1:
+            return QueryNode('not', (QueryNode('term', term=parse_term(token[1:])),))
+        return QueryNode('term', term=parse_term(token))
+
+
+def parse_term(token: str) -> QueryTerm:
+    """Разбор одного терма запроса"""
+    if token.startswith('"'):
+        text = token.strip('"')
+        if not text.strip():
+            raise FilterQueryError("Пустая строка поиска")
+        return QueryTerm('text', 'text', (text,))
+
+    comparison = _COMPARISON.match(token)
+    if comparison and comparison.group(1).lower() in BEHAVIOUR_FIELDS:
+        name, operator, number = comparison.groups()
+        return QueryTerm('behaviour', name.lower(), (float(number),), operator)
+
+    if ':' not in token:
+        return QueryTerm('text', 'text', (token,))
+
+    name, raw_values = token.split(':', 1)
+    name = name.lower()
+    values = [value for value in raw_values.split(',') if value]
+    if not values:
+        raise FilterQueryError(f"Не указано значение поля '{name}'")
+
+    if name in METADATA_FIELDS:
+        dimension = METADATA_FIELDS[name]
+        if dimension == 'wagon':
+            parsed = []
+            for value in values:
+                match = _RANGE.match(value)
+                parsed.append((int(match.group(1)), int(match.group(2))) if match else value)
+            return QueryTerm('meta', dimension, tuple(parsed))
+        return QueryTerm('meta', dimension, tuple(values))
+
+    if name in CATEGORY_FIELDS:
+        category, config = CATEGORY_FIELDS[name]
+        unknown = [value for value in values if value.lower() not in config]
+        if unknown:
+            raise FilterQueryError(f"Неизвестное значение {category}: {', '.join(unknown)} "
+                                   f"(доступны: {', '.join(config)})")
+        return QueryTerm('category', category, tuple(value.lower() for value in values))
+
+    if name == 'is':
+        unknown = [value for value in values if value.lower() not in FLAG_VALUES]
+        if unknown:
+            raise FilterQueryError(f"Неизвестный признак: {', '.join(unknown)} (доступны: {', '.join(FLAG_VALUES)})")
+        return QueryTerm('flag', 'is', tuple(value.lower() for value in values))
+
+    known = sorted({*METADATA_FIELDS, *CATEGORY_FIELDS, *BEHAVIOUR_FIELDS, 'is'})
+    raise FilterQueryError(f"Неизвестное поле '{name}' (доступны: {', '.join(known)})")
+
+
+class FilterQueryContext:
+    """Вычисление планов над одним набором параметров
+
+    Метаданные берутся из ParameterBitsetIndex (значения полей кодируются
+    один раз, шаблоны сопоставляются только с различающимися значениями),
+    текст - из ParameterSearchIndex, поведение - из ChangeScores текущего
+    окна, выровненных по позициям набора. Маски термов кэшируются, поэтому
+    повторные и пересекающиеся запросы сводятся к логическим операциям.
+    """
+
+    DEFAULT_CHANGE_THRESHOLD = 0.1
+
+    def __init__(self, parameters: List[Any], search_index: Optional[ParameterSearchIndex] = None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.parameters = parameters
+        self.size = len(parameters)
+        self.change_threshold = self.DEFAULT_CHANGE_THRESHOLD
+        self._index = ParameterBitsetIndex(parameters, {
+            'type': self._data_type,
+            'wagon': lambda p: str(self._field(p, 'wagon') or ''),
+            'line': lambda p: str(self._field(p, 'line') or ''),
+            'component': lambda p: str(self._field(p, 'component_type') or ''),
+            'hardware': lambda p: str(self._field(p, 'hardware_type') or ''),
+            'code': lambda p: str(self._field(p, 'signal_code') or '')
+        }, lambda p: bool(self._field(p, 'is_problematic')))
+        # Общий поисковый индекс модели (приводится к этому же списку параметров)
+        self._search_index = search_index
+        self._category_index: Optional[DiagnosticCategoryIndex] = None
+        self._term_masks: Dict[QueryTerm, np.ndarray] = {}
+        self._scores = None
+        self._score_rows: Optional[np.ndarray] = None
+
+    @staticmethod
+    def _field(parameter: Any, name: str) -> Any:
+        if isinstance(parameter, dict):
+            return parameter.get(name)
+        return getattr(parameter, name, None)
+
+    @classmethod
+    def _data_type(cls, parameter: Any) -> str:
+        data_type = cls._field(parameter, 'data_type')
+        return str(getattr(data_type, 'value', data_type) or '').upper()
+
+    def is_valid_for(self, parameters: List[Any]) -> bool:
+        return self._index.is_valid_for(parameters)
+
+    def set_change_scores(self, scores, threshold: Optional[float] = None):
+        """Оценки изменяемости текущего окна для поведенческих условий"""
+        if threshold is not None and threshold != self.change_threshold:
+            self.change_threshold = threshold
+            self._drop_masks(lambda term: term.kind == 'flag')
+        if scores is self._scores:
+            return
+        self._scores = scores
+        self._score_rows = None
+        if scores is not None:
+            rows = {column: i for i, column in enumerate(scores.columns)}
+            self._score_rows = np.fromiter(
+                (rows.get(self._field(p, 'full_column'), -1) for p in self.parameters),
+                dtype=np.int64, count=self.size)
+        self._drop_masks(lambda term: term.kind in ('behaviour', 'flag'))
+
+    def _drop_masks(self, predicate: Callable[[QueryTerm], bool]):
+        for term in [term for term in self._term_masks if predicate(term)]:
+            del self._term_masks[term]
+
+    # === ВЫЧИСЛЕНИЕ ===
+
+    def mask(self, plan: CompiledFilterQuery) -> np.ndarray:
+        """Маска параметров набора, удовлетворяющих запросу"""
+        if plan.is_empty:
+            return np.ones(self.size, dtype=bool)
+        return self._evaluate(plan.root)
+
+    def positions(self, plan: CompiledFilterQuery) -> np.ndarray:
+        return np.flatnonzero(self.mask(plan))
+
+    def select(self, plan: CompiledFilterQuery) -> List[Any]:
+        return [self.parameters[i] for i in self.positions(plan).tolist()]
+
+    def _evaluate(self, node: QueryNode) -> np.ndarray:
+        if node.term is not None:
+            return self.term_mask(node.term)
+        if node.operator == 'not':
+            return ~self._evaluate(node.children[0])
+
+        # Дочерние узлы отсортированы по стоимости: дорогие термы не вычисляются,
+        # если результат уже определен
+        result = None
+        for child in node.children:
+            mask = self._evaluate(child)
+            if node.operator == 'and':
+                result = mask if result is None else result & mask
+                if not result.any():
+                    break
+            else:
+                result = mask if result is None else result | mask
+                if result.all():
+                    break
+        return result
+
+    def term_mask(self, term: QueryTerm) -> np.ndarray:
+        mask = self._term_masks.get(term)
+        if mask is None:
+            mask = getattr(self, f"_{term.kind}_mask")(term)
+            mask.setflags(write=False)
+            self._term_masks[term] = mask
+        return mask
+
+    def _meta_mask(self, term: QueryTerm) -> np.ndarray:
+        values = self._index.values(term.field)
+        if term.field == 'wagon':
+            selected = [value for value in values if self._wagon_matches(value, term.values)]
+        elif term.field == 'type':
+            patterns = [re.compile(fnmatch.translate(v.upper())) for v in term.values]
+            selected = [value for value in values if any(p.match(value) for p in patterns)]
+        else:
+            patterns = [re.compile(fnmatch.translate(v), re.IGNORECASE) for v in term.values]
+            selected = [value for value in values if any(p.match(value) for p in patterns)]
+        return self._index.value_mask(term.field, selected)
+
+    @staticmethod
+    def _wagon_matches(value: str, wanted: Sequence[Any]) -> bool:
+        for item in wanted:
+            if isinstance(item, tuple):
+                if value.isdigit() and item[0] <= int(value) <= item[1]:
+                    return True
+            elif fnmatch.fnmatchcase(value, item):
+                return True
+        return False
+
+    def _flag_mask(self, term: QueryTerm) -> np.ndarray:
+        mask = np.zeros(self.size, dtype=bool)
+        problematic = self._index.problematic_values()
+        for value in term.values:
+            if value == 'problematic':
+                mask |= problematic
+            elif value == 'normal':
+                mask |= ~problematic
+            else:
+                mask |= self._score_values('score') > self.change_threshold
+        return mask
+
+    def _category_mask(self, term: QueryTerm) -> np.ndarray:
+        if self._category_index is None:
+            self._category_index = DiagnosticCategoryIndex(self.parameters)
+        return self._category_index.category_mask(_CATEGORY_GROUPS[term.field], term.values)
+
+    def _text_mask(self, term: QueryTerm) -> np.ndarray:
+        if self._search_index is None:
+            self._search_index = ParameterSearchIndex()
+        if not self._search_index.is_current(self.parameters):
+            self._search_index.update(self.parameters)
+        mask = np.zeros(self.size, dtype=bool)
+        mask[self._search_index.positions(term.values[0])] = True
+        return mask
+
+    def _behaviour_mask(self, term: QueryTerm) -> np.ndarray:
+        values = self._score_values(BEHAVIOUR_FIELDS[term.field])
+        with np.errstate(invalid='ignore'):
+            return _COMPARATORS[term.operator](values, term.values[0]) & ~np.isnan(values)
+
+    def _score_values(self, attribute: str) -> np.ndarray:
+        """Показатель ChangeScores по позициям набора (NaN - столбца нет в оценках)"""
+        if self._scores is None:
+            raise FilterQueryError("Оценки изменяемости недоступны: загрузите данные и задайте диапазон времени")
+        source = np.asarray(getattr(self._scores, attribute), dtype=np.float64)
+        values = np.full(self.size, np.nan)
+        present = self._score_rows >= 0
+        values[present] = source[self._score_rows[present]]
+        return values
@@ -5,11 +5,11 @@ import logging
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 from functools import lru_cache
-import hashlib
-import json
 
 from ..entities.parameter import Parameter
 from ..entities.filter_criteria import FilterCriteria
+from .parameter_index import ParameterBitsetIndex
+from ...services.analysis_cache import AnalysisCache
 
 class ParameterFilteringService:
     """Сервис фильтрации параметров (КРИТИЧЕСКИ ИСПРАВЛЕННАЯ ВЕРСИЯ)"""
@@ -18,16 +18,20 @@ class ParameterFilteringService:
         self.data_loader = data_loader
         self.logger = logging.getLogger(self.__class__.__name__)
         
-        # Кэш для результатов фильтрации
-        self._filter_cache: Dict[str, List[Any]] = {}
-        self._cache_enabled = True
-        self._max_cache_size = 100
+        # Общий кэш анализа (если его предоставил загрузчик) - для сводной статистики
+        shared_cache = getattr(data_loader, 'analysis_cache', None)
+        self._analysis_cache = shared_cache if isinstance(shared_cache, AnalysisCache) else AnalysisCache()
+
+        # Индекс измерений текущего набора параметров: строится один раз на набор,
+        # после чего любая комбинация критериев - несколько векторных операций
+        self._index: Optional[ParameterBitsetIndex] = None
+        self._index_enabled = True
         
         # Метрики производительности
         self._filter_stats = {
             'total_calls': 0,
-            'cache_hits': 0,
-            'cache_misses': 0,
+            'index_hits': 0,
+            'index_builds': 0,
             'filter_time_ms': []
         }
         
@@ -42,45 +46,23 @@ class ParameterFilteringService:
         try:
             self._filter_stats['total_calls'] += 1
 
-            # ЛОГИРОВАНИЕ: входные критерии фильтрации
-            self.logger.info(f"filter_parameters: входные критерии: {criteria}")
-            # ЛОГИРОВАНИЕ: уникальные значения по полям в параметрах
-            if parameters:
-                unique_signal_types = set(p.get('signal_type') for p in parameters if isinstance(p, dict) and 'signal_type' in p)
-                unique_lines = set(p.get('line') for p in parameters if isinstance(p, dict) and 'line' in p)
-                unique_wagons = set(p.get('wagon') for p in parameters if isinstance(p, dict) and 'wagon' in p)
-                unique_components = set(p.get('component') for p in parameters if isinstance(p, dict) and 'component' in p)
-                self.logger.info(f"filter_parameters: уникальные signal_types: {unique_signal_types}")
-                self.logger.info(f"filter_parameters: уникальные lines: {unique_lines}")
-                self.logger.info(f"filter_parameters: уникальные wagons: {unique_wagons}")
-                self.logger.info(f"filter_parameters: уникальные components: {unique_components}")
+            self.logger.debug(f"filter_parameters: входные критерии: {criteria}")
 
             # КРИТИЧЕСКОЕ ИСПРАВЛЕНИЕ: Если критерии пустые или None, возвращаем ВСЕ параметры
             if not criteria or self._is_empty_criteria(criteria):
-                self.logger.info("Пустые критерии фильтрации, возвращаем все параметры")
-                filter_time = (time.time() - start_time) * 1000
-                self.logger.info(f"Фильтрация: {len(parameters)} -> {len(parameters)} параметров ({filter_time:.1f}ms)")
+                self.logger.debug("Пустые критерии фильтрации, возвращаем все параметры")
                 return parameters
             
-            # Проверка кэша
-            cache_key = self._generate_cache_key(parameters, criteria)
-            if self._cache_enabled and cache_key in self._filter_cache:
-                self._filter_stats['cache_hits'] += 1
-                self.logger.debug(f"Использование кэша фильтрации: {cache_key[:8]}...")
-                return self._filter_cache[cache_key]
-            
-            self._filter_stats['cache_misses'] += 1
-            
             # Валидация входных данных
             if not self._validate_filter_input(parameters, criteria):
                 return parameters  # Возвращаем все при ошибке валидации
             
-            # Применение фильтров
-            filtered_params = self._apply_sequential_filters(parameters, criteria)
-            
-            # Сохранение в кэш
-            if self._cache_enabled:
-                self._update_cache(cache_key, filtered_params)
+            # Применение фильтров: по индексу набора, последовательно - если индекс недоступен
+            index = self._get_index(parameters)
+            if index is not None:
+                filtered_params = index.select(criteria)
+            else:
+                filtered_params = self._apply_sequential_filters(parameters, criteria)
             
             # Обновление метрик
             filter_time = (time.time() - start_time) * 1000
@@ -93,6 +75,30 @@ class ParameterFilteringService:
             self.logger.error(f"Ошибка фильтрации параметров: {e}")
             return parameters  # Возвращаем исходные данные при ошибке
     
+    def _get_index(self, parameters: List[Any]) -> Optional[ParameterBitsetIndex]:
+        """Индекс набора параметров (перестраивается только для другого набора)"""
+        if not self._index_enabled:
+            return None
+        if self._index is not None and self._index.is_valid_for(parameters):
+            self._filter_stats['index_hits'] += 1
+            return self._index
+
+        try:
+            self._index = ParameterBitsetIndex(parameters, {
+                'signal_types': self._extract_signal_type,
+                'wagons': self._extract_wagon,
+                'lines': self._extract_line,
+                'components': self._extract_component,
+                'hardware': self._extract_hardware
+            }, self._extract_problematic_status)
+            self._filter_stats['index_builds'] += 1
+            self.logger.debug(f"Построен индекс фильтрации для {len(parameters)} параметров")
+            return self._index
+        except Exception as e:
+            self.logger.error(f"Ошибка построения индекса фильтрации: {e}")
+            self._index = None
+            return None
+
     def _is_empty_criteria(self, criteria: Dict[str, List[str]]) -> bool:
         """НОВЫЙ МЕТОД: Проверка на пустые критерии"""
         try:
@@ -445,36 +451,12 @@ class ParameterFilteringService:
             self.logger.error(f"Ошибка fallback фильтрации: {e}")
             return []
     
-    # Остальные методы остаются без изменений...
-    def _generate_cache_key(self, parameters: List[Any], 
-                           criteria: Dict[str, List[str]]) -> str:
-        """Генерация ключа кэша"""
-        try:
-            params_hash = hashlib.md5(str(len(parameters)).encode()).hexdigest()[:8]
-            criteria_str = json.dumps(criteria, sort_keys=True)
-            criteria_hash = hashlib.md5(criteria_str.encode()).hexdigest()[:8]
-            return f"{params_hash}_{criteria_hash}"
-        except Exception as e:
-            self.logger.error(f"Ошибка генерации ключа кэша: {e}")
-            return f"fallback_{len(parameters)}_{len(criteria)}"
-    
-    def _update_cache(self, cache_key: str, filtered_params: List[Any]):
-        """Обновление кэша с контролем размера"""
-        try:
-            if len(self._filter_cache) >= self._max_cache_size:
-                oldest_key = next(iter(self._filter_cache))
-                del self._filter_cache[oldest_key]
-            
-            self._filter_cache[cache_key] = filtered_params.copy()
-        except Exception as e:
-            self.logger.error(f"Ошибка обновления кэша: {e}")
-    
     def get_filter_statistics(self) -> Dict[str, Any]:
         """Получение статистики фильтрации"""
         try:
-            cache_hit_rate = 0
+            index_hit_rate = 0
             if self._filter_stats['total_calls'] > 0:
-                cache_hit_rate = (self._filter_stats['cache_hits'] / 
+                index_hit_rate = (self._filter_stats['index_hits'] / 
                                 self._filter_stats['total_calls']) * 100
             
             avg_filter_time = 0
@@ -483,22 +465,23 @@ class ParameterFilteringService:
             
             return {
                 'total_calls': self._filter_stats['total_calls'],
-                'cache_hits': self._filter_stats['cache_hits'],
-                'cache_misses': self._filter_stats['cache_misses'],
-                'cache_hit_rate_percent': round(cache_hit_rate, 2),
-                'cache_size': len(self._filter_cache),
-                'avg_filter_time_ms': round(avg_filter_time, 2),
-                'cache_enabled': self._cache_enabled
+                'index_hits': self._filter_stats['index_hits'],
+                'index_builds': self._filter_stats['index_builds'],
+                'index_hit_rate_percent': round(index_hit_rate, 2),
+                'indexed_parameters': self._index.size if self._index else 0,
+                'index_size_kb': round(self._index.nbytes / 1024, 1) if self._index else 0,
+                'avg_filter_time_ms': round(avg_filter_time, 3),
+                'index_enabled': self._index_enabled,
+                'shared_cache': self._analysis_cache.get_cache_statistics()
             }
         except Exception as e:
             self.logger.error(f"Ошибка получения статистики: {e}")
             return {}
     
     def clear_cache(self):
-        """Очистка кэша фильтрации"""
+        """Сброс индекса фильтрации (перестроится при следующем вызове)"""
         try:
-            cache_size = len(self._filter_cache)
-            self._filter_cache.clear()
-            self.logger.info(f"Кэш фильтрации очищен ({cache_size} элементов)")
+            self._index = None
+            self.logger.info("Индекс фильтрации сброшен")
         except Exception as e:
             self.logger.error(f"Ошибка очистки кэша: {e}")
@@ -0,0 +1,804 @@
+"""
+Правила контроля пределов и условий по записи: язык правил и векторное вычисление
+
+Набор правил - одно правило на строку, # - комментарий:
+
+    low_voltage: F_U3000 < 2200 for 2s hyst 50
+    door_on_move: B_DOOR_HINDRANCE while F_SPEED > 0
+
+- сравнения < <= > >= == != и арифметика + - * / над сигналами и числами;
+- and (&, while), or (|), not (!) и скобки; сигнал вне сравнения - «не ноль»;
+- for <длительность> (ms, s, min, h; без единицы - секунды) - минимальная
+  длительность нарушения, hyst <число> - гистерезис сравнений (возврат
+  в норму только после отхода от порога на это значение);
+- код без номера вагона (F_U3000) - семейство по вагонам: правило
+  вычисляется для каждого вагона, сигналы без вагона общие для всех вагонов;
+- функции: abs(x) и агрегаты по вагонам sum, mean, min, max, any, all -
+  аргумент агрегата вычисляется по всем вагонам своих семейств и сводится
+  в один столбец (пропуски отдельных вагонов не учитываются).
+"""
+import logging
+import re
+import time
+import warnings
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .change_point_index import RowSelector
+from .event_correlation import timestamps_ns
+from .signal_family_index import SignalFamily, SignalFamilyIndex
+
+_TOKEN = re.compile(
+    r'\s*(?:(?P<number>(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?)(?P<unit>ms|min|s|h)?(?![A-Za-z0-9_.])'
+    r'|(?P<name>[A-Za-z_][A-Za-z0-9_]*)'
+    r'|(?P<symbol><=|>=|==|!=|&&|\|\||[<>=!&|()+\-*/]))')
+_RULE_NAME = re.compile(r'^\s*([A-Za-z_][\w.\-]*)\s*:(?!:)\s*(.*)$')
+
+_DURATION_UNITS = {'ms': 0.001, 's': 1.0, 'min': 60.0, 'h': 3600.0}
+_AND_WORDS = ('AND', '&', '&&', 'WHILE')
+_OR_WORDS = ('OR', '|', '||')
+_NOT_WORDS = ('NOT', '!')
+_KEYWORDS = {'AND', 'OR', 'NOT', 'WHILE', 'FOR', 'HYST', 'HYSTERESIS'}
+
+_ARITHMETIC = {'+': np.add, '-': np.subtract, '*': np.multiply, '/': np.divide}
+_COMPARATORS = {
+    '<': np.less, '<=': np.less_equal, '>': np.greater,
+    '>=': np.greater_equal, '==': np.equal, '!=': np.not_equal
+}
+# Функции: поэлементные и агрегаты по оси вагонов
+_FUNCTIONS = {'abs': np.abs}
+_REDUCTIONS = {'sum': np.nansum, 'mean': np.nanmean, 'min': np.nanmin, 'max': np.nanmax,
+               'any': np.any, 'all': np.all}
+_BOOLEAN_FUNCTIONS = frozenset({'any', 'all'})
+# Операторы с логическим результатом
+BOOLEAN_OPERATORS = frozenset(_COMPARATORS) | {'and', 'or', 'not', 'truthy'}
+
+
+class RuleError(ValueError):
+    """Ошибка разбора или вычисления правила контроля"""
+
+
+@dataclass(frozen=True)
+class RuleNode:
+    """Узел выражения правила (хэшируемый: одинаковые подвыражения правил вычисляются один раз)"""
+    operator: str
+    children: Tuple['RuleNode', ...] = ()
+    value: Any = None
+
+    @property
+    def is_boolean(self) -> bool:
+        if self.operator == 'call':
+            return self.value in _BOOLEAN_FUNCTIONS
+        return self.operator in BOOLEAN_OPERATORS
+
+    def signals(self) -> List[str]:
+        if self.operator == 'signal':
+            return [self.value]
+        return [code for child in self.children for code in child.signals()]
+
+    def wagon_signals(self) -> List[str]:
+        """Сигналы вне агрегатов по вагонам - только они задают вагоны выражения"""
+        if self.operator == 'call' and self.value in _REDUCTIONS:
+            return []
+        if self.operator == 'signal':
+            return [self.value]
+        return [code for child in self.children for code in child.wagon_signals()]
+
+    def describe(self) -> str:
+        if self.operator == 'number':
+            return f"{self.value:g}"
+        if self.operator == 'signal':
+            return self.value
+        if self.operator in ('truthy', 'float'):
+            return self.children[0].describe()
+        if self.operator == 'call':
+            return f"{self.value}({self.children[0].describe()})"
+        if self.operator == 'neg':
+            return f"-{self._operand(self.children[0])}"
+        if self.operator == 'not':
+            return f"not {self._operand(self.children[0])}"
+        separator = f" {self.operator} "
+        return separator.join(self._operand(child) for child in self.children)
+
+    @staticmethod
+    def _operand(node: 'RuleNode') -> str:
+        inner = node.children[0] if node.operator in ('truthy', 'float') else node
+        if inner.children and inner.operator not in ('neg', 'not', 'call'):
+            return f"({inner.describe()})"
+        return inner.describe()
+
+
+@dataclass
+class MonitoringRule:
+    """Скомпилированное правило: условие нарушения, минимальная длительность, гистерезис"""
+    name: str
+    expression: str
+    root: RuleNode
+    min_duration: float = 0.0
+    hysteresis: float = 0.0
+
+    @property
+    def signals(self) -> List[str]:
+        return list(dict.fromkeys(self.root.signals()))
+
+    @property
+    def wagon_signals(self) -> List[str]:
+        return list(dict.fromkeys(self.root.wagon_signals()))
+
+    def describe(self) -> str:
+        text = self.root.describe()
+        if self.min_duration:
+            text += f" for {self.min_duration:g}s"
+        if self.hysteresis:
+            text += f" hyst {self.hysteresis:g}"
+        return text
+
+
+class RuleCompiler:
+    """Разбор правил в деревья выражений с кэшем по тексту правила"""
+
+    def __init__(self, cache_size: int = 1024):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.cache_size = cache_size
+        self._rules: 'OrderedDict[str, MonitoringRule]' = OrderedDict()
+
+    def compile(self, text: str) -> MonitoringRule:
+        """Правило из строки «[имя:] условие [for длительность] [hyst число]»"""
+        key = ' '.join((text or '').split())
+        rule = self._rules.get(key)
+        if rule is not None:
+            self._rules.move_to_end(key)
+            return rule
+
+        match = _RULE_NAME.match(key)
+        name, expression = (match.group(1), match.group(2)) if match else (None, key)
+        if not expression:
+            raise RuleError("Пустое правило")
+        root, min_duration, hysteresis = _RuleParser(tokenize(expression)).parse()
+        rule = MonitoringRule(name=name or expression, expression=expression, root=root,
+                              min_duration=min_duration, hysteresis=hysteresis)
+
+        self._rules[key] = rule
+        if len(self._rules) > self.cache_size:
+            self._rules.popitem(last=False)
+        return rule
+
+    def compile_expression(self, text: str) -> RuleNode:
+        """Дерево выражения без приведения к условию (для производных сигналов)"""
+        expression = ' '.join((text or '').split())
+        if not expression:
+            raise RuleError("Пустое выражение")
+        return _RuleParser(tokenize(expression)).parse_expression()
+
+    def compile_rules(self, source: Union[str, Iterable[str]]) -> List[MonitoringRule]:
+        """Набор правил из текста (строка на правило) или списка строк"""
+        lines = source.splitlines() if isinstance(source, str) else list(source)
+        rules, names = [], set()
+        for number, line in enumerate(lines, 1):
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            try:
+                rule = self.compile(line)
+            except RuleError as e:
+                raise RuleError(f"Строка {number}: {e}") from e
+            if rule.name in names:
+                raise RuleError(f"Строка {number}: повтор имени правила '{rule.name}'")
+            names.add(rule.name)
+            rules.append(rule)
+        return rules
+
+    def clear_cache(self):
+        self._rules.clear()
+
+
+def tokenize(expression: str) -> List[Tuple[str, Any]]:
+    """Лексемы (вид, значение): number (число, единица), name, symbol"""
+    tokens, position = [], 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        match = _TOKEN.match(expression, position)
+        if match is None or match.end() == position:
+            raise RuleError(f"Непонятный символ в позиции {position + 1}: '{expression[position:position + 10]}'")
+        position = match.end()
+        if match.group('number') is not None:
+            tokens.append(('number', (float(match.group('number')), match.group('unit'))))
+        elif match.group('name') is not None:
+            tokens.append(('name', match.group('name')))
+        else:
+            symbol = match.group('symbol')
+            tokens.append(('symbol', '==' if symbol == '=' else symbol))
+    return tokens
+
+
+class _RuleParser:
+    """Рекурсивный спуск: or > and > not > сравнение > сумма > произведение > унарный минус"""
+
+    def __init__(self, tokens: List[Tuple[str, Any]]):
+        self.tokens = tokens
+        self.position = 0
+
+    def parse(self) -> Tuple[RuleNode, float, float]:
+        root = self._as_boolean(self._or_expression())
+        min_duration, hysteresis = 0.0, 0.0
+        while self._peek_word() in ('FOR', 'HYST', 'HYSTERESIS'):
+            word = self._next()[1].upper()
+            if word == 'FOR':
+                min_duration = self._duration()
+            else:
+                hysteresis = self._number('гистерезиса')
+        if self.position < len(self.tokens):
+            raise RuleError(f"Лишнее в конце правила: '{self._text(self.tokens[self.position])}'")
+        return root, min_duration, hysteresis
+
+    def parse_expression(self) -> RuleNode:
+        root = self._or_expression()
+        if self.position < len(self.tokens):
+            raise RuleError(f"Лишнее в конце выражения: '{self._text(self.tokens[self.position])}'")
+        return root
+
+    # === ЛЕКСЕМЫ ===
+
+    def _peek(self) -> Optional[Tuple[str, Any]]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def _peek_word(self) -> Optional[str]:
+        token = self._peek()
+        if token is None or token[0] == 'number':
+            return None
+        return token[1].upper()
+
+    def _next(self) -> Tuple[str, Any]:
+        token = self._peek()
+        if token is None:
+            raise RuleError("Неожиданный конец правила")
+        self.position += 1
+        return token
+
+    @staticmethod
+    def _text(token: Tuple[str, Any]) -> str:
+        if token[0] == 'number':
+            return f"{token[1][0]:g}{token[1][1] or ''}"
+        return token[1]
+
+    def _number(self, what: str) -> float:
+        token = self._next()
+        if token[0] != 'number' or token[1][1] is not None:
+            raise RuleError(f"Ожидалось число {what}, получено '{self._text(token)}'")
+        return token[1][0]
+
+    def _duration(self) -> float:
+        token = self._next()
+        if token[0] != 'number':
+            raise RuleError(f"Ожидалась длительность после for, получено '{self._text(token)}'")
+        value, unit = token[1]
+        # Единица через пробел: for 2 s
+        if unit is None and self._peek() is not None and self._peek()[0] == 'name' \
+                and self._peek()[1].lower() in _DURATION_UNITS:
+            unit = self._next()[1].lower()
+        return value * _DURATION_UNITS[unit or 's']
+
+    # === ВЫРАЖЕНИЯ ===
+
+    @staticmethod
+    def _as_boolean(node: RuleNode) -> RuleNode:
+        return node if node.is_boolean else RuleNode('truthy', (node,))
+
+    @staticmethod
+    def _as_number(node: RuleNode) -> RuleNode:
+        return RuleNode('float', (node,)) if node.is_boolean else node
+
+    def _or_expression(self) -> RuleNode:
+        children = [self._and_expression()]
+        while self._peek_word() in _OR_WORDS:
+            self.position += 1
+            children.append(self._and_expression())
+        if len(children) == 1:
+            return children[0]
+        return RuleNode('or', tuple(self._as_boolean(child) for child in children))
+
+    def _and_expression(self) -> RuleNode:
+        children = [self._not_expression()]
+        while self._peek_word() in _AND_WORDS:
+            self.position += 1
+            children.append(self._not_expression())
+        if len(children) == 1:
+            return children[0]
+        return RuleNode('and', tuple(self._as_boolean(child) for child in children))
+
+    def _not_expression(self) -> RuleNode:
+        if self._peek_word() in _NOT_WORDS:
+            self.position += 1
+            return RuleNode('not', (self._as_boolean(self._not_expression()),))
+        return self._comparison()
+
+    def _comparison(self) -> RuleNode:
+        left = self._sum()
+        token = self._peek()
+        if token is not None and token[0] == 'symbol' and token[1] in _COMPARATORS:
+            self.position += 1
+            right = self._sum()
+            return RuleNode(token[1], (self._as_number(left), self._as_number(right)))
+        return left
+
+    def _sum(self) -> RuleNode:
+        node = self._product()
+        while self._peek() in (('symbol', '+'), ('symbol', '-')):
+            operator = self._next()[1]
+            node = RuleNode(operator, (self._as_number(node), self._as_number(self._product())))
+        return node
+
+    def _product(self) -> RuleNode:
+        node = self._unary()
+        while self._peek() in (('symbol', '*'), ('symbol', '/')):
+            operator = self._next()[1]
+            node = RuleNode(operator, (self._as_number(node), self._as_number(self._unary())))
+        return node
+
+    def _unary(self) -> RuleNode:
+        if self._peek() == ('symbol', '-'):
+            self.position += 1
+            operand = self._as_number(self._unary())
+            if operand.operator == 'number':
+                return RuleNode('number', value=-operand.value)
+            return RuleNode('neg', (operand,))
+        return self._atom()
+
+    def _atom(self) -> RuleNode:
+        token = self._next()
+        kind, value = token
+        if kind == 'number':
+            if value[1] is not None:
+                raise RuleError(f"Единица времени вне for: '{self._text(token)}'")
+            return RuleNode('number', value=value[0])
+        if kind == 'name':
+            if value.upper() in _KEYWORDS:
+                raise RuleError(f"Ожидался сигнал или число, получено '{value}'")
+            if self._peek() == ('symbol', '('):
+                return self._call(value)
+            return RuleNode('signal', value=value)
+        if value == '(':
+            node = self._or_expression()
+            if self._peek() != ('symbol', ')'):
+                raise RuleError("Не закрыта скобка")
+            self.position += 1
+            return node
+        raise RuleError(f"Ожидался сигнал или число, получено '{value}'")
+
+    def _call(self, name: str) -> RuleNode:
+        function = name.lower()
+        if function not in _FUNCTIONS and function not in _REDUCTIONS:
+            raise RuleError(f"Неизвестная функция {name}")
+        self.position += 1
+        argument = self._or_expression()
+        if self._peek() != ('symbol', ')'):
+            raise RuleError(f"Не закрыта скобка функции {name}")
+        self.position += 1
+        argument = self._as_boolean(argument) if function in _BOOLEAN_FUNCTIONS else self._as_number(argument)
+        return RuleNode('call', (argument,), value=function)
+
+
+@dataclass
+class RuleViolation:
+    """Интервал нарушения правила [start, end) в одном вагоне
+
+    columns - столбцы сигналов правила для этого вагона (для отметки на графиках);
+    интервал, не закрытый к концу окна, заканчивается последней строкой окна.
+    """
+    rule: str
+    wagon: Optional[int]
+    wagon_name: str
+    columns: Tuple[str, ...]
+    start: np.datetime64
+    end: np.datetime64
+    duration_seconds: float
+    open_at_end: bool
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'rule': self.rule,
+            'wagon': self.wagon,
+            'wagon_name': self.wagon_name,
+            'start': pd.Timestamp(self.start).isoformat(),
+            'end': pd.Timestamp(self.end).isoformat(),
+            'duration_seconds': round(self.duration_seconds, 3),
+            'open_at_end': self.open_at_end,
+            'columns': list(self.columns)
+        }
+
+
+@dataclass
+class RuleEvaluationReport:
+    """Нарушения набора правил; errors - правила, которые не удалось вычислить (имя -> причина)"""
+    rules: List[MonitoringRule]
+    violations: List[RuleViolation]
+    errors: Dict[str, str] = field(default_factory=dict)
+    elapsed_seconds: float = 0.0
+
+    def __len__(self) -> int:
+        return len(self.violations)
+
+    def by_rule(self) -> Dict[str, List[RuleViolation]]:
+        grouped: Dict[str, List[RuleViolation]] = {rule.name: [] for rule in self.rules}
+        for violation in self.violations:
+            grouped.setdefault(violation.rule, []).append(violation)
+        return grouped
+
+    def for_column(self, column: str) -> List[RuleViolation]:
+        """Нарушения правил, в которых участвует столбец"""
+        return [violation for violation in self.violations if column in violation.columns]
+
+    def intervals(self, column: Optional[str] = None) -> np.ndarray:
+        """Пары (начало, конец) datetime64[ns] для закраски на графиках"""
+        selected = self.violations if column is None else self.for_column(column)
+        return np.array([(v.start, v.end) for v in selected], dtype='datetime64[ns]').reshape(-1, 2)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Сводка по правилам для отчета: число нарушений, суммарная и наибольшая длительность"""
+        rows, grouped = [], self.by_rule()
+        for rule in self.rules:
+            found = grouped.get(rule.name, [])
+            durations = [violation.duration_seconds for violation in found]
+            rows.append({
+                'rule': rule.name,
+                'condition': rule.describe(),
+                'violations': len(found),
+                'wagons': sorted({v.wagon_name for v in found}),
+                'total_seconds': round(float(sum(durations)), 3),
+                'longest_seconds': round(float(max(durations, default=0.0)), 3),
+                'error': self.errors.get(rule.name)
+            })
+        return rows
+
+    def as_frame(self) -> pd.DataFrame:
+        columns = ['rule', 'wagon', 'wagon_name', 'start', 'end', 'duration_seconds', 'open_at_end', 'columns']
+        return pd.DataFrame([violation.as_dict() for violation in self.violations], columns=columns)
+
+
+class RuleEvaluationContext:
+    """Значения сигналов и подвыражений правил над окном записи
+
+    Сигналы берутся столбцами общей числовой матрицы (срезы без копирования),
+    семейства по вагонам - блоками время x вагон. Значения сигналов
+    кэшируются на все вычисление, подвыражения - только встречающиеся в
+    нескольких правилах набора (share), остальные живут до следующего правила.
+    virtual - реестр виртуальных каналов (is_virtual, values): их столбцы
+    доступны правилам наравне с записанными и вычисляются только для окна.
+    """
+
+    def __init__(self, data: pd.DataFrame, parameters: List[Any], rows: Optional[RowSelector] = None,
+                 numeric_matrix=None, families: Optional[SignalFamilyIndex] = None, virtual=None):
+        self.data = data
+        self.rows = slice(None) if rows is None else rows
+        self.numeric_matrix = numeric_matrix
+        self.families = families if families is not None else SignalFamilyIndex(parameters)
+        self.virtual = virtual
+
+        self.columns: Dict[str, str] = {}
+        for parameter in parameters:
+            if self._field(parameter, 'is_problematic'):
+                continue
+            code = self._field(parameter, 'signal_code')
+            column = self._field(parameter, 'full_column')
+            if code and (column in data.columns or self._is_virtual(column)):
+                self.columns.setdefault(code, column)
+
+        timestamps = timestamps_ns(data)
+        if timestamps is None:
+            raise RuleError("В записи нет столбца timestamp")
+        self.timestamps = timestamps[self.rows]
+        self._values: Dict[Tuple[str, Tuple], np.ndarray] = {}
+        self._nodes: Dict[Tuple[RuleNode, Tuple, float], Any] = {}
+        self._rule_nodes: Dict[Tuple[RuleNode, Tuple, float], Any] = {}
+        self._shared: set = set()
+
+    @staticmethod
+    def _field(parameter: Any, name: str) -> Any:
+        if isinstance(parameter, dict):
+            return parameter.get(name)
+        return getattr(parameter, name, None)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def _is_virtual(self, column: Optional[str]) -> bool:
+        return self.virtual is not None and self.virtual.is_virtual(column)
+
+    # === СИГНАЛЫ ===
+
+    def resolve(self, code: str) -> Union[str, SignalFamily]:
+        """Столбец сигнала с точным кодом или семейство по вагонам"""
+        column = self.columns.get(code)
+        if column is not None:
+            return column
+        family = self.families.families.get(code)
+        if family is not None:
+            return family
+        raise RuleError(f"Нет сигнала {code}")
+
+    def wagons_for(self, rule: MonitoringRule) -> Tuple[Optional[Tuple[int, ...]], List[str]]:
+        """Общие вагоны семейств правила (None - правило без семейств) и их имена"""
+        return self.common_wagons(rule.wagon_signals)
+
+    def common_wagons(self, codes: List[str]) -> Tuple[Optional[Tuple[int, ...]], List[str]]:
+        """Общие вагоны семейств среди кодов (None - семейств нет) и их имена"""
+        families = [target for target in map(self.resolve, codes) if isinstance(target, SignalFamily)]
+        if not families:
+            return None, ['']
+        wagons = set(families[0].wagons).intersection(*(family.wagons for family in families[1:]))
+        if not wagons:
+            raise RuleError("У семейств сигналов выражения нет общих вагонов")
+        names = dict(zip(families[0].wagons, families[0].wagon_names))
+        wagons = tuple(sorted(wagons))
+        return wagons, [names[wagon] for wagon in wagons]
+
+    def signal_columns(self, rule: MonitoringRule, wagons: Optional[Tuple[int, ...]]) -> List[Tuple[str, ...]]:
+        """Столбцы сигналов правила по вагонам (семейство внутри агрегата - все его столбцы)"""
+        per_wagon = [[] for _ in (wagons or (None,))]
+        by_wagon = set(rule.wagon_signals) if wagons else set()
+        for code in rule.signals:
+            target = self.resolve(code)
+            for i, wagon in enumerate(wagons or (None,)):
+                if not isinstance(target, SignalFamily):
+                    per_wagon[i].append(target)
+                elif code in by_wagon:
+                    per_wagon[i].append(target.columns[target.wagons.index(wagon)])
+                else:
+                    per_wagon[i].extend(target.columns)
+        return [tuple(columns) for columns in per_wagon]
+
+    def values(self, code: str, wagons: Optional[Tuple[int, ...]]) -> np.ndarray:
+        """Значения сигнала время x вагон (общий сигнал - один столбец для всех вагонов)
+
+        Для семейства wagons=None - все вагоны семейства.
+        """
+        target = self.resolve(code)
+        key = (code, wagons if isinstance(target, SignalFamily) else None)
+        values = self._values.get(key)
+        if values is not None:
+            return values
+
+        if isinstance(target, SignalFamily):
+            family = target
+            if wagons is not None and tuple(family.wagons) != wagons:
+                keep = [family.wagons.index(wagon) for wagon in wagons]
+                family = SignalFamily(family.base_code, [family.columns[i] for i in keep],
+                                      list(wagons), [family.wagon_names[i] for i in keep])
+            if any(self._is_virtual(column) for column in family.columns):
+                values = np.column_stack([self._column_values(column) for column in family.columns])
+            else:
+                values = family.matrix(self.data, self.rows, self.numeric_matrix)
+        else:
+            values = self._column_values(target)[:, np.newaxis]
+
+        self._values[key] = values
+        return values
+
+    def _column_values(self, column: str) -> np.ndarray:
+        """Значения одного столбца в окне (float64): матрица записи, DataFrame или виртуальный канал"""
+        if self._is_virtual(column):
+            return self.virtual.values(column, self.rows)
+        position = self.numeric_matrix.positions.get(column) if self.numeric_matrix is not None else None
+        if position is not None:
+            return self.numeric_matrix.values[:, position][self.rows]
+        series = self.data[column]
+        if series.dtype.kind not in 'biuf':
+            series = pd.to_numeric(series, errors='coerce')
+        return series.to_numpy(dtype=np.float64, na_value=np.nan)[self.rows]
+
+    # === ВЫРАЖЕНИЯ ===
+
+    def share(self, rules: List[MonitoringRule]):
+        """Отметка подвыражений, общих для нескольких правил набора"""
+        seen, shared = set(), set()
+        for rule in rules:
+            nodes, stack = set(), [rule.root]
+            while stack:
+                node = stack.pop()
+                if node not in nodes:
+                    nodes.add(node)
+                    stack.extend(node.children)
+            shared.update(nodes & seen)
+            seen.update(nodes)
+        self._shared = shared
+
+    def begin_rule(self):
+        self._rule_nodes.clear()
+
+    def _cached(self, key: Tuple[RuleNode, Tuple, float]) -> Any:
+        result = self._nodes.get(key)
+        return result if result is not None else self._rule_nodes.get(key)
+
+    def _store(self, key: Tuple[RuleNode, Tuple, float], result: Any):
+        (self._nodes if key[0] in self._shared else self._rule_nodes)[key] = result
+
+    def evaluate(self, node: RuleNode, wagons: Optional[Tuple[int, ...]]) -> Any:
+        """Значение подвыражения: число, массив время x вагон или маска"""
+        key = (node, wagons, 0.0)
+        result = self._cached(key)
+        if result is not None:
+            return result
+
+        operator = node.operator
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if operator == 'number':
+                result = node.value
+            elif operator == 'signal':
+                result = self.values(node.value, wagons)
+            elif operator == 'float':
+                result = np.asarray(self.evaluate(node.children[0], wagons), dtype=np.float64)
+            elif operator == 'truthy':
+                value = self.evaluate(node.children[0], wagons)
+                result = (value != 0) & ~np.isnan(value)
+            elif operator == 'neg':
+                result = -self.evaluate(node.children[0], wagons)
+            elif operator in _ARITHMETIC:
+                result = _ARITHMETIC[operator](*(self.evaluate(child, wagons) for child in node.children))
+            elif operator in _COMPARATORS:
+                result = _COMPARATORS[operator](*(self.evaluate(child, wagons) for child in node.children))
+            elif operator == 'not':
+                result = ~self.evaluate(node.children[0], wagons)
+            elif operator == 'call':
+                result = self._call(node, wagons)
+            else:
+                result = self._combine(operator, [self.evaluate(child, wagons) for child in node.children])
+
+        self._store(key, result)
+        return result
+
+    def hold_mask(self, node: RuleNode, wagons: Optional[Tuple[int, ...]], hysteresis: float) -> Any:
+        """Условие удержания нарушения: пороги сравнений сдвинуты на гистерезис наружу
+
+        Отрицание вычисляет подвыражение с обратным сдвигом, поэтому удержание
+        всегда шире исходного условия (при hysteresis > 0).
+        """
+        key = (node, wagons, hysteresis)
+        result = self._cached(key)
+        if result is not None:
+            return result
+
+        operator = node.operator
+        if operator in ('<', '<=', '>', '>='):
+            left, right = (self.evaluate(child, wagons) for child in node.children)
+            shift = hysteresis if operator in ('<', '<=') else -hysteresis
+            with np.errstate(invalid='ignore'):
+                result = _COMPARATORS[operator](left, right + shift)
+        elif operator == 'not':
+            result = ~self.hold_mask(node.children[0], wagons, -hysteresis)
+        elif operator in ('and', 'or'):
+            result = self._combine(operator, [self.hold_mask(child, wagons, hysteresis) for child in node.children])
+        else:
+            result = self.evaluate(node, wagons)
+
+        self._store(key, result)
+        return result
+
+    def _call(self, node: RuleNode, wagons: Optional[Tuple[int, ...]]) -> Any:
+        function, argument = node.value, node.children[0]
+        if function in _FUNCTIONS:
+            return _FUNCTIONS[function](self.evaluate(argument, wagons))
+
+        # Агрегат: аргумент по всем общим вагонам своих семейств, затем свертка по вагонам
+        inner, _ = self.common_wagons(list(dict.fromkeys(argument.wagon_signals())))
+        value = self.evaluate(argument, inner)
+        if np.ndim(value) < 2:
+            return value
+        with warnings.catch_warnings():
+            # Строка без значений ни в одном вагоне дает NaN
+            warnings.simplefilter('ignore', RuntimeWarning)
+            result = _REDUCTIONS[function](value, axis=1, keepdims=True)
+        if function == 'sum':
+            result[np.isnan(value).all(axis=1)] = np.nan
+        return result
+
+    @staticmethod
+    def _combine(operator: str, masks: List[Any]) -> Any:
+        result = masks[0]
+        for mask in masks[1:]:
+            result = (result & mask) if operator == 'and' else (result | mask)
+        return result
+
+
+class RuleEngine:
+    """Вычисление набора правил по окну записи с выделением интервалов нарушений
+
+    Условие правила вычисляется целиком над массивами время x вагон.
+    Интервалы - серии строк подряд, где условие выполняется (фронты
+    по разности маски, все вагоны одним проходом). С гистерезисом серия
+    строится по ослабленному условию удержания и начинается с первой
+    строки, где выполнено исходное условие; серии без такой строки
+    отбрасываются. Затем отбрасываются интервалы короче min_duration.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def evaluate(self, data: pd.DataFrame, rules: List[MonitoringRule], parameters: List[Any],
+                 rows: Optional[RowSelector] = None, numeric_matrix=None,
+                 families: Optional[SignalFamilyIndex] = None, virtual=None) -> RuleEvaluationReport:
+        """Нарушения всех правил в окне строк rows; virtual - реестр виртуальных каналов"""
+        started = time.perf_counter()
+        context = RuleEvaluationContext(data, parameters, rows, numeric_matrix, families, virtual)
+        context.share(rules)
+
+        violations, errors = [], {}
+        for rule in rules:
+            try:
+                violations.extend(self.evaluate_rule(rule, context))
+            except Exception as e:
+                errors[rule.name] = str(e)
+                self.logger.warning(f"Правило {rule.name} не вычислено: {e}")
+
+        report = RuleEvaluationReport(rules=list(rules), violations=violations, errors=errors,
+                                      elapsed_seconds=time.perf_counter() - started)
+        self.logger.info(f"Правила контроля: {len(rules)} правил, {len(violations)} нарушений "
+                         f"за {report.elapsed_seconds:.2f} с")
+        return report
+
+    def evaluate_rule(self, rule: MonitoringRule, context: RuleEvaluationContext) -> List[RuleViolation]:
+        """Интервалы нарушения одного правила по вагонам"""
+        context.begin_rule()
+        wagons, wagon_names = context.wagons_for(rule)
+        shape = (len(context), len(wagon_names))
+
+        if rule.hysteresis > 0:
+            enter = np.broadcast_to(context.evaluate(rule.root, wagons), shape)
+            stay = np.broadcast_to(context.hold_mask(rule.root, wagons, rule.hysteresis), shape)
+        else:
+            enter = stay = np.broadcast_to(context.evaluate(rule.root, wagons), shape)
+
+        columns, starts, ends = self.segments(enter, stay)
+        if not len(columns):
+            return []
+
+        timestamps = context.timestamps
+        last = len(timestamps) - 1
+        start_times = timestamps[starts]
+        end_times = timestamps[np.minimum(ends, last)]
+        durations = (end_times - start_times) / 1e9
+        keep = durations >= rule.min_duration
+        columns, start_times, end_times, durations, ends = \
+            columns[keep], start_times[keep], end_times[keep], durations[keep], ends[keep]
+
+        signal_columns = context.signal_columns(rule, wagons)
+        return [RuleViolation(
+            rule=rule.name,
+            wagon=wagons[column] if wagons else None,
+            wagon_name=wagon_names[column],
+            columns=signal_columns[column],
+            start=np.datetime64(int(start), 'ns'),
+            end=np.datetime64(int(end), 'ns'),
+            duration_seconds=float(duration),
+            open_at_end=bool(row_end > last)
+        ) for column, start, end, duration, row_end in zip(
+            columns.tolist(), start_times.tolist(), end_times.tolist(), durations.tolist(), ends.tolist())]
+
+    @staticmethod
+    def segments(enter: np.ndarray, stay: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Серии нарушений по маскам время x вагон: (вагон, первая строка, строка после серии)
+
+        Серия - отрезок подряд идущих строк stay, содержащий строку enter;
+        начинается с первой такой строки (enter должен входить в stay).
+        """
+        n_rows = stay.shape[0]
+        padded = np.zeros((stay.shape[1], n_rows + 2), dtype=bool)
+        padded[:, 1:-1] = stay.T
+        # Фронты по сквозной нумерации вагон x (строка + 1): по вагонам серии идут подряд
+        rises = np.flatnonzero(padded[:, 1:] & ~padded[:, :-1])
+        falls = np.flatnonzero(padded[:, :-1] & ~padded[:, 1:])
+        columns, starts = np.divmod(rises, n_rows + 1)
+        ends = falls % (n_rows + 1)
+        if enter is stay or not len(starts):
+            return columns, starts, ends
+
+        # Первая строка входа не раньше начала серии (сквозная нумерация вагон x строка)
+        entries = np.flatnonzero(enter.T)
+        keys = columns * n_rows + starts
+        found = np.searchsorted(entries, keys)
+        first = entries[np.minimum(found, len(entries) - 1)] if len(entries) else keys
+        keep = (found < len(entries)) & (first < columns * n_rows + ends)
+        return columns[keep], (first - columns * n_rows)[keep], ends[keep]
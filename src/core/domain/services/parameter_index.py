@@ -0,0 +1,115 @@
+"""
+Индекс параметров по измерениям фильтрации (тип сигнала, вагон, линия, компонент, оборудование)
+"""
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+# Измерения фильтрации в порядке ParameterFilteringService._apply_sequential_filters
+FILTER_DIMENSIONS = ('signal_types', 'wagons', 'lines', 'components', 'hardware')
+
+# Измерение без значимых значений не фильтрует (как и последовательные фильтры)
+_EMPTY_VALUE_SETS = ({None}, {''}, {'Unknown'})
+
+
+class ParameterBitsetIndex:
+    """Коды значений каждого измерения для набора параметров
+
+    Значения измерений извлекаются один раз при построении и хранятся как
+    массив целочисленных кодов. Выбор значений измерения - таблица
+    истинности по кодам, маска параметров - одна выборка по таблице,
+    а комбинация критериев - логическое И масок измерений.
+    """
+
+    def __init__(self, parameters: List[Any], extractors: Dict[str, Callable[[Any], Any]],
+                 problematic: Callable[[Any], bool]):
+        self.size = len(parameters)
+        self._source = parameters
+        self._first = parameters[0] if parameters else None
+        self._last = parameters[-1] if parameters else None
+
+        # Объектный массив: результат отбора - одна выборка и tolist()
+        self._items = np.empty(self.size, dtype=object)
+        for i, parameter in enumerate(parameters):
+            self._items[i] = parameter
+
+        self._codes: Dict[str, np.ndarray] = {}
+        self._values: Dict[str, Dict[Any, int]] = {}
+        for dimension, extract in extractors.items():
+            values: Dict[Any, int] = {}
+            codes = np.fromiter((values.setdefault(extract(p), len(values)) for p in parameters),
+                                dtype=np.int32, count=self.size)
+            self._codes[dimension] = codes
+            self._values[dimension] = values
+        self._inert = {dimension for dimension, values in self._values.items()
+                       if not values or set(values) in _EMPTY_VALUE_SETS}
+
+        self._problematic = np.fromiter((bool(problematic(p)) for p in parameters), dtype=bool, count=self.size)
+
+    def is_valid_for(self, parameters: List[Any]) -> bool:
+        """Индекс построен по этому же списку (без пересчета отпечатка)"""
+        return (parameters is self._source and len(parameters) == self.size
+                and (not parameters or (parameters[0] is self._first and parameters[-1] is self._last)))
+
+    @property
+    def nbytes(self) -> int:
+        return sum(codes.nbytes for codes in self._codes.values()) + self._problematic.nbytes + self._items.nbytes
+
+    def values(self, dimension: str) -> List[Any]:
+        """Значения измерения, встречающиеся в наборе"""
+        return list(self._values.get(dimension, {}))
+
+    # === ОТБОР ===
+
+    def dimension_mask(self, dimension: str, selected: Iterable[Any]) -> Optional[np.ndarray]:
+        """Маска параметров с любым из выбранных значений (None - измерение не фильтрует)"""
+        if dimension not in self._values or dimension in self._inert:
+            return None
+        return self.value_mask(dimension, selected)
+
+    def value_mask(self, dimension: str, selected: Iterable[Any]) -> np.ndarray:
+        """Маска параметров с любым из выбранных значений (без правила пропуска измерения)"""
+        values = self._values.get(dimension, {})
+        lookup = np.zeros(len(values) + 1, dtype=bool)
+        for value in set(selected):
+            code = values.get(value)
+            if code is not None:
+                lookup[code] = True
+        codes = self._codes.get(dimension)
+        return lookup[codes] if codes is not None else np.zeros(self.size, dtype=bool)
+
+    def problematic_values(self) -> np.ndarray:
+        """Признак проблемного параметра по позициям набора"""
+        return self._problematic
+
+    def problematic_mask(self, statuses: Iterable[str]) -> Optional[np.ndarray]:
+        statuses = set(statuses)
+        if not statuses or 'all' in statuses:
+            return None
+        mask = np.zeros(self.size, dtype=bool)
+        if 'problematic' in statuses:
+            mask |= self._problematic
+        if 'normal' in statuses:
+            mask |= ~self._problematic
+        return mask
+
+    def mask(self, criteria: Dict[str, Any]) -> np.ndarray:
+        """Маска параметров, удовлетворяющих всем непустым критериям"""
+        result = np.ones(self.size, dtype=bool)
+        for dimension in FILTER_DIMENSIONS:
+            selected = criteria.get(dimension)
+            if selected:
+                mask = self.dimension_mask(dimension, selected)
+                if mask is not None:
+                    result &= mask
+
+        statuses = criteria.get('problematic')
+        if statuses:
+            mask = self.problematic_mask(statuses)
+            if mask is not None:
+                result &= mask
+        return result
+
+    def select(self, criteria: Dict[str, Any]) -> List[Any]:
+        """Параметры, удовлетворяющие критериям, в исходном порядке"""
+        return self._items[self.mask(criteria)].tolist()
@@ -0,0 +1,338 @@
+"""
+Поисковый индекс параметров по n-граммам (код сигнала, описание, линия)
+"""
+import logging
+import re
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+# Поля поиска и их вес в ранжировании (совпадение в коде сигнала важнее описания)
+DEFAULT_SEARCH_FIELDS = ('signal_code', 'description', 'line')
+FIELD_WEIGHTS = {'signal_code': 1.0, 'description': 0.6, 'line': 0.4}
+
+# Качество совпадения токена запроса с полем
+MATCH_EXACT = 100
+MATCH_PREFIX = 80
+MATCH_WORD_PREFIX = 60
+MATCH_SUBSTRING = 40
+
+NGRAM_SIZE = 3
+
+_WORD_SEPARATORS = frozenset(' _-./:,;()[]')
+_WORD_START = re.compile(r'[ _\-./:,;()\[\]](?=.)')
+_WILDCARDS = re.compile(r'[*?+]')
+_MAX_CHAR = '\U0010ffff'
+
+
+def normalize_search_text(text: Any) -> str:
+    """Нормализация для поиска без учета регистра (в т.ч. кириллицы, ё = е)"""
+    return str(text).casefold().replace('ё', 'е') if text is not None else ''
+
+
+def query_tokens(query: str) -> List[str]:
+    """Токены запроса: слова через пробел, каждое ищется как подстрока"""
+    return list(dict.fromkeys(normalize_search_text(query).split()))
+
+
+def has_wildcards(query: str) -> bool:
+    """Запрос с шаблонами (*, ?, +) ищется регулярным выражением, а не по индексу"""
+    return bool(_WILDCARDS.search(query or ''))
+
+
+def match_quality(token: str, text: str) -> int:
+    """Качество вхождения токена в текст поля (0 - не входит)"""
+    position = text.find(token)
+    if position < 0:
+        return 0
+    if position == 0:
+        return MATCH_EXACT if len(text) == len(token) else MATCH_PREFIX
+    while position > 0:
+        if text[position - 1] in _WORD_SEPARATORS:
+            return MATCH_WORD_PREFIX
+        position = text.find(token, position + 1)
+    return MATCH_SUBSTRING
+
+
+def _word_starts(text: str) -> List[int]:
+    """Позиции начала слов: начало текста и символы после разделителей"""
+    return [0] + [match.end() for match in _WORD_START.finditer(text)] if text else []
+
+
+class ParameterSearchIndex:
+    """Индекс триграмм и префиксов слов по нормализованным полям параметров
+
+    Кандидаты для токена запроса - пересечение списков документов его
+    триграмм (списки - отсортированные массивы numpy), после чего точное
+    вхождение подстроки проверяется только у кандидатов; токены короче
+    триграммы проверяются перебором готовых нормализованных строк.
+
+    Качество совпадения определяется без просмотра строк: для каждого поля
+    хранится отсортированная таблица окончаний текста, начинающихся с
+    начала слова, и совпадения-префиксы (точное, префикс поля, начало
+    слова) - это диапазон таблицы, найденный двоичным поиском. Оценки
+    и порядок результатов считаются векторно.
+
+    update() сопоставляет параметры по ключу (full_column): неизменные
+    документы сохраняются, новые и измененные индексируются дополнительно,
+    удаленные помечаются, таблицы префиксов пересобираются при следующем поиске.
+    """
+
+    def __init__(self, fields: Sequence[str] = DEFAULT_SEARCH_FIELDS,
+                 key: Optional[Callable[[Any], Any]] = None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.fields = tuple(fields)
+        self._weights = np.array([FIELD_WEIGHTS.get(f, 0.3) for f in self.fields])
+        self._key = key or self._default_key
+        self._reset()
+
+    def _reset(self):
+        self._items: List[Any] = []
+        self._texts: List[Tuple[str, ...]] = []
+        self._joined: List[str] = []
+        self._alive = np.zeros(0, dtype=bool)
+        self._positions = np.zeros(0, dtype=np.int64)
+        self._lengths = np.zeros((0, len(self.fields)), dtype=np.int64)
+        self._documents: Dict[Any, int] = {}
+        self._postings: Dict[str, List[int]] = {}
+        self._posting_arrays: Dict[str, np.ndarray] = {}
+        self._prefix_tables: List[Tuple[List[str], np.ndarray, np.ndarray]] = [
+            ([], np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool)) for _ in self.fields]
+        self._alive_count = 0
+        self._source: Optional[List[Any]] = None
+        self._source_length = -1
+
+    def __len__(self) -> int:
+        return self._alive_count
+
+    # === ПОСТРОЕНИЕ ===
+
+    @staticmethod
+    def _field(parameter: Any, name: str) -> Any:
+        if isinstance(parameter, dict):
+            return parameter.get(name)
+        return getattr(parameter, name, None)
+
+    @classmethod
+    def _default_key(cls, parameter: Any) -> Any:
+        return cls._field(parameter, 'full_column') or cls._field(parameter, 'signal_code') or id(parameter)
+
+    def is_current(self, parameters: List[Any]) -> bool:
+        """Индекс построен по этому же списку в его текущем размере"""
+        return parameters is self._source and len(parameters) == self._source_length
+
+    def build(self, parameters: Iterable[Any]) -> 'ParameterSearchIndex':
+        """Полное построение индекса"""
+        self._reset()
+        return self.update(parameters)
+
+    def update(self, parameters: Iterable[Any]) -> 'ParameterSearchIndex':
+        """Приведение индекса к новому набору параметров без полного перестроения"""
+        source = parameters if isinstance(parameters, list) else list(parameters)
+        seen: Dict[Any, int] = {}
+        keys: Dict[Any, int] = {}
+        positions: Dict[int, int] = {}
+        added: List[Tuple[Any, Any, Tuple[str, ...], int]] = []
+
+        for position, parameter in enumerate(source):
+            key = self._key(parameter)
+            occurrence = seen.get(key, 0)
+            seen[key] = occurrence + 1
+            key = (key, occurrence)
+
+            texts = tuple(normalize_search_text(self._field(parameter, f)) for f in self.fields)
+            doc = self._documents.get(key)
+            if doc is not None and self._texts[doc] == texts:
+                self._items[doc] = parameter
+                positions[doc] = position
+                keys[key] = doc
+            else:
+                added.append((key, parameter, texts, position))
+
+        removed = [doc for key, doc in self._documents.items() if keys.get(key) != doc]
+        # Удаленные документы только помечаются - при их преобладании индекс перестраивается
+        if self._documents and len(removed) + len(self._alive) - self._alive_count > max(len(keys), 1024):
+            return self.build(source)
+
+        for doc in removed:
+            self._alive[doc] = False
+            self._items[doc] = None
+        self._documents = keys
+        self._append(added)
+
+        if positions:
+            docs = np.fromiter(positions.keys(), dtype=np.int64, count=len(positions))
+            self._positions[docs] = np.fromiter(positions.values(), dtype=np.int64, count=len(positions))
+        self._alive_count = int(self._alive.sum())
+        self._source, self._source_length = source, len(source)
+
+        if added or removed:
+            self.logger.debug(f"Поисковый индекс: +{len(added)} -{len(removed)}, всего {self._alive_count}")
+        return self
+
+    def _append(self, added: List[Tuple[Any, Any, Tuple[str, ...], int]]):
+        if not added:
+            return
+        first = len(self._items)
+        postings = self._postings
+        for offset, (key, parameter, texts, _) in enumerate(added):
+            doc = first + offset
+            self._documents[key] = doc
+            self._items.append(parameter)
+            self._texts.append(texts)
+            # '\n' не входит в нормализованный токен - вхождение не пересекает границу полей,
+            # а триграммы через '\n' никогда не запрашиваются
+            joined = '\n'.join(texts)
+            self._joined.append(joined)
+
+            for gram in {joined[i:i + NGRAM_SIZE] for i in range(len(joined) - NGRAM_SIZE + 1)}:
+                posting = postings.get(gram)
+                if posting is None:
+                    postings[gram] = [doc]
+                else:
+                    posting.append(doc)
+
+        # Массивы списков, в которые добавлены документы, строятся заново при обращении
+        if self._posting_arrays:
+            self._posting_arrays = {gram: array for gram, array in self._posting_arrays.items()
+                                    if len(array) == len(postings[gram])}
+        self._alive = np.concatenate([self._alive, np.ones(len(added), dtype=bool)])
+        self._positions = np.concatenate([self._positions, np.array([a[3] for a in added], dtype=np.int64)])
+        self._lengths = np.concatenate([self._lengths, np.array([[len(text) for text in a[2]] for a in added],
+                                                                dtype=np.int64)])
+        for f in range(len(self.fields)):
+            self._extend_prefix_table(f, first)
+
+    def _posting(self, gram: str) -> Optional[np.ndarray]:
+        """Документы с триграммой (массив по возрастанию, строится при первом обращении)"""
+        array = self._posting_arrays.get(gram)
+        if array is None:
+            posting = self._postings.get(gram)
+            if posting is None:
+                return None
+            array = self._posting_arrays[gram] = np.array(posting, dtype=np.int64)
+        return array
+
+    def _extend_prefix_table(self, field_index: int, first: int):
+        """Добавление в таблицу префиксов поля окончаний документов с номерами от first
+
+        Таблица - отсортированные окончания текста поля от начал слов, номер
+        документа и признак окончания, совпадающего со всем текстом. Строки
+        удаленных документов остаются в таблице и отсеиваются при поиске.
+        """
+        suffixes, docs, whole = self._prefix_tables[field_index]
+        new_suffixes, new_docs, new_whole = [], [], []
+        for doc in range(first, len(self._texts)):
+            text = self._texts[doc][field_index]
+            for start in _word_starts(text):
+                new_suffixes.append(text[start:])
+                new_docs.append(doc)
+                new_whole.append(start == 0)
+
+        # Старая часть уже отсортирована - сортировка слиянием двух серий почти линейна
+        suffixes = suffixes + new_suffixes
+        order = sorted(range(len(suffixes)), key=suffixes.__getitem__)
+        self._prefix_tables[field_index] = (
+            [suffixes[i] for i in order],
+            np.concatenate([docs, np.array(new_docs, dtype=np.int64)])[order],
+            np.concatenate([whole, np.array(new_whole, dtype=bool)])[order]
+        )
+
+    # === ПОИСК ===
+
+    def _substring_documents(self, token: str) -> np.ndarray:
+        """Документы, в одном из полей которых есть подстрока token"""
+        joined = self._joined
+        if len(token) < NGRAM_SIZE:
+            candidates = np.flatnonzero(self._alive)
+        else:
+            postings = [self._posting(token[i:i + NGRAM_SIZE]) for i in range(len(token) - NGRAM_SIZE + 1)]
+            if any(p is None for p in postings):
+                return np.zeros(0, dtype=np.int64)
+            postings.sort(key=len)
+            candidates = postings[0]
+            for posting in postings[1:]:
+                if not len(candidates):
+                    break
+                candidates = np.intersect1d(candidates, posting, assume_unique=True)
+            candidates = candidates[self._alive[candidates]]
+            if len(token) == NGRAM_SIZE:
+                return candidates
+        return np.array([doc for doc in candidates.tolist() if token in joined[doc]], dtype=np.int64)
+
+    def _token_quality(self, token: str, documents: np.ndarray) -> np.ndarray:
+        """Взвешенное качество совпадения токена для документов (лучшее по полям)"""
+        rows = np.full(len(self._items), -1, dtype=np.int64)
+        rows[documents] = np.arange(len(documents))
+        quality = np.zeros((len(documents), len(self.fields)))
+
+        for f in range(len(self.fields)):
+            suffixes, docs, whole = self._prefix_tables[f]
+            lo = bisect_left(suffixes, token)
+            hi = bisect_left(suffixes, token + _MAX_CHAR, lo)
+            docs, whole = docs[lo:hi], whole[lo:hi]
+            docs_rows = rows[docs]
+            hit = docs_rows >= 0
+            docs_rows, docs, whole = docs_rows[hit], docs[hit], whole[hit]
+
+            levels = np.where(whole, MATCH_PREFIX, MATCH_WORD_PREFIX)
+            levels[whole & (self._lengths[docs, f] == len(token))] = MATCH_EXACT
+            np.maximum.at(quality[:, f], docs_rows, levels)
+
+        # Совпадения не с начала слова: подстрока в поле, не найденная таблицей префиксов
+        for row in np.flatnonzero(quality.max(axis=1) == 0).tolist():
+            texts = self._texts[documents[row]]
+            quality[row] = [MATCH_SUBSTRING if token in text else 0 for text in texts]
+
+        return (quality * self._weights).max(axis=1)
+
+    def _matching_documents(self, tokens: List[str]) -> np.ndarray:
+        """Документы, содержащие все токены"""
+        # Сначала самые длинные (обычно самые избирательные) токены
+        tokens = sorted(tokens, key=len, reverse=True)
+        documents = self._substring_documents(tokens[0])
+        joined = self._joined
+        for token in tokens[1:]:
+            if not len(documents):
+                break
+            documents = np.array([doc for doc in documents.tolist() if token in joined[doc]], dtype=np.int64)
+        return documents
+
+    def ranked(self, query: str, limit: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Документы, содержащие все токены запроса, и их оценки в порядке ранжирования"""
+        tokens = query_tokens(query)
+        if not tokens or not self._alive_count:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+        documents = self._matching_documents(tokens)
+        scores = np.zeros(len(documents))
+        for token in tokens:
+            if len(documents):
+                scores += self._token_quality(token, documents)
+
+        order = np.lexsort((self._positions[documents], self._lengths[documents, 0], -scores))
+        if limit:
+            order = order[:limit]
+        return documents[order], scores[order]
+
+    def positions(self, query: str) -> np.ndarray:
+        """Позиции найденных параметров в списке последнего update() (без ранжирования)"""
+        tokens = query_tokens(query)
+        if not tokens or not self._alive_count:
+            return np.zeros(0, dtype=np.int64)
+        return np.sort(self._positions[self._matching_documents(tokens)])
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Any]:
+        """Параметры, содержащие все токены запроса, по убыванию качества совпадения"""
+        documents, _ = self.ranked(query, limit)
+        items = self._items
+        return [items[doc] for doc in documents.tolist()]
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            'documents': self._alive_count,
+            'removed_documents': len(self._alive) - self._alive_count,
+            'ngrams': len(self._postings),
+            'postings': sum(len(p) for p in self._postings.values())
+        }
@@ -0,0 +1,294 @@
+"""
+Префиксный индекс статистик столбцов для мгновенного анализа произвольных окон
+"""
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+# Относительная точность решений по индексу; спорные столбцы пересчитываются точно
+DECISION_TOLERANCE = 1e-6
+
+
+@dataclass
+class WindowStatistics:
+    """Статистика окна [lo, hi) по столбцам индекса (массивы выровнены по positions)"""
+    positions: np.ndarray
+    count: int
+    mean: np.ndarray
+    variance: np.ndarray
+    change_count: np.ndarray
+    reliable: np.ndarray
+    mean_reliable: np.ndarray
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(np.maximum(self.variance, 0.0))
+
+    @property
+    def coefficient_of_variation(self) -> np.ndarray:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self.std / np.abs(self.mean)
+
+
+class RangeStatisticsIndex:
+    """Блочные префиксные суммы count/sum/sum of squares/число переключений
+
+    Для каждого столбца без пропусков хранятся накопленные суммы на границах
+    блоков по block_size строк. Статистика окна собирается из разности префиксов
+    и досчета не более двух неполных блоков по краям, поэтому стоимость запроса
+    не зависит от длины окна. Значения сдвигаются на первое значение столбца,
+    чтобы уменьшить потерю точности в sum of squares.
+
+    source - числовые столбцы записи с атрибутом shape и методом
+    block(positions, rows) (NumericMatrix или FrameColumns). Префиксы строятся
+    группами по column_chunk_size столбцов, поэтому вся запись одновременно
+    в памяти не нужна; по source затем читаются только неполные блоки на краях окна.
+    """
+
+    def __init__(self, source, block_size: int = 256, column_chunk_size: int = 256):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.block_size = block_size
+        self._source = source
+
+        n_rows, n_columns = source.shape
+        self.row_count = n_rows
+
+        # Индексируются только столбцы без пропусков
+        self.indexed = np.zeros(n_columns, dtype=bool)
+        self._reference = np.zeros(n_columns)
+
+        n_blocks = n_rows // block_size
+        self._sum = np.zeros((n_blocks + 1, n_columns))
+        self._sum_sq = np.zeros((n_blocks + 1, n_columns))
+        self._changes = np.zeros((n_blocks + 1, n_columns), dtype=np.int64)
+
+        if n_rows:
+            for start in range(0, n_columns, max(1, column_chunk_size)):
+                self._build_chunk(np.arange(start, min(start + column_chunk_size, n_columns)), n_blocks)
+
+    def _build_chunk(self, chunk: np.ndarray, n_blocks: int):
+        """Опорные значения и суммы по полным блокам для группы столбцов"""
+        values = self._source.block(chunk, slice(0, self.row_count))
+        complete = ~np.isnan(values).any(axis=0)
+        self.indexed[chunk] = complete
+        if not complete.any():
+            return
+        if not complete.all():
+            chunk, values = chunk[complete], values[:, complete]
+        self._reference[chunk] = values[0]
+        if not n_blocks:
+            return
+
+        size = n_blocks * self.block_size
+        shifted = values[:size] - values[0]
+        blocks = shifted.reshape(n_blocks, self.block_size, len(chunk))
+        self._sum[1:, chunk] = np.cumsum(blocks.sum(axis=1), axis=0)
+        self._sum_sq[1:, chunk] = np.cumsum((blocks * blocks).sum(axis=1), axis=0)
+        del shifted, blocks
+
+        # Переключение в строке i: значение отличается от строки i-1
+        switched = np.zeros((size, len(chunk)), dtype=bool)
+        switched[1:] = values[1:size] != values[:size - 1]
+        self._changes[1:, chunk] = np.cumsum(
+            switched.reshape(n_blocks, self.block_size, len(chunk)).sum(axis=1), axis=0)
+
+    @property
+    def nbytes(self) -> int:
+        return self._sum.nbytes + self._sum_sq.nbytes + self._changes.nbytes
+
+    # === ЗАПРОСЫ ===
+
+    def query(self, lo: int, hi: int, positions: np.ndarray) -> Optional[WindowStatistics]:
+        """Статистика окна строк [lo, hi) для индексируемых столбцов positions"""
+        lo, hi = max(0, lo), min(self.row_count, hi)
+        if hi <= lo:
+            return None
+
+        positions = np.asarray(positions)
+        reference = self._reference[positions]
+
+        total, total_sq, bound = self.range_sums(lo, hi, positions, reference)
+        changes = self.range_changes(lo + 1, hi, positions)
+
+        # Накопление вдоль блоков последовательное, поэтому ошибка растет с номером блока
+        growth = hi // self.block_size + 2 * int(np.log2(self.block_size)) + 8
+        return self.window_statistics(lo, hi, positions, total, total_sq, bound, changes, growth)
+
+    def window_statistics(self, lo: int, hi: int, positions: np.ndarray, total: np.ndarray,
+                          total_sq: np.ndarray, bound: np.ndarray, changes: np.ndarray,
+                          growth: float) -> WindowStatistics:
+        """Статистика окна по сдвинутым суммам с оценкой ошибки округления
+
+        growth - множитель машинного эпсилона для накопленной ошибки сумм,
+        |sum| оценивается через sqrt(n * sum of squares).
+        """
+        count = hi - lo
+        reference = self._reference[positions]
+        mean = reference + total / count
+
+        eps = np.finfo(np.float64).eps * growth
+        with np.errstate(divide='ignore', invalid='ignore'):
+            variance = (total_sq - total * total / count) / (count - 1) if count > 1 \
+                else np.full(len(positions), np.nan)
+            variance_error = eps * bound / max(count - 1, 1)
+            reliable = variance_error <= DECISION_TOLERANCE * np.maximum(variance, 0.0)
+            mean_error = eps * (np.sqrt(bound * hi) / count + np.abs(reference))
+            mean_reliable = mean_error * (1 + 1 / DECISION_TOLERANCE) < np.abs(mean)
+
+        # Без переключений разброс равен нулю точно
+        constant = changes == 0
+        variance = np.where(constant, 0.0, variance)
+        reliable = reliable | constant
+
+        return WindowStatistics(positions=positions, count=count, mean=mean, variance=variance,
+                                change_count=changes, reliable=reliable, mean_reliable=mean_reliable)
+
+    def range_sums(self, lo: int, hi: int, positions: np.ndarray, reference: np.ndarray):
+        """Суммы сдвинутых значений и их квадратов по строкам [lo, hi)"""
+        first_block = -(-lo // self.block_size)
+        last_block = min(hi // self.block_size, len(self._sum) - 1)
+
+        if first_block >= last_block:
+            total, total_sq = self.scan_sums(lo, hi, positions, reference)
+            return total, total_sq, total_sq.copy()
+
+        total = self._sum[last_block, positions] - self._sum[first_block, positions]
+        total_sq = self._sum_sq[last_block, positions] - self._sum_sq[first_block, positions]
+        bound = self._sum_sq[last_block, positions]
+
+        for a, b in ((lo, first_block * self.block_size), (last_block * self.block_size, hi)):
+            if b > a:
+                part, part_sq = self.scan_sums(a, b, positions, reference)
+                total += part
+                total_sq += part_sq
+                bound = bound + part_sq
+
+        return total, total_sq, bound
+
+    def scan_sums(self, a: int, b: int, positions: np.ndarray, reference: np.ndarray):
+        shifted = self._source.block(positions, slice(a, b)) - reference
+        return shifted.sum(axis=0), (shifted * shifted).sum(axis=0)
+
+    def range_changes(self, a: int, b: int, positions: np.ndarray) -> np.ndarray:
+        """Число строк i в [a, b), где значение отличается от строки i-1"""
+        if b <= a:
+            return np.zeros(len(positions), dtype=np.int64)
+
+        first_block = -(-a // self.block_size)
+        last_block = min(b // self.block_size, len(self._changes) - 1)
+
+        if first_block >= last_block:
+            return self.scan_changes(a, b, positions)
+
+        changes = self._changes[last_block, positions] - self._changes[first_block, positions]
+        for start, stop in ((a, first_block * self.block_size), (last_block * self.block_size, b)):
+            if stop > start:
+                changes = changes + self.scan_changes(start, stop, positions)
+        return changes
+
+    def scan_changes(self, a: int, b: int, positions: np.ndarray) -> np.ndarray:
+        """Число переключений в строках [a, b) прямым сравнением соседних строк (a >= 1)"""
+        window = self._source.block(positions, slice(a - 1, b))
+        return np.count_nonzero(window[1:] != window[:-1], axis=0)
+
+
+class SlidingWindowAccumulator:
+    """Суммы текущего окна по всем индексируемым столбцам, сдвигаемые на разность окон
+
+    При небольшом сдвиге окна из сумм вычитается ушедший срез строк и
+    добавляется вошедший, поэтому стоимость пропорциональна сдвигу, а не
+    ширине окна. При большом сдвиге или после max_slides сдвигов (чтобы
+    ограничить накопление ошибки округления) суммы берутся из префиксного индекса.
+    """
+
+    def __init__(self, index: RangeStatisticsIndex, max_slides: int = 64):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.index = index
+        self.max_slides = max_slides
+
+        self.positions = np.flatnonzero(index.indexed)
+        self._slots = np.full(len(index.indexed), -1, dtype=np.intp)
+        self._slots[self.positions] = np.arange(len(self.positions))
+        self._reference = index._reference[self.positions]
+
+        self._window: Optional[tuple] = None
+        self._total = self._total_sq = self._bound = self._changes = None
+        self._growth = 0.0
+        self._slides = 0
+        self.stats = {'slides': 0, 'rebuilds': 0, 'rows_scanned': 0}
+
+    def statistics(self, lo: int, hi: int, positions: np.ndarray) -> Optional[WindowStatistics]:
+        """Статистика окна [lo, hi) для индексируемых столбцов positions"""
+        lo, hi = max(0, lo), min(self.index.row_count, hi)
+        if hi <= lo or not len(self.positions):
+            return None
+
+        if not self._try_slide(lo, hi):
+            self._rebuild(lo, hi)
+
+        slots = self._slots[np.asarray(positions)]
+        return self.index.window_statistics(
+            lo, hi, np.asarray(positions), self._total[slots], self._total_sq[slots],
+            self._bound[slots], self._changes[slots], self._growth)
+
+    def reset(self):
+        self._window = None
+
+    # === СДВИГ ОКНА ===
+
+    def _try_slide(self, lo: int, hi: int) -> bool:
+        if self._window is None or self._slides >= self.max_slides:
+            return False
+
+        old_lo, old_hi = self._window
+        if (old_lo, old_hi) == (lo, hi):
+            return True
+
+        delta = abs(lo - old_lo) + abs(hi - old_hi)
+        # Сдвиг дороже запроса к префиксному индексу (два неполных блока) - пересчитываем
+        if lo >= old_hi or hi <= old_lo or delta > 2 * self.index.block_size:
+            return False
+
+        self._move_start(old_lo, lo)
+        self._move_end(old_hi, hi)
+
+        self._window = (lo, hi)
+        self._slides += 1
+        self._growth += 2 * int(np.log2(self.index.block_size)) + 4
+        self.stats['slides'] += 1
+        self.stats['rows_scanned'] += delta
+        return True
+
+    def _move_start(self, old_lo: int, lo: int):
+        """Сдвиг начала окна: строки [old_lo, lo) уходят или [lo, old_lo) входят"""
+        if lo == old_lo:
+            return
+        a, b, sign = (old_lo, lo, -1) if lo > old_lo else (lo, old_lo, 1)
+        self._apply_rows(a, b, sign)
+        # Переключение строки i учитывается, если i и i-1 в окне: затронуты строки [a+1, b+1)
+        self._changes += sign * self.index.scan_changes(a + 1, b + 1, self.positions)
+
+    def _move_end(self, old_hi: int, hi: int):
+        """Сдвиг конца окна: строки [old_hi, hi) входят или [hi, old_hi) уходят"""
+        if hi == old_hi:
+            return
+        a, b, sign = (old_hi, hi, 1) if hi > old_hi else (hi, old_hi, -1)
+        self._apply_rows(a, b, sign)
+        self._changes += sign * self.index.scan_changes(a, b, self.positions)
+
+    def _apply_rows(self, a: int, b: int, sign: int):
+        part, part_sq = self.index.scan_sums(a, b, self.positions, self._reference)
+        self._total += sign * part
+        self._total_sq += sign * part_sq
+        # Граница ошибки растет и при вычитании
+        self._bound += part_sq
+
+    def _rebuild(self, lo: int, hi: int):
+        self._total, self._total_sq, self._bound = self.index.range_sums(lo, hi, self.positions, self._reference)
+        self._changes = self.index.range_changes(lo + 1, hi, self.positions)
+        self._growth = hi // self.index.block_size + 2 * int(np.log2(self.index.block_size)) + 8
+        self._window = (lo, hi)
+        self._slides = 0
+        self.stats['rebuilds'] += 1
@@ -0,0 +1,253 @@
+"""
+Сравнение поведения сигналов двух записей одного состава (до и после ремонта)
+"""
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .change_analysis_engine import ChangeAnalysisEngine, ColumnChangeStatistics
+
+# Веса составляющих итоговой оценки различия
+SCORE_WEIGHTS = {
+    'level_shift': 0.35,
+    'spread_change': 0.25,
+    'switching_change': 0.3,
+    'availability_change': 0.1
+}
+
+_LENGTH_MULTIPLIER = np.uint64(0x94D049BB133111EB)
+_HASH_SEED = 0x5EED
+
+
+@dataclass
+class RecordingDiff:
+    """Результат сравнения записей
+
+    signals - сигналы, присутствующие в обеих записях, по убыванию оценки
+    различия score (0 - поведение совпадает, ближе к 1 - сильно отличается).
+    """
+    signals: pd.DataFrame
+    only_before: List[str] = field(default_factory=list)
+    only_after: List[str] = field(default_factory=list)
+    identical_count: int = 0
+    elapsed_seconds: float = 0.0
+
+    def __len__(self) -> int:
+        return len(self.signals)
+
+    def ranked(self, min_score: float = 0.0, top_n: Optional[int] = None) -> pd.DataFrame:
+        """Различающиеся сигналы с оценкой выше min_score"""
+        ranked = self.signals[~self.signals['identical'] & (self.signals['score'] > min_score)]
+        return ranked.head(top_n) if top_n else ranked
+
+    def as_records(self, min_score: float = 0.0, top_n: Optional[int] = None) -> List[Dict[str, Any]]:
+        return self.ranked(min_score, top_n).to_dict('records')
+
+    def get_summary(self) -> Dict[str, Any]:
+        return {
+            'aligned_signals': len(self.signals),
+            'identical_signals': self.identical_count,
+            'different_signals': int((~self.signals['identical'] & (self.signals['score'] > 0)).sum()),
+            'only_before': len(self.only_before),
+            'only_after': len(self.only_after),
+            'elapsed_seconds': round(self.elapsed_seconds, 3)
+        }
+
+
+class RecordingDiffEngine:
+    """Сравнение сигналов двух записей
+
+    Сигналы сопоставляются по (signal_code, вагон). Совпадающие по
+    содержимому столбцы отсеиваются по 64-битным хэшам, посчитанным
+    матрично блоками столбцов, без поэлементного сравнения. Для остальных
+    статистика обеих записей считается векторно движком изменяемости, а
+    различия уровня, разброса, частоты переключений и доли пропусков
+    сводятся в оценку для ранжирования.
+    """
+
+    def __init__(self, column_chunk_size: int = 64):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.column_chunk_size = column_chunk_size
+        # Собственный движок без кэша матрицы: расчет по чужой записи не
+        # сбрасывает матрицу и индексы текущей записи в общем движке
+        self.change_engine = ChangeAnalysisEngine(matrix_budget_mb=0)
+
+    # === СОПОСТАВЛЕНИЕ ===
+
+    @staticmethod
+    def _field(parameter: Any, name: str, default: Any = None) -> Any:
+        """Поле параметра (объект Parameter или словарь)"""
+        if isinstance(parameter, dict):
+            return parameter.get(name, default)
+        return getattr(parameter, name, default)
+
+    @classmethod
+    def signal_key(cls, parameter: Any) -> Tuple[str, str]:
+        """Ключ сопоставления сигнала: код сигнала и номер вагона"""
+        return str(cls._field(parameter, 'signal_code', '')), str(cls._field(parameter, 'wagon') or '')
+
+    def align(self, before_parameters: List[Any], after_parameters: List[Any],
+              before_columns, after_columns) -> Tuple[List[Tuple[Tuple[str, str], str, str]], List[str], List[str]]:
+        """Пары (ключ, столбец до, столбец после) и столбцы, присутствующие только в одной записи"""
+        def index(parameters, columns):
+            mapping = {}
+            for parameter in parameters:
+                if self._field(parameter, 'is_problematic', False):
+                    continue
+                column = self._field(parameter, 'full_column')
+                if column in columns and column != 'timestamp':
+                    mapping.setdefault(self.signal_key(parameter), column)
+            return mapping
+
+        before = index(before_parameters, set(before_columns))
+        after = index(after_parameters, set(after_columns))
+
+        pairs = [(key, column, after[key]) for key, column in before.items() if key in after]
+        only_before = [column for key, column in before.items() if key not in after]
+        only_after = [column for key, column in after.items() if key not in before]
+        return pairs, only_before, only_after
+
+    # === ХЭШИ СОДЕРЖИМОГО ===
+
+    @staticmethod
+    def row_weights(n_rows: int) -> np.ndarray:
+        """Нечетные случайные веса строк (одинаковые для обеих записей благодаря общему зерну)"""
+        rng = np.random.default_rng(_HASH_SEED)
+        return rng.integers(0, np.iinfo(np.uint64).max, size=n_rows, dtype=np.uint64, endpoint=True) | np.uint64(1)
+
+    def content_hashes(self, data: pd.DataFrame, columns: List[str], weights: np.ndarray) -> np.ndarray:
+        """64-битный хэш содержимого каждого столбца (с учетом порядка и числа строк)
+
+        Числа хэшируются по битам float64 (пропуски и -0.0 нормализуются),
+        поэтому целый и вещественный столбцы с одинаковыми значениями совпадают.
+        """
+        n_rows = len(data)
+        row_weights = weights[:n_rows]
+        hashes = np.zeros(len(columns), dtype=np.uint64)
+        numeric = [i for i, c in enumerate(columns) if data[c].dtype.kind in 'biuf']
+        numeric_set = set(numeric)
+
+        with np.errstate(over='ignore'):
+            for chunk_start in range(0, len(numeric), self.column_chunk_size):
+                chunk = numeric[chunk_start:chunk_start + self.column_chunk_size]
+                block = data[[columns[i] for i in chunk]].to_numpy(dtype=np.float64, na_value=np.nan, copy=True)
+                block += 0.0
+                block[np.isnan(block)] = np.nan
+                hashes[chunk] = self._weighted_hash(block.view(np.uint64), row_weights)
+
+            for i, column in enumerate(columns):
+                if i in numeric_set:
+                    continue
+                bits = pd.util.hash_pandas_object(data[column].astype(str), index=False).to_numpy(np.uint64)
+                hashes[i] = self._weighted_hash(bits[:, None], row_weights)[0]
+
+            hashes ^= np.uint64(n_rows) * _LENGTH_MULTIPLIER
+        return hashes
+
+    @staticmethod
+    def _weighted_hash(bits: np.ndarray, row_weights: np.ndarray) -> np.ndarray:
+        """Взвешенная сумма битов значений по строкам (по модулю 2^64)
+
+        Для различающихся столбцов совпадение сумм при случайных нечетных
+        весах практически исключено, а расчет - одно умножение и одна редукция.
+        """
+        return (bits * row_weights[:, None]).sum(axis=0, dtype=np.uint64)
+
+    # === СРАВНЕНИЕ ===
+
+    def diff(self, before_data: pd.DataFrame, before_parameters: List[Any],
+             after_data: pd.DataFrame, after_parameters: List[Any]) -> RecordingDiff:
+        """Сравнение двух записей: ранжированный список сигналов с изменившимся поведением"""
+        start_time = time.time()
+        pairs, only_before, only_after = self.align(before_parameters, after_parameters,
+                                                    before_data.columns, after_data.columns)
+        before_columns = [b for _, b, _ in pairs]
+        after_columns = [a for _, _, a in pairs]
+
+        weights = self.row_weights(max(len(before_data), len(after_data)))
+        identical = self.content_hashes(before_data, before_columns, weights) == \
+            self.content_hashes(after_data, after_columns, weights)
+
+        changed = np.flatnonzero(~identical)
+        # Уникальные значения для сравнения не нужны - сортировка пропускается
+        before_stats = self.change_engine.compute(before_data, [before_columns[i] for i in changed],
+                                                  count_unique=False)
+        after_stats = self.change_engine.compute(after_data, [after_columns[i] for i in changed],
+                                                 count_unique=False)
+        components = self.compare_statistics(before_stats, after_stats)
+
+        # Совпадающие по содержимому сигналы получают нулевые различия без расчета статистики
+        columns = {name: np.zeros(len(pairs)) for name in ('score', *SCORE_WEIGHTS)}
+        columns.update({name: np.full(len(pairs), np.nan)
+                        for name in ('mean_before', 'mean_after', 'std_before', 'std_after')})
+        columns.update({name: np.zeros(len(pairs), dtype=np.int64) for name in ('changes_before', 'changes_after')})
+        for name, values in components.items():
+            columns[name][changed] = values
+
+        signals = pd.DataFrame({
+            'signal_code': [key[0] for key, _, _ in pairs],
+            'wagon': [key[1] for key, _, _ in pairs],
+            'column_before': before_columns,
+            'column_after': after_columns,
+            'identical': identical,
+            **columns
+        })
+        signals = signals.sort_values('score', ascending=False, kind='stable', ignore_index=True)
+        result = RecordingDiff(signals=signals, only_before=only_before, only_after=only_after,
+                               identical_count=int(identical.sum()),
+                               elapsed_seconds=time.time() - start_time)
+
+        self.logger.info(f"Сравнение записей: {len(pairs)} сигналов, {result.identical_count} совпадают, "
+                         f"{len(only_before)}/{len(only_after)} только в одной записи, "
+                         f"{result.elapsed_seconds:.2f}с")
+        return result
+
+    @staticmethod
+    def compare_statistics(before: ColumnChangeStatistics, after: ColumnChangeStatistics) -> Dict[str, np.ndarray]:
+        """Составляющие различия (каждая в [0, 1]) и итоговая оценка по выровненной статистике"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Сдвиг уровня в единицах разброса (для постоянных сигналов - любой сдвиг значим)
+            scale = np.fmax(before.std, after.std)
+            shift = np.abs(after.mean - before.mean) / scale
+            shift = np.where(scale > 0, shift, np.where(after.mean != before.mean, np.inf, 0.0))
+            level_shift = np.where(np.isinf(shift), 1.0, shift / (1.0 + shift))
+
+            spread = np.abs(after.std - before.std) / scale
+            spread_change = np.where(scale > 0, spread, 0.0)
+
+            before_rate = before.change_count / np.maximum(before.valid_values - 1, 1)
+            after_rate = after.change_count / np.maximum(after.valid_values - 1, 1)
+            peak_rate = np.maximum(before_rate, after_rate)
+            switching_change = np.where(peak_rate > 0, np.abs(after_rate - before_rate) / peak_rate, 0.0)
+
+            availability_change = np.abs(after.valid_values / np.maximum(after.total_values, 1)
+                                         - before.valid_values / np.maximum(before.total_values, 1))
+
+        # У нечисловых сигналов уровень и разброс не определены - их вес перераспределяется
+        numeric = before.is_numeric & after.is_numeric & ~np.isnan(before.mean) & ~np.isnan(after.mean)
+        level_shift = np.where(numeric, np.nan_to_num(level_shift), np.nan)
+        spread_change = np.where(numeric, np.nan_to_num(spread_change), np.nan)
+
+        components = {
+            'level_shift': level_shift,
+            'spread_change': spread_change,
+            'switching_change': switching_change,
+            'availability_change': availability_change
+        }
+        weighted = sum(SCORE_WEIGHTS[name] * np.nan_to_num(values) for name, values in components.items())
+        total_weight = sum(SCORE_WEIGHTS[name] * ~np.isnan(values) for name, values in components.items())
+
+        return {
+            **components,
+            'score': weighted / total_weight,
+            'mean_before': before.mean,
+            'mean_after': after.mean,
+            'std_before': before.std,
+            'std_after': after.std,
+            'changes_before': before.change_count,
+            'changes_after': after.change_count
+        }
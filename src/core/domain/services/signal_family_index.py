@@ -0,0 +1,296 @@
+"""
+Семейства сигналов по вагонам и поиск вагона, выбивающегося из ряда
+"""
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .change_point_index import RowSelector
+
+# Сквозной номер вагона - числовой суффикс кода сигнала (B_BCU_FAULT_3)
+WAGON_SUFFIX = re.compile(r'^(?P<base>.+?)_(?P<wagon>\d{1,2})$')
+
+# Виды отклонений вагона от остальных вагонов семейства
+OUTLIER_KINDS = ('toggles', 'stuck', 'mean')
+
+# Масштаб MAD до стандартного отклонения нормального распределения
+MAD_SCALE = 1.4826
+
+
+@dataclass
+class SignalFamily:
+    """Один логический сигнал по вагонам: столбцы упорядочены по сквозному номеру вагона"""
+    base_code: str
+    columns: List[str]
+    wagons: List[int]
+    wagon_names: List[str]
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def matrix(self, data: pd.DataFrame, rows: Optional[RowSelector] = None,
+               numeric_matrix=None) -> np.ndarray:
+        """Значения семейства время x вагон (float64)
+
+        При наличии NumericMatrix записи и столбцах семейства, идущих в ней с
+        постоянным шагом (обычная раскладка по вагонам), результат - срез-
+        представление без копирования; иначе копируются только столбцы семейства.
+        """
+        rows = slice(None) if rows is None else rows
+        positions = [numeric_matrix.positions.get(column) for column in self.columns] \
+            if numeric_matrix is not None else [None]
+        if None not in positions:
+            steps = np.diff(positions)
+            if len(positions) == 1 or (steps[0] > 0 and (steps == steps[0]).all()):
+                step = int(steps[0]) if len(steps) else 1
+                family_values = numeric_matrix.values[:, positions[0]:positions[-1] + 1:step]
+            else:
+                family_values = numeric_matrix.values[:, positions]
+            return family_values[rows]
+
+        block = np.empty((len(data.index[rows]), len(self.columns)), dtype=np.float64, order='F')
+        for j, column in enumerate(self.columns):
+            series = data[column]
+            if series.dtype.kind not in 'biuf':
+                series = pd.to_numeric(series, errors='coerce')
+            block[:, j] = series.to_numpy(dtype=np.float64, na_value=np.nan)[rows]
+        return block
+
+
+@dataclass
+class WagonOutlier:
+    """Вагон, поведение сигнала в котором отличается от остальных вагонов семейства"""
+    base_code: str
+    column: str
+    wagon: int
+    wagon_name: str
+    kind: str
+    value: float
+    siblings_median: float
+    score: float
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'base_code': self.base_code,
+            'column': self.column,
+            'wagon': self.wagon,
+            'wagon_name': self.wagon_name,
+            'kind': self.kind,
+            'value': round(self.value, 6),
+            'siblings_median': round(self.siblings_median, 6),
+            'score': round(self.score, 3)
+        }
+
+
+@dataclass
+class FamilyComparison:
+    """Статистика семейства по вагонам в окне и найденные отклонения"""
+    family: SignalFamily
+    toggles: np.ndarray
+    mean: np.ndarray
+    std: np.ndarray
+    valid: np.ndarray
+    outliers: List[WagonOutlier] = field(default_factory=list)
+
+    def as_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({'toggles': self.toggles, 'mean': self.mean, 'std': self.std, 'valid': self.valid},
+                            index=pd.Index(self.family.wagon_names, name='wagon'))
+
+
+class SignalFamilyIndex:
+    """Группировка столбцов записи по коду сигнала без номера вагона
+
+    Семейство - сигналы с одинаковой основой кода в двух и более вагонах.
+    На вагон берется первый столбец с этим кодом. Индекс строится один раз
+    на набор параметров и проверяется по идентичности списка.
+    """
+
+    def __init__(self, parameters: List[Any], wagon_name: Optional[Callable[[int], str]] = None,
+                 min_wagons: int = 2):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._source = parameters
+        self.size = len(parameters)
+
+        grouped: Dict[str, Dict[int, str]] = {}
+        for parameter in parameters:
+            if self._field(parameter, 'is_problematic') or self._field(parameter, 'is_virtual'):
+                continue
+            split = self.split_code(self._field(parameter, 'signal_code') or '')
+            column = self._field(parameter, 'full_column')
+            if split is None or not column:
+                continue
+            base_code, wagon = split
+            grouped.setdefault(base_code, {}).setdefault(wagon, column)
+
+        self.families: Dict[str, SignalFamily] = {}
+        self._family_of: Dict[str, str] = {}
+        for base_code, by_wagon in grouped.items():
+            if len(by_wagon) < min_wagons:
+                continue
+            wagons = sorted(by_wagon)
+            self.families[base_code] = SignalFamily(
+                base_code=base_code,
+                columns=[by_wagon[w] for w in wagons],
+                wagons=wagons,
+                wagon_names=[self._wagon_name(wagon_name, w) for w in wagons]
+            )
+            self._family_of.update({by_wagon[w]: base_code for w in wagons})
+
+        self.logger.info(f"Семейств сигналов по вагонам: {len(self.families)}")
+
+    @staticmethod
+    def _field(parameter: Any, name: str) -> Any:
+        if isinstance(parameter, dict):
+            return parameter.get(name)
+        return getattr(parameter, name, None)
+
+    @staticmethod
+    def _wagon_name(wagon_name: Optional[Callable[[int], str]], wagon: int) -> str:
+        if wagon_name is None:
+            return str(wagon)
+        try:
+            return str(wagon_name(wagon))
+        except Exception:
+            return str(wagon)
+
+    @staticmethod
+    def split_code(signal_code: str) -> Optional[Tuple[str, int]]:
+        """(основа кода, сквозной номер вагона) или None для кода без номера вагона"""
+        match = WAGON_SUFFIX.match(signal_code)
+        if match is None or int(match.group('wagon')) == 0:
+            return None
+        return match.group('base'), int(match.group('wagon'))
+
+    def is_valid_for(self, parameters: List[Any]) -> bool:
+        return parameters is self._source and len(parameters) == self.size
+
+    def __len__(self) -> int:
+        return len(self.families)
+
+    def family_of(self, column: str) -> Optional[SignalFamily]:
+        base_code = self._family_of.get(column)
+        return self.families.get(base_code) if base_code else None
+
+
+class WagonOutlierDetector:
+    """Сравнение вагонов семейства робастными оценками (медиана и MAD)
+
+    Для каждого вагона векторно по матрице время x вагон считаются число
+    переключений (с пропуском пустых значений, как в ChangePointIndex),
+    среднее и разброс. Отклонение - вагон с числом переключений или
+    средним дальше z_threshold робастных сигм от медианы вагонов, либо
+    вагон без единого переключения, когда большинство остальных переключается.
+    Лишние переключения засчитываются, только если их не меньше чем в
+    min_toggle_ratio раз больше медианы (естественный разброс счетчиков и
+    шумные аналоговые сигналы не дают ложных срабатываний).
+    Для решения нужно не менее min_wagons вагонов.
+    """
+
+    def __init__(self, z_threshold: float = 3.5, min_wagons: int = 3, min_toggle_excess: int = 3,
+                 min_toggle_ratio: float = 1.5, relative_mean_floor: float = 0.02,
+                 spread_mean_floor: float = 0.5):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.z_threshold = z_threshold
+        self.min_wagons = min_wagons
+        self.min_toggle_excess = min_toggle_excess
+        self.min_toggle_ratio = min_toggle_ratio
+        self.relative_mean_floor = relative_mean_floor
+        self.spread_mean_floor = spread_mean_floor
+
+    @staticmethod
+    def column_statistics(block: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Переключения, среднее, разброс и число значений по столбцам блока время x вагон"""
+        n_rows, n_columns = block.shape
+        toggles = np.zeros(n_columns, dtype=np.int64)
+        mean = np.full(n_columns, np.nan)
+        std = np.full(n_columns, np.nan)
+        counts = np.full(n_columns, n_rows, dtype=np.int64)
+        if not n_rows:
+            return toggles, mean, std, counts
+
+        # Столбцы без пропусков - прямые редукции по столбцам
+        gaps = np.isnan(block).any(axis=0)
+        dense = np.flatnonzero(~gaps)
+        if len(dense):
+            values = block if len(dense) == n_columns else block[:, dense]
+            toggles[dense] = np.count_nonzero(values[1:] != values[:-1], axis=0)
+            mean[dense] = values.mean(axis=0)
+            if n_rows > 1:
+                std[dense] = values.std(axis=0, ddof=1)
+
+        # Столбцы с пропусками: сравнение с последним непустым значением
+        for j in np.flatnonzero(gaps):
+            column = block[:, j]
+            present = column[~np.isnan(column)]
+            counts[j] = len(present)
+            if len(present):
+                toggles[j] = np.count_nonzero(present[1:] != present[:-1])
+                mean[j] = present.mean()
+            if len(present) > 1:
+                std[j] = present.std(ddof=1)
+        return toggles, mean, std, counts
+
+    def compare(self, family: SignalFamily, block: np.ndarray) -> FamilyComparison:
+        """Статистика вагонов семейства и отклонения по блоку время x вагон"""
+        toggles, mean, std, counts = self.column_statistics(block)
+        comparison = FamilyComparison(family, toggles, mean, std, counts)
+
+        present = counts > 0
+        if present.sum() < self.min_wagons:
+            return comparison
+
+        def robust_z(values: np.ndarray, floor: float) -> Tuple[np.ndarray, float]:
+            median = float(np.median(values[present]))
+            mad = float(np.median(np.abs(values[present] - median))) * MAD_SCALE
+            return (values - median) / max(mad, floor), median
+
+        # Лишние переключения
+        toggle_z, toggle_median = robust_z(toggles.astype(np.float64), 1.0)
+        extra = present & (toggle_z >= self.z_threshold) & (toggles - toggle_median >= self.min_toggle_excess) \
+            & (toggles >= toggle_median * self.min_toggle_ratio)
+        # Зависшее значение: нет переключений, хотя больше половины вагонов переключаются
+        stuck = present & (toggles == 0) & (np.count_nonzero(toggles[present] > 0) * 2 > present.sum())
+        # Другое среднее (по вагонам с хотя бы одним значением); нижняя граница масштаба -
+        # доля медианы и доля собственного разброса сигнала, чтобы почти одинаковые
+        # средние и случайная скважность редких переключений не давали больших z
+        spread = float(np.nanmedian(std[present])) if np.isfinite(std[present]).any() else 0.0
+        mean_z, mean_median = robust_z(np.nan_to_num(mean), max(
+            self.relative_mean_floor * abs(float(np.median(mean[present]))),
+            self.spread_mean_floor * spread, np.finfo(np.float64).tiny))
+        shifted = present & ~stuck & (np.abs(mean_z) >= self.z_threshold)
+
+        for kind, mask, values, median, scores in (
+                ('toggles', extra, toggles, toggle_median, toggle_z),
+                ('stuck', stuck, toggles, toggle_median, np.full(len(toggles), np.inf)),
+                ('mean', shifted, mean, mean_median, np.abs(mean_z))):
+            for j in np.flatnonzero(mask):
+                comparison.outliers.append(WagonOutlier(
+                    base_code=family.base_code, column=family.columns[j], wagon=family.wagons[j],
+                    wagon_name=family.wagon_names[j], kind=kind, value=float(values[j]),
+                    siblings_median=float(median), score=float(scores[j])
+                ))
+        return comparison
+
+    def scan(self, data: pd.DataFrame, index: SignalFamilyIndex, rows: Optional[RowSelector] = None,
+             numeric_matrix=None) -> List[FamilyComparison]:
+        """Сравнение вагонов по всем семействам индекса в окне строк rows"""
+        comparisons = []
+        for family in index.families.values():
+            try:
+                comparisons.append(self.compare(family, family.matrix(data, rows, numeric_matrix)))
+            except Exception as e:
+                self.logger.error(f"Ошибка сравнения вагонов семейства {family.base_code}: {e}")
+
+        outliers = sum(len(comparison.outliers) for comparison in comparisons)
+        self.logger.info(f"Сравнение вагонов: {len(comparisons)} семейств, {outliers} отклонений")
+        return comparisons
+
+    @staticmethod
+    def outliers(comparisons: List[FamilyComparison]) -> List[WagonOutlier]:
+        """Все отклонения, от наиболее выраженных"""
+        found = [outlier for comparison in comparisons for outlier in comparison.outliers]
+        return sorted(found, key=lambda outlier: -outlier.score)
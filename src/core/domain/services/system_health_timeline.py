@@ -0,0 +1,152 @@
+"""
+Состояние систем по временным корзинам записи из активности сигналов неисправности
+"""
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..entities.signal_classifier import SignalClassificationTable, SignalCriticality
+from .fault_activity import FaultActivityReport
+
+# Уровни состояния: индекс - код в матрице status
+HEALTH_STATUSES = ('healthy', 'warning', 'critical')
+
+
+@dataclass
+class SystemHealthTimeline:
+    """Системы x временные корзины фиксированной ширины
+
+    status[i, j] - код HEALTH_STATUSES системы systems[i] в корзине j:
+    critical - в корзине активна хотя бы одна критичная неисправность
+    системы, warning - любая другая неисправность, healthy - ни одной.
+    fault_counts[i, j] - число разных сигналов неисправности, активных в корзине.
+    """
+    systems: List[str]
+    bucket_starts: np.ndarray
+    bucket_seconds: float
+    status: np.ndarray
+    fault_counts: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.systems)
+
+    @property
+    def bucket_count(self) -> int:
+        return len(self.bucket_starts)
+
+    @property
+    def overall(self) -> np.ndarray:
+        """Худшее состояние среди систем в каждой корзине"""
+        if not len(self.systems):
+            return np.zeros(self.bucket_count, dtype=np.int8)
+        return self.status.max(axis=0)
+
+    def bucket_bounds(self, first: int, last: Optional[int] = None) -> Tuple[pd.Timestamp, pd.Timestamp]:
+        """Начало корзины first и конец корзины last (исключительно)"""
+        last = first if last is None else last
+        first, last = sorted((int(first), int(last)))
+        width = pd.Timedelta(seconds=self.bucket_seconds)
+        return pd.Timestamp(self.bucket_starts[first]), pd.Timestamp(self.bucket_starts[last]) + width
+
+    def time_range(self, first: int, last: Optional[int] = None,
+                   time_format: str = '%Y-%m-%d %H:%M:%S') -> Tuple[str, str]:
+        """Диапазон корзин в формате полей времени (обе границы включительно)"""
+        start, end = self.bucket_bounds(first, last)
+        end = end - pd.Timedelta(seconds=1) if self.bucket_seconds >= 1 else end
+        return start.strftime(time_format), max(start, end).strftime(time_format)
+
+    def trouble_spots(self, min_status: str = 'warning') -> List[Tuple[int, int]]:
+        """Отрезки корзин (первая, последняя) с общим состоянием не лучше min_status"""
+        flagged = (self.overall >= HEALTH_STATUSES.index(min_status)).astype(np.int8)
+        edges = np.diff(np.concatenate(([0], flagged, [0])))
+        return list(zip(np.flatnonzero(edges == 1).tolist(), (np.flatnonzero(edges == -1) - 1).tolist()))
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'bucket_seconds': self.bucket_seconds,
+            'bucket_starts': [str(pd.Timestamp(t)) for t in self.bucket_starts],
+            'systems': {system: [HEALTH_STATUSES[code] for code in self.status[i].tolist()]
+                        for i, system in enumerate(self.systems)},
+            'fault_counts': {system: self.fault_counts[i].tolist() for i, system in enumerate(self.systems)}
+        }
+
+
+class SystemHealthTimelineBuilder:
+    """Построение временной шкалы состояния систем по интервалам активности
+
+    Интервалы активности всех неисправностей переводятся в отрезки номеров
+    корзин, и покрытие (система, уровень) x корзины считается разностным
+    массивом: +1 в первой корзине отрезка, -1 после последней, накопленная
+    сумма по корзинам. Стоимость - O(интервалов + систем x корзин) без
+    прохода по строкам записи.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def build(self, report: FaultActivityReport, classifier,
+              bucket_seconds: float = 60.0) -> Optional[SystemHealthTimeline]:
+        """Шкала состояния по FaultActivityReport всей записи
+
+        Система и критичность берутся из строки классификации, по которой
+        сигнал отобран как неисправность (FaultActivity.classification_row),
+        поэтому совпадают с диагностической панелью. Сигналы отчета,
+        собранного без классификации, классифицируются по коду.
+        """
+        if report is None or report.start is None or bucket_seconds <= 0:
+            return None
+
+        width = max(int(bucket_seconds * 1_000_000_000), 1)
+        origin = int(report.start.astype(np.int64))
+        n_buckets = (int(report.end.astype(np.int64)) - origin) // width + 1
+        starts = np.datetime64(origin, 'ns') + np.arange(n_buckets, dtype=np.int64) * np.timedelta64(width, 'ns')
+
+        activities = list(report.activities.values())
+        rows = np.array([a.classification_row for a in activities], dtype=np.int64)
+        missing = np.flatnonzero(rows < 0)
+        if len(missing):
+            rows[missing] = classifier.classify_rows([{'signal_code': activities[i].signal_code} for i in missing],
+                                                     use_description=False)
+        table = classifier.table
+        critical_code = SignalClassificationTable.CRITICALITIES.index(SignalCriticality.CRITICAL)
+        system_codes = table.column('system')[rows] if len(table) else np.zeros(0, dtype=np.int8)
+        critical = table.column('criticality')[rows] == critical_code if len(table) else np.zeros(0, dtype=bool)
+
+        systems = [table.SYSTEMS[code].value for code in np.unique(system_codes).tolist()]
+        positions = {system: i for i, system in enumerate(systems)}
+
+        # Отрезки корзин (первая, последняя) каждой неисправности без повторов на стыке интервалов
+        cells, firsts, lasts = [], [], []
+        for activity, system_code, is_critical in zip(activities, system_codes.tolist(), critical.tolist()):
+            if not activity.was_active:
+                continue
+            intervals = activity.intervals.astype(np.int64) - origin
+            first = intervals[:, 0] // width
+            # Интервал [начало, спад): корзина спада не затронута; открытый в конце записи - включительно
+            ends = intervals[:, 1] - 1
+            if activity.active_at_end:
+                ends[-1] += 1
+            last = np.maximum(first, ends // width)
+            first = np.maximum(first, np.concatenate(([-1], last[:-1])) + 1)
+            keep = first <= last
+            row = positions[table.SYSTEMS[system_code].value] * 2 + int(is_critical)
+            cells.append(np.full(int(keep.sum()), row))
+            firsts.append(first[keep])
+            lasts.append(last[keep])
+
+        coverage = np.zeros((len(systems) * 2, n_buckets + 1), dtype=np.int32)
+        if cells:
+            cells = np.concatenate(cells)
+            np.add.at(coverage, (cells, np.clip(np.concatenate(firsts), 0, n_buckets - 1)), 1)
+            np.add.at(coverage, (cells, np.clip(np.concatenate(lasts), 0, n_buckets - 1) + 1), -1)
+        coverage = np.cumsum(coverage, axis=1)[:, :n_buckets].reshape(len(systems), 2, n_buckets)
+
+        status = np.where(coverage[:, 1] > 0, 2, np.where(coverage[:, 0] > 0, 1, 0)).astype(np.int8)
+        timeline = SystemHealthTimeline(systems=systems, bucket_starts=starts, bucket_seconds=float(bucket_seconds),
+                                        status=status, fault_counts=coverage.sum(axis=1))
+        self.logger.info(f"Шкала состояния: {len(systems)} систем x {n_buckets} корзин, "
+                         f"{len(timeline.trouble_spots())} отрезков с неисправностями")
+        return timeline
@@ -8,6 +8,7 @@ import pandas as pd
 
 from ..entities.telemetry_data import TelemetryData
 from ..entities.parameter import Parameter
+from .change_analysis_engine import ChangeAnalysisEngine, ColumnChangeStatistics, ChangeScores
 
 class TimeRangeService:
     """Сервис управления временными диапазонами для анализа (исправленная версия)"""
@@ -16,6 +17,7 @@ class TimeRangeService:
         self.logger = logging.getLogger(self.__class__.__name__)
         self._current_range: Optional[Tuple[datetime, datetime]] = None
         self._data_range: Optional[Tuple[datetime, datetime]] = None
+        self.change_engine = ChangeAnalysisEngine()
     
     def initialize_from_telemetry_data(self, telemetry_data: TelemetryData) -> Dict[str, str]:
         """Улучшенная инициализация временного диапазона из данных телеметрии"""
@@ -138,26 +140,20 @@ class TimeRangeService:
                 self.logger.error("Временной диапазон не установлен")
                 return []
             
-            start_time, end_time = self._current_range
-            
-            # Фильтруем данные по времени
-            filtered_data = telemetry_data.filter_by_time(start_time, end_time)
-            
-            if filtered_data.records_count == 0:
+            # Пропускаем проблемные параметры для анализа изменчивости
+            candidates = [param for param in parameters if not param.is_problematic]
+
+            data = telemetry_data.data
+            rows = self.change_engine.resolve_rows(data, *self._current_range)
+
+            if self.change_engine.count_rows(rows) == 0:
                 self.logger.warning("Нет данных в выбранном диапазоне")
                 return []
-            
-            # Анализируем изменчивость параметров
-            changed_params = []
-            
-            for param in parameters:
-                # Пропускаем проблемные параметры для анализа изменчивости
-                if param.is_problematic:
-                    continue
-                    
-                if param.full_column in filtered_data.data.columns:
-                    if self._is_parameter_changed(filtered_data.data[param.full_column], threshold):
-                        changed_params.append(param)
+
+            # Решение по префиксному индексу окон; спорные столбцы досчитываются точно
+            changed_columns = self.change_engine.changed_columns(
+                data, [param.full_column for param in candidates], rows, threshold, rule='variation')
+            changed_params = [param for param in candidates if param.full_column in changed_columns]
             
             self.logger.info(f"Найдено {len(changed_params)} изменяемых параметров в диапазоне (исключены проблемные)")
             return changed_params
@@ -166,6 +162,33 @@ class TimeRangeService:
             self.logger.error(f"Ошибка поиска изменяемых параметров: {e}")
             return []
     
+    def compute_change_scores(self, telemetry_data: TelemetryData,
+                              parameters: List[Parameter]) -> Optional[ChangeScores]:
+        """Пороговонезависимые оценки изменяемости непроблемных параметров в текущем диапазоне"""
+        if not self._current_range:
+            return None
+
+        data = telemetry_data.data
+        rows = self.change_engine.resolve_rows(data, *self._current_range)
+        if self.change_engine.count_rows(rows) == 0:
+            return None
+
+        columns = [param.full_column for param in parameters if not param.is_problematic]
+        return self.change_engine.compute_scores(data, columns, rows, rule='variation')
+
+    def compute_range_statistics(self, telemetry_data: TelemetryData,
+                                 columns: List[str]) -> Optional[ColumnChangeStatistics]:
+        """Статистика изменяемости столбцов в текущем диапазоне (None если диапазон пуст)"""
+        if not self._current_range:
+            return None
+
+        data = telemetry_data.data
+        rows = self.change_engine.resolve_rows(data, *self._current_range)
+        if self.change_engine.count_rows(rows) == 0:
+            return None
+
+        return self.change_engine.compute(data, columns, rows)
+
     def _is_parameter_changed(self, series: pd.Series, threshold: float) -> bool:
         """Проверка изменчивости параметра"""
         try:
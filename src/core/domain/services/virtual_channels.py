@@ -0,0 +1,386 @@
+"""
+Виртуальные каналы: производные сигналы, заданные выражением над столбцами записи
+
+    F_TRACTION_I_SUM = sum(F_TRACTION_I)
+    F_BRAKE_DP = F_BRAKE_P1 - F_BRAKE_P2
+    B_DOOR_ANY_OPEN = any(B_DOOR_OPEN)
+
+Выражения - язык правил контроля (monitoring_rules) без for и hyst.
+Код семейства вне агрегата дает канал на каждый общий вагон
+(F_BRAKE_DP_1, F_BRAKE_DP_2, ...), логический результат - значения 0/1.
+Каналы ссылаются только на записанные сигналы.
+"""
+import logging
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .change_point_index import ColumnTransitions, RowSelector
+from .monitoring_rules import RuleCompiler, RuleError, RuleEvaluationContext, RuleNode
+from .signal_family_index import SignalFamilyIndex
+
+# Линия связи виртуальных каналов в списке параметров
+VIRTUAL_LINE = 'L_VIRTUAL'
+
+_CHANNEL_NAME = re.compile(r'^[A-Z]+(_[A-Z0-9]+)*$')
+
+
+@dataclass
+class VirtualChannel:
+    """Определение виртуального канала и его столбцы в текущей записи
+
+    columns пуст, пока канал не привязан к записи (или его сигналов в ней нет).
+    """
+    name: str
+    expression: str
+    root: RuleNode
+    description: str = ''
+    wagons: Optional[Tuple[int, ...]] = None
+    wagon_names: List[str] = field(default_factory=list)
+    signal_codes: List[str] = field(default_factory=list)
+    columns: List[str] = field(default_factory=list)
+
+    @property
+    def signals(self) -> List[str]:
+        return list(dict.fromkeys(self.root.signals()))
+
+    @property
+    def wagon_signals(self) -> List[str]:
+        return list(dict.fromkeys(self.root.wagon_signals()))
+
+    @property
+    def is_bound(self) -> bool:
+        return bool(self.columns)
+
+    def header(self, signal_code: str) -> str:
+        """Заголовок столбца в формате записи: КОД::ЛИНИЯ|описание"""
+        description = (self.description or self.root.describe()).replace('|', '/')
+        return f"{signal_code}::{VIRTUAL_LINE}|{description}"
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'expression': self.expression,
+            'description': self.description,
+            'wagons': list(self.wagons) if self.wagons else None,
+            'columns': list(self.columns)
+        }
+
+
+@dataclass(frozen=True, eq=False)
+class VirtualChannelSnapshot:
+    """Активные каналы, зафиксированные для расчета вне потока UI
+
+    Хранит выражения и вагоны каналов на момент снимка и ссылки только на
+    неизменяемые объекты записи; значения вычисляются без кэша реестра,
+    поэтому снимок не пересекается с переопределением каналов и привязкой
+    к новой записи в потоке UI.
+    """
+    data: pd.DataFrame
+    parameters: Tuple[Any, ...]
+    families: SignalFamilyIndex
+    numeric_matrix: Any
+    channels: Tuple[Tuple[RuleNode, Optional[Tuple[int, ...]], Tuple[str, ...]], ...]
+
+    @property
+    def columns(self) -> List[str]:
+        return [column for _, _, columns in self.channels for column in columns]
+
+    def values_block(self, rows: RowSelector) -> np.ndarray:
+        """Блок строки x столбцы всех каналов снимка (порядок columns)"""
+        context = RuleEvaluationContext(self.data, list(self.parameters), rows, self.numeric_matrix, self.families)
+        block = np.empty((len(context), len(self.columns)), dtype=np.float64, order='F')
+        position = 0
+        for root, wagons, columns in self.channels:
+            block[:, position:position + len(columns)] = context.evaluate(root, wagons)
+            position += len(columns)
+        return block
+
+
+class VirtualChannelRegistry:
+    """Определения виртуальных каналов и их ленивое вычисление по окнам записи
+
+    Определения не зависят от записи: bind привязывает их к загруженной
+    записи, каналы без нужных сигналов остаются неактивными. Значения
+    вычисляются векторно по дереву выражения только для запрошенного окна
+    строк (общая числовая матрица записи, без копирования столбцов) и
+    хранятся в LRU-кэше блоков время x вагон с вытеснением по объему.
+    """
+
+    def __init__(self, compiler: Optional[RuleCompiler] = None, cache_budget_mb: float = 64.0):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.compiler = compiler or RuleCompiler()
+        self.cache_budget_bytes = int(cache_budget_mb * 1024 * 1024)
+
+        self._channels: 'OrderedDict[str, VirtualChannel]' = OrderedDict()
+        self._columns: Dict[str, Tuple[VirtualChannel, int]] = {}
+        self._cache: 'OrderedDict[Tuple, np.ndarray]' = OrderedDict()
+        self._cache_bytes = 0
+        self._hits = 0
+        self._misses = 0
+
+        self._data: Optional[pd.DataFrame] = None
+        self._parameters: List[Any] = []
+        self._matrix_provider: Optional[Callable[[], Any]] = None
+        self._families: Optional[SignalFamilyIndex] = None
+        self._recorded_codes: set = set()
+
+    @staticmethod
+    def _field(parameter: Any, name: str) -> Any:
+        if isinstance(parameter, dict):
+            return parameter.get(name)
+        return getattr(parameter, name, None)
+
+    # === ОПРЕДЕЛЕНИЯ ===
+
+    @property
+    def channels(self) -> List[VirtualChannel]:
+        return list(self._channels.values())
+
+    @property
+    def bound_channels(self) -> List[VirtualChannel]:
+        return [channel for channel in self._channels.values() if channel.is_bound]
+
+    @property
+    def columns(self) -> List[str]:
+        """Столбцы активных каналов в порядке определения"""
+        return [column for channel in self.bound_channels for column in channel.columns]
+
+    def get(self, name: str) -> Optional[VirtualChannel]:
+        return self._channels.get(name)
+
+    def is_virtual(self, column: Optional[str]) -> bool:
+        return column in self._columns
+
+    def define(self, name: str, expression: str, description: str = '') -> VirtualChannel:
+        """Новый или переопределенный канал; ошибки выражения и имени - RuleError
+
+        При привязанной записи канал сразу проверяется на ней: все сигналы
+        должны существовать, а семейства вне агрегатов - иметь общие вагоны.
+        """
+        name = (name or '').strip()
+        if not _CHANNEL_NAME.match(name):
+            raise RuleError(f"Недопустимое имя канала '{name}': нужен код вида F_TRACTION_I_SUM")
+        if SignalFamilyIndex.split_code(name) is not None:
+            raise RuleError(f"Имя канала {name} не должно оканчиваться номером вагона")
+
+        channel = VirtualChannel(name=name, expression=' '.join(expression.split()),
+                                 root=self.compiler.compile_expression(expression),
+                                 description=(description or '').strip())
+        if name in channel.signals:
+            raise RuleError(f"Канал {name} ссылается сам на себя")
+        if self._data is not None:
+            self._bind_channel(channel)
+
+        self.remove(name)
+        self._channels[name] = channel
+        self._register(channel)
+        self.logger.info(f"Виртуальный канал {name} = {channel.root.describe()} "
+                         f"({len(channel.columns)} столбцов)")
+        return channel
+
+    def remove(self, name: str) -> bool:
+        channel = self._channels.pop(name, None)
+        if channel is None:
+            return False
+        for column in channel.columns:
+            self._columns.pop(column, None)
+        self._drop_cached(name)
+        return True
+
+    # === ПРИВЯЗКА К ЗАПИСИ ===
+
+    def bind(self, data: pd.DataFrame, parameters: List[Any],
+             matrix_provider: Optional[Callable[[], Any]] = None,
+             wagon_name: Optional[Callable[[int], str]] = None):
+        """Привязка определений к записи; parameters - записанные (не виртуальные) параметры"""
+        self._data = data
+        self._parameters = [p for p in parameters if not self._field(p, 'is_virtual')]
+        self._matrix_provider = matrix_provider
+        self._families = SignalFamilyIndex(self._parameters, wagon_name)
+        self._recorded_codes = {self._field(p, 'signal_code') for p in self._parameters}
+        self._columns.clear()
+        self.clear_cache()
+
+        for channel in self._channels.values():
+            try:
+                self._bind_channel(channel)
+                self._register(channel)
+            except RuleError as e:
+                channel.wagons, channel.wagon_names, channel.signal_codes, channel.columns = None, [], [], []
+                self.logger.warning(f"Виртуальный канал {channel.name} неактивен в записи: {e}")
+
+    def unbind(self):
+        self._data = None
+        self._parameters = []
+        self._matrix_provider = None
+        self._families = None
+        self._recorded_codes = set()
+        self._columns.clear()
+        self.clear_cache()
+        for channel in self._channels.values():
+            channel.wagons, channel.wagon_names, channel.signal_codes, channel.columns = None, [], [], []
+
+    def snapshot(self) -> Optional[VirtualChannelSnapshot]:
+        """Снимок активных каналов для фонового расчета (None - активных каналов нет)"""
+        channels = self.bound_channels
+        if self._data is None or not channels:
+            return None
+        return VirtualChannelSnapshot(
+            data=self._data,
+            parameters=tuple(self._parameters),
+            families=self._families,
+            numeric_matrix=self._matrix_provider() if self._matrix_provider else None,
+            channels=tuple((channel.root, channel.wagons, tuple(channel.columns)) for channel in channels)
+        )
+
+    def _bind_channel(self, channel: VirtualChannel):
+        """Вагоны и столбцы канала в текущей записи (проверка пробным вычислением)"""
+        if channel.name in self._recorded_codes or channel.name in self._families.families:
+            raise RuleError(f"Имя канала {channel.name} совпадает с сигналом записи")
+
+        context = self._context(slice(0, min(len(self._data), 1)))
+        for code in channel.signals:
+            context.resolve(code)
+        wagons, wagon_names = context.common_wagons(channel.wagon_signals)
+        context.evaluate(channel.root, wagons)
+
+        channel.wagons = wagons
+        channel.wagon_names = wagon_names if wagons else []
+        channel.signal_codes = [f"{channel.name}_{wagon}" for wagon in wagons] if wagons else [channel.name]
+        channel.columns = [channel.header(code) for code in channel.signal_codes]
+
+    def _register(self, channel: VirtualChannel):
+        for j, column in enumerate(channel.columns):
+            self._columns[column] = (channel, j)
+
+    def _context(self, rows: RowSelector) -> RuleEvaluationContext:
+        numeric_matrix = self._matrix_provider() if self._matrix_provider else None
+        return RuleEvaluationContext(self._data, self._parameters, rows, numeric_matrix, self._families)
+
+    # === ЗНАЧЕНИЯ ===
+
+    def normalize_rows(self, rows: Optional[RowSelector]) -> RowSelector:
+        """Окно строк: срез для непрерывного набора строк, иначе массив номеров"""
+        n_rows = len(self._data) if self._data is not None else 0
+        if rows is None:
+            return slice(0, n_rows)
+        if isinstance(rows, slice):
+            start, stop, step = rows.indices(n_rows)
+            return slice(start, max(start, stop)) if step == 1 else np.arange(start, stop, step)
+
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        if not len(rows):
+            return slice(0, 0)
+        # -1 (строка не найдена, например get_indexer) не должна читать конец записи
+        if rows.min() < 0 or rows.max() >= n_rows:
+            raise IndexError(f"Номера строк вне записи из {n_rows} строк")
+        if rows[-1] - rows[0] == len(rows) - 1 and (np.diff(rows) == 1).all():
+            return slice(int(rows[0]), int(rows[-1]) + 1)
+        return rows.astype(np.int64, copy=False)
+
+    def values(self, column: str, rows: Optional[RowSelector] = None) -> np.ndarray:
+        """Значения столбца виртуального канала в окне строк (float64, только чтение)"""
+        channel, position = self._lookup(column)
+        return self._block(channel, self.normalize_rows(rows))[:, position]
+
+    def values_many(self, columns: List[str], rows: Optional[RowSelector] = None) -> Dict[str, np.ndarray]:
+        """Значения нескольких столбцов с общим окном: сигналы окна читаются один раз"""
+        rows = self.normalize_rows(rows)
+        context, result = None, {}
+        for column in columns:
+            channel, position = self._lookup(column)
+            if context is None and self._cache_key(channel, rows) not in self._cache:
+                context = self._context(rows)
+            result[column] = self._block(channel, rows, context)[:, position]
+        return result
+
+    def values_block(self, columns: List[str], rows: Optional[RowSelector] = None) -> np.ndarray:
+        """Блок строки x столбцы (порядок columns) для матричных редукций"""
+        values = self.values_many(columns, rows)
+        block = np.empty((len(values[columns[0]]) if columns else 0, len(columns)), dtype=np.float64, order='F')
+        for j, column in enumerate(columns):
+            block[:, j] = values[column]
+        return block
+
+    def transitions(self, column: str, rows: Optional[RowSelector] = None) -> ColumnTransitions:
+        """Переходы значений столбца в окне (номера строк записи, пропуски пропускаются)"""
+        rows = self.normalize_rows(rows)
+        values = self.values(column, rows)
+        row_numbers = np.arange(rows.start, rows.stop) if isinstance(rows, slice) else rows
+
+        valid = np.flatnonzero(~np.isnan(values))
+        compact = values[valid]
+        changed = np.flatnonzero(compact[1:] != compact[:-1])
+        return ColumnTransitions(
+            rows=row_numbers[valid[changed + 1]],
+            previous_rows=row_numbers[valid[changed]],
+            old_values=compact[changed],
+            new_values=compact[changed + 1],
+            has_gaps=len(valid) != len(values),
+            first_row=int(row_numbers[valid[0]]) if len(valid) else -1,
+            first_value=compact[0] if len(compact) else np.nan
+        )
+
+    def _lookup(self, column: str) -> Tuple[VirtualChannel, int]:
+        found = self._columns.get(column)
+        if found is None:
+            raise RuleError(f"Нет виртуального канала {column}")
+        return found
+
+    def _block(self, channel: VirtualChannel, rows: RowSelector,
+               context: Optional[RuleEvaluationContext] = None) -> np.ndarray:
+        key = self._cache_key(channel, rows)
+        block = self._cache.get(key)
+        if block is not None:
+            self._hits += 1
+            self._cache.move_to_end(key)
+            return block
+
+        self._misses += 1
+        context = context or self._context(rows)
+        block = np.empty((len(context), len(channel.columns)), dtype=np.float64, order='F')
+        block[:] = context.evaluate(channel.root, channel.wagons)
+        block.flags.writeable = False
+        self._store(key, block)
+        return block
+
+    # === КЭШ ===
+
+    @staticmethod
+    def _cache_key(channel: VirtualChannel, rows: RowSelector) -> Tuple:
+        if isinstance(rows, slice):
+            return channel.name, channel.root, rows.start, rows.stop
+        return channel.name, channel.root, len(rows), hash(rows.tobytes())
+
+    def _store(self, key: Tuple, block: np.ndarray):
+        if block.nbytes > self.cache_budget_bytes:
+            return
+        self._cache[key] = block
+        self._cache_bytes += block.nbytes
+        while self._cache_bytes > self.cache_budget_bytes:
+            _, evicted = self._cache.popitem(last=False)
+            self._cache_bytes -= evicted.nbytes
+
+    def _drop_cached(self, name: str):
+        for key in [key for key in self._cache if key[0] == name]:
+            self._cache_bytes -= self._cache.pop(key).nbytes
+
+    def clear_cache(self):
+        self._cache.clear()
+        self._cache_bytes = 0
+
+    def get_cache_statistics(self) -> Dict[str, Any]:
+        return {
+            'entries': len(self._cache),
+            'bytes': self._cache_bytes,
+            'budget_bytes': self.cache_budget_bytes,
+            'hits': self._hits,
+            'misses': self._misses
+        }
@@ -3,6 +3,7 @@
 Модель данных приложения с поддержкой приоритетной логики изменяемых параметров
 """
 import logging
+import os
 from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime, timedelta
 import time
@@ -18,6 +19,99 @@ except ImportError as e:
     Parameter = None
     TimeRangeService = None
 
+# Сервисы анализа: каждый подключается отдельно, недоступный сервис
+# отключает только свою функцию, а не всю модель
+try:
+    from ..domain.services.change_analysis_engine import ChangeAnalysisEngine
+except ImportError as e:
+    logging.warning(f"Движок анализа изменяемости недоступен: {e}")
+    ChangeAnalysisEngine = None
+
+try:
+    from ..domain.services.column_parallel_backend import ColumnParallelBackend
+except ImportError as e:
+    logging.warning(f"Параллельный расчет по столбцам недоступен: {e}")
+    ColumnParallelBackend = None
+
+try:
+    from ..domain.services.recording_diff import RecordingDiffEngine
+except ImportError as e:
+    logging.warning(f"Сравнение записей недоступно: {e}")
+    RecordingDiffEngine = None
+
+try:
+    from ..domain.services.event_correlation import EventCorrelationEngine
+except ImportError as e:
+    logging.warning(f"Корреляция событий недоступна: {e}")
+    EventCorrelationEngine = None
+
+try:
+    from ..domain.services.fault_activity import FaultActivityScanner
+except ImportError as e:
+    logging.warning(f"Сканер активности неисправностей недоступен: {e}")
+    FaultActivityScanner = None
+
+try:
+    from ..domain.services.causal_graph import CausalGraphIndex
+except ImportError as e:
+    logging.warning(f"Граф причинных связей недоступен: {e}")
+    CausalGraphIndex = None
+
+try:
+    from ..domain.services.system_health_timeline import SystemHealthTimelineBuilder
+except ImportError as e:
+    logging.warning(f"Шкала состояния систем недоступна: {e}")
+    SystemHealthTimelineBuilder = None
+
+try:
+    from ..domain.services.signal_family_index import SignalFamilyIndex, WagonOutlierDetector
+except ImportError as e:
+    logging.warning(f"Семейства сигналов по вагонам недоступны: {e}")
+    SignalFamilyIndex = None
+    WagonOutlierDetector = None
+
+try:
+    from ..domain.services.monitoring_rules import MonitoringRule, RuleCompiler, RuleEngine, RuleError
+except ImportError as e:
+    logging.warning(f"Правила контроля недоступны: {e}")
+    MonitoringRule = None
+    RuleCompiler = None
+    RuleEngine = None
+    RuleError = ValueError
+
+try:
+    from ..domain.services.virtual_channels import VIRTUAL_LINE, VirtualChannelRegistry
+except ImportError as e:
+    logging.warning(f"Виртуальные каналы недоступны: {e}")
+    VIRTUAL_LINE = 'L_VIRTUAL'
+    VirtualChannelRegistry = None
+
+try:
+    from ..domain.services.duty_cycle import DutyCycleAnalyzer
+except ImportError as e:
+    logging.warning(f"Анализ наработки дискретных сигналов недоступен: {e}")
+    DutyCycleAnalyzer = None
+
+try:
+    from ..domain.services.changed_parameters_job import ChangedParametersJob
+except ImportError as e:
+    logging.warning(f"Фоновое задание поиска изменяемых параметров недоступно: {e}")
+    ChangedParametersJob = None
+
+try:
+    from ..domain.services.parameter_search_index import ParameterSearchIndex
+except ImportError as e:
+    logging.warning(f"Индекс поиска параметров недоступен: {e}")
+    ParameterSearchIndex = None
+
+try:
+    from ..domain.services.filter_query import FilterQueryCompiler, FilterQueryContext, FilterQueryError
+except ImportError as e:
+    logging.warning(f"Язык запросов фильтрации недоступен: {e}")
+    FilterQueryCompiler = None
+    FilterQueryContext = None
+    FilterQueryError = ValueError
+
 # Импорты инфраструктуры
 try:
     from ...infrastructure.data.csv_loader import CSVDataLoader
@@ -25,6 +119,29 @@ except ImportError as e:
     logging.warning(f"CSV Loader недоступен: {e}")
     CSVDataLoader = None
 
+# Общий кэш результатов анализа; без него кэши модели - обычные словари
+try:
+    from ..services.analysis_cache import AnalysisCache
+except ImportError as e:
+    logging.warning(f"Общий кэш анализа недоступен: {e}")
+    AnalysisCache = None
+
+# Анализатор первопричин неисправностей (классификация сигналов сохраняется между сессиями)
+try:
+    from ..services.diagnostic_analyzer import DiagnosticAnalyzer
+    from ..domain.entities.signal_classifier import SignalClassifier
+except ImportError as e:
+    logging.warning(f"Анализатор первопричин недоступен: {e}")
+    DiagnosticAnalyzer = None
+
+# Менеджер сессий для быстрого переключения между записями
+try:
+    from ..services.session_manager import TelemetrySessionManager, SessionSnapshot
+except ImportError as e:
+    logging.warning(f"Менеджер сессий недоступен: {e}")
+    TelemetrySessionManager = None
+    SessionSnapshot = None
+
 # Импорты Use Cases для интеграции
 try:
     from ..application.use_cases.filter_parameters_use_case import (
@@ -36,6 +153,11 @@ except ImportError:
     USE_CASES_AVAILABLE = False
 
 
+def _make_cache_key(*parts: Any) -> str:
+    """Ключ кэша модели (без общего кэша анализа - строковое представление частей)"""
+    return AnalysisCache.make_key(*parts) if AnalysisCache else repr(parts)
+
+
 class TimestampParameterService:
     """Сервис для работы с timestamp параметрами"""
 
@@ -173,11 +295,39 @@ class TimestampParameterService:
 class DataModel:
     """ИСПРАВЛЕННАЯ модель данных с приоритетной логикой изменяемых параметров"""
 
-    def __init__(self):
+    def __init__(self, classification_store=None):
+        """classification_store - хранилище таблицы классификации сигналов между
+        сессиями (ClassificationTableStore); None - таблица только в памяти"""
         # Основные сервисы
         self.data_loader = CSVDataLoader() if CSVDataLoader else None
         self.timestamp_service = TimestampParameterService()
         self.time_range_service = TimeRangeService() if TimeRangeService else None
+        self.session_manager = TelemetrySessionManager() if TelemetrySessionManager else None
+        # Широкие записи считаются пулом процессов; небольшие - в текущем процессе
+        self.change_engine = ChangeAnalysisEngine(
+            parallel_backend=ColumnParallelBackend() if ColumnParallelBackend else None) \
+            if ChangeAnalysisEngine else None
+        self.analysis_cache = AnalysisCache() if AnalysisCache else None
+        self._local_caches = []
+        self.recording_diff_engine = RecordingDiffEngine() if RecordingDiffEngine else None
+        self.event_correlation_engine = EventCorrelationEngine() if EventCorrelationEngine else None
+        self.fault_activity_scanner = FaultActivityScanner() if FaultActivityScanner else None
+        self.health_timeline_builder = SystemHealthTimelineBuilder() if SystemHealthTimelineBuilder else None
+        self.wagon_outlier_detector = WagonOutlierDetector() if WagonOutlierDetector else None
+        self._signal_families = None
+        self._causal_graph = None
+        self.rule_compiler = RuleCompiler() if RuleCompiler else None
+        self.rule_engine = RuleEngine() if RuleEngine else None
+        self._rule_report = None
+        self._monitoring_rules = ''
+        self.virtual_channels = VirtualChannelRegistry(self.rule_compiler) if VirtualChannelRegistry else None
+        self.duty_cycle_analyzer = DutyCycleAnalyzer() if DutyCycleAnalyzer else None
+        self.search_index = ParameterSearchIndex() if ParameterSearchIndex else None
+        self.filter_query_compiler = FilterQueryCompiler() if FilterQueryCompiler else None
+        self._filter_query_context = None
+        self.diagnostic_analyzer = DiagnosticAnalyzer(SignalClassifier(classification_store)) \
+            if DiagnosticAnalyzer else None
+        self._share_change_engine()
         self.logger = logging.getLogger(self.__class__.__name__)
 
         # Кэшированные данные для производительности
@@ -189,8 +339,18 @@ class DataModel:
 
         # ПРИОРИТЕТНЫЕ поля для изменяемых параметров
         self._time_range_fields: Optional[Dict[str, str]] = None
-        self._changed_params_cache: Dict[str, List[Parameter]] = {}
-        self._analysis_cache: Dict[str, Any] = {}
+        # Представления общего кэша анализа (ключи привязаны к отпечатку записи)
+        self._changed_params_cache = self._cache_namespace('changed_params')
+        self._analysis_cache = self._cache_namespace('detailed_analysis')
+        self._change_scores_cache = self._cache_namespace('change_scores')
+        self._activity_cache = self._cache_namespace('activity_matrix')
+        self._fault_correlation_cache = self._cache_namespace('fault_correlation')
+        self._fault_activity_cache = self._cache_namespace('fault_activity')
+        self._health_timeline_cache = self._cache_namespace('health_timeline')
+        self._wagon_outlier_cache = self._cache_namespace('wagon_outliers')
+        self._rule_violation_cache = self._cache_namespace('rule_violations')
+        self._virtual_scores_cache = self._cache_namespace('virtual_change_scores')
+        self._duty_cycle_cache = self._cache_namespace('duty_cycle')
         self._priority_mode_active = False
 
         # Статистика и метрики
@@ -217,6 +377,17 @@ class DataModel:
             # Очищаем предыдущие данные
             self.clear_cache()
 
+            # Переключение на ранее открытую запись без повторного парсинга
+            if self._restore_session(file_path):
+                self._attach_virtual_channels()
+                self._set_cache_fingerprint(file_path)
+                self._prepare_range_index()
+                self._apply_monitoring_rules()
+                load_time = time.time() - start_time
+                self._collect_load_statistics(file_path, load_time)
+                self.logger.info(f"✅ Сессия {file_path} восстановлена за {load_time:.3f}с")
+                return True
+
             # Загружаем новые данные
             if not self.data_loader:
                 self.logger.error("CSVDataLoader недоступен")
@@ -246,10 +417,19 @@ class DataModel:
             if success:
                 # Обновляем кэш
                 self._last_file_path = file_path
+                self._attach_virtual_channels()
+                self._set_cache_fingerprint(file_path)
+
+                # Индекс окон строится сразу, чтобы первый сдвиг диапазона не ждал
+                self._prepare_range_index()
+                self._apply_monitoring_rules()
                 
                 # Собираем статистику загрузки
                 load_time = time.time() - start_time
                 self._collect_load_statistics(file_path, load_time)
+
+                # Запоминаем сессию для последующих переключений
+                self._store_session(file_path)
                 
                 self.logger.info(f"✅ ПРИОРИТЕТНАЯ загрузка завершена за {load_time:.2f}с")
                 return True
@@ -323,18 +503,11 @@ class DataModel:
             self._cached_parameters = parameters
             self._cached_parameter_dicts = [p.to_dict() for p in parameters]
             self._cached_lines = lines
+            self._causal_graph = None
 
             # ИСПРАВЛЕНИЕ: Устанавливаем для совместимости с legacy кодом
-            if self.data_loader:
-                self.data_loader.parameters = self._cached_parameter_dicts
-                self.data_loader.lines = list(lines)
-                
-                # Устанавливаем временные метки
-                if hasattr(telemetry_data, 'timestamp_range') and telemetry_data.timestamp_range:
-                    self.data_loader.min_timestamp = telemetry_data.timestamp_range[0].strftime('%Y-%m-%d %H:%M:%S')
-                    self.data_loader.max_timestamp = telemetry_data.timestamp_range[1].strftime('%Y-%m-%d %H:%M:%S')
-                    self.data_loader.start_time = telemetry_data.timestamp_range[0]
-                    self.data_loader.end_time = telemetry_data.timestamp_range[1]
+            self._sync_data_loader_attributes(telemetry_data)
+            self._classify_parameters()
 
             # Подсчитываем статистику
             problematic_count = sum(1 for p in parameters if p.is_problematic)
@@ -348,6 +521,185 @@ class DataModel:
             self.logger.error(f"Ошибка приоритетной обработки данных телеметрии: {e}")
             return False
 
+    def _classify_parameters(self):
+        """Классификация всего набора параметров одним проходом по таблице классификатора
+
+        Сигналы, встречавшиеся в прежних сессиях, берутся из сохраненной
+        таблицы; новые строки сохраняются для следующих сессий. Здесь же
+        один раз строится граф причинно-следственных связей набора.
+        """
+        self.get_causal_graph()
+        try:
+            if not self.diagnostic_analyzer or not self._cached_parameter_dicts:
+                return
+            classifier = self.diagnostic_analyzer.signal_classifier
+            known = len(classifier.table)
+            classifier.classify_rows(self._cached_parameter_dicts)
+            added = len(classifier.table) - known
+            if added:
+                classifier.save_table()
+            self.logger.info(f"Классификация сигналов: {len(self._cached_parameter_dicts)} параметров, "
+                             f"новых в таблице: {added}")
+        except Exception as e:
+            self.logger.error(f"Ошибка классификации параметров: {e}")
+
+    def _share_change_engine(self):
+        """Общий движок анализа изменяемости (и его кэш числовой матрицы) для всех сервисов"""
+        if self.data_loader:
+            self.data_loader.analysis_cache = self.analysis_cache
+            self.data_loader.virtual_channels = self.virtual_channels
+            self.data_loader.rule_report = self._rule_report
+        if not self.change_engine:
+            return
+        if self.time_range_service:
+            self.time_range_service.change_engine = self.change_engine
+        if self.data_loader:
+            self.data_loader.change_engine = self.change_engine
+
+    def _cache_namespace(self, name: str):
+        """Пространство общего кэша анализа; без него - словарь, очищаемый clear_cache"""
+        if self.analysis_cache:
+            return self.analysis_cache.namespace(name)
+        namespace = {}
+        self._local_caches.append(namespace)
+        return namespace
+
+    def _set_cache_fingerprint(self, file_path: str):
+        """Отпечаток записи для ключей кэша: путь, размер и время изменения файла, форма данных"""
+        try:
+            parts = [os.path.abspath(file_path)]
+            if os.path.exists(file_path):
+                stat = os.stat(file_path)
+                parts += [str(stat.st_size), str(stat.st_mtime_ns)]
+            if self._telemetry_data is not None:
+                parts += [str(self._telemetry_data.records_count), str(len(self._telemetry_data.data.columns))]
+            if self.analysis_cache:
+                self.analysis_cache.set_fingerprint(':'.join(parts))
+        except Exception as e:
+            self.logger.error(f"Ошибка вычисления отпечатка записи: {e}")
+            if self.analysis_cache:
+                self.analysis_cache.set_fingerprint(f"{file_path}:{time.time()}")
+
+    def _prepare_range_index(self):
+        """Предварительное построение префиксного индекса окон для текущей записи"""
+        try:
+            if self.change_engine and self._telemetry_data is not None:
+                self.change_engine.get_range_index(self._telemetry_data.data)
+        except Exception as e:
+            self.logger.error(f"Ошибка построения индекса окон: {e}")
+
+    def _sync_data_loader_attributes(self, telemetry_data: TelemetryData):
+        """Синхронизация legacy атрибутов data_loader с текущими данными"""
+        if not self.data_loader:
+            return
+
+        self.data_loader.data = telemetry_data.data
+        self.data_loader.records_count = telemetry_data.records_count
+        self.data_loader.parameters = self._cached_parameter_dicts
+        self.data_loader.lines = list(self._cached_lines or [])
+
+        # Устанавливаем временные метки
+        if hasattr(telemetry_data, 'timestamp_range') and telemetry_data.timestamp_range:
+            self.data_loader.min_timestamp = telemetry_data.timestamp_range[0].strftime('%Y-%m-%d %H:%M:%S')
+            self.data_loader.max_timestamp = telemetry_data.timestamp_range[1].strftime('%Y-%m-%d %H:%M:%S')
+            self.data_loader.start_time = telemetry_data.timestamp_range[0]
+            self.data_loader.end_time = telemetry_data.timestamp_range[1]
+
+    # === МЕТОДЫ РАБОТЫ С СЕССИЯМИ ===
+
+    def _store_session(self, file_path: str):
+        """Сохранение текущей записи в менеджере сессий"""
+        if not self.session_manager or not self._telemetry_data:
+            return
+
+        self.session_manager.store(SessionSnapshot(
+            file_path=file_path,
+            telemetry_data=self._telemetry_data,
+            parameters=self._cached_parameters,
+            parameter_dicts=self._cached_parameter_dicts,
+            lines=self._cached_lines,
+            time_range_fields=self._time_range_fields
+        ))
+
+    def _restore_session(self, file_path: str) -> bool:
+        """Восстановление ранее загруженной записи из менеджера сессий"""
+        try:
+            if not self.session_manager:
+                return False
+
+            snapshot = self.session_manager.restore(file_path)
+            if snapshot is None:
+                return False
+
+            self._telemetry_data = snapshot.telemetry_data
+            self._cached_parameters = snapshot.parameters
+            self._cached_parameter_dicts = snapshot.parameter_dicts
+            self._cached_lines = snapshot.lines
+            self._causal_graph = None
+            self.get_causal_graph()
+
+            # Как и при обычной загрузке, диапазон сбрасывается на полный
+            if self.time_range_service:
+                self._time_range_fields = self.time_range_service.initialize_from_telemetry_data(
+                    snapshot.telemetry_data)
+            else:
+                self._time_range_fields = snapshot.time_range_fields
+
+            self._sync_data_loader_attributes(snapshot.telemetry_data)
+            self._last_file_path = file_path
+            return True
+
+        except Exception as e:
+            self.logger.error(f"Ошибка восстановления сессии {file_path}: {e}")
+            self._telemetry_data = None
+            self._cached_parameters = None
+            self._causal_graph = None
+            self._cached_parameter_dicts = None
+            self._cached_lines = None
+            return False
+
+    def diff_recordings(self, before_path: str, after_path: Optional[str] = None):
+        """Сравнение поведения сигналов двух загруженных записей (RecordingDiff или None)
+
+        Записи берутся из менеджера сессий; after_path=None - текущая запись.
+        """
+        try:
+            if not self.recording_diff_engine or not self.session_manager:
+                self.logger.warning("Сравнение записей недоступно")
+                return None
+
+            sides = []
+            for path in (before_path, after_path):
+                if path is None or (self._last_file_path and os.path.abspath(path) == os.path.abspath(self._last_file_path)):
+                    if not self._telemetry_data or not self._cached_parameters:
+                        self.logger.warning("Текущая запись не загружена")
+                        return None
+                    sides.append((self._telemetry_data, self._cached_parameters))
+                    continue
+
+                snapshot = self.session_manager.restore(path)
+                if snapshot is None:
+                    self.logger.warning(f"Запись {path} не загружена в сессию")
+                    return None
+                sides.append((snapshot.telemetry_data, snapshot.parameters))
+
+            (before_data, before_params), (after_data, after_params) = sides
+            return self.recording_diff_engine.diff(before_data.data, before_params, after_data.data, after_params)
+
+        except Exception as e:
+            self.logger.error(f"Ошибка сравнения записей: {e}")
+            return None
+
+    def get_cache_statistics(self) -> Dict[str, Any]:
+        """Счетчики общего кэша анализа: попадания, промахи, вытеснения, заполненность"""
+        return self.analysis_cache.get_cache_statistics() if self.analysis_cache else {}
+
+    def get_session_statistics(self) -> Dict[str, Any]:
+        """Статистика менеджера сессий"""
+        if not self.session_manager:
+            return {}
+        return self.session_manager.get_statistics()
+
     def _collect_load_statistics(self, file_path: str, load_time: float):
         """Сбор статистики загрузки"""
         try:
@@ -383,15 +735,22 @@ class DataModel:
                 return []
 
             # Проверяем кэш
-            cache_key = f"changed_params_{threshold}_{self._get_current_range_key()}"
-            if cache_key in self._changed_params_cache:
+            range_key = self._get_current_range_key()
+            cache_key = f"changed_params_{threshold}_{range_key}"
+            cached = self._changed_params_cache.get(cache_key)
+            if cached is not None:
                 self.logger.debug("Использование кэшированных изменяемых параметров")
-                return self._changed_params_cache[cache_key]
+                return cached
 
             # Выполняем приоритетный анализ
             start_time = time.time()
-            
-            if self.time_range_service:
+
+            # Второй порог на том же окне - перебор порогов: оценки окна считаются
+            # один раз, а каждый следующий порог - векторная маска по ним
+            scores = self.get_change_scores(compute=self._is_threshold_sweep(range_key))
+            if scores is not None:
+                changed_params = self._changed_parameters_from_scores(scores, threshold)
+            elif self.time_range_service:
                 changed_params = self.time_range_service.find_changed_parameters_in_range(
                     self._telemetry_data,
                     self._cached_parameters,
@@ -400,6 +759,7 @@ class DataModel:
             else:
                 # Fallback анализ
                 changed_params = self._fallback_changed_analysis(threshold)
+            changed_params = changed_params + self._changed_virtual_parameters(threshold)
 
             analysis_time = time.time() - start_time
 
@@ -418,22 +778,488 @@ class DataModel:
             self.logger.error(f"Ошибка приоритетного поиска изменяемых параметров: {e}")
             return []
 
+    def prepare_changed_parameters_job(self, from_time: str, to_time: str, threshold: float = 0.1):
+        """Задание поиска изменяемых параметров для фонового потока (ChangedParametersJob или None)
+
+        Вызывается в потоке UI: диапазон устанавливается и разрешается в окно
+        строк здесь же, а задание получает только неизменяемые входы. Готовый
+        результат из кэша (или по уже посчитанным оценкам окна) передается в
+        задании без расчета. Результат расчета возвращается в модель через
+        complete_changed_parameters_job в потоке UI.
+        """
+        try:
+            if not self._telemetry_data or not self._cached_parameters or not ChangedParametersJob \
+                    or not self.change_engine or not self.time_range_service:
+                return None
+            if not self.set_user_time_range(from_time, to_time):
+                return None
+
+            data = self._telemetry_data.data
+            range_key = self._get_current_range_key()
+            cache_key = f"changed_params_{threshold}_{range_key}"
+            cached = self._changed_params_cache.get(cache_key)
+            if cached is None and self._is_threshold_sweep(range_key):
+                scores = self.get_change_scores(compute=False)
+                if scores is not None:
+                    # Результат по готовым оценкам окна кэшируется здесь же, как и обычный
+                    cached = self._changed_parameters_from_scores(scores, threshold) + \
+                        self._changed_virtual_parameters(threshold)
+                    self._changed_params_cache[cache_key] = cached
+
+            rows = self.change_engine.resolve_rows(data, *self.time_range_service.get_current_range())
+            if not isinstance(rows, slice):
+                rows.flags.writeable = False
+
+            return ChangedParametersJob(
+                cache_key=cache_key,
+                data=data,
+                parameters=tuple(param for param in self._cached_parameters if not param.is_problematic),
+                rows=rows,
+                threshold=threshold,
+                engine=self.change_engine.fork(data) if cached is None else self.change_engine,
+                virtual=self.virtual_channels.snapshot() if self.virtual_channels and cached is None else None,
+                result=tuple(cached) if cached is not None else None
+            )
+
+        except Exception as e:
+            self.logger.error(f"Ошибка подготовки поиска изменяемых параметров: {e}")
+            return None
+
+    def complete_changed_parameters_job(self, job, changed_params: List[Parameter]) -> List[Dict[str, Any]]:
+        """Результат фонового задания в потоке UI: кэш модели и словари параметров для панели"""
+        try:
+            # Запись могла смениться, пока задание выполнялось
+            if job.result is None and self._telemetry_data is not None and self._telemetry_data.data is job.data:
+                self._changed_params_cache[job.cache_key] = list(changed_params)
+                self._performance_metrics['changed_params_found'] = len(changed_params)
+            rows = {row.get('full_column'): row for row in (self._cached_parameter_dicts or [])}
+            return [rows.get(param.full_column) or param.to_dict() for param in changed_params]
+
+        except Exception as e:
+            self.logger.error(f"Ошибка применения результата поиска изменяемых параметров: {e}")
+            return []
+
+    def get_change_scores(self, compute: bool = True):
+        """Пороговонезависимые оценки изменяемости параметров текущего окна (ChangeScores или None)"""
+        try:
+            range_key = self._get_current_range_key()
+            scores = self._change_scores_cache.get(range_key)
+            if scores is not None or not compute:
+                return scores
+
+            if not self._telemetry_data or not self._cached_parameters or not self.time_range_service:
+                return None
+
+            scores = self.time_range_service.compute_change_scores(self._telemetry_data, self._cached_parameters)
+            virtual_scores = self._get_virtual_change_scores()
+            if scores is not None and virtual_scores is not None:
+                scores = scores.concat(virtual_scores)
+            if scores is not None:
+                self._change_scores_cache[range_key] = scores
+            return scores
+
+        except Exception as e:
+            self.logger.error(f"Ошибка расчета оценок изменяемости: {e}")
+            return None
+
+    def rank_changed_parameters(self, threshold: float = 0.1) -> List[Tuple[Parameter, float]]:
+        """Изменяемые параметры текущего окна по убыванию оценки (для ползунка порога)"""
+        scores = self.get_change_scores()
+        if scores is None or not self._cached_parameters:
+            return []
+
+        by_column = {param.full_column: param for param in self._cached_parameters}
+        return [(by_column[column], score) for column, score in scores.ranked(threshold) if column in by_column]
+
+    def _changed_parameters_from_scores(self, scores, threshold: float) -> List[Parameter]:
+        """Записанные изменяемые параметры по оценкам окна (виртуальные добавляет вызывающий)"""
+        changed_columns = set(scores.changed(threshold))
+        return [param for param in self._cached_parameters
+                if not param.is_virtual and param.full_column in changed_columns]
+
+    def _is_threshold_sweep(self, range_key: str) -> bool:
+        """Для окна уже есть результат с другим порогом"""
+        suffix = f"_{range_key}"
+        return any(key.startswith("changed_params_") and key.endswith(suffix)
+                   for key in self._changed_params_cache)
+
+    def get_activity_matrix(self, bucket_seconds: float = 60.0, metric: str = 'changes',
+                            top_n: Optional[int] = None):
+        """Матрица активности параметров по корзинам всей записи (ActivityMatrix или None)
+
+        Строится одним проходом по индексу переходов, поэтому заменяет
+        перебор окон с повторным анализом изменяемых параметров.
+        """
+        try:
+            if not self._telemetry_data or not self._cached_parameters or not self.change_engine:
+                return None
+
+            cache_key = _make_cache_key(bucket_seconds, metric)
+            matrix = self._activity_cache.get(cache_key)
+            if matrix is None:
+                start_time = time.time()
+                columns = [param.full_column for param in self._cached_parameters if not param.is_problematic]
+                matrix = self.change_engine.activity_matrix(self._telemetry_data.data, columns,
+                                                            bucket_seconds, metric)
+                if matrix is None:
+                    return None
+                self._activity_cache[cache_key] = matrix
+                self._performance_metrics['last_activity_matrix_time'] = time.time() - start_time
+                self.logger.info(f"Матрица активности {len(matrix)}x{matrix.bucket_count} "
+                                 f"построена за {time.time() - start_time:.2f}с")
+
+            return matrix.top(top_n) if top_n else matrix
+
+        except Exception as e:
+            self.logger.error(f"Ошибка построения матрицы активности: {e}")
+            return None
+
+    def set_time_range_from_activity(self, matrix, first_bucket: int, last_bucket: Optional[int] = None) -> bool:
+        """Установка диапазона анализа по корзинам матрицы активности"""
+        try:
+            from_time, to_time = matrix.time_range(first_bucket, last_bucket)
+            return self.set_user_time_range(from_time, to_time)
+        except Exception as e:
+            self.logger.error(f"Ошибка установки диапазона по матрице активности: {e}")
+            return False
+
+    def find_fault_precursors(self, window_seconds: float = 5.0,
+                              fault_columns: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Сигналы, переключавшиеся в окне ±window_seconds вокруг срабатываний B_*FAULT
+
+        Возвращает FaultCorrelation по столбцам сработавших неисправностей.
+        """
+        try:
+            if not self._telemetry_data or not self._cached_parameters or not self.event_correlation_engine:
+                return {}
+
+            parameters = [param for param in self._cached_parameters if not param.is_problematic]
+            fault_columns = fault_columns or self.event_correlation_engine.fault_columns(parameters)
+            if not fault_columns:
+                return {}
+
+            cache_key = _make_cache_key(window_seconds, fault_columns)
+            correlations = self._fault_correlation_cache.get(cache_key)
+            if correlations is None:
+                data = self._telemetry_data.data
+                change_points = self.change_engine.get_change_points(data) if self.change_engine else None
+                correlations = self.event_correlation_engine.correlate(
+                    data, fault_columns, [param.full_column for param in parameters],
+                    window_seconds, change_points)
+                self._fault_correlation_cache[cache_key] = correlations
+            return correlations
+
+        except Exception as e:
+            self.logger.error(f"Ошибка корреляции событий неисправностей: {e}")
+            return {}
+
+    def scan_fault_activity(self, full_recording: bool = False):
+        """Интервалы активности, фронты и длительность сигналов неисправности в текущем окне
+
+        Сигналы неисправности выбираются по таблице классификации, состояние
+        восстанавливается по общему индексу переходов. Сигналы цепочек
+        CAUSAL_RELATIONSHIPS сканируются в report.context. Возвращает
+        FaultActivityReport или None. full_recording - вся запись вместо окна.
+        """
+        try:
+            if (not self._telemetry_data or not self._cached_parameters
+                    or not self.fault_activity_scanner or not self.diagnostic_analyzer):
+                return None
+
+            range_key = 'full_recording' if full_recording else self._get_current_range_key()
+            report = self._fault_activity_cache.get(range_key)
+            if report is None:
+                data = self._telemetry_data.data
+                parameters = [param for param in self._cached_parameters if not param.is_problematic]
+                classifier = self.diagnostic_analyzer.signal_classifier
+                classification_rows = self.fault_activity_scanner.classification_rows(parameters, classifier)
+                columns = self.fault_activity_scanner.fault_columns(parameters, classifier, classification_rows)
+
+                current_range = self.time_range_service.get_current_range() \
+                    if self.time_range_service and not full_recording else None
+                rows = self.change_engine.resolve_rows(data, *current_range) \
+                    if self.change_engine and current_range else None
+                change_points = self.change_engine.get_change_points(data) if self.change_engine else None
+
+                # Прочие сигналы причинно-следственных цепочек - для временного порядка цепочек
+                causal_graph = self.get_causal_graph()
+                context_columns = self.fault_activity_scanner.signal_columns(
+                    parameters, causal_graph.linked_codes()) if causal_graph else None
+
+                report = self.fault_activity_scanner.scan(data, columns, rows, change_points, context_columns,
+                                                          classification_rows)
+                self._fault_activity_cache[range_key] = report
+            return report
+
+        except Exception as e:
+            self.logger.error(f"Ошибка сканирования активности неисправностей: {e}")
+            return None
+
+    def get_system_health_timeline(self, bucket_seconds: float = 60.0):
+        """Состояние систем по корзинам всей записи (SystemHealthTimeline или None)
+
+        Строится по активности сигналов неисправности всей записи и
+        кэшируется по записи и ширине корзины.
+        """
+        try:
+            if not self.health_timeline_builder or not self.diagnostic_analyzer:
+                return None
+
+            cache_key = _make_cache_key(bucket_seconds)
+            timeline = self._health_timeline_cache.get(cache_key)
+            if timeline is None:
+                report = self.scan_fault_activity(full_recording=True)
+                timeline = self.health_timeline_builder.build(
+                    report, self.diagnostic_analyzer.signal_classifier, bucket_seconds)
+                if timeline is None:
+                    return None
+                self._health_timeline_cache[cache_key] = timeline
+            return timeline
+
+        except Exception as e:
+            self.logger.error(f"Ошибка построения шкалы состояния систем: {e}")
+            return None
+
+    def get_causal_graph(self):
+        """Граф причинно-следственных связей записанных сигналов (CausalGraphIndex или None)
+
+        Строится один раз на набор параметров записи (при загрузке) и
+        сбрасывается только при смене записи: виртуальные каналы в цепочки
+        не входят, поэтому их изменение граф не затрагивает.
+        """
+        try:
+            if not self._cached_parameters or not CausalGraphIndex:
+                return None
+
+            if self._causal_graph is None:
+                self._causal_graph = CausalGraphIndex(
+                    [param for param in self._cached_parameters if not param.is_virtual])
+            return self._causal_graph
+
+        except Exception as e:
+            self.logger.error(f"Ошибка построения графа причинно-следственных связей: {e}")
+            return None
+
+    def get_signal_families(self):
+        """Семейства сигналов по вагонам (SignalFamilyIndex или None)
+
+        Индекс строится один раз на набор параметров; вагоны подписываются
+        реальными номерами из конфигурации вагонов загрузчика.
+        """
+        try:
+            if not self._cached_parameters or not SignalFamilyIndex:
+                return None
+
+            if self._signal_families is None or not self._signal_families.is_valid_for(self._cached_parameters):
+                wagon_config = getattr(self.data_loader, 'wagon_config', None)
+                self._signal_families = SignalFamilyIndex(
+                    self._cached_parameters, wagon_config.get_real_wagon_number if wagon_config else None)
+            return self._signal_families
+
+        except Exception as e:
+            self.logger.error(f"Ошибка построения семейств сигналов по вагонам: {e}")
+            return None
+
+    def scan_wagon_outliers(self, full_recording: bool = False) -> List[Any]:
+        """Сравнение вагонов по каждому семейству сигналов в текущем окне
+
+        Возвращает список FamilyComparison (статистика вагонов и найденные
+        WagonOutlier); значения берутся срезами общей числовой матрицы записи.
+        full_recording - вся запись вместо окна.
+        """
+        try:
+            if not self._telemetry_data or not self.wagon_outlier_detector:
+                return []
+            families = self.get_signal_families()
+            if families is None or not len(families):
+                return []
+
+            range_key = 'full_recording' if full_recording else self._get_current_range_key()
+            comparisons = self._wagon_outlier_cache.get(range_key)
+            if comparisons is None:
+                data = self._telemetry_data.data
+                current_range = self.time_range_service.get_current_range() \
+                    if self.time_range_service and not full_recording else None
+                rows = self.change_engine.resolve_rows(data, *current_range) \
+                    if self.change_engine and current_range else None
+                numeric_matrix = self.change_engine.get_matrix(data) if self.change_engine else None
+
+                comparisons = self.wagon_outlier_detector.scan(data, families, rows, numeric_matrix)
+                self._wagon_outlier_cache[range_key] = comparisons
+            return comparisons
+
+        except Exception as e:
+            self.logger.error(f"Ошибка сравнения вагонов: {e}")
+            return []
+
+    def evaluate_monitoring_rules(self, rules, full_recording: bool = True):
+        """Интервалы нарушений правил контроля (RuleEvaluationReport или None)
+
+        rules - текст набора правил (строка на правило), список строк или
+        MonitoringRule. По умолчанию вычисляется вся запись, full_recording=False -
+        текущее окно. Последний отчет доступен графикам через
+        get_rule_violation_intervals. Ошибки в тексте правил передаются
+        вызывающему как RuleError.
+        """
+        if not self._telemetry_data or not self._cached_parameters or not self.rule_engine:
+            return None
+
+        compiled = list(rules) if isinstance(rules, (list, tuple)) and rules and all(
+            isinstance(rule, MonitoringRule) for rule in rules) else self.rule_compiler.compile_rules(rules)
+        try:
+            range_key = 'full_recording' if full_recording else self._get_current_range_key()
+            # Правила могут ссылаться на виртуальные каналы: их определения входят в ключ
+            channels = [f"{channel.name} = {channel.expression}" for channel in self.get_virtual_channels()]
+            cache_key = _make_cache_key(
+                range_key, [f"{rule.name}: {rule.describe()}" for rule in compiled], channels)
+            report = self._rule_violation_cache.get(cache_key)
+            if report is None:
+                data = self._telemetry_data.data
+                current_range = self.time_range_service.get_current_range() \
+                    if self.time_range_service and not full_recording else None
+                rows = self.change_engine.resolve_rows(data, *current_range) \
+                    if self.change_engine and current_range else None
+                numeric_matrix = self.change_engine.get_matrix(data) if self.change_engine else None
+
+                report = self.rule_engine.evaluate(data, compiled, self._cached_parameters, rows,
+                                                   numeric_matrix, self.get_signal_families(),
+                                                   self.virtual_channels)
+                self._rule_violation_cache[cache_key] = report
+            self._set_rule_report(report)
+            return report
+
+        except Exception as e:
+            self.logger.error(f"Ошибка вычисления правил контроля: {e}")
+            return None
+
+    def get_rule_violation_intervals(self, column: Optional[str] = None):
+        """Интервалы (начало, конец) нарушений последнего набора правил для отметки на графиках
+
+        column - только правила, в которых участвует столбец; None - нет вычисленных правил.
+        """
+        if self._rule_report is None:
+            return None
+        return self._rule_report.intervals(column)
+
+    def get_rule_report(self):
+        """Отчет последнего вычисления правил контроля (RuleEvaluationReport или None)"""
+        return self._rule_report
+
+    def set_monitoring_rules(self, rules: str):
+        """Активный набор правил контроля (текст, строка на правило)
+
+        Набор хранится в модели на всю сессию и вычисляется по всей записи
+        сразу и после каждой загрузки или переключения записи. Пустой текст
+        отключает правила. Ошибка в тексте передается как RuleError, прежний
+        набор при этом сохраняется.
+        """
+        if not self.rule_compiler:
+            return None
+        compiled = self.rule_compiler.compile_rules(rules or '')
+        self._monitoring_rules = rules or ''
+        if not compiled:
+            self._set_rule_report(None)
+            return None
+        return self.evaluate_monitoring_rules(compiled)
+
+    def get_monitoring_rules(self) -> str:
+        return self._monitoring_rules
+
+    def _apply_monitoring_rules(self):
+        """Вычисление активного набора правил для только что загруженной записи"""
+        try:
+            if not self._monitoring_rules.strip() or not self.rule_compiler:
+                return
+            report = self.evaluate_monitoring_rules(self.rule_compiler.compile_rules(self._monitoring_rules))
+            if report is not None:
+                self.logger.info(f"Правила контроля: {len(report.rules)} правил, "
+                                 f"{len(report.violations)} нарушений")
+        except Exception as e:
+            self.logger.error(f"Ошибка применения правил контроля: {e}")
+
+    def _set_rule_report(self, report):
+        """Текущий отчет правил контроля, общий с data_loader для графиков и отчетов"""
+        self._rule_report = report
+        if self.data_loader:
+            self.data_loader.rule_report = report
+
+    def analyze_duty_cycles(self, full_recording: bool = False):
+        """Наработка дискретных (B_) сигналов в текущем окне (DutyCycleReport или None)
+
+        Переключения, включения, скважность, суммарные и наибольшие
+        длительности состояний и частота в час по каждому сигналу вагона;
+        считается по общему индексу переходов записи. full_recording - вся запись.
+        """
+        try:
+            if not self._telemetry_data or not self._cached_parameters or not self.duty_cycle_analyzer:
+                return None
+
+            range_key = 'full_recording' if full_recording else self._get_current_range_key()
+            report = self._duty_cycle_cache.get(range_key)
+            if report is None:
+                data = self._telemetry_data.data
+                current_range = self.time_range_service.get_current_range() \
+                    if self.time_range_service and not full_recording else None
+                rows = self.change_engine.resolve_rows(data, *current_range) \
+                    if self.change_engine and current_range else None
+                change_points = self.change_engine.get_change_points(data) if self.change_engine else None
+                wagon_config = getattr(self.data_loader, 'wagon_config', None)
+
+                report = self.duty_cycle_analyzer.analyze(
+                    data, self._cached_parameters, rows, change_points,
+                    wagon_config.get_real_wagon_number if wagon_config else None)
+                self._duty_cycle_cache[range_key] = report
+            return report
+
+        except Exception as e:
+            self.logger.error(f"Ошибка расчета наработки дискретных сигналов: {e}")
+            return None
+
+    def export_duty_cycle_table(self, save_path: str, full_recording: bool = False) -> bool:
+        """Экспорт таблицы наработки дискретных сигналов в CSV"""
+        try:
+            report = self.analyze_duty_cycles(full_recording)
+            if report is None or not len(report):
+                self.logger.warning("Нет дискретных сигналов для экспорта наработки")
+                return False
+            report.as_frame().to_csv(save_path, index=False, encoding='utf-8-sig')
+            self.logger.info(f"Наработка {len(report)} сигналов экспортирована в CSV: {save_path}")
+            return True
+        except Exception as e:
+            self.logger.error(f"Ошибка экспорта наработки в CSV: {e}")
+            return False
+
+    def diagnose_fault_events(self, window_seconds: float = 5.0) -> List[Any]:
+        """Диагностика сработавших неисправностей с первопричинами из корреляции событий"""
+        try:
+            if not self.diagnostic_analyzer:
+                return []
+            self.diagnostic_analyzer.set_fault_activity(self.scan_fault_activity())
+            correlations = self.find_fault_precursors(window_seconds)
+            if not correlations:
+                return []
+            return self.diagnostic_analyzer.analyze_fault_correlations(correlations, self.get_parameters())
+        except Exception as e:
+            self.logger.error(f"Ошибка диагностики событий неисправностей: {e}")
+            return []
+
     def _fallback_changed_analysis(self, threshold: float) -> List[Parameter]:
         """Fallback анализ изменяемых параметров"""
         try:
             if not self._telemetry_data or not self._cached_parameters:
                 return []
 
-            changed_params = []
             data = self._telemetry_data.data
 
+            # Простой анализ изменяемости всех столбцов одной векторной маской
+            stats = self.change_engine.compute(data, [p.full_column for p in self._cached_parameters])
+            changed_mask = self.change_engine.uniqueness_mask(stats, threshold)
+
+            changed_params = []
             for param in self._cached_parameters:
-                if param.full_column in data.columns:
-                    series = data[param.full_column]
-                    
-                    # Простой анализ изменяемости
-                    if self._is_parameter_changed_simple(series, threshold):
-                        changed_params.append(param)
+                position = stats.position(param.full_column)
+                if position is not None and changed_mask[position]:
+                    changed_params.append(param)
 
             return changed_params
 
@@ -515,6 +1341,111 @@ class DataModel:
         except Exception:
             return "unknown_range"
 
+    # === ВИРТУАЛЬНЫЕ КАНАЛЫ ===
+
+    def define_virtual_channel(self, name: str, expression: str, description: str = ''):
+        """Производный сигнал по выражению над столбцами записи (VirtualChannel)
+
+        Столбцы канала добавляются в общий список параметров (линия L_VIRTUAL)
+        и дальше обрабатываются графиками, анализом изменяемости и отчетами
+        как записанные. Определение сохраняется при смене записи. Ошибки
+        имени и выражения передаются вызывающему как RuleError.
+        """
+        if not self.virtual_channels:
+            return None
+        channel = self.virtual_channels.define(name, expression, description)
+        self._apply_virtual_parameters()
+        self._apply_monitoring_rules()
+        return channel
+
+    def remove_virtual_channel(self, name: str) -> bool:
+        if not self.virtual_channels or not self.virtual_channels.remove(name):
+            return False
+        self._apply_virtual_parameters()
+        self._apply_monitoring_rules()
+        return True
+
+    def get_virtual_channels(self) -> List[Any]:
+        return self.virtual_channels.channels if self.virtual_channels else []
+
+    def _attach_virtual_channels(self):
+        """Привязка определений виртуальных каналов к загруженной записи"""
+        try:
+            if not self.virtual_channels or not self._telemetry_data or self._cached_parameters is None:
+                return
+            data = self._telemetry_data.data
+            recorded = [param for param in self._cached_parameters if not param.is_virtual]
+            wagon_config = getattr(self.data_loader, 'wagon_config', None)
+            self.virtual_channels.bind(
+                data, recorded,
+                (lambda: self.change_engine.get_matrix(data)) if self.change_engine else None,
+                wagon_config.get_real_wagon_number if wagon_config else None)
+            self._apply_virtual_parameters()
+        except Exception as e:
+            self.logger.error(f"Ошибка привязки виртуальных каналов: {e}")
+
+    def _apply_virtual_parameters(self):
+        """Параметры активных виртуальных каналов в конце списка параметров записи
+
+        Списки заменяются новыми, поэтому индексы поиска и фильтров,
+        проверяющие идентичность списка, перестраиваются сами.
+        """
+        if self._cached_parameters is None:
+            return
+        parameters = [param for param in self._cached_parameters if not param.is_virtual]
+        parameter_dicts = [row for row in (self._cached_parameter_dicts or []) if not row.get('is_virtual')]
+
+        virtual = []
+        for channel in self.virtual_channels.bound_channels:
+            for column in channel.columns:
+                parameter = Parameter.from_header(column)
+                parameter.is_virtual = True
+                virtual.append(parameter)
+
+        self._cached_parameters = parameters + virtual
+        self._cached_parameter_dicts = parameter_dicts + [param.to_dict() for param in virtual]
+        lines = set(self._cached_lines or ()) - {VIRTUAL_LINE}
+        self._cached_lines = lines | {VIRTUAL_LINE} if virtual else lines
+
+        # Оценки изменяемости окна включают виртуальные столбцы
+        self._virtual_scores_cache.clear()
+        self._change_scores_cache.clear()
+        self._changed_params_cache.clear()
+        if self.data_loader:
+            self.data_loader.parameters = self._cached_parameter_dicts
+            self.data_loader.lines = list(self._cached_lines)
+
+    def _get_virtual_change_scores(self):
+        """Оценки изменяемости виртуальных столбцов текущего окна (ChangeScores или None)"""
+        try:
+            if not self.virtual_channels or not self.change_engine or not self._telemetry_data:
+                return None
+            columns = self.virtual_channels.columns
+            if not columns:
+                return None
+
+            range_key = self._get_current_range_key()
+            scores = self._virtual_scores_cache.get(range_key)
+            if scores is None:
+                data = self._telemetry_data.data
+                current_range = self.time_range_service.get_current_range() if self.time_range_service else None
+                rows = self.change_engine.resolve_rows(data, *current_range) if current_range else None
+                block = self.virtual_channels.values_block(columns, rows)
+                scores = self.change_engine.scores(self.change_engine.compute_block(block, columns), 'variation')
+                self._virtual_scores_cache[range_key] = scores
+            return scores
+
+        except Exception as e:
+            self.logger.error(f"Ошибка оценки изменяемости виртуальных каналов: {e}")
+            return None
+
+    def _changed_virtual_parameters(self, threshold: float) -> List[Parameter]:
+        scores = self._get_virtual_change_scores()
+        if scores is None:
+            return []
+        changed = set(scores.changed(threshold))
+        return [param for param in self._cached_parameters if param.is_virtual and param.full_column in changed]
+
     # === МЕТОДЫ РАБОТЫ С ВРЕМЕННЫМИ ДИАПАЗОНАМИ ===
 
     def get_time_range_fields(self) -> Optional[Dict[str, Any]]:
@@ -617,9 +1548,10 @@ class DataModel:
                         'source': 'user_set'
                     })
 
-                # ПРИОРИТЕТНАЯ очистка кэша изменяемых параметров
-                self._changed_params_cache.clear()
-                self._analysis_cache.clear()
+                # Кэши анализа привязаны к диапазону в ключе, поэтому при сдвиге окна
+                # не очищаются: новое окно досчитывается сдвигом сумм, а возврат к
+                # недавнему окну берется из кэша
+                self._trim_analysis_caches()
 
                 self.logger.info(f"✅ ПРИОРИТЕТНЫЙ диапазон установлен: {from_time} - {to_time}")
 
@@ -629,6 +1561,12 @@ class DataModel:
             self.logger.error(f"Ошибка установки приоритетного диапазона: {e}")
             return False
 
+    def _trim_analysis_caches(self, max_entries: int = 32):
+        """Ограничение кэшей анализа последними max_entries окнами (давно не использованные удаляются первыми)"""
+        for cache in (self._changed_params_cache, self._analysis_cache):
+            for key in list(cache)[:-max_entries]:
+                cache.pop(key, None)
+
     def _validate_time_range(self, from_time: str, to_time: str) -> bool:
         """Валидация временного диапазона"""
         try:
@@ -669,9 +1607,8 @@ class DataModel:
                         self._telemetry_data)
                     self.logger.info("✅ Временной диапазон сброшен к полному")
 
-            # ПРИОРИТЕТНАЯ очистка кэша
-            self._changed_params_cache.clear()
-            self._analysis_cache.clear()
+            # Ключи кэшей содержат диапазон - результаты полного диапазона остаются верными
+            self._trim_analysis_caches()
 
         except Exception as e:
             self.logger.error(f"Ошибка приоритетного сброса временного диапазона: {e}")
@@ -785,9 +1722,9 @@ class DataModel:
             elif parameter_type == 'timestamp':
                 return [p for p in self._cached_parameters if p.is_timestamp_parameter()]
             elif parameter_type == 'changed':
-                # Возвращаем последние найденные изменяемые параметры
+                # Возвращаем последние найденные изменяемые параметры (кэш хранит порядок добавления)
                 if self._changed_params_cache:
-                    latest_key = max(self._changed_params_cache.keys())
+                    latest_key = next(reversed(self._changed_params_cache))
                     return self._changed_params_cache[latest_key]
                 return []
             else:  # 'all'
@@ -827,6 +1764,14 @@ class DataModel:
             if not self._cached_parameters or not search_text:
                 return []
 
+            # Индекс обновляется по разнице с прежним набором только при его смене
+            if self.search_index is not None:
+                if not self.search_index.is_current(self._cached_parameters):
+                    self.search_index.update(self._cached_parameters)
+                found_parameters = self.search_index.search(search_text)
+                self.logger.debug(f"Найдено {len(found_parameters)} параметров по запросу '{search_text}'")
+                return found_parameters
+
             search_text = search_text.lower()
             found_parameters = []
 
@@ -853,6 +1798,38 @@ class DataModel:
             self.logger.error(f"Ошибка поиска параметров: {e}")
             return []
 
+    def query_parameters(self, query: str, change_threshold: Optional[float] = None,
+                         as_dicts: bool = False) -> List[Any]:
+        """Параметры, удовлетворяющие запросу фильтрации (type:B wagon:3..5 changed>0.2 ...)
+
+        План запроса берется из кэша компилятора, маски метаданных - из
+        индекса текущего набора параметров, поведенческие условия - из
+        оценок изменяемости текущего окна. Ошибки в тексте запроса
+        передаются вызывающему как FilterQueryError.
+        """
+        if not self._cached_parameters or not self.filter_query_compiler:
+            return []
+
+        plan = self.filter_query_compiler.compile(query)
+        try:
+            context = self._filter_query_context
+            if context is None or not context.is_valid_for(self._cached_parameters):
+                context = self._filter_query_context = FilterQueryContext(self._cached_parameters,
+                                                                          self.search_index)
+            if plan.uses_change_scores:
+                context.set_change_scores(self.get_change_scores(), change_threshold)
+
+            positions = context.positions(plan).tolist()
+            source = self._cached_parameter_dicts if as_dicts else self._cached_parameters
+            self.logger.debug(f"Запрос '{plan.describe()}': {len(positions)} параметров")
+            return [source[i] for i in positions]
+
+        except FilterQueryError:
+            raise
+        except Exception as e:
+            self.logger.error(f"Ошибка выполнения запроса фильтрации: {e}")
+            return []
+
     # === МЕТОДЫ АНАЛИЗА И СТАТИСТИКИ ===
 
     def analyze_parameter_changes_detailed(self, threshold: float = 0.1) -> Dict[str, Any]:
@@ -865,9 +1842,10 @@ class DataModel:
 
             # Проверяем кэш
             cache_key = f"detailed_analysis_{threshold}_{self._get_current_range_key()}"
-            if cache_key in self._analysis_cache:
+            cached = self._analysis_cache.get(cache_key)
+            if cached is not None:
                 self.logger.debug("Использование кэшированного детального анализа")
-                return self._analysis_cache[cache_key]
+                return cached
 
             start_time = time.time()
 
@@ -880,8 +1858,16 @@ class DataModel:
             if not current_range:
                 return {'error': 'Временной диапазон не установлен'}
 
-            # Фильтруем данные по времени
-            filtered_data = self._telemetry_data.filter_by_time(*current_range)
+            # Статистика всех столбцов диапазона одним векторным проходом
+            data = self._telemetry_data.data
+            rows = self.change_engine.resolve_rows(data, *current_range)
+            filtered_records = self.change_engine.count_rows(rows)
+            stats = self.change_engine.compute(data, [p.full_column for p in self._cached_parameters], rows)
+
+            if self.time_range_service:
+                changed_mask = self.change_engine.variation_mask(stats, threshold)
+            else:
+                changed_mask = self.change_engine.uniqueness_mask(stats, threshold)
 
             analysis_result = {
                 'total_parameters': len(self._cached_parameters),
@@ -896,28 +1882,26 @@ class DataModel:
                 'performance': {}
             }
 
-            # Анализируем каждый параметр
+            # Раскладываем параметры по результатам анализа
             for param in self._cached_parameters:
-                if param.full_column in filtered_data.data.columns:
-                    series = filtered_data.data[param.full_column]
-                    
-                    # Определяем изменяемость
-                    is_changed = self._is_parameter_changed_advanced(series, threshold)
-                    
-                    # Собираем статистику
-                    param_stats = self._calculate_parameter_statistics(series)
-                    
-                    param_info = {
-                        'parameter': param.to_dict(),
-                        'is_changed': is_changed,
-                        'change_statistics': param_stats,
-                        'change_score': param_stats.get('change_score', 0)
-                    }
+                position = stats.position(param.full_column)
+                if position is None:
+                    continue
 
-                    if is_changed:
-                        analysis_result['changed_parameters'].append(param_info)
-                    else:
-                        analysis_result['unchanged_parameters'].append(param_info)
+                is_changed = bool(changed_mask[position])
+                param_stats = self.change_engine.parameter_statistics(stats, param.full_column)
+
+                param_info = {
+                    'parameter': param.to_dict(),
+                    'is_changed': is_changed,
+                    'change_statistics': param_stats,
+                    'change_score': param_stats.get('change_score', 0)
+                }
+
+                if is_changed:
+                    analysis_result['changed_parameters'].append(param_info)
+                else:
+                    analysis_result['unchanged_parameters'].append(param_info)
 
             # Сортируем изменяемые параметры по score
             analysis_result['changed_parameters'].sort(
@@ -929,7 +1913,7 @@ class DataModel:
                 'changed_count': len(analysis_result['changed_parameters']),
                 'unchanged_count': len(analysis_result['unchanged_parameters']),
                 'change_ratio': (len(analysis_result['changed_parameters']) / len(self._cached_parameters) * 100) if self._cached_parameters else 0,
-                'filtered_records': filtered_data.records_count if filtered_data else 0,
+                'filtered_records': filtered_records,
                 'total_records': self._telemetry_data.records_count
             }
 
@@ -1019,7 +2003,8 @@ class DataModel:
                     'parameters_cached': self._cached_parameters is not None,
                     'lines_cached': self._cached_lines is not None,
                     'analysis_cache_size': len(self._analysis_cache),
-                    'changed_params_cache_size': len(self._changed_params_cache)
+                    'changed_params_cache_size': len(self._changed_params_cache),
+                    'shared_cache': self.get_cache_statistics()
                 },
                 'time_range_fields': self._time_range_fields
             }
@@ -1066,8 +2051,9 @@ class DataModel:
                 'load_performance': self._load_statistics,
                 'runtime_performance': self._performance_metrics,
                 'cache_performance': {
-                    'analysis_cache_hits': len(self._analysis_cache),
-                    'changed_params_cache_hits': len(self._changed_params_cache),
+                    'analysis_cache_entries': len(self._analysis_cache),
+                    'changed_params_cache_entries': len(self._changed_params_cache),
+                    'shared_cache': self.get_cache_statistics(),
                     'memory_usage_estimate': self._estimate_memory_usage()
                 },
                 'recommendations': self._get_performance_recommendations()
@@ -1085,8 +2071,7 @@ class DataModel:
             memory_estimate = {
                 'cached_parameters_mb': sys.getsizeof(self._cached_parameters) / 1024 / 1024 if self._cached_parameters else 0,
                 'cached_dicts_mb': sys.getsizeof(self._cached_parameter_dicts) / 1024 / 1024 if self._cached_parameter_dicts else 0,
-                'analysis_cache_mb': sys.getsizeof(self._analysis_cache) / 1024 / 1024,
-                'changed_params_cache_mb': sys.getsizeof(self._changed_params_cache) / 1024 / 1024,
+                'analysis_cache_mb': self.get_cache_statistics().get('size_mb', 0),
                 'telemetry_data_mb': sys.getsizeof(self._telemetry_data) / 1024 / 1024 if self._telemetry_data else 0
             }
             
@@ -1172,6 +2157,8 @@ class DataModel:
                     # Очищаем кэш для пересчета
                     self._analysis_cache.clear()
                     self._changed_params_cache.clear()
+                    if self.change_engine:
+                        self.change_engine.invalidate()
                     
                     self.logger.info(f"✅ Timestamp данные восстановлены методом '{method}'")
                 
@@ -1272,13 +2259,24 @@ class DataModel:
             self._cached_parameters = None
             self._cached_parameter_dicts = None
             self._cached_lines = None
+            self._signal_families = None
+            self._causal_graph = None
+            self._set_rule_report(None)
+            if self.virtual_channels:
+                self.virtual_channels.unbind()
             self._last_file_path = None
             self._telemetry_data = None
             self._time_range_fields = None
 
-            # ПРИОРИТЕТНАЯ очистка кэша изменяемых параметров
-            self._changed_params_cache.clear()
-            self._analysis_cache.clear()
+            # ПРИОРИТЕТНАЯ очистка кэша изменяемых параметров (общий кэш всех сервисов)
+            if self.analysis_cache:
+                self.analysis_cache.invalidate()
+                self.analysis_cache.set_fingerprint('')
+            else:
+                for namespace in self._local_caches:
+                    namespace.clear()
+            if self.change_engine:
+                self.change_engine.invalidate()
 
             # Сброс режимов
             self._priority_mode_active = False
@@ -1314,17 +2312,12 @@ class DataModel:
         try:
             self.logger.info("Начало оптимизации памяти")
 
-            # Очищаем старые записи кэша (оставляем только последние 10)
-            if len(self._analysis_cache) > 10:
-                # Сортируем по времени и оставляем последние
-                sorted_keys = sorted(self._analysis_cache.keys())
-                for key in sorted_keys[:-10]:
-                    del self._analysis_cache[key]
+            # Очищаем старые записи кэша (оставляем только последние 10 и 5 по LRU)
+            for key in list(self._analysis_cache)[:-10]:
+                self._analysis_cache.pop(key, None)
 
-            if len(self._changed_params_cache) > 5:
-                sorted_keys = sorted(self._changed_params_cache.keys())
-                for key in sorted_keys[:-5]:
-                    del self._changed_params_cache[key]
+            for key in list(self._changed_params_cache)[:-5]:
+                self._changed_params_cache.pop(key, None)
 
             # Принудительная сборка мусора
             import gc
@@ -1411,6 +2404,12 @@ class DataModel:
             if self.data_loader and hasattr(self.data_loader, 'cleanup'):
                 self.data_loader.cleanup()
 
+            if self.session_manager:
+                self.session_manager.cleanup()
+
+            if self.change_engine:
+                self.change_engine.shutdown()
+
             self.logger.info("✅ DataModel полностью очищена")
 
         except Exception as e:
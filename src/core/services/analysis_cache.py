@@ -0,0 +1,276 @@
+"""
+Общий кэш результатов анализа: ключи по содержимому, LRU с ограничением размера и метрики
+"""
+import hashlib
+import json
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class _CacheEntry:
+    value: Any
+    size_bytes: int
+    expires_at: Optional[float] = None
+
+
+class AnalysisCache:
+    """LRU-кэш результатов анализа с бюджетом по числу записей и по байтам
+
+    Ключ записи - (пространство имен, отпечаток записи, ключ). Отпечаток
+    текущей записи задается при загрузке, поэтому результаты другой записи
+    или измененного файла никогда не возвращаются.
+    """
+
+    def __init__(self, max_entries: int = 512, max_bytes_mb: float = 256.0):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.max_entries = max_entries
+        self.max_bytes = int(max_bytes_mb * 1024 * 1024)
+
+        self._entries: "OrderedDict[tuple, _CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.fingerprint = ''
+
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    # === КЛЮЧИ ===
+
+    @staticmethod
+    def make_key(*parts: Any, **named: Any) -> str:
+        """Стабильный ключ из частей: коллекции нормализуются, порядок элементов множеств не важен"""
+        payload = json.dumps([AnalysisCache.normalize(p) for p in parts] +
+                             [[k, AnalysisCache.normalize(v)] for k, v in sorted(named.items())],
+                             sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+    @staticmethod
+    def normalize(value: Any) -> Any:
+        """Нормализация критериев: словари по ключам, множества и списки значений - сортировкой"""
+        if isinstance(value, dict):
+            # Пустые критерии эквивалентны отсутствующим
+            return {str(k): AnalysisCache.normalize(v) for k, v in value.items()
+                    if not (v is None or (isinstance(v, (str, list, tuple, set, frozenset)) and not v))}
+        if isinstance(value, (list, tuple, set, frozenset)):
+            return sorted((AnalysisCache.normalize(v) for v in value), key=lambda v: json.dumps(v, default=str))
+        if isinstance(value, float):
+            return repr(value)
+        return value
+
+    @staticmethod
+    def items_signature(items: Iterable[Any]) -> str:
+        """Отпечаток набора параметров по их идентификаторам (а не по длине списка)"""
+        digest = hashlib.blake2b(digest_size=16)
+        count = 0
+        for item in items:
+            if isinstance(item, dict):
+                identity = item.get('full_column') or item.get('signal_code') or repr(sorted(item.items(), key=str))
+            else:
+                identity = getattr(item, 'full_column', None) or getattr(item, 'signal_code', None) or repr(item)
+            digest.update(str(identity).encode('utf-8'))
+            digest.update(b'\0')
+            count += 1
+        return f"{count}:{digest.hexdigest()}"
+
+    def set_fingerprint(self, fingerprint: str):
+        """Отпечаток текущей записи (путь, размер, время изменения, форма данных)"""
+        self.fingerprint = fingerprint or ''
+
+    # === ОСНОВНОЙ API ===
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        full_key = (namespace, self.fingerprint, key)
+        with self._lock:
+            entry = self._entries.get(full_key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return default
+
+            if entry.expires_at is not None and entry.expires_at < time.monotonic():
+                self._remove(full_key)
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return default
+
+            self._entries.move_to_end(full_key)
+            self._stats['hits'] += 1
+            return entry.value
+
+    def put(self, namespace: str, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        full_key = (namespace, self.fingerprint, key)
+        size_bytes = self.estimate_size(value)
+        expires_at = time.monotonic() + ttl_seconds if ttl_seconds else None
+
+        with self._lock:
+            if full_key in self._entries:
+                self._remove(full_key)
+            if size_bytes > self.max_bytes:
+                self.logger.debug(f"Результат {namespace} ({size_bytes} байт) превышает бюджет кэша")
+                return
+
+            self._entries[full_key] = _CacheEntry(value, size_bytes, expires_at)
+            self._bytes += size_bytes
+            self._evict()
+
+    def contains(self, namespace: str, key: str) -> bool:
+        """Проверка наличия без учета в счетчиках и без продления LRU"""
+        with self._lock:
+            entry = self._entries.get((namespace, self.fingerprint, key))
+            return entry is not None and (entry.expires_at is None or entry.expires_at >= time.monotonic())
+
+    def get_or_compute(self, namespace: str, key: str, compute: Callable[[], Any],
+                       ttl_seconds: Optional[float] = None) -> Any:
+        missing = object()
+        value = self.get(namespace, key, missing)
+        if value is missing:
+            value = compute()
+            self.put(namespace, key, value, ttl_seconds)
+        return value
+
+    def discard(self, namespace: str, key: str):
+        with self._lock:
+            self._remove((namespace, self.fingerprint, key))
+
+    def invalidate(self, namespace: Optional[str] = None):
+        """Сброс всех записей или записей одного пространства имен (всех записей телеметрии)"""
+        with self._lock:
+            keys = [k for k in self._entries if namespace is None or k[0] == namespace]
+            for full_key in keys:
+                self._remove(full_key)
+            self._stats['invalidations'] += 1
+
+    def namespace(self, name: str) -> 'CacheNamespace':
+        """Представление пространства имен текущей записи в виде словаря"""
+        return CacheNamespace(self, name)
+
+    def namespace_keys(self, namespace: str) -> list:
+        """Ключи пространства имен текущей записи от давних к недавним"""
+        with self._lock:
+            return [k[2] for k in self._entries if k[0] == namespace and k[1] == self.fingerprint]
+
+    def get_cache_statistics(self) -> Dict[str, Any]:
+        """Счетчики попаданий, промахов и вытеснений, заполненность кэша"""
+        with self._lock:
+            requests = self._stats['hits'] + self._stats['misses']
+            by_namespace: Dict[str, int] = {}
+            for namespace, _, _ in self._entries:
+                by_namespace[namespace] = by_namespace.get(namespace, 0) + 1
+
+            return {
+                **self._stats,
+                'hit_rate_percent': round(self._stats['hits'] / requests * 100, 2) if requests else 0.0,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'size_mb': round(self._bytes / 1024 / 1024, 3),
+                'max_size_mb': round(self.max_bytes / 1024 / 1024, 3),
+                'entries_by_namespace': by_namespace,
+                'fingerprint': self.fingerprint
+            }
+
+    # === ВЫТЕСНЕНИЕ ===
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+            self._stats['evictions'] += 1
+
+    def _remove(self, full_key: tuple):
+        entry = self._entries.pop(full_key, None)
+        if entry is not None:
+            self._bytes -= entry.size_bytes
+
+    # === ОЦЕНКА РАЗМЕРА ===
+
+    @classmethod
+    def estimate_size(cls, value: Any, depth: int = 0) -> int:
+        """Приблизительный размер значения в байтах (для больших коллекций - по выборке)"""
+        try:
+            if isinstance(value, (pd.DataFrame, pd.Series)):
+                usage = value.memory_usage(index=True, deep=True)
+                return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+            if isinstance(value, np.ndarray):
+                return int(value.nbytes)
+
+            size = sys.getsizeof(value)
+            if depth >= 4:
+                return size
+
+            if isinstance(value, dict):
+                items = list(value.items())
+                sample = items[:64]
+                sampled = sum(cls.estimate_size(k, depth + 1) + cls.estimate_size(v, depth + 1) for k, v in sample)
+            elif isinstance(value, (list, tuple, set, frozenset)):
+                items = list(value)
+                sample = items[:64]
+                sampled = sum(cls.estimate_size(v, depth + 1) for v in sample)
+            elif hasattr(value, '__dict__'):
+                return size + cls.estimate_size(vars(value), depth + 1)
+            else:
+                return size
+
+            if sample:
+                size += int(sampled * len(items) / len(sample))
+            return size
+
+        except Exception:
+            return sys.getsizeof(value)
+
+
+class CacheNamespace(MutableMapping):
+    """Словарный интерфейс к пространству имен общего кэша для текущей записи"""
+
+    def __init__(self, cache: AnalysisCache, name: str):
+        self.cache = cache
+        self.name = name
+
+    def __getitem__(self, key):
+        missing = object()
+        value = self.cache.get(self.name, key, missing)
+        if value is missing:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.cache.put(self.name, key, value)
+
+    def __delitem__(self, key):
+        if not self.cache.contains(self.name, key):
+            raise KeyError(key)
+        self.cache.discard(self.name, key)
+
+    def __contains__(self, key) -> bool:
+        return self.cache.contains(self.name, key)
+
+    def __iter__(self):
+        return iter(self.cache.namespace_keys(self.name))
+
+    def __reversed__(self):
+        return reversed(self.cache.namespace_keys(self.name))
+
+    def __len__(self) -> int:
+        return len(self.cache.namespace_keys(self.name))
+
+    def pop(self, key, *default):
+        """Удаление без учета в счетчиках попаданий"""
+        missing = object()
+        with self.cache._lock:
+            value = self.cache._entries.get((self.name, self.cache.fingerprint, key), missing)
+            if value is missing:
+                if default:
+                    return default[0]
+                raise KeyError(key)
+            self.cache.discard(self.name, key)
+            return value.value
+
+    def clear(self):
+        for key in self.cache.namespace_keys(self.name):
+            self.cache.discard(self.name, key)
@@ -0,0 +1,182 @@
+"""
+Фоновое выполнение тяжелых расчетов с подавлением дребезга и отменой устаревших запросов
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+
+class TaskCancelledError(Exception):
+    """Задача отменена более новым запросом"""
+
+
+class CancellationToken:
+    """Признак отмены, проверяемый задачей между этапами расчета"""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise TaskCancelledError()
+
+
+@dataclass
+class _PendingTask:
+    generation: int
+    function: Callable[[CancellationToken, Callable[[float], None]], Any]
+    on_result: Callable[[Any], None]
+    on_error: Optional[Callable[[Exception], None]]
+    on_progress: Optional[Callable[[float], None]]
+    token: CancellationToken
+    submitted_at: float
+
+
+class LatestOnlyTaskRunner:
+    """Рабочий поток, выполняющий только самый свежий запрос
+
+    submit() заменяет еще не начатый запрос и отменяет выполняемый. Запуск
+    откладывается на debounce_seconds после последнего submit(), поэтому серия
+    быстрых правок времени дает один расчет. Результат, прогресс и ошибки
+    передаются через dispatch (например, root.after(0, ...)) и только для
+    последнего запроса.
+    """
+
+    def __init__(self, dispatch: Callable[[Callable[[], None]], None],
+                 debounce_seconds: float = 0.25, name: str = "background-task"):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.dispatch = dispatch
+        self.debounce_seconds = debounce_seconds
+        self.name = name
+
+        self._condition = threading.Condition()
+        self._pending: Optional[_PendingTask] = None
+        self._running: Optional[_PendingTask] = None
+        self._generation = 0
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+
+        self.stats = {'submitted': 0, 'executed': 0, 'superseded': 0, 'delivered': 0}
+
+    # === ОСНОВНОЙ API ===
+
+    def submit(self, function: Callable[[CancellationToken, Callable[[float], None]], Any],
+               on_result: Callable[[Any], None],
+               on_error: Optional[Callable[[Exception], None]] = None,
+               on_progress: Optional[Callable[[float], None]] = None) -> int:
+        """Постановка расчета function(token, report_progress); возвращает номер запроса"""
+        with self._condition:
+            self._generation += 1
+            if self._pending is not None:
+                self.stats['superseded'] += 1
+            if self._running is not None:
+                self._running.token.cancel()
+
+            self._pending = _PendingTask(self._generation, function, on_result, on_error,
+                                         on_progress, CancellationToken(), time.monotonic())
+            self.stats['submitted'] += 1
+            self._ensure_thread()
+            self._condition.notify()
+            return self._generation
+
+    def cancel(self):
+        """Отмена ожидающего и выполняемого запросов"""
+        with self._condition:
+            self._generation += 1
+            self._pending = None
+            if self._running is not None:
+                self._running.token.cancel()
+
+    def is_busy(self) -> bool:
+        with self._condition:
+            return self._pending is not None or self._running is not None
+
+    def shutdown(self):
+        """Остановка рабочего потока"""
+        with self._condition:
+            self._stopped = True
+            self._pending = None
+            if self._running is not None:
+                self._running.token.cancel()
+            self._condition.notify()
+
+    # === РАБОЧИЙ ПОТОК ===
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped = False
+            self._thread = threading.Thread(target=self._worker_loop, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _worker_loop(self):
+        while True:
+            task = self._next_task()
+            if task is None:
+                return
+            self._execute(task)
+
+    def _next_task(self) -> Optional[_PendingTask]:
+        """Ожидание запроса, не обновлявшегося debounce_seconds"""
+        with self._condition:
+            while True:
+                if self._stopped:
+                    return None
+                if self._pending is None:
+                    self._condition.wait()
+                    continue
+
+                remaining = self._pending.submitted_at + self.debounce_seconds - time.monotonic()
+                if remaining > 0:
+                    self._condition.wait(remaining)
+                    continue
+
+                task, self._pending = self._pending, None
+                self._running = task
+                return task
+
+    def _execute(self, task: _PendingTask):
+        self.stats['executed'] += 1
+        try:
+            result = task.function(task.token, lambda fraction: self._report_progress(task, fraction))
+            task.token.raise_if_cancelled()
+            self._deliver(task, lambda: task.on_result(result))
+
+        except TaskCancelledError:
+            self.logger.debug(f"Запрос {task.generation} отменен более новым")
+
+        except Exception as e:
+            self.logger.error(f"Ошибка фонового расчета: {e}")
+            if task.on_error:
+                self._deliver(task, lambda: task.on_error(e))
+
+        finally:
+            with self._condition:
+                if self._running is task:
+                    self._running = None
+
+    def _report_progress(self, task: _PendingTask, fraction: float):
+        task.token.raise_if_cancelled()
+        if task.on_progress:
+            self._deliver(task, lambda: task.on_progress(fraction), count=False)
+
+    def _deliver(self, task: _PendingTask, callback: Callable[[], None], count: bool = True):
+        """Передача в поток UI; к моменту вызова запрос должен оставаться последним"""
+        def deliver_if_latest():
+            if task.generation == self._generation and not task.token.cancelled:
+                if count:
+                    self.stats['delivered'] += 1
+                callback()
+
+        try:
+            self.dispatch(deliver_if_latest)
+        except Exception as e:
+            self.logger.error(f"Ошибка передачи результата в поток UI: {e}")
@@ -0,0 +1,58 @@
+"""
+Хранилище таблицы классификации сигналов между сессиями
+"""
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+class ClassificationTableStore:
+    """Таблица классификации сигналов в JSON-файле пользователя
+
+    Файл содержит данные SignalClassificationTable.to_payload() вместе с
+    версией конфигурации классификатора; данные другой версии или другой
+    структуры при загрузке отбрасывает сам классификатор. Хранилище
+    передается модели явно (DataModel(classification_store=...)), без
+    него таблица живет только в памяти.
+    """
+
+    DEFAULT_FILE = Path.home() / '.tramm_signal_classification.json'
+
+    def __init__(self, file_path: Optional[Path] = None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.file_path = Path(file_path) if file_path else self.DEFAULT_FILE
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        try:
+            if self.file_path.exists():
+                with open(self.file_path, 'r', encoding='utf-8') as f:
+                    payload = json.load(f)
+                return payload if isinstance(payload, dict) else None
+        except Exception as e:
+            self.logger.error(f"Ошибка загрузки таблицы классификации: {e}")
+        return None
+
+    def save(self, payload: Dict[str, Any]) -> bool:
+        """Запись через временный файл: прерванное сохранение не портит прежнюю таблицу"""
+        temp_path = self.file_path.with_name(self.file_path.name + '.tmp')
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, ensure_ascii=False, default=self._plain)
+            os.replace(temp_path, self.file_path)
+            return True
+        except Exception as e:
+            self.logger.error(f"Ошибка сохранения таблицы классификации: {e}")
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return False
+
+    @staticmethod
+    def _plain(value: Any) -> Any:
+        """Скаляры numpy в числа Python"""
+        if hasattr(value, 'item'):
+            return value.item()
+        raise TypeError(f"Тип {type(value).__name__} не сохраняется в JSON")
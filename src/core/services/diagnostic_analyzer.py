@@ -4,11 +4,18 @@
 """
 import logging
 from typing import Dict, List, Any, Optional, Set, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 
-from ..domain.entities.signal_classifier import SignalClassifier, SignalCriticality, SignalSystem
-from ...config.diagnostic_filters_config import CAUSAL_RELATIONSHIPS, SEVERITY_LEVELS
+import numpy as np
+import pandas as pd
+
+from ..domain.entities.signal_classifier import (
+    SignalClassifier, SignalClassificationTable, SignalCriticality, SignalSystem
+)
+from ..domain.services.causal_graph import CausalGraphIndex
+from ..domain.services.fault_activity import ActivationTimeline
+from ...config.diagnostic_filters_config import SEVERITY_LEVELS
 
 @dataclass
 class CausalChain:
@@ -21,6 +28,10 @@ class CausalChain:
     confidence: float
     timestamp: datetime
     affected_systems: List[SignalSystem]
+    # Доля пар (причина, следствие) в правильном временном порядке, None - срабатывания неизвестны
+    temporal_score: Optional[float] = None
+    # Начала срабатываний сигналов цепочки, относящиеся к моменту неисправности
+    activation_times: Dict[str, datetime] = field(default_factory=dict)
 
 @dataclass
 class DiagnosticResult:
@@ -33,10 +44,44 @@ class DiagnosticResult:
     confidence_score: float
     recommendations: List[str]
     related_faults: List[str]
+    # Кандидаты из корреляции событий записи (сигналы, переключавшиеся перед срабатыванием)
+    data_driven_causes: List[Dict[str, Any]] = field(default_factory=list)
+    # Фактические срабатывания в окне записи (FaultActivity.as_dict), None - активность не сканировалась
+    activity: Optional[Dict[str, Any]] = None
 
 class DiagnosticAnalyzer:
     """Анализатор причинно-следственных связей"""
     
+    _CRITICALITY_CODES = {criticality: code for code, criticality
+                          in enumerate(SignalClassificationTable.CRITICALITIES)}
+    
+    # Специфичные для системы причины и эффекты
+    SYSTEM_ROOT_CAUSES = {
+        SignalSystem.POWER: [
+            'F_U3000', 'B_PANTO_UP', 'B_QF1_TRIP', 'B_WAGON_3000V_OK'
+        ],
+        SignalSystem.BRAKES: [
+            'F_R_PRESSURE_MPA', 'B_R_PRESSURE_LOW', 'F_T_PRESSURE_MPA'
+        ],
+        SignalSystem.TRACTION: [
+            'B_PST_CONNECTED', 'B_INVERTER1_READY', 'B_MOTOR_READY'
+        ],
+        SignalSystem.DOORS: [
+            'B_DOOR_HINDRANCE', 'B_BUD_POWER_OK', 'B_DOOR_LOCK_OK'
+        ]
+    }
+    SYSTEM_EFFECTS = {
+        SignalSystem.POWER: [
+            'B_PST_CONNECTED', 'B_PSN_CONNECTED', 'B_TRACTION_AVAILABLE'
+        ],
+        SignalSystem.BRAKES: [
+            'B_EMERGENCY_BRAKING', 'B_BRAKE_APPLIED', 'B_MOTION_BLOCKED'
+        ],
+        SignalSystem.DOORS: [
+            'B_ALL_DOORS_CLOSED', 'B_TRAIN_IS_MOVING_PERMIT'
+        ]
+    }
+    
     def __init__(self, signal_classifier: SignalClassifier = None):
         self.logger = logging.getLogger(self.__class__.__name__)
         self.signal_classifier = signal_classifier or SignalClassifier()
@@ -44,10 +89,22 @@ class DiagnosticAnalyzer:
         # Кэш анализа
         self._analysis_cache: Dict[str, DiagnosticResult] = {}
         self._causal_chains_cache: Dict[str, List[CausalChain]] = {}
+        # Кандидаты-предшественники из данных записи по кодам сигналов неисправности
+        self._correlation_candidates: Dict[str, List[Dict[str, Any]]] = {}
+        # Активность сигналов неисправности в окне записи (FaultActivity по кодам)
+        self._fault_activity: Dict[str, Any] = {}
+        self._activity_start: Optional[datetime] = None
+        self._activation_timeline: Optional[ActivationTimeline] = None
+        # Граф связей текущего набора параметров и затронутые системы его цепочек
+        self._causal_graph: Optional[CausalGraphIndex] = None
+        self._chain_systems: Dict[str, List[SignalSystem]] = {}
+        self._signal_rows: Optional[Tuple[np.ndarray, int]] = None
         
         # Конфигурация
         self.confidence_threshold = 0.6
         self.max_chain_depth = 5
+        # Окно поиска срабатываний сигналов цепочки вокруг момента неисправности, с
+        self.chain_time_horizon = 60.0
         
         self.logger.info("DiagnosticAnalyzer инициализирован")
     
@@ -59,7 +116,6 @@ class DiagnosticAnalyzer:
             if not fault_signals:
                 return []
             
-            timestamp = timestamp or datetime.now()
             results = []
             
             for fault_signal in fault_signals:
@@ -67,15 +123,24 @@ class DiagnosticAnalyzer:
                 if not signal_code:
                     continue
                 
+                # Просканированная и не сработавшая в окне неисправность не анализируется
+                activity = self._fault_activity.get(signal_code)
+                if activity is not None and not activity.was_active:
+                    continue
+                
+                # Время неисправности - ее срабатывание в записи, а не момент анализа
+                fault_time = (timestamp or (activity.first_activation if activity is not None else None)
+                              or self._activity_start or datetime.now())
+                
                 # Проверяем кэш
-                cache_key = f"{signal_code}_{timestamp.strftime('%Y%m%d_%H')}"
+                cache_key = f"{signal_code}_{fault_time.strftime('%Y%m%d_%H')}"
                 if cache_key in self._analysis_cache:
                     results.append(self._analysis_cache[cache_key])
                     continue
                 
                 # Выполняем анализ
                 result = self._analyze_single_fault(
-                    fault_signal, all_signals or [], timestamp
+                    fault_signal, all_signals or [], fault_time
                 )
                 
                 # Сохраняем в кэш
@@ -100,9 +165,12 @@ class DiagnosticAnalyzer:
             classification = self.signal_classifier.classify_signal(
                 signal_code, fault_signal.get('description', '')
             )
+            activity = self._fault_activity.get(signal_code)
             
-            # Ищем возможные причины
+            # Ищем возможные причины: сначала подтвержденные данными записи
+            data_driven_causes = self._correlation_candidates.get(signal_code, [])
             root_causes = self._find_root_causes(signal_code, classification, all_signals)
+            root_causes = list(dict.fromkeys([c['signal_code'] for c in data_driven_causes] + root_causes))
             
             # Ищем потенциальные эффекты
             effects = self._find_potential_effects(signal_code, classification, all_signals)
@@ -114,7 +182,7 @@ class DiagnosticAnalyzer:
             severity = self._assess_fault_severity(classification, causal_chains)
             
             # Расчет уверенности
-            confidence = self._calculate_confidence(root_causes, effects, causal_chains)
+            confidence = self._calculate_confidence(root_causes, effects, causal_chains, data_driven_causes)
             
             # Генерация рекомендаций
             recommendations = self._generate_recommendations(
@@ -132,41 +200,59 @@ class DiagnosticAnalyzer:
                 severity_assessment=severity,
                 confidence_score=confidence,
                 recommendations=recommendations,
-                related_faults=related_faults
+                related_faults=related_faults,
+                data_driven_causes=data_driven_causes,
+                activity=activity.as_dict() if activity is not None else None
             )
             
         except Exception as e:
             self.logger.error(f"Ошибка анализа сигнала {fault_signal.get('signal_code', 'Unknown')}: {e}")
             return self._create_fallback_result(fault_signal.get('signal_code', ''))
     
+    # === ПРИЧИННО-СЛЕДСТВЕННЫЙ ГРАФ ===
+    
+    def _get_causal_graph(self, all_signals: List[Dict[str, Any]]) -> CausalGraphIndex:
+        """Граф связей для набора параметров: строится один раз на загруженный список"""
+        if self._causal_graph is None or not self._causal_graph.is_valid_for(all_signals):
+            self._causal_graph = CausalGraphIndex(all_signals)
+            self._chain_systems = {}
+            self._signal_rows = None
+        return self._causal_graph
+    
+    def _get_signal_rows(self, all_signals: List[Dict[str, Any]]) -> np.ndarray:
+        """Строки таблицы классификации набора параметров (по коду), одна классификация на набор"""
+        self._get_causal_graph(all_signals)
+        table_size = len(self.signal_classifier.table)
+        # Таблица только дополняется; после ее очистки строки пересчитываются
+        if self._signal_rows is None or table_size < self._signal_rows[1]:
+            rows = self.signal_classifier.classify_rows(all_signals, use_description=False)
+            self._signal_rows = (rows, len(self.signal_classifier.table))
+        return self._signal_rows[0]
+    
     def _find_root_causes(self, signal_code: str, 
                          classification, 
                          all_signals: List[Dict[str, Any]]) -> List[str]:
         """Поиск возможных первопричин"""
         try:
-            root_causes = []
+            graph = self._get_causal_graph(all_signals)
             
-            # Поиск в предопределенных связях
-            for chain_name, chain_data in CAUSAL_RELATIONSHIPS.items():
-                if signal_code in chain_data.get('effects', []):
-                    root_causes.extend(chain_data.get('root_causes', []))
+            # Предопределенные связи: прямые причины и причины причин до max_chain_depth звеньев
+            root_causes = [code for code, _ in graph.traverse(signal_code, True, self.max_chain_depth)]
             
             # Поиск по системе
             if classification.system != SignalSystem.UNKNOWN:
-                system_causes = self._find_system_root_causes(
+                root_causes.extend(self._find_system_root_causes(
                     classification.system, signal_code, all_signals
-                )
-                root_causes.extend(system_causes)
+                ))
             
             # Поиск по компоненту
             if classification.component != "UNKNOWN":
-                component_causes = self._find_component_root_causes(
+                root_causes.extend(self._find_component_root_causes(
                     classification.component, signal_code, all_signals
-                )
-                root_causes.extend(component_causes)
+                ))
             
             # Убираем дубликаты и сам сигнал
-            return list(set(root_causes) - {signal_code})
+            return [code for code in dict.fromkeys(root_causes) if code != signal_code]
             
         except Exception as e:
             self.logger.error(f"Ошибка поиска первопричин: {e}")
@@ -177,21 +263,18 @@ class DiagnosticAnalyzer:
                                all_signals: List[Dict[str, Any]]) -> List[str]:
         """Поиск потенциальных эффектов"""
         try:
-            effects = []
+            graph = self._get_causal_graph(all_signals)
             
-            # Поиск в предопределенных связях
-            for chain_name, chain_data in CAUSAL_RELATIONSHIPS.items():
-                if signal_code in chain_data.get('root_causes', []):
-                    effects.extend(chain_data.get('effects', []))
+            # Предопределенные связи: прямые эффекты и их каскад до max_chain_depth звеньев
+            effects = [code for code, _ in graph.traverse(signal_code, False, self.max_chain_depth)]
             
             # Поиск каскадных эффектов по системе
             if classification.system != SignalSystem.UNKNOWN:
-                system_effects = self._find_system_effects(
+                effects.extend(self._find_system_effects(
                     classification.system, signal_code, all_signals
-                )
-                effects.extend(system_effects)
+                ))
             
-            return list(set(effects) - {signal_code})
+            return [code for code in dict.fromkeys(effects) if code != signal_code]
             
         except Exception as e:
             self.logger.error(f"Ошибка поиска эффектов: {e}")
@@ -200,74 +283,94 @@ class DiagnosticAnalyzer:
     def _build_causal_chains(self, signal_code: str,
                             all_signals: List[Dict[str, Any]],
                             timestamp: datetime) -> List[CausalChain]:
-        """Построение причинно-следственных цепочек"""
+        """Построение причинно-следственных цепочек
+        
+        Уверенность - доля присутствующих сигналов цепочки; если по записи
+        известны срабатывания ее сигналов, уверенность снижается за нарушенный
+        порядок (следствие раньше причины). Цепочки отсортированы по уверенности.
+        """
         try:
             chains = []
-            
-            # Ищем предопределенные цепочки
-            for chain_id, chain_data in CAUSAL_RELATIONSHIPS.items():
-                if (signal_code in chain_data.get('root_causes', []) or 
-                    signal_code in chain_data.get('effects', [])):
+            graph = self._get_causal_graph(all_signals)
+            
+            # Предопределенные цепочки с участием сигнала
+            for chain_id in graph.chains_of(signal_code):
+                chain_data = graph.relationships[chain_id]
+                chain_signals = (chain_data.get('root_causes', []) + 
+                               chain_data.get('effects', []))
+                # Сигналы цепочки, присутствующие в данных
+                present_signals = graph.chain_members(chain_id)
+                
+                if len(present_signals) >= 2:  # Минимум 2 сигнала для цепочки
+                    confidence = len(present_signals) / len(chain_signals)
                     
-                    # Проверяем наличие других сигналов цепочки в данных
-                    chain_signals = (chain_data.get('root_causes', []) + 
-                                   chain_data.get('effects', []))
-                    present_signals = self._find_present_signals(chain_signals, all_signals)
+                    # Порядок срабатываний причин и следствий вокруг момента неисправности
+                    temporal_score, activation_times = self._score_chain_order(
+                        *graph.chain_roles(chain_id), timestamp
+                    )
+                    if temporal_score is not None:
+                        confidence *= 0.5 + 0.5 * temporal_score
                     
-                    if len(present_signals) >= 2:  # Минимум 2 сигнала для цепочки
-                        confidence = len(present_signals) / len(chain_signals)
-                        
-                        # Определяем затронутые системы
-                        affected_systems = self._get_affected_systems(present_signals)
-                        
-                        chain = CausalChain(
-                            chain_id=chain_id,
-                            root_cause_signals=chain_data.get('root_causes', []),
-                            effect_signals=chain_data.get('effects', []),
-                            description=chain_data.get('description', ''),
-                            severity=chain_data.get('severity', 'medium'),
-                            confidence=confidence,
-                            timestamp=timestamp,
-                            affected_systems=affected_systems
-                        )
-                        chains.append(chain)
-            
+                    # Затронутые системы цепочки не зависят от анализируемого сигнала
+                    if chain_id not in self._chain_systems:
+                        self._chain_systems[chain_id] = self._get_affected_systems(present_signals)
+                    
+                    chain = CausalChain(
+                        chain_id=chain_id,
+                        root_cause_signals=chain_data.get('root_causes', []),
+                        effect_signals=chain_data.get('effects', []),
+                        description=chain_data.get('description', ''),
+                        severity=chain_data.get('severity', 'medium'),
+                        confidence=confidence,
+                        timestamp=timestamp,
+                        affected_systems=list(self._chain_systems[chain_id]),
+                        temporal_score=temporal_score,
+                        activation_times=activation_times
+                    )
+                    chains.append(chain)
+            
+            # Подтвержденные порядком срабатываний цепочки - первыми
+            chains.sort(key=lambda chain: (chain.confidence, chain.temporal_score or 0.0), reverse=True)
             return chains
             
         except Exception as e:
             self.logger.error(f"Ошибка построения цепочек: {e}")
             return []
     
+    def _score_chain_order(self, root_signals: List[str], effect_signals: List[str],
+                           timestamp: datetime) -> Tuple[Optional[float], Dict[str, datetime]]:
+        """Доля пар (причина, следствие), где причина сработала не позже следствия
+        
+        Берется срабатывание каждого сигнала, относящееся к моменту
+        неисправности (ActivationTimeline.onset); одновременные срабатывания
+        считаются за половину. None - по записи нет ни одной пары с временами.
+        """
+        timeline = self._activation_timeline
+        if timeline is None or not len(timeline):
+            return None, {}
+        
+        onsets = {}
+        for code in dict.fromkeys(root_signals + effect_signals):
+            onset = timeline.onset(code, timestamp, self.chain_time_horizon)
+            if onset is not None:
+                onsets[code] = onset
+        
+        pairs = [(onsets[root], onsets[effect]) for root in root_signals for effect in effect_signals
+                 if root != effect and root in onsets and effect in onsets]
+        activation_times = {code: pd.Timestamp(onset).to_pydatetime() for code, onset in onsets.items()}
+        if not pairs:
+            return None, activation_times
+        
+        ordered = sum(1.0 if root < effect else 0.5 if root == effect else 0.0 for root, effect in pairs)
+        return ordered / len(pairs), activation_times
+    
     def _find_system_root_causes(self, system: SignalSystem, 
                                 signal_code: str,
                                 all_signals: List[Dict[str, Any]]) -> List[str]:
         """Поиск первопричин в рамках системы"""
         try:
-            causes = []
-            
-            # Специфичные для системы причины
-            system_specific_causes = {
-                SignalSystem.POWER: [
-                    'F_U3000', 'B_PANTO_UP', 'B_QF1_TRIP', 'B_WAGON_3000V_OK'
-                ],
-                SignalSystem.BRAKES: [
-                    'F_R_PRESSURE_MPA', 'B_R_PRESSURE_LOW', 'F_T_PRESSURE_MPA'
-                ],
-                SignalSystem.TRACTION: [
-                    'B_PST_CONNECTED', 'B_INVERTER1_READY', 'B_MOTOR_READY'
-                ],
-                SignalSystem.DOORS: [
-                    'B_DOOR_HINDRANCE', 'B_BUD_POWER_OK', 'B_DOOR_LOCK_OK'
-                ]
-            }
-            
-            system_causes = system_specific_causes.get(system, [])
-            
-            # Фильтруем только существующие сигналы
-            present_causes = self._find_present_signals(system_causes, all_signals)
-            causes.extend(present_causes)
-            
-            return causes
+            # Только существующие сигналы из специфичных для системы причин
+            return self._find_present_signals(self.SYSTEM_ROOT_CAUSES.get(system, []), all_signals)
             
         except Exception as e:
             self.logger.error(f"Ошибка поиска причин в системе {system}: {e}")
@@ -276,27 +379,14 @@ class DiagnosticAnalyzer:
     def _find_component_root_causes(self, component: str,
                                    signal_code: str,
                                    all_signals: List[Dict[str, Any]]) -> List[str]:
-        """Поиск первопричин в рамках компонента"""
+        """Поиск первопричин в рамках компонента
+        
+        Сигналы вида B_<компонент>_READY, F_<компонент>_VOLTAGE и т.п. берутся
+        из индекса компонентов графа, а не перебором всех сигналов.
+        """
         try:
-            causes = []
-            
-            # Общие паттерны для компонентов
-            component_patterns = [
-                f"B_{component}_POWER_OK",
-                f"B_{component}_READY", 
-                f"B_{component}_CONNECTED",
-                f"B_{component}_FAULT",
-                f"F_{component}_VOLTAGE"
-            ]
-            
-            # Ищем существующие сигналы по паттернам
-            for signal in all_signals:
-                signal_code_check = signal.get('signal_code', '')
-                for pattern in component_patterns:
-                    if pattern in signal_code_check and signal_code_check != signal_code:
-                        causes.append(signal_code_check)
-            
-            return list(set(causes))
+            graph = self._get_causal_graph(all_signals)
+            return [code for code in graph.component_signals(component) if code != signal_code]
             
         except Exception as e:
             self.logger.error(f"Ошибка поиска причин компонента {component}: {e}")
@@ -307,26 +397,7 @@ class DiagnosticAnalyzer:
                             all_signals: List[Dict[str, Any]]) -> List[str]:
         """Поиск эффектов в рамках системы"""
         try:
-            effects = []
-            
-            # Специфичные для системы эффекты
-            system_effects = {
-                SignalSystem.POWER: [
-                    'B_PST_CONNECTED', 'B_PSN_CONNECTED', 'B_TRACTION_AVAILABLE'
-                ],
-                SignalSystem.BRAKES: [
-                    'B_EMERGENCY_BRAKING', 'B_BRAKE_APPLIED', 'B_MOTION_BLOCKED'
-                ],
-                SignalSystem.DOORS: [
-                    'B_ALL_DOORS_CLOSED', 'B_TRAIN_IS_MOVING_PERMIT'
-                ]
-            }
-            
-            system_effect_list = system_effects.get(system, [])
-            present_effects = self._find_present_signals(system_effect_list, all_signals)
-            effects.extend(present_effects)
-            
-            return effects
+            return self._find_present_signals(self.SYSTEM_EFFECTS.get(system, []), all_signals)
             
         except Exception as e:
             self.logger.error(f"Ошибка поиска эффектов системы {system}: {e}")
@@ -334,32 +405,16 @@ class DiagnosticAnalyzer:
     
     def _find_present_signals(self, signal_list: List[str],
                              all_signals: List[Dict[str, Any]]) -> List[str]:
-        """Поиск присутствующих сигналов из списка"""
-        present = []
-        all_signal_codes = {s.get('signal_code', '') for s in all_signals}
-        
-        for signal_pattern in signal_list:
-            if signal_pattern in all_signal_codes:
-                present.append(signal_pattern)
-            else:
-                # Поиск по паттерну (если содержит *)
-                if '*' in signal_pattern:
-                    pattern_base = signal_pattern.replace('*', '')
-                    for signal_code in all_signal_codes:
-                        if pattern_base in signal_code:
-                            present.append(signal_code)
-        
-        return present
+        """Поиск присутствующих сигналов из списка (коды и шаблоны с *)"""
+        return self._get_causal_graph(all_signals).resolve_all(signal_list)
     
     def _get_affected_systems(self, signal_codes: List[str]) -> List[SignalSystem]:
         """Определение затронутых систем"""
         try:
-            systems = set()
-            
-            for signal_code in signal_codes:
-                classification = self.signal_classifier.classify_signal(signal_code)
-                if classification.system != SignalSystem.UNKNOWN:
-                    systems.add(classification.system)
+            rows = self.signal_classifier.classify_rows([{'signal_code': code} for code in signal_codes])
+            systems = {SignalClassificationTable.SYSTEMS[code]
+                       for code in self.signal_classifier.table.column('system')[rows[rows >= 0]].tolist()}
+            systems.discard(SignalSystem.UNKNOWN)
             
             return list(systems)
             
@@ -396,7 +451,8 @@ class DiagnosticAnalyzer:
     
     def _calculate_confidence(self, root_causes: List[str],
                              effects: List[str],
-                             causal_chains: List[CausalChain]) -> float:
+                             causal_chains: List[CausalChain],
+                             data_driven_causes: Optional[List[Dict[str, Any]]] = None) -> float:
         """Расчет уверенности в диагнозе"""
         try:
             confidence_factors = []
@@ -414,6 +470,10 @@ class DiagnosticAnalyzer:
                 avg_chain_confidence = sum(chain.confidence for chain in causal_chains) / len(causal_chains)
                 confidence_factors.append(avg_chain_confidence * 0.3)
             
+            # Фактор подтверждения данными: насколько стабильно лучший кандидат предшествует срабатыванию
+            if data_driven_causes:
+                confidence_factors.append(data_driven_causes[0].get('consistency', 0.0) * 0.3)
+            
             # Базовая уверенность
             base_confidence = 0.2
             
@@ -481,18 +541,19 @@ class DiagnosticAnalyzer:
             # Классифицируем исходный сигнал
             classification = self.signal_classifier.classify_signal(signal_code)
             
-            # Ищем сигналы того же компонента с неисправностями
-            for signal in all_signals:
-                other_code = signal.get('signal_code', '')
-                if other_code == signal_code:
-                    continue
-                
-                other_classification = self.signal_classifier.classify_signal(other_code)
-                
-                # Тот же компонент и критичность
-                if (other_classification.component == classification.component and
-                    other_classification.criticality in [SignalCriticality.HIGH, SignalCriticality.CRITICAL]):
+            # Сигналы того же компонента с неисправностями - по столбцам таблицы классификации
+            table = self.signal_classifier.table
+            rows = self._get_signal_rows(all_signals)
+            faulty = np.isin(table.column('criticality'), [self._CRITICALITY_CODES[SignalCriticality.HIGH],
+                                                           self._CRITICALITY_CODES[SignalCriticality.CRITICAL]])
+            candidates = (rows >= 0) & faulty[rows] & (table.column('component')[rows] == classification.component)
+            
+            for i in np.flatnonzero(candidates):
+                other_code = all_signals[i].get('signal_code', '')
+                if other_code != signal_code:
                     related.append(other_code)
+                    if len(related) == 5:
+                        break
             
             return related[:5]  # Максимум 5 связанных
             
@@ -515,6 +576,63 @@ class DiagnosticAnalyzer:
     
     # === ПУБЛИЧНЫЕ МЕТОДЫ ===
     
+    def set_event_correlations(self, correlations: Dict[str, Any],
+                               parameters: List[Dict[str, Any]] = None,
+                               top_n: int = 10, min_consistency: float = 0.1):
+        """Загрузка кандидатов-предшественников из корреляции событий записи
+
+        correlations - результат EventCorrelationEngine.correlate (по столбцам),
+        parameters - словари параметров для перевода столбцов в коды сигналов.
+        """
+        try:
+            codes = {p.get('full_column'): p.get('signal_code') for p in parameters or []}
+            self._correlation_candidates.clear()
+
+            for fault_column, correlation in correlations.items():
+                candidates = []
+                for candidate in correlation.top(top_n, min_consistency):
+                    entry = candidate.as_dict()
+                    entry['signal_code'] = codes.get(candidate.column) or candidate.column
+                    entry['event_count'] = correlation.event_count
+                    candidates.append(entry)
+                if candidates:
+                    fault_code = codes.get(fault_column) or fault_column
+                    self._correlation_candidates.setdefault(fault_code, []).extend(candidates)
+
+            # Прежние результаты построены без кандидатов из данных
+            self._analysis_cache.clear()
+            self.logger.info(f"Загружены кандидаты корреляции для {len(self._correlation_candidates)} неисправностей")
+
+        except Exception as e:
+            self.logger.error(f"Ошибка загрузки корреляции событий: {e}")
+
+    def set_fault_activity(self, report):
+        """Загрузка фактической активности сигналов неисправности (FaultActivityReport)
+
+        После загрузки анализ пропускает просканированные, но не сработавшие
+        в окне неисправности, а временем неисправности считается ее первое
+        срабатывание вместо момента анализа. Срабатывания сигналов неисправности
+        и сигналов цепочек (report.context) задают временной порядок цепочек.
+        """
+        try:
+            self._fault_activity = report.by_signal_code() if report is not None else {}
+            self._activity_start = report.start_time if report is not None else None
+            self._activation_timeline = ActivationTimeline.from_report(report)
+            # Прежние результаты построены без учета активности
+            self._analysis_cache.clear()
+            self.logger.info(f"Загружена активность {len(self._fault_activity)} сигналов неисправности")
+        except Exception as e:
+            self.logger.error(f"Ошибка загрузки активности неисправностей: {e}")
+
+    def analyze_fault_correlations(self, correlations: Dict[str, Any],
+                                   all_signals: List[Dict[str, Any]],
+                                   timestamp: datetime = None) -> List[DiagnosticResult]:
+        """Диагностика сработавших неисправностей с первопричинами из данных записи"""
+        self.set_event_correlations(correlations, all_signals)
+        faulted_columns = {column for column, correlation in correlations.items() if correlation.event_count}
+        fault_signals = [s for s in all_signals if s.get('full_column') in faulted_columns]
+        return self.analyze_fault_signals(fault_signals, all_signals, timestamp)
+    
     def analyze_system_health(self, all_signals: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Анализ общего состояния систем"""
         try:
@@ -526,40 +644,45 @@ class DiagnosticAnalyzer:
                 'recommendations': []
             }
             
-            # Классифицируем все сигналы
-            for signal in all_signals:
-                signal_code = signal.get('signal_code', '')
-                if not signal_code:
-                    continue
-                
-                classification = self.signal_classifier.classify_signal(
-                    signal_code, signal.get('description', '')
-                )
-                
-                # Проверяем критичные сигналы
-                if classification.criticality == SignalCriticality.CRITICAL:
-                    health_report['critical_faults'].append(signal_code)
-                    health_report['overall_status'] = 'critical'
-                elif (classification.criticality == SignalCriticality.HIGH and 
-                      health_report['overall_status'] == 'healthy'):
-                    health_report['overall_status'] = 'warning'
-                
-                # Статус систем
-                system_key = classification.system.value
-                if system_key not in health_report['systems_status']:
-                    health_report['systems_status'][system_key] = {
-                        'status': 'healthy',
-                        'fault_count': 0,
-                        'critical_count': 0
-                    }
-                
-                if classification.criticality in [SignalCriticality.HIGH, SignalCriticality.CRITICAL]:
-                    health_report['systems_status'][system_key]['fault_count'] += 1
-                    if classification.criticality == SignalCriticality.CRITICAL:
-                        health_report['systems_status'][system_key]['critical_count'] += 1
-                        health_report['systems_status'][system_key]['status'] = 'critical'
-                    elif health_report['systems_status'][system_key]['status'] == 'healthy':
-                        health_report['systems_status'][system_key]['status'] = 'warning'
+            # Классифицируем все сигналы одним проходом по таблице классификации
+            table = self.signal_classifier.table
+            rows = self.signal_classifier.classify_rows(all_signals)
+            classified = rows >= 0
+            rows = rows[classified]
+            criticality = table.column('criticality')[rows]
+            systems = table.column('system')[rows]
+            critical = criticality == self._CRITICALITY_CODES[SignalCriticality.CRITICAL]
+            faulty = critical | (criticality == self._CRITICALITY_CODES[SignalCriticality.HIGH])
+            
+            # Просканированные неисправности считаются только при фактическом срабатывании в окне
+            if self._fault_activity:
+                codes = [signal.get('signal_code') for signal in all_signals]
+                idle = np.fromiter((code in self._fault_activity and not self._fault_activity[code].was_active
+                                    for code in codes), dtype=bool, count=len(codes))[classified]
+                critical &= ~idle
+                faulty &= ~idle
+                health_report['active_faults'] = [activity.as_dict() for activity in sorted(
+                    (a for a in self._fault_activity.values() if a.was_active),
+                    key=lambda a: a.intervals[0, 0])]
+            
+            # Проверяем критичные сигналы
+            health_report['critical_faults'] = table.column('signal_code')[rows[critical]].tolist()
+            if critical.any():
+                health_report['overall_status'] = 'critical'
+            elif faulty.any():
+                health_report['overall_status'] = 'warning'
+            
+            # Статус систем (в порядке первого появления системы)
+            codes, first_rows = np.unique(systems, return_index=True)
+            for code in codes[np.argsort(first_rows)]:
+                in_system = systems == code
+                fault_count = int(np.count_nonzero(faulty & in_system))
+                critical_count = int(np.count_nonzero(critical & in_system))
+                health_report['systems_status'][table.SYSTEMS[code].value] = {
+                    'status': 'critical' if critical_count else 'warning' if fault_count else 'healthy',
+                    'fault_count': fault_count,
+                    'critical_count': critical_count
+                }
             
             return health_report
             
@@ -572,4 +695,11 @@ class DiagnosticAnalyzer:
         cache_size = len(self._analysis_cache) + len(self._causal_chains_cache)
         self._analysis_cache.clear()
         self._causal_chains_cache.clear()
+        self._correlation_candidates.clear()
+        self._fault_activity = {}
+        self._activity_start = None
+        self._activation_timeline = None
+        self._causal_graph = None
+        self._chain_systems = {}
+        self._signal_rows = None
         self.logger.info(f"Очищены кэши анализа ({cache_size} элементов)")
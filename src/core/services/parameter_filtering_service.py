@@ -11,6 +11,8 @@ import re
 from datetime import datetime
 
 from ..domain.entities.signal_classifier import SignalClassifier, SignalCriticality
+from ..domain.services.parameter_search_index import ParameterSearchIndex
+from ..domain.services.diagnostic_category_index import get_pattern_matcher
 from ...config.diagnostic_filters_config import (
     CRITICAL_FILTERS, SYSTEM_FILTERS, FUNCTIONAL_FILTERS
 )
@@ -27,6 +29,8 @@ class ParameterFilteringService:
         self._filter_cache = {}
         self._cache_enabled = True
         self._max_cache_size = 100
+        # Поисковый индекс обновляется по разнице наборов, а не строится на каждый запрос
+        self._search_index = ParameterSearchIndex(fields=('signal_code', 'description'))
         
         # Метрики
         self.metrics = {
@@ -82,35 +86,20 @@ class ParameterFilteringService:
                              diagnostic_criteria: Dict[str, List[str]]) -> List[Any]:
         """ИНТЕГРАЦИЯ реальных диагностических фильтров"""
         try:
-            from ...config.diagnostic_filters_config import (
-                CRITICAL_FILTERS, SYSTEM_FILTERS, FUNCTIONAL_FILTERS
-            )
+            matcher = get_pattern_matcher()
+            selected_bits = matcher.criteria_bits({
+                'criticality': diagnostic_criteria.get('criticality', []),
+                'systems': diagnostic_criteria.get('systems', [])
+            })
             
             filtered = []
             
             for param in params:
                 signal_code = param.get('signal_code', '').upper()
-                description = param.get('description', '').upper()
                 
-                matches = False
-                
-                # ИНТЕГРАЦИЯ: Проверяем критичность
-                if diagnostic_criteria.get('criticality'):
-                    for crit_key in diagnostic_criteria['criticality']:
-                        if crit_key in CRITICAL_FILTERS:
-                            patterns = CRITICAL_FILTERS[crit_key]['patterns']
-                            if any(pattern in signal_code or pattern in description for pattern in patterns):
-                                matches = True
-                                break
-                
-                # ИНТЕГРАЦИЯ: Проверяем системы
-                if diagnostic_criteria.get('systems'):
-                    for sys_key in diagnostic_criteria['systems']:
-                        if sys_key in SYSTEM_FILTERS:
-                            patterns = SYSTEM_FILTERS[sys_key]['patterns']
-                            if any(pattern in signal_code or pattern in description for pattern in patterns):
-                                matches = True
-                                break
+                # ИНТЕГРАЦИЯ: Критичность и системы - один проход автомата шаблонов
+                matches = bool(selected_bits and
+                               matcher.signal_bits(signal_code, param.get('description', '')) & selected_bits)
                 
                 # ИНТЕГРАЦИЯ: Реальные паттерны из анализа
                 if not matches and diagnostic_criteria.get('real_patterns'):
@@ -183,12 +172,9 @@ class ParameterFilteringService:
         if not search_text:
             return params
             
-        search_text = search_text.lower()
-        return [
-            p for p in params
-            if (search_text in p.get('signal_code', '').lower() or
-                search_text in p.get('description', '').lower())
-        ]
+        if not self._search_index.is_current(params):
+            self._search_index.update(params)
+        return self._search_index.search(search_text)
 
     # Вспомогательные методы
     def _generate_cache_key(self, params: List[Any], criteria: Dict[str, Any]) -> str:
@@ -0,0 +1,258 @@
+"""
+Менеджер сессий телеметрии: несколько загруженных записей в пределах бюджета памяти
+"""
+import hashlib
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional, List, Dict, Any
+
+
+@dataclass
+class SessionSnapshot:
+    """Снимок загруженной записи, достаточный для восстановления без повторного парсинга"""
+    file_path: str
+    telemetry_data: Any
+    parameters: List[Any]
+    parameter_dicts: List[Dict[str, Any]]
+    lines: set
+    time_range_fields: Optional[Dict[str, str]] = None
+    load_statistics: Dict[str, Any] = field(default_factory=dict)
+    file_mtime: float = 0.0
+    file_size: int = 0
+    size_bytes: int = 0
+
+
+class TelemetrySessionManager:
+    """LRU-хранилище сессий с бюджетом памяти и выгрузкой вытесненных сессий на диск"""
+
+    def __init__(self, memory_budget_mb: float = 1024.0, max_sessions: int = 8,
+                 spill_dir: Optional[str] = None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self.memory_budget_bytes = int(memory_budget_mb * 1024 * 1024)
+        self.max_sessions = max_sessions
+
+        # Сессии в памяти: от давно использованных к недавним
+        self._sessions: "OrderedDict[str, SessionSnapshot]" = OrderedDict()
+        # Выгруженные на диск сессии: file_path -> (путь к файлу выгрузки, mtime, size)
+        self._spilled: Dict[str, tuple] = {}
+
+        self._spill_dir = spill_dir
+        self._owns_spill_dir = spill_dir is None
+
+        self._stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'spills': 0,
+            'stale_dropped': 0
+        }
+
+    # === ОСНОВНОЙ API ===
+
+    def store(self, snapshot: SessionSnapshot) -> bool:
+        """Помещение сессии в хранилище (становится самой недавней)"""
+        try:
+            key = self._normalize_key(snapshot.file_path)
+            snapshot.file_mtime, snapshot.file_size = self._get_file_signature(snapshot.file_path)
+            if not snapshot.size_bytes:
+                snapshot.size_bytes = self._estimate_snapshot_size(snapshot)
+
+            self._drop_spilled(key)
+            self._sessions[key] = snapshot
+            self._sessions.move_to_end(key)
+
+            self._enforce_budget(protect_key=key)
+
+            self.logger.debug(f"Сессия сохранена: {snapshot.file_path} "
+                              f"({snapshot.size_bytes / 1024 / 1024:.1f} МБ)")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"Ошибка сохранения сессии {snapshot.file_path}: {e}")
+            return False
+
+    def restore(self, file_path: str) -> Optional[SessionSnapshot]:
+        """Получение сессии из памяти или с диска; None если сессии нет или файл изменился"""
+        try:
+            key = self._normalize_key(file_path)
+            signature = self._get_file_signature(file_path)
+
+            snapshot = self._sessions.get(key)
+            if snapshot is not None:
+                if (snapshot.file_mtime, snapshot.file_size) != signature:
+                    self._drop_stale(key)
+                    return None
+                self._sessions.move_to_end(key)
+                self._stats['memory_hits'] += 1
+                return snapshot
+
+            spilled = self._spilled.get(key)
+            if spilled is not None:
+                spill_path, mtime, size = spilled
+                if (mtime, size) != signature:
+                    self._drop_stale(key)
+                    return None
+
+                start_time = time.time()
+                with open(spill_path, 'rb') as f:
+                    snapshot = pickle.load(f)
+
+                self._drop_spilled(key)
+                self._sessions[key] = snapshot
+                self._enforce_budget(protect_key=key)
+                self._stats['disk_hits'] += 1
+
+                self.logger.info(f"Сессия {file_path} восстановлена с диска за {time.time() - start_time:.3f}с")
+                return snapshot
+
+            self._stats['misses'] += 1
+            return None
+
+        except Exception as e:
+            self.logger.error(f"Ошибка восстановления сессии {file_path}: {e}")
+            self._drop_spilled(self._normalize_key(file_path))
+            return None
+
+    def contains(self, file_path: str) -> bool:
+        """Проверка наличия сессии (в памяти или на диске)"""
+        key = self._normalize_key(file_path)
+        return key in self._sessions or key in self._spilled
+
+    def remove(self, file_path: str):
+        """Удаление сессии из хранилища"""
+        key = self._normalize_key(file_path)
+        self._sessions.pop(key, None)
+        self._drop_spilled(key)
+
+    def set_memory_budget(self, memory_budget_mb: float):
+        """Изменение бюджета памяти с немедленным применением"""
+        self.memory_budget_bytes = int(memory_budget_mb * 1024 * 1024)
+        self._enforce_budget()
+
+    def get_session_paths(self) -> List[str]:
+        """Пути всех доступных сессий, от недавних к давним"""
+        in_memory = [s.file_path for s in reversed(self._sessions.values())]
+        return in_memory + [k for k in self._spilled if k not in self._sessions]
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Статистика хранилища сессий"""
+        return {
+            'sessions_in_memory': len(self._sessions),
+            'sessions_spilled': len(self._spilled),
+            'memory_used_mb': self._memory_used() / 1024 / 1024,
+            'memory_budget_mb': self.memory_budget_bytes / 1024 / 1024,
+            **self._stats
+        }
+
+    def clear(self):
+        """Очистка всех сессий (включая выгруженные)"""
+        self._sessions.clear()
+        for key in list(self._spilled):
+            self._drop_spilled(key)
+
+    def cleanup(self):
+        """Финальная очистка ресурсов"""
+        try:
+            self.clear()
+            if self._owns_spill_dir and self._spill_dir and os.path.isdir(self._spill_dir):
+                shutil.rmtree(self._spill_dir, ignore_errors=True)
+                self._spill_dir = None
+        except Exception as e:
+            self.logger.error(f"Ошибка очистки менеджера сессий: {e}")
+
+    # === ВЫТЕСНЕНИЕ И ВЫГРУЗКА ===
+
+    def _enforce_budget(self, protect_key: Optional[str] = None):
+        """Вытеснение давно использованных сессий до соблюдения бюджета"""
+        while self._sessions and (self._memory_used() > self.memory_budget_bytes
+                                  or len(self._sessions) > self.max_sessions):
+            key = next(iter(self._sessions))
+            if key == protect_key:
+                # Единственная защищенная сессия превышает бюджет - оставляем ее в памяти
+                if len(self._sessions) == 1:
+                    break
+                self._sessions.move_to_end(key)
+                continue
+
+            snapshot = self._sessions.pop(key)
+            self._spill(key, snapshot)
+
+    def _spill(self, key: str, snapshot: SessionSnapshot):
+        """Выгрузка сессии в бинарный файл"""
+        try:
+            spill_dir = self._get_spill_dir()
+            spill_path = os.path.join(spill_dir, f"session_{hashlib.md5(key.encode('utf-8')).hexdigest()}.pkl")
+
+            start_time = time.time()
+            with open(spill_path, 'wb') as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+            self._spilled[key] = (spill_path, snapshot.file_mtime, snapshot.file_size)
+            self._stats['spills'] += 1
+
+            self.logger.info(f"Сессия {snapshot.file_path} выгружена на диск за {time.time() - start_time:.3f}с")
+
+        except Exception as e:
+            self.logger.warning(f"Не удалось выгрузить сессию {snapshot.file_path}, сессия отброшена: {e}")
+
+    def _get_spill_dir(self) -> str:
+        if not self._spill_dir:
+            self._spill_dir = tempfile.mkdtemp(prefix='telemetry_sessions_')
+        os.makedirs(self._spill_dir, exist_ok=True)
+        return self._spill_dir
+
+    def _drop_spilled(self, key: str):
+        spilled = self._spilled.pop(key, None)
+        if spilled:
+            try:
+                os.remove(spilled[0])
+            except OSError:
+                pass
+
+    def _drop_stale(self, key: str):
+        """Сессия устарела: исходный файл изменился после загрузки"""
+        self._sessions.pop(key, None)
+        self._drop_spilled(key)
+        self._stats['stale_dropped'] += 1
+        self._stats['misses'] += 1
+        self.logger.info(f"Сессия {key} устарела и удалена")
+
+    # === ВСПОМОГАТЕЛЬНЫЕ МЕТОДЫ ===
+
+    def _memory_used(self) -> int:
+        return sum(s.size_bytes for s in self._sessions.values())
+
+    def _estimate_snapshot_size(self, snapshot: SessionSnapshot) -> int:
+        """Оценка размера сессии в памяти по DataFrame"""
+        try:
+            data = getattr(snapshot.telemetry_data, 'data', None)
+            if data is not None:
+                return int(data.memory_usage(index=True, deep=True).sum())
+        except Exception as e:
+            self.logger.debug(f"Не удалось оценить размер сессии: {e}")
+        return 0
+
+    @staticmethod
+    def _normalize_key(file_path: str) -> str:
+        return os.path.normcase(os.path.abspath(file_path))
+
+    @staticmethod
+    def _get_file_signature(file_path: str) -> tuple:
+        try:
+            stat = os.stat(file_path)
+            return stat.st_mtime, stat.st_size
+        except OSError:
+            return 0.0, 0
+
+    def __del__(self):
+        try:
+            self.cleanup()
+        except Exception:
+            pass
@@ -26,6 +26,13 @@ except ImportError as e:
     TelemetryData = None
     Parameter = None
 
+# Векторизованный анализ изменяемости
+try:
+    from ...core.domain.services.change_analysis_engine import ChangeAnalysisEngine
+except ImportError as e:
+    logging.warning(f"ChangeAnalysisEngine недоступен: {e}")
+    ChangeAnalysisEngine = None
+
 
 class CSVDataLoader:
     """ПОЛНЫЙ загрузчик CSV данных с обработкой сложной структуры и приоритетной логикой"""
@@ -35,6 +42,7 @@ class CSVDataLoader:
 
         # Инициализация WagonConfig
         self.wagon_config = WagonConfig(self) if WagonConfig else None
+        self.change_engine = ChangeAnalysisEngine() if ChangeAnalysisEngine else None
 
         # Состояние для совместимости с legacy и main.py
         self.parameters = []
@@ -51,6 +59,7 @@ class CSVDataLoader:
         # Кэш для производительности
         self._encoding_cache = {}
         self._structure_cache = {}
+        self._column_index: Optional[Tuple[Any, Dict[str, str]]] = None
 
         # Статистика загрузки
         self._load_statistics = {}
@@ -1323,80 +1332,35 @@ class CSVDataLoader:
             self.logger.info(
                 f"ПРИОРИТЕТНАЯ фильтрация изменяемых параметров: {start_time} - {end_time}")
 
-            # КРИТИЧНО: Фильтруем данные по временному диапазону
+            # КРИТИЧНО: Определяем строки временного диапазона
             if 'timestamp' in self.data.columns:
                 # Преобразуем строки времени в datetime для корректного сравнения
-                start_dt = pd.to_datetime(start_time)
-                end_dt = pd.to_datetime(end_time)
-                data_timestamps = pd.to_datetime(self.data['timestamp'])
-
-                mask = (data_timestamps >= start_dt) & (
-                    data_timestamps <= end_dt)
-                filtered_data = self.data[mask]
+                rows = self.change_engine.resolve_rows(
+                    self.data, pd.to_datetime(start_time), pd.to_datetime(end_time))
 
                 self.logger.info(
-                    f"Отфильтровано по времени: {len(filtered_data)} записей из {len(self.data)} (диапазон: {start_time} - {end_time})")
+                    f"Отфильтровано по времени: {self.change_engine.count_rows(rows)} записей из {len(self.data)} (диапазон: {start_time} - {end_time})")
             else:
                 self.logger.warning(
                     "Столбец timestamp не найден, используем все данные")
-                filtered_data = self.data
+                rows = slice(0, len(self.data))
 
-            if filtered_data.empty:
+            if self.change_engine.count_rows(rows) == 0:
                 self.logger.warning(
                     f"Нет данных в диапазоне {start_time} - {end_time}")
                 return []
 
-            changed_params = []
             all_params = self.get_parameters()
 
-            for param in all_params:
-                signal_code = param.get('signal_code', '')
+            # Столбец параметра определяется по словарю, а не линейным поиском
+            param_columns = [self._resolve_parameter_column(param) for param in all_params]
 
-                # Ищем столбец с данными параметра
-                param_column = None
-                for col in filtered_data.columns:
-                    if signal_code in col:
-                        param_column = col
-                        break
-
-                if param_column and param_column in filtered_data.columns:
-                    # РЕАЛЬНЫЙ анализ изменяемости в указанном временном диапазоне
-                    param_values = filtered_data[param_column].dropna()
+            # РЕАЛЬНЫЙ анализ изменяемости: префиксный индекс окон + точный досчет спорных столбцов
+            changed_columns = self.change_engine.changed_columns(
+                self.data, [c for c in param_columns if c is not None], rows, threshold, rule='loader')
 
-                    if len(param_values) > 1:
-                        # Проверяем, изменяются ли значения
-                        unique_values = param_values.nunique()
-                        total_values = len(param_values)
-
-                        if unique_values > 1:
-                            # Вычисляем коэффициент вариации
-                            try:
-                                if param_values.dtype in ['float64', 'int64']:
-                                    std_dev = param_values.std()
-                                    mean_val = param_values.mean()
-
-                                    if mean_val != 0:
-                                        cv = std_dev / abs(mean_val)
-                                        if cv > threshold:
-                                            changed_params.append(param)
-                                            self.logger.debug(
-                                                f"Параметр {signal_code} изменяется (CV={cv:.3f}) в диапазоне {start_time}-{end_time}")
-                                    else:
-                                        # Для нулевого среднего проверяем просто наличие разных значений
-                                        if std_dev > 0:
-                                            changed_params.append(param)
-                                            self.logger.debug(
-                                                f"Параметр {signal_code} изменяется (std={std_dev:.3f}) в диапазоне {start_time}-{end_time}")
-                                else:
-                                    # Для нечисловых данных проверяем долю уникальных значений
-                                    uniqueness_ratio = unique_values / total_values
-                                    if uniqueness_ratio > threshold:
-                                        changed_params.append(param)
-                                        self.logger.debug(
-                                            f"Параметр {signal_code} изменяется (uniqueness={uniqueness_ratio:.3f}) в диапазоне {start_time}-{end_time}")
-                            except Exception as e:
-                                self.logger.debug(
-                                    f"Ошибка анализа параметра {signal_code}: {e}")
+            changed_params = [param for param, param_column in zip(all_params, param_columns)
+                              if param_column is not None and param_column in changed_columns]
 
             self.logger.info(
                 f"Найдено {len(changed_params)} изменяемых параметров из {len(all_params)} в диапазоне {start_time} - {end_time}")
@@ -1406,6 +1370,32 @@ class CSVDataLoader:
             self.logger.error(f"Ошибка фильтрации изменяемых параметров: {e}")
             return []
 
+    def _resolve_parameter_column(self, param: Dict[str, Any]) -> Optional[str]:
+        """Столбец данных параметра: full_column, код сигнала из заголовка или подстрока"""
+        columns = self.data.columns
+
+        full_column = param.get('full_column')
+        if full_column and full_column in columns:
+            return full_column
+
+        signal_code = param.get('signal_code', '')
+        if not signal_code:
+            return None
+
+        # Индекс "код сигнала -> первый столбец" строится один раз для текущих данных
+        if self._column_index is None or self._column_index[0] is not columns:
+            mapping = {}
+            for col in columns:
+                mapping.setdefault(str(col).split('::', 1)[0].strip(), col)
+            self._column_index = (columns, mapping)
+
+        column = self._column_index[1].get(signal_code)
+        if column is not None:
+            return column
+
+        # Совместимость: первый столбец, содержащий код сигнала
+        return next((col for col in columns if signal_code in col), None)
+
     def _detailed_change_analysis(self, series: pd.Series, threshold: float) -> bool:
         """НОВЫЙ МЕТОД: Детальный анализ изменяемости с threshold"""
         try:
@@ -1447,6 +1437,7 @@ class CSVDataLoader:
             self._clear_previous_data()
             self._encoding_cache.clear()
             self._structure_cache.clear()
+            self._column_index = None
             self._load_statistics.clear()
             self.logger.info("CSVDataLoader очищен")
         except Exception as e:
@@ -261,9 +261,13 @@ class PlotBuilder:
             # Ограничение количества параметров
             params = params[:self.max_params_per_plot]
 
+            # Для ступенчатых графиков достаточно точек переходов из индекса
+            step_window = self._get_step_window(start_time, end_time, filtered_df) \
+                if strategy == 'step' else None
+
             # Построение линий для каждого параметра
             lines_plotted = self._plot_parameters(
-                ax, params, filtered_df, strategy)
+                ax, params, filtered_df, strategy, step_window)
 
             if lines_plotted == 0:
                 self._show_no_data_message(
@@ -287,7 +291,7 @@ class PlotBuilder:
             return fig, ax
 
     def _plot_parameters(self, ax, params: List[Dict[str, Any]], 
-                         filtered_df, strategy: str) -> int:
+                         filtered_df, strategy: str, step_window: Optional[slice] = None) -> int:
         """ИСПРАВЛЕННОЕ построение параметров на графике"""
         if filtered_df.empty:
             self.logger.error("DataFrame пуст")
@@ -311,14 +315,20 @@ class PlotBuilder:
 
         plot_strategy = self.strategies.get(strategy, self.strategies['step'])
         lines_plotted = 0
+        plotted_columns = []
 
         for idx, param in enumerate(params):
             try:
                 # ИСПРАВЛЕНИЕ: Множественные способы поиска столбца
                 col_name = None
-                
+
+                # Виртуальный канал: значения вычисляются только для окна графика
+                virtual_values = self._get_virtual_values(param.get('full_column'), filtered_df, step_window)
+                if virtual_values is not None:
+                    col_name = param['full_column']
+
                 # Способ 1: По full_column
-                if param.get('full_column') and param['full_column'] in filtered_df.columns:
+                elif param.get('full_column') and param['full_column'] in filtered_df.columns:
                     col_name = param['full_column']
                     self.logger.debug(f"Столбец найден по full_column: {col_name}")
                 
@@ -348,11 +358,21 @@ class PlotBuilder:
                     continue
 
                 # Преобразование значений в числовой формат
-                values = pd.to_numeric(filtered_df[col_name], errors='coerce')
+                if virtual_values is not None:
+                    values = pd.Series(virtual_values, index=filtered_df.index)
+                else:
+                    values = pd.to_numeric(filtered_df[col_name], errors='coerce')
                 if values.dropna().empty:
                     self.logger.warning(f"Нет валидных данных в столбце: {col_name}")
                     continue
 
+                x_data = timestamps_num
+                step_rows = self._get_step_rows(col_name, step_window) if virtual_values is None else None
+                if step_rows is not None:
+                    source = self.data_loader.data
+                    x_data = mdates.date2num(source[timestamp_col].iloc[step_rows])
+                    values = pd.to_numeric(source[col_name].iloc[step_rows], errors='coerce')
+
                 # Создание метки для легенды
                 label = self._create_parameter_label(param, idx, col_name)
 
@@ -361,19 +381,95 @@ class PlotBuilder:
 
                 # Построение линии с использованием стратегии
                 plot_strategy.plot(
-                    ax, timestamps_num, values, label=label,
+                    ax, x_data, values, label=label,
                     color=color, linewidth=1.5, alpha=0.8
                 )
 
                 lines_plotted += 1
+                plotted_columns.append((col_name, color))
                 self.logger.debug(f"Построен график для: {col_name}")
 
             except Exception as e:
                 self.logger.warning(f"Ошибка построения параметра {param.get('signal_code', 'Unknown')}: {e}")
                 continue
 
+        self._shade_rule_violations(ax, plotted_columns, timestamps_num[0], timestamps_num[-1])
         return lines_plotted
 
+    def _shade_rule_violations(self, ax, plotted_columns: List[tuple], window_start: float, window_end: float):
+        """Закраска интервалов нарушений правил контроля для построенных столбцов
+
+        Интервал, общий для нескольких столбцов (одно правило), закрашивается
+        один раз цветом первого из них; в легенду попадает одна метка.
+        """
+        shaded = set()
+        for col_name, color in plotted_columns:
+            try:
+                intervals = self._get_rule_violation_intervals(col_name)
+                if intervals is None or not len(intervals):
+                    continue
+                for start, end in zip(mdates.date2num(intervals[:, 0]), mdates.date2num(intervals[:, 1])):
+                    start, end = max(start, window_start), min(end, window_end)
+                    if start >= end or (start, end) in shaded:
+                        continue
+                    ax.axvspan(start, end, color=color, alpha=0.15, linewidth=0,
+                               label="Нарушение правил" if not shaded else None)
+                    shaded.add((start, end))
+            except Exception as e:
+                self.logger.debug(f"Нарушения правил для {col_name} не отмечены: {e}")
+
+    def _get_rule_violation_intervals(self, col_name: str) -> Optional[np.ndarray]:
+        """Интервалы нарушений последнего набора правил с участием столбца (None - правила не вычислены)"""
+        report = getattr(self.data_loader, 'rule_report', None)
+        if report is None:
+            return None
+        return report.intervals(col_name)
+
+    def _get_step_window(self, start_time: datetime, end_time: datetime,
+                         filtered_df) -> Optional[slice]:
+        """Непрерывный срез строк окна в исходных данных (None если индекс переходов неприменим)"""
+        try:
+            change_engine = getattr(self.data_loader, 'change_engine', None)
+            data = getattr(self.data_loader, 'data', None)
+            if change_engine is None or data is None or 'timestamp' not in data.columns:
+                return None
+
+            rows = change_engine.resolve_rows(data, start_time, end_time)
+            if isinstance(rows, slice) and change_engine.count_rows(rows) == len(filtered_df):
+                return rows
+        except Exception as e:
+            self.logger.debug(f"Окно ступенчатого графика не определено: {e}")
+        return None
+
+    def _get_virtual_values(self, col_name: Optional[str], filtered_df,
+                            step_window: Optional[slice]) -> Optional[np.ndarray]:
+        """Значения виртуального канала для строк окна графика (None - столбец не виртуальный)"""
+        registry = getattr(self.data_loader, 'virtual_channels', None)
+        if registry is None or not registry.is_virtual(col_name):
+            return None
+        try:
+            rows = step_window
+            if rows is None:
+                rows = self.data_loader.data.index.get_indexer(filtered_df.index)
+                if (rows < 0).any():
+                    self.logger.warning(f"Строки окна не найдены в записи, канал {col_name} не построен")
+                    return None
+            return registry.values(col_name, rows)
+        except Exception as e:
+            self.logger.warning(f"Виртуальный канал {col_name} не вычислен: {e}")
+            return None
+
+    def _get_step_rows(self, col_name: str, step_window: Optional[slice]) -> Optional[np.ndarray]:
+        """Опорные строки ступенчатого графика: начало окна, переходы и конец окна"""
+        if step_window is None:
+            return None
+        try:
+            change_points = self.data_loader.change_engine.get_change_points(self.data_loader.data)
+            return change_points.step_rows(col_name, step_window)
+        except Exception as e:
+            self.logger.debug(f"Переходы для {col_name} недоступны: {e}")
+            return None
+
     def _create_parameter_label(self, param: Dict[str, Any], index: int, col_name: str = None) -> str:
         """УЛУЧШЕННОЕ создание метки для параметра"""
         signal_code = param.get('signal_code', col_name or f'Param_{index}')
@@ -540,6 +540,12 @@ class PDFRenderer:
             if not data_loader:
                 self.logger.error("❌ data_loader не передан")
                 return []
+
+            # Переходы из индекса точек изменения записи (без обхода строк)
+            indexed_changes = self._extract_changes_from_index(
+                params, start_time_str, end_time_str, data_loader)
+            if indexed_changes is not None:
+                return indexed_changes
             
             # Получаем отфильтрованные данные
             filtered_df = None
@@ -643,6 +649,48 @@ class PDFRenderer:
             self.logger.error(f"Ошибка извлечения изменений параметров: {e}")
             return []
 
+    def _extract_changes_from_index(self, params: List[Dict], start_time_str: str,
+                                    end_time_str: str, data_loader) -> Optional[List[Dict]]:
+        """Изменения параметров из индекса переходов (None если индекс недоступен)"""
+        import pandas as pd
+        from datetime import datetime
+
+        data = getattr(data_loader, 'data', None)
+        change_engine = getattr(data_loader, 'change_engine', None)
+        if change_engine is None or not isinstance(data, pd.DataFrame) or 'timestamp' not in data.columns:
+            return None
+
+        columns = {}
+        for param in params[:10]:  # Ограничиваем до 10 параметров
+            col = param.get('full_column') or param.get('signal_code')
+            if col and col in data.columns:
+                columns.setdefault(col, param.get('signal_code', col))
+
+        events = change_engine.query_transitions(
+            data, list(columns),
+            datetime.strptime(start_time_str, '%Y-%m-%d %H:%M:%S'),
+            datetime.strptime(end_time_str, '%Y-%m-%d %H:%M:%S'))
+
+        changes_data = []
+        if events.empty:
+            return changes_data
+
+        times = pd.to_datetime(events['timestamp']).dt.strftime("%H:%M:%S.%f").str[:-3]
+        for time_str, column, prev_value, value in zip(times, events['column'],
+                                                      events['old_value'], events['new_value']):
+            change = value - prev_value
+            if abs(change) > 0.001:  # Только значимые изменения
+                changes_data.append({
+                    'timestamp': time_str,
+                    'parameter': columns[column],
+                    'prev_value': f"{prev_value:.3f}" if isinstance(prev_value, float) else str(prev_value),
+                    'new_value': f"{value:.3f}" if isinstance(value, float) else str(value),
+                    'change': f"{change:+.3f}" if abs(change) < 1000 else f"{change:+.0f}"
+                })
+
+        self.logger.info(f"✅ Найдено {len(changes_data)} изменений (индекс переходов)")
+        return changes_data
+
     def _generate_sample_changes(self, params: List[Dict], start_time_str: str, end_time_str: str) -> List[Dict]:
         """НОВЫЙ: Генерация примеров изменений для демонстрации"""
         try:
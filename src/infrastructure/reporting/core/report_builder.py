@@ -91,6 +91,23 @@ class TelemetryReportTemplate(ReportTemplate):
                     metadata={'block_id': block_id}
                 ))
         
+        # Правила контроля: сводка по всей записи и нарушения за период
+        if data.get('rule_summary'):
+            sections.append(ReportSection(
+                title="Правила контроля",
+                content=data['rule_summary'],
+                section_type="table"
+            ))
+        if data.get('rule_violations'):
+            total = data.get('rule_violations_total', len(data['rule_violations']))
+            shown = len(data['rule_violations'])
+            sections.append(ReportSection(
+                title=f"Нарушения правил контроля за период ({shown} из {total})" if total > shown
+                else "Нарушения правил контроля за период",
+                content=data['rule_violations'],
+                section_type="table"
+            ))
+
         # Аналитическая секция
         sections.append(ReportSection(
             title="Анализ изменений",
@@ -23,6 +23,8 @@ except ImportError:
 
 class ReportManager:
     """Менеджер отчетов с полной функциональностью"""
+
+    MAX_RULE_VIOLATION_ROWS = 200
     
     def __init__(self, data_loader=None, plot_service=None):
         self.data_loader = data_loader
@@ -59,7 +61,8 @@ class ReportManager:
                 'subtitle': f"Период: {start_time.strftime('%Y-%m-%d %H:%M:%S')} - {end_time.strftime('%Y-%m-%d %H:%M:%S')}",
                 'data_loader': self.data_loader,  # ДОБАВЛЯЕМ data_loader
                 'total_blocks': 1,
-                'total_params': len(selected_params)
+                'total_params': len(selected_params),
+                **self._collect_rule_tables(start_time, end_time)
             }
             
             # Построение отчета
@@ -126,38 +129,14 @@ class ReportManager:
                 return False
             
             import pandas as pd
-            
-            filtered_df = self.data_loader.filter_by_time_range(start_time, end_time)
-            changes_data = []
-            
-            for param in params:
-                col = param.get('full_column')
-                signal_code = param.get('signal_code', col)
-                
-                if col not in filtered_df.columns:
-                    continue
-                    
-                values = pd.to_numeric(filtered_df[col], errors='coerce')
-                if values.dropna().empty:
-                    continue
-                
-                prev_value = None
-                for i, val in enumerate(values):
-                    if pd.isna(val):
-                        continue
-                        
-                    if prev_value is not None and val != prev_value:
-                        timestamp = filtered_df['timestamp'].iloc[i]
-                        changes_data.append({
-                            'Время': timestamp.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
-                            'Параметр': signal_code,
-                            'Описание': param.get('description', ''),
-                            'Предыдущее значение': prev_value,
-                            'Новое значение': val,
-                            'Изменение': val - prev_value if isinstance(val, (int, float)) and isinstance(prev_value, (int, float)) else 'N/A'
-                        })
-                    
-                    prev_value = val
+
+            change_engine = getattr(self.data_loader, 'change_engine', None)
+            data = getattr(self.data_loader, 'data', None)
+
+            if change_engine is not None and isinstance(data, pd.DataFrame) and 'timestamp' in data.columns:
+                changes_data = self._collect_indexed_changes(change_engine, data, params, start_time, end_time)
+            else:
+                changes_data = self._collect_scanned_changes(params, start_time, end_time)
             
             if changes_data:
                 changes_df = pd.DataFrame(changes_data)
@@ -172,6 +151,137 @@ class ReportManager:
             self.logger.error(f"Ошибка экспорта изменений в CSV: {e}")
             return False
 
+    def _collect_indexed_changes(self, change_engine, data, params: List[Dict[str, Any]],
+                                 start_time: datetime, end_time: datetime) -> List[Dict[str, Any]]:
+        """Изменения параметров из индекса переходов, в хронологическом порядке"""
+        registry = getattr(self.data_loader, 'virtual_channels', None)
+        params_by_column = {}
+        virtual_columns = []
+        for param in params:
+            col = param.get('full_column')
+            if col in data.columns:
+                params_by_column.setdefault(col, param)
+            elif registry is not None and registry.is_virtual(col) and col not in virtual_columns:
+                virtual_columns.append(col)
+                params_by_column[col] = param
+
+        events = change_engine.query_transitions(
+            data, [col for col in params_by_column if col not in virtual_columns], start_time, end_time)
+        if virtual_columns:
+            events = self._merge_virtual_transitions(events, registry, virtual_columns,
+                                                     change_engine.resolve_rows(data, start_time, end_time), data)
+
+        changes_data = []
+        for timestamp, column, prev_value, val in zip(events['timestamp'], events['column'],
+                                                      events['old_value'], events['new_value']):
+            param = params_by_column[column]
+            changes_data.append({
+                'Время': timestamp.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+                'Параметр': param.get('signal_code', column),
+                'Описание': param.get('description', ''),
+                'Предыдущее значение': prev_value,
+                'Новое значение': val,
+                'Изменение': val - prev_value if isinstance(val, (int, float)) and isinstance(prev_value, (int, float)) else 'N/A'
+            })
+        return changes_data
+
+    @staticmethod
+    def _merge_virtual_transitions(events, registry, columns: List[str], rows, data):
+        """Переходы виртуальных каналов в окне, объединенные с переходами записи по номеру строки"""
+        import pandas as pd
+
+        parts = [events] if len(events) else []
+        for column in columns:
+            window = registry.transitions(column, rows)
+            if len(window):
+                parts.append(pd.DataFrame({
+                    'row': window.rows,
+                    'timestamp': data['timestamp'].to_numpy()[window.rows],
+                    'column': column,
+                    'old_value': pd.Series(window.old_values, dtype=object),
+                    'new_value': pd.Series(window.new_values, dtype=object)
+                }))
+        if not parts:
+            return events
+        return pd.concat(parts, ignore_index=True).sort_values('row', kind='stable', ignore_index=True)
+
+    def _collect_rule_tables(self, start_time: datetime, end_time: datetime) -> Dict[str, Any]:
+        """Таблицы правил контроля для отчета: сводка по записи и нарушения за период отчета"""
+        try:
+            report = getattr(self.data_loader, 'rule_report', None) if self.data_loader else None
+            if report is None or not report.rules:
+                return {}
+
+            summary = [{
+                'Правило': row['rule'],
+                'Условие': row['condition'],
+                'Нарушений': row['violations'],
+                'Вагоны': ', '.join(row['wagons']) or '-',
+                'Всего, с': row['total_seconds'],
+                'Наибольшее, с': row['longest_seconds'],
+                'Ошибка': row['error'] or ''
+            } for row in report.summary()]
+
+            import pandas as pd
+
+            frame = report.as_frame()
+            frame['start'] = pd.to_datetime(frame['start'])
+            frame['end'] = pd.to_datetime(frame['end'])
+            frame = frame[(frame['end'] >= pd.Timestamp(start_time)) & (frame['start'] <= pd.Timestamp(end_time))]
+            violations = [{
+                'Правило': row.rule,
+                'Вагон': row.wagon_name,
+                'Начало': row.start.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3],
+                'Конец': row.end.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3] + (' (до конца записи)' if row.open_at_end else ''),
+                'Длительность, с': round(float(row.duration_seconds), 3)
+            } for row in frame.head(self.MAX_RULE_VIOLATION_ROWS).itertuples(index=False)]
+
+            return {'rule_summary': summary, 'rule_violations': violations,
+                    'rule_violations_total': len(frame)}
+
+        except Exception as e:
+            self.logger.error(f"Ошибка подготовки таблиц правил контроля: {e}")
+            return {}
+
+    def _collect_scanned_changes(self, params: List[Dict[str, Any]],
+                                 start_time: datetime, end_time: datetime) -> List[Dict[str, Any]]:
+        """Изменения параметров построчным обходом (загрузчик без индекса переходов)"""
+        import pandas as pd
+
+        filtered_df = self.data_loader.filter_by_time_range(start_time, end_time)
+        changes_data = []
+        
+        for param in params:
+            col = param.get('full_column')
+            signal_code = param.get('signal_code', col)
+            
+            if col not in filtered_df.columns:
+                continue
+                
+            values = pd.to_numeric(filtered_df[col], errors='coerce')
+            if values.dropna().empty:
+                continue
+            
+            prev_value = None
+            for i, val in enumerate(values):
+                if pd.isna(val):
+                    continue
+                    
+                if prev_value is not None and val != prev_value:
+                    timestamp = filtered_df['timestamp'].iloc[i]
+                    changes_data.append({
+                        'Время': timestamp.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+                        'Параметр': signal_code,
+                        'Описание': param.get('description', ''),
+                        'Предыдущее значение': prev_value,
+                        'Новое значение': val,
+                        'Изменение': val - prev_value if isinstance(val, (int, float)) and isinstance(prev_value, (int, float)) else 'N/A'
+                    })
+                
+                prev_value = val
+
+        return changes_data
+
     def get_report_summary(self, plot_blocks_data: Dict[str, List[str]]) -> Dict[str, Any]:
         """Получение сводки по отчету"""
         try:
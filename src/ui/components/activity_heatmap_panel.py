@@ -0,0 +1,222 @@
+"""
+Тепловая карта активности параметров по времени записи с выбором диапазона кликом
+"""
+import tkinter as tk
+from tkinter import ttk
+import logging
+from typing import Any, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class ActivityHeatmapPanel(ttk.Frame):
+    """Тепловая карта параметры x временные корзины
+
+    Карта рисуется одним изображением PhotoImage (пиксель на ячейку с
+    масштабированием), поэтому сотни параметров на тысячах корзин не
+    создают отдельных объектов холста. Клик по ячейке задает диапазон
+    анализа равным корзине, протягивание - диапазону корзин.
+    """
+
+    BUCKET_CHOICES = {'10 с': 10, '30 с': 30, '1 мин': 60, '5 мин': 300, '10 мин': 600}
+    METRIC_CHOICES = {'Переключения': 'changes', 'Дисперсия': 'variance'}
+    LABEL_WIDTH = 220
+    AXIS_HEIGHT = 24
+
+    def __init__(self, parent, controller=None):
+        super().__init__(parent)
+        self.controller = controller
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self.bucket_var = tk.StringVar(value='1 мин')
+        self.metric_var = tk.StringVar(value='Переключения')
+        self.top_var = tk.IntVar(value=60)
+        self.status_var = tk.StringVar(value="Выберите ширину корзины и нажмите «Построить»")
+
+        self.matrix = None
+        self._image: Optional[tk.PhotoImage] = None
+        self._cell: Tuple[int, int] = (1, 1)
+        self._drag_start: Optional[int] = None
+        self._selection = None
+
+        self._palette = np.array([self._color(i / 255) for i in range(256)])
+
+        self._setup_ui()
+
+    def _setup_ui(self):
+        controls = ttk.Frame(self)
+        controls.pack(fill=tk.X, padx=5, pady=5)
+
+        ttk.Label(controls, text="Корзина:").pack(side=tk.LEFT)
+        ttk.Combobox(controls, textvariable=self.bucket_var, values=list(self.BUCKET_CHOICES),
+                     width=8, state='readonly').pack(side=tk.LEFT, padx=(2, 10))
+        ttk.Label(controls, text="Метрика:").pack(side=tk.LEFT)
+        ttk.Combobox(controls, textvariable=self.metric_var, values=list(self.METRIC_CHOICES),
+                     width=13, state='readonly').pack(side=tk.LEFT, padx=(2, 10))
+        ttk.Label(controls, text="Параметров:").pack(side=tk.LEFT)
+        ttk.Spinbox(controls, from_=5, to=500, increment=5, textvariable=self.top_var,
+                    width=5).pack(side=tk.LEFT, padx=(2, 10))
+        ttk.Button(controls, text="Построить", command=self.refresh).pack(side=tk.LEFT)
+
+        body = ttk.Frame(self)
+        body.pack(fill=tk.BOTH, expand=True, padx=5)
+        body.grid_rowconfigure(0, weight=1)
+        body.grid_columnconfigure(0, weight=1)
+
+        self.canvas = tk.Canvas(body, background='white', highlightthickness=0)
+        self.canvas.grid(row=0, column=0, sticky='nsew')
+        y_scroll = ttk.Scrollbar(body, orient=tk.VERTICAL, command=self.canvas.yview)
+        y_scroll.grid(row=0, column=1, sticky='ns')
+        x_scroll = ttk.Scrollbar(body, orient=tk.HORIZONTAL, command=self.canvas.xview)
+        x_scroll.grid(row=1, column=0, sticky='ew')
+        self.canvas.configure(xscrollcommand=x_scroll.set, yscrollcommand=y_scroll.set)
+
+        self.canvas.bind('<Motion>', self._on_motion)
+        self.canvas.bind('<ButtonPress-1>', self._on_press)
+        self.canvas.bind('<B1-Motion>', self._on_drag)
+        self.canvas.bind('<ButtonRelease-1>', self._on_release)
+
+        ttk.Label(self, textvariable=self.status_var, anchor=tk.W).pack(fill=tk.X, padx=5, pady=(2, 5))
+
+    # === ПОСТРОЕНИЕ ===
+
+    def refresh(self):
+        """Запрос матрицы у модели и перерисовка карты"""
+        try:
+            model = getattr(self.controller, 'model', None)
+            if model is None or not hasattr(model, 'get_activity_matrix'):
+                self.status_var.set("Модель данных недоступна")
+                return
+
+            matrix = model.get_activity_matrix(
+                bucket_seconds=self.BUCKET_CHOICES.get(self.bucket_var.get(), 60),
+                metric=self.METRIC_CHOICES.get(self.metric_var.get(), 'changes'),
+                top_n=max(1, int(self.top_var.get()))
+            )
+            if matrix is None or not len(matrix):
+                self.status_var.set("Нет данных для карты активности")
+                return
+
+            self.show_matrix(matrix)
+
+        except Exception as e:
+            self.logger.error(f"Ошибка построения карты активности: {e}")
+            self.status_var.set(f"Ошибка: {e}")
+
+    def show_matrix(self, matrix):
+        """Отрисовка готовой матрицы активности"""
+        self.matrix = matrix
+        n_rows, n_buckets = matrix.values.shape
+
+        cell_w = int(np.clip(900 // max(n_buckets, 1), 1, 16))
+        cell_h = int(np.clip(600 // max(n_rows, 1), 6, 16))
+        self._cell = (cell_w, cell_h)
+
+        # Логарифмическая шкала: редкие переключения видны рядом с частыми
+        values = np.log1p(np.nan_to_num(matrix.values, nan=0.0))
+        peak = values.max() if values.size else 0.0
+        levels = (values / peak * 255).astype(np.int64) if peak > 0 else np.zeros(values.shape, dtype=np.int64)
+        colors = self._palette[levels]
+        colors[np.isnan(matrix.values)] = '#d0d0d0'
+
+        image = tk.PhotoImage(width=n_buckets, height=n_rows)
+        image.put(' '.join('{' + ' '.join(row) + '}' for row in colors))
+        self._image = image.zoom(cell_w, cell_h)
+
+        self.canvas.delete('all')
+        self._selection = None
+        self.canvas.create_image(self.LABEL_WIDTH, 0, image=self._image, anchor=tk.NW)
+
+        for i, column in enumerate(matrix.columns):
+            self.canvas.create_text(self.LABEL_WIDTH - 4, i * cell_h + cell_h / 2, text=column,
+                                    anchor=tk.E, font=('Arial', 7 if cell_h < 10 else 8))
+
+        height = n_rows * cell_h
+        tick_every = max(1, int(np.ceil(90 / cell_w)))
+        for j in range(0, n_buckets, tick_every):
+            x = self.LABEL_WIDTH + j * cell_w
+            self.canvas.create_line(x, height, x, height + 4)
+            self.canvas.create_text(x, height + 6, text=pd.Timestamp(matrix.bucket_starts[j]).strftime('%H:%M:%S'),
+                                    anchor=tk.N, font=('Arial', 7))
+
+        self.canvas.configure(scrollregion=(0, 0, self.LABEL_WIDTH + n_buckets * cell_w,
+                                            height + self.AXIS_HEIGHT))
+        self.status_var.set(f"{n_rows} параметров x {n_buckets} корзин по {matrix.bucket_seconds:g} с. "
+                            f"Клик - диапазон корзины, протягивание - диапазон нескольких корзин")
+
+    @staticmethod
+    def _color(level: float) -> str:
+        """Цвет шкалы: белый - нет активности, желтый - средняя, темно-красный - максимальная"""
+        if level <= 0:
+            return '#ffffff'
+        if level < 0.5:
+            t = level / 0.5
+            return '#%02x%02x%02x' % (255, 255, int(220 * (1 - t)))
+        t = (level - 0.5) / 0.5
+        return '#%02x%02x%02x' % (int(255 - 115 * t), int(255 * (1 - t)), 0)
+
+    # === ВЗАИМОДЕЙСТВИЕ ===
+
+    def _cell_at(self, event) -> Optional[Tuple[int, int]]:
+        """Ячейка (строка, корзина) под курсором"""
+        if self.matrix is None:
+            return None
+        x = self.canvas.canvasx(event.x) - self.LABEL_WIDTH
+        y = self.canvas.canvasy(event.y)
+        row, bucket = int(y // self._cell[1]), int(x // self._cell[0])
+        if x < 0 or not (0 <= row < len(self.matrix) and 0 <= bucket < self.matrix.bucket_count):
+            return None
+        return row, bucket
+
+    def _on_motion(self, event):
+        cell = self._cell_at(event)
+        if cell is None:
+            return
+        row, bucket = cell
+        start, end = self.matrix.bucket_bounds(bucket)
+        value = self.matrix.values[row, bucket]
+        value_text = 'нет данных' if np.isnan(value) else f"{value:g}"
+        self.status_var.set(f"{self.matrix.columns[row]} | {start:%H:%M:%S} - {end:%H:%M:%S} | {value_text}")
+
+    def _on_press(self, event):
+        cell = self._cell_at(event)
+        self._drag_start = cell[1] if cell else None
+        if cell:
+            self._draw_selection(cell[1], cell[1])
+
+    def _on_drag(self, event):
+        cell = self._cell_at(event)
+        if cell and self._drag_start is not None:
+            self._draw_selection(self._drag_start, cell[1])
+
+    def _on_release(self, event):
+        cell = self._cell_at(event)
+        if cell is None or self._drag_start is None:
+            return
+        first, last = self._drag_start, cell[1]
+        self._drag_start = None
+        self.select_buckets(first, last)
+
+    def _draw_selection(self, first: int, last: int):
+        first, last = sorted((first, last))
+        cell_w = self._cell[0]
+        if self._selection is not None:
+            self.canvas.delete(self._selection)
+        self._selection = self.canvas.create_rectangle(
+            self.LABEL_WIDTH + first * cell_w, 0, self.LABEL_WIDTH + (last + 1) * cell_w,
+            len(self.matrix) * self._cell[1], outline='#1f5fbf', width=2)
+
+    def select_buckets(self, first: int, last: int):
+        """Установка диапазона анализа по корзинам first..last"""
+        try:
+            from_time, to_time = self.matrix.time_range(first, last)
+            if self.controller and hasattr(self.controller, 'set_analysis_time_range'):
+                self.controller.set_analysis_time_range(from_time, to_time)
+            self.status_var.set(f"Диапазон анализа: {from_time} - {to_time}")
+        except Exception as e:
+            self.logger.error(f"Ошибка установки диапазона по карте активности: {e}")
+
+    def cleanup(self):
+        self.matrix = None
+        self._image = None
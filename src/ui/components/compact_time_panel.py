@@ -21,6 +21,8 @@ class CompactTimePanel(ttk.Frame):
         self.duration_var = tk.StringVar(value="Длительность: --")
         self.params_count_var = tk.StringVar(value="Параметров: 0")
         self.changed_only_var = tk.BooleanVar()
+        self.threshold_var = tk.DoubleVar(value=0.1)
+        self.threshold_text_var = tk.StringVar(value="Порог: 0.10")
 
         # Таймер для отложенного пересчета
         self._recalc_timer = None
@@ -235,6 +237,13 @@ class CompactTimePanel(ttk.Frame):
         priority_label = ttk.Label(info_frame, text="⚡ Приоритет", font=('Arial', 8), foreground='red')
         priority_label.grid(row=0, column=2, sticky="w", padx=(0, 20))
 
+        # Порог изменяемости: пересчет по готовым оценкам окна
+        ttk.Label(info_frame, textvariable=self.threshold_text_var, font=('Arial', 9)).grid(
+            row=0, column=3, sticky="w", padx=(0, 5))
+        threshold_scale = ttk.Scale(info_frame, from_=0.01, to=1.0, orient=tk.HORIZONTAL, length=120,
+                                    variable=self.threshold_var, command=self._on_threshold_changed)
+        threshold_scale.grid(row=0, column=4, sticky="w", padx=(0, 20))
+
         # Кнопки управления
         controls_frame = ttk.Frame(row2_frame)
         controls_frame.grid(row=0, column=1, sticky="e")
@@ -242,6 +251,16 @@ class CompactTimePanel(ttk.Frame):
         ttk.Button(controls_frame, text="Применить", command=self._apply_filters_priority, width=10).grid(row=0, column=0, padx=(0, 5))
         ttk.Button(controls_frame, text="Сброс", command=self._reset_time, width=8).grid(row=0, column=1)
 
+    def _on_threshold_changed(self, value=None):
+        """Передача порога изменяемости в контроллер (пересчет без повторного анализа окна)"""
+        try:
+            threshold = round(float(self.threshold_var.get()), 2)
+            self.threshold_text_var.set(f"Порог: {threshold:.2f}")
+            if self.controller and hasattr(self.controller, 'set_change_threshold'):
+                self.controller.set_change_threshold(threshold)
+        except Exception as e:
+            self.logger.error(f"Ошибка изменения порога изменяемости: {e}")
+
     def _on_changed_only_toggle_priority(self):
         """ПРИОРИТЕТНОЕ переключение с управлением стрелочками"""
         is_enabled = self.changed_only_var.get()
@@ -525,6 +544,7 @@ class CompactTimePanel(ttk.Frame):
         """НОВЫЙ МЕТОД: Получение настроек фильтрации"""
         return {
             'changed_only': self.changed_only_var.get() if self.changed_only_var else False,
+            'change_threshold': round(float(self.threshold_var.get()), 2),
             'has_priority': getattr(self, 'has_priority_for_changed_filter', True),
             'source_panel': 'compact_time_panel',
             'time_range': {
@@ -0,0 +1,128 @@
+"""
+Редактор набора правил контроля и сводка их нарушений по записи
+"""
+import tkinter as tk
+from tkinter import ttk, filedialog
+import logging
+from typing import Any
+
+from ...core.domain.services.monitoring_rules import RuleError
+
+
+class MonitoringRulesPanel(ttk.Frame):
+    """Текст правил (строка на правило), применение к модели и сводка нарушений
+
+    Набор хранится в модели на всю сессию и вычисляется заново для каждой
+    загружаемой записи; интервалы нарушений отмечаются на графиках при их
+    следующем построении и попадают в отчет.
+    """
+
+    SUMMARY_COLUMNS = (('rule', 'Правило', 160), ('violations', 'Нарушений', 80), ('wagons', 'Вагоны', 120),
+                       ('total_seconds', 'Всего, с', 80), ('longest_seconds', 'Наибольшее, с', 100),
+                       ('error', 'Ошибка', 260))
+
+    def __init__(self, parent, controller=None):
+        super().__init__(parent)
+        self.controller = controller
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.status_var = tk.StringVar(value="Правило: 'имя: условие [for 2s] [hyst 50]', # - комментарий")
+        self._setup_ui()
+
+    def _setup_ui(self):
+        self.editor = tk.Text(self, height=10, wrap=tk.NONE, undo=True)
+        self.editor.pack(fill=tk.BOTH, expand=True, padx=5, pady=(5, 0))
+        model = self._get_model()
+        if model is not None and hasattr(model, 'get_monitoring_rules'):
+            self.editor.insert('1.0', model.get_monitoring_rules())
+
+        controls = ttk.Frame(self)
+        controls.pack(fill=tk.X, padx=5, pady=5)
+        ttk.Button(controls, text="Применить", command=self.apply).pack(side=tk.LEFT)
+        ttk.Button(controls, text="Загрузить...", command=self._load_from_file).pack(side=tk.LEFT, padx=5)
+        ttk.Button(controls, text="Сохранить...", command=self._save_to_file).pack(side=tk.LEFT)
+        ttk.Button(controls, text="Отключить", command=self._clear).pack(side=tk.LEFT, padx=5)
+
+        self.summary = ttk.Treeview(self, columns=[key for key, _, _ in self.SUMMARY_COLUMNS],
+                                    show='headings', height=8)
+        for key, title, width in self.SUMMARY_COLUMNS:
+            self.summary.heading(key, text=title)
+            self.summary.column(key, width=width, anchor=tk.W)
+        self.summary.pack(fill=tk.BOTH, expand=True, padx=5)
+
+        ttk.Label(self, textvariable=self.status_var, anchor=tk.W).pack(fill=tk.X, padx=5, pady=(2, 5))
+
+        if model is not None and hasattr(model, 'get_rule_report'):
+            self.show_report(model.get_rule_report())
+
+    def _get_model(self):
+        return getattr(self.controller, 'model', None)
+
+    def apply(self) -> bool:
+        """Передача текста правил модели и показ сводки нарушений"""
+        try:
+            model = self._get_model()
+            if model is None or not hasattr(model, 'set_monitoring_rules'):
+                self.status_var.set("Модель данных недоступна")
+                return False
+
+            report = model.set_monitoring_rules(self.editor.get('1.0', tk.END))
+            self.show_report(report)
+            if report is None:
+                self.status_var.set("Правила сохранены и будут вычислены после загрузки записи"
+                                    if model.get_monitoring_rules().strip() else "Правила контроля отключены")
+            else:
+                self.status_var.set(f"Нарушений: {len(report.violations)} за {report.elapsed_seconds:.2f} с; "
+                                    f"отметки появятся на графиках при следующем построении")
+            return True
+
+        except RuleError as e:
+            self.status_var.set(f"Ошибка в правилах: {e}")
+            return False
+        except Exception as e:
+            self.logger.error(f"Ошибка применения правил контроля: {e}")
+            self.status_var.set(f"Ошибка: {e}")
+            return False
+
+    def show_report(self, report):
+        """Сводка по правилам (RuleEvaluationReport или None)"""
+        self.summary.delete(*self.summary.get_children())
+        if report is None:
+            return
+        for row in report.summary():
+            self.summary.insert('', tk.END, values=(
+                row['rule'], row['violations'], ', '.join(row['wagons']) or '-',
+                row['total_seconds'], row['longest_seconds'], row['error'] or ''))
+
+    def _load_from_file(self):
+        try:
+            path = filedialog.askopenfilename(
+                parent=self, title="Набор правил контроля",
+                filetypes=[("Правила", "*.rules *.txt"), ("Все файлы", "*.*")])
+            if not path:
+                return
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+            self.editor.delete('1.0', tk.END)
+            self.editor.insert('1.0', text)
+            self.apply()
+        except Exception as e:
+            self.logger.error(f"Ошибка загрузки правил контроля: {e}")
+            self.status_var.set(f"Ошибка загрузки: {e}")
+
+    def _save_to_file(self):
+        try:
+            path = filedialog.asksaveasfilename(
+                parent=self, title="Набор правил контроля", defaultextension=".rules",
+                filetypes=[("Правила", "*.rules *.txt"), ("Все файлы", "*.*")])
+            if not path:
+                return
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(self.editor.get('1.0', 'end-1c'))
+            self.status_var.set(f"Правила сохранены: {path}")
+        except Exception as e:
+            self.logger.error(f"Ошибка сохранения правил контроля: {e}")
+            self.status_var.set(f"Ошибка сохранения: {e}")
+
+    def _clear(self):
+        self.editor.delete('1.0', tk.END)
+        self.apply()
@@ -9,6 +9,13 @@ from typing import List, Dict, Any, Optional, Callable
 import re
 from collections import defaultdict
 
+try:
+    from ...core.domain.services.parameter_search_index import ParameterSearchIndex, has_wildcards
+except ImportError as e:
+    logging.warning(f"Поисковый индекс параметров недоступен: {e}")
+    ParameterSearchIndex = None
+    has_wildcards = None
+
 class ParameterPanel(ttk.Frame):
     """ИСПРАВЛЕННАЯ панель параметров телеметрии с полной функциональностью"""
 
@@ -45,6 +52,9 @@ class ParameterPanel(ttk.Frame):
         # НОВОЕ: Кэширование для оптимизации
         self._search_cache = {}
         self._group_cache = {}
+        # Индекс поиска по тем же полям, что и перебор (включая вагон)
+        self._search_index = ParameterSearchIndex(
+            fields=('signal_code', 'description', 'line', 'wagon')) if ParameterSearchIndex else None
         self._last_search_term = ""
         self._last_grouping_mode = ""
 
@@ -731,6 +741,13 @@ class ParameterPanel(ttk.Frame):
                 self.filtered_parameters = self.all_parameters.copy()
                 return
                 
+            # Обычный запрос - по индексу (подстрока, префикс, несколько слов), с ранжированием
+            if self._search_index is not None and not has_wildcards(search_text):
+                if not self._search_index.is_current(self.all_parameters):
+                    self._search_index.update(self.all_parameters)
+                self.filtered_parameters = self._search_index.search(search_text)
+                return
+
             self.filtered_parameters = []
             search_lower = search_text.lower()
             
@@ -20,6 +20,7 @@ from ...core.application.use_cases.plot_generation_use_case import (
 from ...infrastructure.plotting.adapters.tkinter_plot_adapter import TkinterPlotAdapter
 from ...infrastructure.plotting.core.plot_builder import PlotBuilder
 from ...infrastructure.plotting.interactions.base_interaction import ZoomInteraction
+from .system_health_strip import SystemHealthStrip
 
 class PlotVisualizationPanel(ttk.Frame):
     """Панель визуализации графиков с полной интеграцией архитектуры"""
@@ -91,6 +92,7 @@ class PlotVisualizationPanel(ttk.Frame):
         # UI компоненты
         self.notebook: Optional[ttk.Notebook] = None
         self.control_frame: Optional[ttk.Frame] = None
+        self.health_strip: Optional[SystemHealthStrip] = None
         self.plot_tabs: Dict[str, Dict[str, Any]] = {}
 
         # Состояние
@@ -114,12 +116,16 @@ class PlotVisualizationPanel(ttk.Frame):
     def _setup_ui(self):
         """Настройка пользовательского интерфейса"""
         # Настройка сетки
-        self.grid_rowconfigure(1, weight=1)
+        self.grid_rowconfigure(2, weight=1)
         self.grid_columnconfigure(0, weight=1)
 
         # Панель управления
         self._create_control_panel()
 
+        # Полоса состояния систем по всей записи
+        self.health_strip = SystemHealthStrip(self, self.controller)
+        self.health_strip.grid(row=1, column=0, sticky="ew", padx=5)
+
         # Основная область с вкладками графиков
         self._create_plot_area()
 
@@ -193,7 +199,7 @@ class PlotVisualizationPanel(ttk.Frame):
         """Создание области с вкладками графиков"""
         # Notebook для вкладок
         self.notebook = ttk.Notebook(self)
-        self.notebook.grid(row=1, column=0, sticky="nsew", padx=5, pady=5)
+        self.notebook.grid(row=2, column=0, sticky="nsew", padx=5, pady=5)
 
         # Привязка событий
         self.notebook.bind("<Button-3>", self._on_tab_right_click)
@@ -462,6 +468,8 @@ class PlotVisualizationPanel(ttk.Frame):
                 self.logger.info(
                     f"Успешно создано {success_count} графиков из {len(plot_groups)}"
                 )
+                if self.health_strip:
+                    self.health_strip.refresh()
             else:
                 self._show_error(
                     "Не удалось создать ни одного графика. Проверьте данные и логи."
@@ -904,6 +912,8 @@ class PlotVisualizationPanel(ttk.Frame):
     def set_controller(self, controller):
         """Установка контроллера"""
         self.controller = controller
+        if self.health_strip:
+            self.health_strip.controller = controller
         self._setup_use_cases()
         self.logger.info("Контроллер установлен в PlotVisualizationPanel")
 
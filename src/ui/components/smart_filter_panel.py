@@ -9,6 +9,12 @@ from typing import Dict, Any, List, Optional, Callable
 from dataclasses import dataclass, field
 from datetime import datetime
 
+try:
+    from ...core.config.filter_presets import FilterPresetStore
+except ImportError as e:
+    logging.warning(f"Пресеты фильтров недоступны: {e}")
+    FilterPresetStore = None
+
 
 @dataclass
 class FilterState:
@@ -110,6 +116,9 @@ class SmartFilterPanel(ttk.Frame):
             # Горизонтальная панель быстрых действий
             self._create_quick_actions_bar()
 
+            # Строка запроса фильтрации и пресеты
+            self._create_query_bar()
+
             self.logger.info("Компактный UI с вкладками создан")
 
         except Exception as e:
@@ -143,6 +152,67 @@ class SmartFilterPanel(ttk.Frame):
         except Exception as e:
             self.logger.error(f"Ошибка создания панели быстрых действий: {e}")
 
+    def _create_query_bar(self):
+        """Строка запроса (type:B wagon:3..5 line:L_CAN_* changed>0.2 system:brakes) и пресеты"""
+        try:
+            self.query_var = tk.StringVar()
+            self.preset_var = tk.StringVar()
+            self.preset_store = FilterPresetStore() if FilterPresetStore else None
+
+            query_frame = ttk.Frame(self)
+            query_frame.grid(row=3, column=0, sticky="ew", pady=(0, 5))
+            query_frame.grid_columnconfigure(0, weight=1)
+
+            self.query_entry = ttk.Entry(query_frame, textvariable=self.query_var)
+            self.query_entry.grid(row=0, column=0, columnspan=3, sticky="ew", padx=5)
+            self.query_entry.bind('<Return>', lambda e: self._apply_query())
+
+            self.preset_combo = ttk.Combobox(query_frame, textvariable=self.preset_var,
+                                             values=self._preset_names(), width=18, state='readonly')
+            self.preset_combo.grid(row=1, column=0, sticky="ew", padx=5, pady=(3, 0))
+            self.preset_combo.bind('<<ComboboxSelected>>', self._on_preset_selected)
+
+            ttk.Button(query_frame, text="Найти", command=self._apply_query).grid(
+                row=1, column=1, padx=(0, 5), pady=(3, 0))
+            ttk.Button(query_frame, text="Сохранить", command=self._save_query_preset).grid(
+                row=1, column=2, padx=(0, 5), pady=(3, 0))
+
+        except Exception as e:
+            self.logger.error(f"Ошибка создания строки запроса: {e}")
+
+    def _preset_names(self) -> List[str]:
+        return self.preset_store.names() if self.preset_store else []
+
+    def _apply_query(self):
+        """Применение запроса из строки (пустой запрос - все параметры)"""
+        try:
+            query = self.query_var.get().strip()
+            if self.controller and hasattr(self.controller, 'apply_filter_query'):
+                self.controller.apply_filter_query(query)
+        except Exception as e:
+            self.logger.error(f"Ошибка применения запроса фильтрации: {e}")
+
+    def _on_preset_selected(self, event=None):
+        query = self.preset_store.get(self.preset_var.get()) if self.preset_store else None
+        if query is not None:
+            self.query_var.set(query)
+            self._apply_query()
+
+    def _save_query_preset(self):
+        """Сохранение текущего запроса под именем пресета"""
+        try:
+            query = self.query_var.get().strip()
+            if not query or not self.preset_store:
+                return
+            from tkinter import simpledialog
+            name = simpledialog.askstring("Пресет фильтра", "Название пресета:",
+                                          initialvalue=self.preset_var.get(), parent=self)
+            if name and self.preset_store.save(name, query):
+                self.preset_combo.configure(values=self._preset_names())
+                self.preset_var.set(name.strip())
+        except Exception as e:
+            self.logger.error(f"Ошибка сохранения пресета фильтра: {e}")
+
     def _reset_all_filters(self):
         """Сброс всех фильтров к значениям по умолчанию"""
         try:
@@ -0,0 +1,172 @@
+"""
+Полоса состояния систем по времени записи над графиками с переходом к неисправностям кликом
+"""
+import tkinter as tk
+from tkinter import ttk
+import logging
+from typing import Optional
+
+import numpy as np
+
+
+class SystemHealthStrip(ttk.Frame):
+    """Компактная полоса состояния систем x временные корзины всей записи
+
+    Верхняя строка - общее состояние, ниже по строке на систему. Полоса
+    рисуется одним изображением PhotoImage; если корзин больше, чем пикселей
+    по ширине, соседние корзины сворачиваются по худшему состоянию. Клик
+    задает диапазон анализа равным корзине под курсором, кнопки «‹» и «›»
+    переходят к предыдущему и следующему отрезку с неисправностями.
+    """
+
+    BUCKET_CHOICES = {'10 с': 10, '30 с': 30, '1 мин': 60, '5 мин': 300}
+    STATUS_COLORS = ('#d9ead3', '#ffd966', '#e06666')
+    STATUS_NAMES = ('норма', 'предупреждение', 'критично')
+    LABEL_WIDTH = 90
+    ROW_HEIGHT = 6
+
+    def __init__(self, parent, controller=None):
+        super().__init__(parent)
+        self.controller = controller
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self.bucket_var = tk.StringVar(value='1 мин')
+        self.status_var = tk.StringVar(value="")
+
+        self.timeline = None
+        self._rows: Optional[np.ndarray] = None
+        self._labels = []
+        self._group = 1
+        self._image: Optional[tk.PhotoImage] = None
+        self._spot = -1
+
+        self._setup_ui()
+
+    def _setup_ui(self):
+        controls = ttk.Frame(self)
+        controls.pack(fill=tk.X)
+
+        ttk.Label(controls, text="Состояние систем:", font=('Arial', 8)).pack(side=tk.LEFT)
+        combo = ttk.Combobox(controls, textvariable=self.bucket_var, values=list(self.BUCKET_CHOICES),
+                             width=6, state='readonly')
+        combo.pack(side=tk.LEFT, padx=(2, 4))
+        combo.bind('<<ComboboxSelected>>', lambda event: self.refresh())
+        ttk.Button(controls, text="⟳", width=2, command=self.refresh).pack(side=tk.LEFT)
+        ttk.Button(controls, text="‹", width=2, command=lambda: self.goto_trouble_spot(-1)).pack(side=tk.LEFT)
+        ttk.Button(controls, text="›", width=2, command=lambda: self.goto_trouble_spot(1)).pack(side=tk.LEFT)
+        ttk.Label(controls, textvariable=self.status_var, anchor=tk.W,
+                  font=('Arial', 8)).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(6, 0))
+
+        self.canvas = tk.Canvas(self, height=self.ROW_HEIGHT, background='white', highlightthickness=0)
+        self.canvas.pack(fill=tk.X)
+        self.canvas.bind('<Configure>', lambda event: self._draw())
+        self.canvas.bind('<Motion>', self._on_motion)
+        self.canvas.bind('<ButtonRelease-1>', self._on_click)
+
+    # === ПОСТРОЕНИЕ ===
+
+    def refresh(self):
+        """Запрос шкалы состояния у модели и перерисовка полосы"""
+        try:
+            model = getattr(self.controller, 'model', None)
+            if model is None or not hasattr(model, 'get_system_health_timeline'):
+                return
+
+            timeline = model.get_system_health_timeline(self.BUCKET_CHOICES.get(self.bucket_var.get(), 60))
+            if timeline is None or not timeline.bucket_count:
+                self.status_var.set("Нет данных о неисправностях")
+                return
+            self.show_timeline(timeline)
+
+        except Exception as e:
+            self.logger.error(f"Ошибка построения полосы состояния: {e}")
+
+    def show_timeline(self, timeline):
+        """Отрисовка готовой шкалы состояния (SystemHealthTimeline)"""
+        self.timeline = timeline
+        self._rows = np.vstack([timeline.overall[np.newaxis, :], timeline.status]).astype(np.int64)
+        self._labels = ['Общее'] + list(timeline.systems)
+        self._spot = -1
+        self.canvas.configure(height=len(self._labels) * self.ROW_HEIGHT)
+        self._draw()
+
+        spots = timeline.trouble_spots()
+        self.status_var.set(f"Отрезков с неисправностями: {len(spots)}" if spots else "Неисправностей нет")
+
+    def _draw(self):
+        if self._rows is None:
+            return
+        n_rows, n_buckets = self._rows.shape
+        width = max(self.canvas.winfo_width() - self.LABEL_WIDTH, 1)
+
+        # Свертка соседних корзин по худшему состоянию, если корзин больше пикселей
+        self._group = int(np.ceil(n_buckets / width))
+        columns = int(np.ceil(n_buckets / self._group))
+        padded = np.zeros((n_rows, columns * self._group), dtype=np.int64)
+        padded[:, :n_buckets] = self._rows
+        folded = padded.reshape(n_rows, columns, self._group).max(axis=2)
+
+        colors = np.array(self.STATUS_COLORS)[folded]
+        image = tk.PhotoImage(width=columns, height=n_rows)
+        image.put(' '.join('{' + ' '.join(row) + '}' for row in colors))
+        self._image = image.zoom(max(1, width // columns), self.ROW_HEIGHT)
+
+        self.canvas.delete('all')
+        self.canvas.create_image(self.LABEL_WIDTH, 0, image=self._image, anchor=tk.NW)
+        for i, label in enumerate(self._labels):
+            self.canvas.create_text(self.LABEL_WIDTH - 3, i * self.ROW_HEIGHT + self.ROW_HEIGHT / 2,
+                                    text=label, anchor=tk.E, font=('Arial', 5))
+
+    # === ВЗАИМОДЕЙСТВИЕ ===
+
+    def _bucket_at(self, event) -> Optional[int]:
+        if self._rows is None:
+            return None
+        columns = int(np.ceil(self._rows.shape[1] / self._group))
+        cell_w = max(1, (max(self.canvas.winfo_width() - self.LABEL_WIDTH, 1)) // columns)
+        x = event.x - self.LABEL_WIDTH
+        bucket = int(x // cell_w) * self._group
+        if x < 0 or bucket >= self._rows.shape[1]:
+            return None
+        return bucket
+
+    def _on_motion(self, event):
+        bucket = self._bucket_at(event)
+        if bucket is None:
+            return
+        row = min(int(event.y // self.ROW_HEIGHT), len(self._labels) - 1)
+        last = min(bucket + self._group, self._rows.shape[1]) - 1
+        start, end = self.timeline.bucket_bounds(bucket, last)
+        status = self._rows[row, bucket:last + 1].max()
+        self.status_var.set(f"{self._labels[row]} | {start:%H:%M:%S} - {end:%H:%M:%S} | "
+                            f"{self.STATUS_NAMES[status]}")
+
+    def _on_click(self, event):
+        bucket = self._bucket_at(event)
+        if bucket is not None:
+            self.select_buckets(bucket, min(bucket + self._group, self._rows.shape[1]) - 1)
+
+    def goto_trouble_spot(self, step: int):
+        """Переход к следующему (step=1) или предыдущему (step=-1) отрезку с неисправностями"""
+        if self.timeline is None:
+            return
+        spots = self.timeline.trouble_spots()
+        if not spots:
+            return
+        self._spot = (self._spot + step) % len(spots) if self._spot >= 0 else (0 if step > 0 else len(spots) - 1)
+        self.select_buckets(*spots[self._spot])
+
+    def select_buckets(self, first: int, last: int):
+        """Установка диапазона анализа по корзинам first..last"""
+        try:
+            from_time, to_time = self.timeline.time_range(first, last)
+            if self.controller and hasattr(self.controller, 'set_analysis_time_range'):
+                self.controller.set_analysis_time_range(from_time, to_time)
+            self.status_var.set(f"Диапазон анализа: {from_time} - {to_time}")
+        except Exception as e:
+            self.logger.error(f"Ошибка установки диапазона по полосе состояния: {e}")
+
+    def cleanup(self):
+        self.timeline = None
+        self._rows = None
+        self._image = None
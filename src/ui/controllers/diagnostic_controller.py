@@ -2,6 +2,10 @@ import logging
 from datetime import datetime
 from typing import List, Dict, Any
 
+import numpy as np
+
+from ...core.domain.services.diagnostic_category_index import DiagnosticCategoryIndex
+
 class DiagnosticController:
     """Контроллер для диагностики и анализа параметров"""
 
@@ -11,6 +15,7 @@ class DiagnosticController:
         self.logger = logging.getLogger(self.__class__.__name__)
         self.event_emitter = event_emitter  # Функция или объект для эмиссии событий
         self.ui_controller = ui_controller  # Контроллер для работы с UI
+        self._category_index = None  # Категории текущего набора параметров
 
     def apply_diagnostic_filters(self, diagnostic_criteria: Dict[str, List[str]]):
         """Применение диагностических фильтров"""
@@ -24,44 +29,10 @@ class DiagnosticController:
                 return
 
             all_params = self._get_all_parameters()
-
-            from src.config.diagnostic_filters_config import (
-                CRITICAL_FILTERS,
-                SYSTEM_FILTERS,
-                FUNCTIONAL_FILTERS,
-            )
-
-            def matches_patterns(param, patterns):
-                text = f"{param.get('signal_code', '').upper()} {param.get('description', '').upper()}"
-                return any(pat in text for pat in patterns)
-
-            filtered = []
-
-            for param in all_params:
-                match = False
-
-                for crit_key in diagnostic_criteria.get("criticality", []):
-                    crit_conf = CRITICAL_FILTERS.get(crit_key)
-                    if crit_conf and matches_patterns(param, crit_conf["patterns"]):
-                        match = True
-                        break
-
-                if not match:
-                    for sys_key in diagnostic_criteria.get("systems", []):
-                        sys_conf = SYSTEM_FILTERS.get(sys_key)
-                        if sys_conf and matches_patterns(param, sys_conf["patterns"]):
-                            match = True
-                            break
-
-                if not match:
-                    for func_key in diagnostic_criteria.get("functions", []):
-                        func_conf = FUNCTIONAL_FILTERS.get(func_key)
-                        if func_conf and matches_patterns(param, func_conf["patterns"]):
-                            match = True
-                            break
-
-                if match:
-                    filtered.append(param)
+            index = self._get_category_index(all_params)
+            criteria = {group: diagnostic_criteria.get(group, [])
+                        for group in ("criticality", "systems", "functions")}
+            filtered = [all_params[i] for i in index.positions(criteria)]
 
             self._update_ui_with_filtered_params(filtered)
             if self.event_emitter:
@@ -109,29 +80,11 @@ class DiagnosticController:
             systems_status = {}
             recommendations = []
 
-            from src.config.diagnostic_filters_config import (
-                CRITICAL_FILTERS,
-                SYSTEM_FILTERS,
-                COMPONENT_MAPPING,
-            )
-
-            for param in all_params:
-                text = f"{param.get('signal_code', '').upper()} {param.get('description', '').upper()}"
-                for crit_key, crit_conf in CRITICAL_FILTERS.items():
-                    if any(pat in text for pat in crit_conf["patterns"]):
-                        critical_faults.append(param.get("signal_code", ""))
-                        break
-
-            for sys_key in SYSTEM_FILTERS.keys():
-                count_faults = sum(
-                    1
-                    for param in all_params
-                    if any(
-                        pat
-                        in f"{param.get('signal_code', '').upper()} {param.get('description', '').upper()}"
-                        for pat in SYSTEM_FILTERS[sys_key]["patterns"]
-                    )
-                )
+            index = self._get_category_index(all_params)
+            critical_faults = [all_params[i].get("signal_code", "")
+                               for i in np.flatnonzero(index.category_mask("criticality"))]
+
+            for sys_key, count_faults in index.counts("systems").items():
                 systems_status[sys_key] = {
                     "fault_count": count_faults,
                     "status": "critical" if count_faults > 0 else "normal",
@@ -151,6 +104,14 @@ class DiagnosticController:
                 "timestamp": datetime.now().isoformat(),
             }
 
+            # Первопричины из данных: сигналы, стабильно переключавшиеся перед срабатываниями B_*FAULT
+            if hasattr(self.model, "diagnose_fault_events"):
+                diagnoses = self.model.diagnose_fault_events()
+                if isinstance(diagnoses, list):
+                    results["root_cause_candidates"] = {
+                        d.signal_code: d.data_driven_causes for d in diagnoses if d.data_driven_causes
+                    }
+
             if hasattr(self.view, "show_info"):
                 message = f"Диагностический анализ завершен. Статус: {results['overall_status'].upper()}"
                 self.view.show_info("Диагностический анализ", message)
@@ -201,6 +162,13 @@ class DiagnosticController:
             self.logger.error(f"Ошибка получения всех параметров: {e}")
             return []
 
+    def _get_category_index(self, parameters: List[Dict[str, Any]]) -> DiagnosticCategoryIndex:
+        """Индекс диагностических категорий (строится один раз на набор параметров)"""
+        index = self._category_index
+        if index is None or not index.is_valid_for(parameters):
+            index = self._category_index = DiagnosticCategoryIndex(parameters)
+        return index
+
     def _has_data(self) -> bool:
         """Проверка наличия загруженных данных"""
         try:
@@ -1,6 +1,26 @@
 import logging
 from typing import List, Dict, Any, Optional
 
+try:
+    from ...core.application.use_cases.find_changed_parameters_use_case import FindChangedParametersRequest
+except ImportError as e:
+    logging.warning(f"FindChangedParametersRequest недоступен: {e}")
+    FindChangedParametersRequest = None
+
+# Фоновый расчет изменяемых параметров
+try:
+    from ...core.services.background_tasks import LatestOnlyTaskRunner
+except ImportError as e:
+    logging.warning(f"LatestOnlyTaskRunner недоступен: {e}")
+    LatestOnlyTaskRunner = None
+
+# Язык запросов фильтрации
+try:
+    from ...core.domain.services.filter_query import FilterQueryError
+except ImportError as e:
+    logging.warning(f"FilterQueryError недоступен: {e}")
+    FilterQueryError = ValueError
+
 class FilterController:
     """Контроллер для фильтрации параметров и управления фильтрами"""
 
@@ -13,6 +33,14 @@ class FilterController:
         self._filter_criteria_cache: Optional[Dict[str, Any]] = None
         self.find_changed_params_use_case = None  # Можно внедрить через сеттер
 
+        # Анализ изменяемых параметров выполняется вне потока Tk
+        self.use_background_analysis = True
+        self.analysis_debounce_seconds = 0.25
+        self.background_runner = None
+
+        # Порог изменяемости (CV / доля уникальных значений)
+        self.change_threshold = 0.1
+
     def apply_filters(self, changed_only: bool = False, **kwargs):
         """Применение фильтров с поддержкой приоритетного режима"""
         try:
@@ -103,7 +131,70 @@ class FilterController:
 
             session_id = self.get_session_id()
 
-            changed_params = self._get_changed_parameters(start_time, end_time, session_id)
+            # Диапазон устанавливается и разрешается в окно строк здесь, в потоке UI;
+            # рабочий поток получает только неизменяемое задание и не трогает модель.
+            # Без фонового исполнителя то же задание выполняется сразу: правило
+            # изменяемости и источник данных одни и те же в обоих режимах
+            job = self._prepare_changed_parameters_job(start_time, end_time)
+            if job is None:
+                changed_params = self._get_changed_parameters(start_time, end_time, session_id)
+                filtered_changed_params = self._filter_changed_parameters(changed_params, filter_criteria)
+                self._apply_changed_parameters_result(
+                    changed_params, filtered_changed_params, filter_criteria, start_time, end_time)
+                return
+
+            runner = self._get_background_runner()
+            if runner is None:
+                self._apply_job_result(job, job.run(), filter_criteria, start_time, end_time)
+                return
+
+            self._show_analysis_progress(0)
+            runner.submit(
+                job.run,
+                on_result=lambda changed: self._apply_job_result(job, changed, filter_criteria,
+                                                                 start_time, end_time),
+                on_error=self._on_background_analysis_error,
+                on_progress=lambda fraction: self._show_analysis_progress(int(fraction * 100))
+            )
+
+        except Exception as e:
+            self.logger.error(f"Ошибка приоритетной фильтрации с критериями: {e}")
+
+    def _prepare_changed_parameters_job(self, start_time: str, end_time: str):
+        """Задание фонового поиска изменяемых параметров; None - модель его не поддерживает"""
+        try:
+            if not hasattr(self.model, "prepare_changed_parameters_job"):
+                return None
+            return self.model.prepare_changed_parameters_job(start_time, end_time, self.change_threshold)
+        except Exception as e:
+            self.logger.error(f"Ошибка подготовки фонового анализа: {e}")
+            return None
+
+    def _apply_job_result(self, job, changed: List[Any], filter_criteria: Dict[str, Any],
+                          start_time: str, end_time: str):
+        """Результат фонового задания (в потоке UI): кэш модели, фильтры панели, отображение"""
+        changed_params = self.model.complete_changed_parameters_job(job, changed)
+        self._apply_changed_parameters_result(
+            changed_params, self._filter_changed_parameters(changed_params, filter_criteria),
+            filter_criteria, start_time, end_time)
+
+    def _filter_changed_parameters(self, changed_params: List[Dict[str, Any]],
+                                   filter_criteria: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Применение дополнительных критериев к изменяемым параметрам"""
+        if changed_params and filter_criteria:
+            filtered = self._detailed_filter_parameters(changed_params, filter_criteria)
+            self.logger.info(f"После применения фильтров: {len(filtered)} из {len(changed_params)} параметров")
+            return filtered
+        return changed_params
+
+    def _apply_changed_parameters_result(self, changed_params: List[Dict[str, Any]],
+                                         filtered_changed_params: List[Dict[str, Any]],
+                                         filter_criteria: Dict[str, Any],
+                                         start_time: str, end_time: str):
+        """Отображение результата анализа (в потоке UI)"""
+        try:
+            self._hide_analysis_progress()
+
             if not changed_params:
                 self.logger.warning("Изменяемые параметры не найдены")
                 if hasattr(self.view, "show_warning"):
@@ -112,12 +203,6 @@ class FilterController:
 
             self.logger.info(f"Найдено {len(changed_params)} изменяемых параметров")
 
-            if filter_criteria:
-                filtered_changed_params = self._detailed_filter_parameters(changed_params, filter_criteria)
-                self.logger.info(f"После применения фильтров: {len(filtered_changed_params)} из {len(changed_params)} параметров")
-            else:
-                filtered_changed_params = changed_params
-
             self._update_ui_with_filtered_params(filtered_changed_params)
 
             self._emit_event(
@@ -133,20 +218,122 @@ class FilterController:
             self.logger.info(f"Приоритетная фильтрация завершена: {len(filtered_changed_params)} параметров")
 
         except Exception as e:
-            self.logger.error(f"Ошибка приоритетной фильтрации с критериями: {e}")
+            self.logger.error(f"Ошибка отображения изменяемых параметров: {e}")
+
+    def set_change_threshold(self, threshold: float):
+        """Смена порога изменяемости с пересчетом списка в приоритетном режиме
+
+        Оценки окна считаются один раз, поэтому повторный расчет для нового
+        порога сводится к сравнению с готовым вектором оценок.
+        """
+        try:
+            threshold = float(threshold)
+            if threshold == self.change_threshold:
+                return
+            self.change_threshold = threshold
+            self.logger.debug(f"Порог изменяемости: {threshold:.3f}")
+
+            if self._has_data() and self._is_priority_mode_active():
+                self.apply_filters(changed_only=True)
+
+        except Exception as e:
+            self.logger.error(f"Ошибка установки порога изменяемости: {e}")
+
+    def apply_filter_query(self, query: str) -> bool:
+        """Применение текстового запроса фильтрации (type:B wagon:3..5 changed>0.2 ...)"""
+        try:
+            if not self._has_data():
+                self._show_no_data_message()
+                return False
+            if not hasattr(self.model, "query_parameters"):
+                self.logger.error("Модель не поддерживает запросы фильтрации")
+                return False
+
+            parameters = self.model.query_parameters(
+                query, change_threshold=self.change_threshold, as_dicts=True)
+
+        except FilterQueryError as e:
+            self.logger.warning(f"Ошибка в запросе фильтрации '{query}': {e}")
+            if hasattr(self.view, "show_warning"):
+                self.view.show_warning(f"Ошибка в запросе: {e}")
+            return False
+        except Exception as e:
+            self.logger.error(f"Ошибка применения запроса фильтрации: {e}")
+            return False
+
+        self._update_ui_with_filtered_params(parameters)
+        self._emit_event("filter_query_applied", {"query": query, "count": len(parameters)})
+        return True
+
+    # === ФОНОВЫЙ АНАЛИЗ ===
+
+    def _get_background_runner(self):
+        """Фоновый исполнитель; None - анализ выполняется синхронно"""
+        if not self.use_background_analysis or LatestOnlyTaskRunner is None:
+            return None
+
+        if self.background_runner is None:
+            root = getattr(self.view, "root", None)
+            if root is None or not hasattr(root, "after"):
+                return None
+            self.background_runner = LatestOnlyTaskRunner(
+                dispatch=lambda callback: root.after(0, callback),
+                debounce_seconds=self.analysis_debounce_seconds,
+                name="changed-params-analysis"
+            )
+        return self.background_runner
+
+    def cancel_background_analysis(self):
+        """Отмена ожидающего и выполняемого анализа"""
+        if self.background_runner:
+            self.background_runner.cancel()
+        self._hide_analysis_progress()
+
+    def cleanup(self):
+        """Остановка фонового анализа"""
+        try:
+            if self.background_runner:
+                self.background_runner.shutdown()
+                self.background_runner = None
+        except Exception as e:
+            self.logger.error(f"Ошибка остановки фонового анализа: {e}")
+
+    def _on_background_analysis_error(self, error: Exception):
+        self._hide_analysis_progress()
+        if hasattr(self.view, "show_error"):
+            self.view.show_error(f"Ошибка поиска изменяемых параметров: {error}")
+
+    def _show_analysis_progress(self, value: int):
+        """Индикатор прогресса анализа изменяемых параметров"""
+        try:
+            if hasattr(self.view, "show_progress"):
+                self.view.show_progress(True, value, 100)
+            if value == 0 and hasattr(self.view, "update_status"):
+                self.view.update_status("Поиск изменяемых параметров...")
+        except Exception as e:
+            self.logger.debug(f"Не удалось обновить прогресс: {e}")
+
+    def _hide_analysis_progress(self):
+        try:
+            if hasattr(self.view, "show_progress"):
+                self.view.show_progress(False)
+        except Exception as e:
+            self.logger.debug(f"Не удалось скрыть прогресс: {e}")
 
     def _get_changed_parameters(self, start_time: str, end_time: str, session_id: str) -> List[Dict[str, Any]]:
         """Получение изменяемых параметров"""
         try:
-            if hasattr(self, "find_changed_params_use_case") and self.find_changed_params_use_case:
-                request = FindChangedParametersRequest(session_id=session_id, from_time=start_time, to_time=end_time)
+            if self.find_changed_params_use_case and FindChangedParametersRequest is not None:
+                request = FindChangedParametersRequest(session_id=session_id, from_time=start_time,
+                                                       to_time=end_time, threshold=self.change_threshold)
                 response = self.find_changed_params_use_case.execute(request)
                 if response.success and response.changed_parameters:
                     self.logger.info(f"Use Case: найдено {len(response.changed_parameters)} изменяемых параметров")
                     return response.changed_parameters
 
             if hasattr(self.model, "data_loader") and self.model.data_loader and hasattr(self.model.data_loader, "filter_changed_params"):
-                changed_params = self.model.data_loader.filter_changed_params(start_time, end_time)
+                changed_params = self.model.data_loader.filter_changed_params(
+                    start_time, end_time, self.change_threshold)
                 if changed_params:
                     self.logger.info(f"CSV Loader: найдено {len(changed_params)} изменяемых параметров")
                     return changed_params
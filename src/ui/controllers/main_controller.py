@@ -232,6 +232,30 @@ class MainController:
         self.logger.info(f"apply_changed_parameters_filter вызван с auto_recalc={auto_recalc}")
         self.apply_filters(changed_only=True, auto_recalc=auto_recalc)
 
+    def set_change_threshold(self, threshold: float) -> None:
+        """
+        Делегирование смены порога изменяемости
+        
+        Args:
+            threshold: Порог CV / доли уникальных значений
+        """
+        if self.filter_controller and hasattr(self.filter_controller, 'set_change_threshold'):
+            self.filter_controller.set_change_threshold(threshold)
+
+    def apply_filter_query(self, query: str) -> bool:
+        """
+        Делегирование применения текстового запроса фильтрации
+        
+        Args:
+            query: Запрос вида 'type:B wagon:3..5 line:L_CAN_* changed>0.2'
+            
+        Returns:
+            True, если запрос разобран и применен
+        """
+        if not self.filter_controller or not hasattr(self.filter_controller, 'apply_filter_query'):
+            raise ControllerNotInitializedError("FilterController не инициализирован")
+        return self.filter_controller.apply_filter_query(query)
+
     # === Делегирующие методы для DiagnosticController ===
     def apply_diagnostic_filters(self, diagnostic_criteria: Dict[str, List[str]]) -> None:
         """
@@ -394,6 +418,30 @@ class MainController:
             raise ControllerNotInitializedError("UIController не инициализирован")
         return self.ui_controller.update_time_range(from_time, to_time)
 
+    def set_analysis_time_range(self, from_time: str, to_time: str) -> bool:
+        """
+        Установка диапазона анализа извне панели времени (карта активности)
+        
+        Обновляет поля панели и модель; при включенном фильтре изменяемых
+        параметров сразу пересчитывает их для нового диапазона.
+        
+        Args:
+            from_time: Начальное время
+            to_time: Конечное время
+            
+        Returns:
+            bool: Успешность операции
+        """
+        if not self.update_time_range(from_time, to_time):
+            return False
+        if hasattr(self.model, 'set_user_time_range'):
+            self.model.set_user_time_range(from_time, to_time)
+
+        time_panel = self.get_ui_component('time_panel')
+        if time_panel and hasattr(time_panel, 'is_changed_only_enabled') and time_panel.is_changed_only_enabled():
+            self.apply_changed_parameters_filter()
+        return True
+
     def reset_time_range(self) -> bool:
         """
         Делегирование сброса временного диапазона
@@ -537,6 +585,8 @@ class MainController:
         """
         if not self.state_controller:
             raise ControllerNotInitializedError("StateController не инициализирован")
+        if self.filter_controller and hasattr(self.filter_controller, 'cleanup'):
+            self.filter_controller.cleanup()
         self.state_controller.cleanup()
 
     # === Общие утилитные методы ===
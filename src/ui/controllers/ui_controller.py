@@ -270,6 +270,20 @@ class UIController:
             self.logger.error(f"Ошибка получения временного диапазона: {e}")
             return None, None
 
+    def update_time_range(self, from_time: str, to_time: str) -> bool:
+        """Обновление полей временного диапазона в time_panel"""
+        try:
+            time_panel = self.get_ui_component("time_panel")
+            if not time_panel or not hasattr(time_panel, "update_time_fields"):
+                self.logger.warning("time_panel отсутствует или не поддерживает update_time_fields")
+                return False
+            time_panel.update_time_fields(from_time, to_time)
+            self.emit_event("time_changed", {"from_time": from_time, "to_time": to_time})
+            return True
+        except Exception as e:
+            self.logger.error(f"Ошибка обновления временного диапазона: {e}")
+            return False
+
     def get_selected_parameters(self):
         """Получение выбранных параметров из parameter_panel"""
         try:
@@ -372,6 +372,8 @@ class MainWindow:
         self.menu_bar.add_cascade(label="Инструменты", menu=tools_menu)
         tools_menu.add_command(label="Настройки...", command=self._show_settings)
         tools_menu.add_command(label="Диагностика", command=self._show_diagnostics)
+        tools_menu.add_command(label="Карта активности", command=self._show_activity_map)
+        tools_menu.add_command(label="Правила контроля...", command=self._show_monitoring_rules)
 
         # Меню "Справка"
         help_menu = tk.Menu(self.menu_bar, tearoff=0)
@@ -890,6 +892,39 @@ class MainWindow:
         except Exception as e:
             self.logger.error(f"Ошибка показа диагностики: {e}")
     
+    def _show_activity_map(self):
+        """Окно тепловой карты активности параметров по времени записи"""
+        try:
+            from ..components.activity_heatmap_panel import ActivityHeatmapPanel
+
+            map_window = tk.Toplevel(self.root)
+            map_window.title("Карта активности параметров")
+            map_window.geometry("1200x700")
+            map_window.transient(self.root)
+
+            panel = ActivityHeatmapPanel(map_window, self.controller)
+            panel.pack(fill=tk.BOTH, expand=True)
+            panel.refresh()
+
+        except Exception as e:
+            self.logger.error(f"Ошибка показа карты активности: {e}")
+
+    def _show_monitoring_rules(self):
+        """Окно набора правил контроля со сводкой нарушений"""
+        try:
+            from ..components.monitoring_rules_panel import MonitoringRulesPanel
+
+            rules_window = tk.Toplevel(self.root)
+            rules_window.title("Правила контроля")
+            rules_window.geometry("900x550")
+            rules_window.transient(self.root)
+
+            panel = MonitoringRulesPanel(rules_window, self.controller)
+            panel.pack(fill=tk.BOTH, expand=True)
+
+        except Exception as e:
+            self.logger.error(f"Ошибка показа правил контроля: {e}")
+
     def _collect_diagnostic_info(self) -> str:
         """Сбор диагностической информации"""
         try:
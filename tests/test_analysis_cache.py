@@ -0,0 +1,59 @@
+import unittest
+
+import numpy as np
+
+from src.core.services.analysis_cache import AnalysisCache
+from src.core.domain.services.filtering_service import ParameterFilteringService
+
+
+class FakeLoader:
+    def __init__(self, cache):
+        self.analysis_cache = cache
+
+
+class TestAnalysisCache(unittest.TestCase):
+    def test_lru_eviction_by_bytes_and_statistics(self):
+        cache = AnalysisCache(max_entries=10, max_bytes_mb=1.0)
+        block = np.zeros(50_000)  # ~0.4 MB
+
+        cache.put('ns', 'a', block)
+        cache.put('ns', 'b', block.copy())
+        self.assertIsNotNone(cache.get('ns', 'a'))  # 'a' становится недавним
+        cache.put('ns', 'c', block.copy())
+
+        self.assertIsNone(cache.get('ns', 'b'))
+        self.assertIsNotNone(cache.get('ns', 'a'))
+        stats = cache.get_cache_statistics()
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['misses'], 1)
+        self.assertLessEqual(stats['size_mb'], 1.0)
+
+    def test_fingerprint_separates_recordings(self):
+        cache = AnalysisCache()
+        view = cache.namespace('changed_params')
+        cache.set_fingerprint('first.csv:1')
+        view['range'] = ['x']
+
+        cache.set_fingerprint('second.csv:1')
+        self.assertNotIn('range', view)
+        self.assertEqual(len(view), 0)
+
+        cache.set_fingerprint('first.csv:1')
+        self.assertEqual(view['range'], ['x'])
+
+    def test_key_ignores_criteria_order(self):
+        self.assertEqual(AnalysisCache.make_key({'lines': ['L1', 'L2'], 'wagons': []}),
+                         AnalysisCache.make_key({'lines': ['L2', 'L1']}))
+
+    def test_filter_cache_distinguishes_lists_of_same_length(self):
+        service = ParameterFilteringService(FakeLoader(AnalysisCache()))
+        first = [{'full_column': 'A_1', 'line': 'L1'}, {'full_column': 'B_1', 'line': 'L2'}]
+        second = [{'full_column': 'C_1', 'line': 'L1'}, {'full_column': 'D_1', 'line': 'L2'}]
+
+        self.assertEqual(service.filter_parameters(first, {'lines': ['L1']}), [first[0]])
+        self.assertEqual(service.filter_parameters(second, {'lines': ['L1']}), [second[0]])
+
+
+if __name__ == '__main__':
+    unittest.main()
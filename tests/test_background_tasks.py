@@ -0,0 +1,56 @@
+import threading
+import time
+import unittest
+
+from src.core.services.background_tasks import LatestOnlyTaskRunner
+
+
+class TestLatestOnlyTaskRunner(unittest.TestCase):
+    def setUp(self):
+        self.delivered = []
+        self.done = threading.Event()
+        self.runner = LatestOnlyTaskRunner(dispatch=lambda callback: callback(), debounce_seconds=0.05)
+
+    def tearDown(self):
+        self.runner.shutdown()
+
+    def _on_result(self, value):
+        self.delivered.append(value)
+        self.done.set()
+
+    def test_rapid_submissions_are_debounced(self):
+        calls = []
+
+        def task(value):
+            def run(token, report_progress):
+                calls.append(value)
+                return value
+            return run
+
+        for value in range(5):
+            self.runner.submit(task(value), self._on_result)
+
+        self.assertTrue(self.done.wait(2))
+        self.assertEqual(calls, [4])
+        self.assertEqual(self.delivered, [4])
+
+    def test_superseded_running_task_is_cancelled(self):
+        started = threading.Event()
+
+        def slow(token, report_progress):
+            started.set()
+            for _ in range(200):
+                report_progress(0.5)
+                time.sleep(0.005)
+            return 'slow'
+
+        self.runner.submit(slow, self._on_result)
+        self.assertTrue(started.wait(2))
+        self.runner.submit(lambda token, report_progress: 'fast', self._on_result)
+
+        self.assertTrue(self.done.wait(2))
+        time.sleep(0.1)
+        self.assertEqual(self.delivered, ['fast'])
+
+if __name__ == "__main__":
+    unittest.main()
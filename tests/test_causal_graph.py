@@ -0,0 +1,129 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from src.core.domain.services.causal_graph import CausalGraphIndex
+from src.core.models.data_model import DataModel
+from src.core.services.diagnostic_analyzer import DiagnosticAnalyzer
+
+RELATIONSHIPS = {
+    'supply': {'root_causes': ['B_MAIN_OK'], 'effects': ['B_PANTO_UP', 'B_AUX_*']},
+    'panto': {'root_causes': ['B_PANTO_UP'], 'effects': ['F_U3000']},
+    'line': {'root_causes': ['F_U3000'], 'effects': ['B_PST_CONNECTED']},
+}
+
+
+def signals(*codes):
+    return [{'signal_code': code, 'description': ''} for code in codes]
+
+
+class TestCausalGraphIndex(unittest.TestCase):
+    def setUp(self):
+        self.signals = signals('B_PANTO_UP', 'F_U3000', 'B_AUX_1', 'B_AUX_2', 'B_INV_READY_1',
+                               'B_X_B_INV_READY', 'F_INV_VOLTAGE', 'B_PST_CONNECTED')
+        self.graph = CausalGraphIndex(self.signals, RELATIONSHIPS)
+
+    def test_adjacency_and_resolution(self):
+        self.assertEqual(self.graph.chains_of('B_PANTO_UP'), ['supply', 'panto'])
+        self.assertEqual(self.graph.causes_of('F_U3000'), ['B_PANTO_UP'])
+        self.assertEqual(self.graph.resolve('B_AUX_*'), ['B_AUX_1', 'B_AUX_2'])
+        self.assertEqual(self.graph.resolve('B_MAIN_OK'), [])
+        self.assertEqual(self.graph.chain_members('supply'), ['B_PANTO_UP', 'B_AUX_1', 'B_AUX_2'])
+        # Подстрочное совпадение шаблонов B_<компонент>_READY / F_<компонент>_VOLTAGE
+        self.assertEqual(self.graph.component_signals('INV'),
+                         ['B_INV_READY_1', 'B_X_B_INV_READY', 'F_INV_VOLTAGE'])
+
+    def test_traverse_respects_depth(self):
+        self.assertEqual(self.graph.traverse('B_PST_CONNECTED'),
+                         [('F_U3000', 1), ('B_PANTO_UP', 2), ('B_MAIN_OK', 3)])
+        self.assertEqual(self.graph.traverse('B_PST_CONNECTED', max_depth=2),
+                         [('F_U3000', 1), ('B_PANTO_UP', 2)])
+        self.assertEqual([code for code, _ in self.graph.traverse('B_MAIN_OK', upstream=False)],
+                         ['B_PANTO_UP', 'B_AUX_*', 'F_U3000', 'B_PST_CONNECTED'])
+
+    def test_analyzer_builds_graph_once_per_parameter_set(self):
+        analyzer = DiagnosticAnalyzer()
+        faults = signals('B_PST_CONNECTED', 'F_U3000', 'B_BCU_FAULT')
+        all_signals = self.signals + faults[2:]
+        with patch('src.core.services.diagnostic_analyzer.CausalGraphIndex',
+                   side_effect=lambda s: CausalGraphIndex(s, RELATIONSHIPS)) as build:
+            results = analyzer.analyze_fault_signals(faults, all_signals)
+            self.assertEqual(build.call_count, 1)
+            analyzer.analyze_fault_signals(faults, list(all_signals), datetime(2024, 1, 1))
+            self.assertEqual(build.call_count, 2)
+
+            analyzer.max_chain_depth = 1
+            analyzer.clear_cache()
+            result = analyzer.analyze_fault_signals(faults[:1], all_signals)[0]
+            self.assertEqual(result.possible_root_causes[0], 'F_U3000')
+            self.assertNotIn('B_PANTO_UP', result.possible_root_causes)
+
+        by_code = {r.signal_code: r for r in results}
+        # Причины через несколько звеньев связей, ближайшие первыми
+        self.assertEqual(by_code['B_PST_CONNECTED'].possible_root_causes[:3],
+                         ['F_U3000', 'B_PANTO_UP', 'B_MAIN_OK'])
+        self.assertEqual([c.chain_id for c in by_code['F_U3000'].causal_chains], ['panto', 'line'])
+
+
+def write_recording(path, codes, rows=300):
+    """CSV в формате бортовой записи с битовыми сигналами codes (по одному вагону)"""
+    times = pd.date_range('2024-03-01 10:00:00', periods=rows, freq='s')
+    columns = {
+        'W_TIMESTAMP_YEAR_1': times.year, 'BY_TIMESTAMP_MONTH_1': times.month, 'BY_TIMESTAMP_DAY_1': times.day,
+        'BY_TIMESTAMP_HOUR_1': times.hour, 'BY_TIMESTAMP_MINUTE_1': times.minute,
+        'BY_TIMESTAMP_SECOND_1': times.second, 'BY_TIMESTAMP_SMALLSECOND_1': np.zeros(rows, dtype=int),
+        **{f'{code}_1': (np.arange(rows) // 40) % 2 for code in codes}
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("Date: 01.03.2024;\nCase: 1;\nVehicle number: 0001;\n")
+        f.write(';'.join(f"{code}::L_CAN_BLOCK_1_1|Сигнал" for code in columns) + '\n')
+        for row in zip(*columns.values()):
+            f.write(';'.join(str(value) for value in row) + '\n')
+
+
+class TestModelCausalGraph(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.first = os.path.join(self.directory, 'first.csv')
+        self.second = os.path.join(self.directory, 'second.csv')
+        write_recording(self.first, ['B_PANTO_UP', 'B_BCU_FAULT'])
+        write_recording(self.second, ['B_PANTO_UP', 'B_DOOR_FAULT'])
+        self.model = DataModel()
+
+    def tearDown(self):
+        self.model.cleanup()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_graph_built_once_per_parameter_set(self):
+        with patch('src.core.models.data_model.CausalGraphIndex', side_effect=CausalGraphIndex) as build:
+            self.assertTrue(self.model.load_csv_file(self.first))
+            self.assertEqual(build.call_count, 1)
+            graph = self.model.get_causal_graph()
+
+            # Сканы окон, всей записи и смена виртуальных каналов граф не перестраивают
+            self.assertIsNotNone(self.model.scan_fault_activity(full_recording=True))
+            self.assertTrue(self.model.set_user_time_range('2024-03-01 10:01:00', '2024-03-01 10:03:00'))
+            self.assertIsNotNone(self.model.scan_fault_activity())
+            self.model.define_virtual_channel('PANTO_ANY', 'max(B_PANTO_UP_1)')
+            self.model.scan_fault_activity()
+            self.assertEqual(build.call_count, 1)
+            self.assertIs(self.model.get_causal_graph(), graph)
+            self.assertNotIn('PANTO_ANY', graph.present)
+
+            # Новая запись - новый набор параметров
+            self.assertTrue(self.model.load_csv_file(self.second))
+            self.assertEqual(build.call_count, 2)
+            self.assertIn('B_DOOR_FAULT_1', self.model.get_causal_graph().present)
+
+        self.model.clear_cache()
+        self.assertIsNone(self.model.get_causal_graph())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+import numpy as np
+
+from src.core.domain.services.causal_graph import CausalGraphIndex
+from src.core.domain.services.fault_activity import ActivationTimeline, FaultActivity, FaultActivityReport
+from src.core.services.diagnostic_analyzer import DiagnosticAnalyzer
+
+BASE = np.datetime64('2024-01-01T00:00:00', 'ns')
+
+RELATIONSHIPS = {
+    'ordered': {'root_causes': ['B_SUPPLY_LOST'], 'effects': ['B_UNIT_FAULT', 'B_OUTPUT_OFF']},
+    'reversed': {'root_causes': ['B_COOLING_OFF'], 'effects': ['B_UNIT_FAULT']},
+}
+
+
+def activity(code, *intervals, column=None):
+    pairs = np.array([[BASE + np.timedelta64(int(s * 1e9), 'ns'), BASE + np.timedelta64(int(e * 1e9), 'ns')]
+                      for s, e in intervals], dtype='datetime64[ns]').reshape(-1, 2)
+    return FaultActivity(column or f'{code}_1', code, pairs, pairs[:, 0], float(sum(e - s for s, e in intervals)),
+                         False, False)
+
+
+class TestActivationTimeline(unittest.TestCase):
+    def test_queries_match_interval_scan(self):
+        rng = np.random.default_rng(11)
+        activities = []
+        for wagon in range(4):
+            starts = np.sort(rng.choice(100000, 600, replace=False)).astype(float)
+            intervals = [(s, s + rng.uniform(0.1, 30)) for s in starts]
+            activities.append(activity('B_X_FAULT', *intervals, column=f'B_X_FAULT_{wagon}'))
+        timeline = ActivationTimeline(activities)
+        intervals = np.concatenate([a.intervals.astype(np.int64) for a in activities])
+
+        for t in rng.uniform(0, 100000, 300):
+            moment = int(BASE.astype(np.int64)) + int(t * 1e9)
+            covering = intervals[(intervals[:, 0] <= moment) & (intervals[:, 1] >= moment)]
+            self.assertEqual(timeline.active_at('B_X_FAULT', moment), bool(len(covering)))
+            onset = timeline.onset('B_X_FAULT', moment, 20)
+            if len(covering):
+                self.assertEqual(onset, intervals[intervals[:, 0] <= moment, 0].max())
+            else:
+                distance = np.abs(intervals[:, 0] - moment).min()
+                self.assertEqual(onset is not None, distance <= 20e9)
+                if onset is not None:
+                    self.assertEqual(abs(onset - moment), distance)
+        self.assertIsNone(timeline.onset('B_MISSING', BASE, 20))
+
+
+class TestChainTemporalOrder(unittest.TestCase):
+    def setUp(self):
+        codes = ['B_SUPPLY_LOST', 'B_UNIT_FAULT', 'B_OUTPUT_OFF', 'B_COOLING_OFF']
+        self.signals = [{'signal_code': code, 'description': ''} for code in codes]
+        self.analyzer = DiagnosticAnalyzer()
+        patcher = patch('src.core.services.diagnostic_analyzer.CausalGraphIndex',
+                        side_effect=lambda s: CausalGraphIndex(s, RELATIONSHIPS))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def analyze(self, report):
+        self.analyzer.set_fault_activity(report)
+        return self.analyzer.analyze_fault_signals(self.signals[1:2], self.signals)[0]
+
+    def test_root_before_effect_ranks_higher(self):
+        report = FaultActivityReport(BASE, BASE + np.timedelta64(600, 's'), {
+            'B_UNIT_FAULT_1': activity('B_UNIT_FAULT', (100, 200)),
+        }, {
+            'B_SUPPLY_LOST_1': activity('B_SUPPLY_LOST', (90, 250)),
+            'B_OUTPUT_OFF_1': activity('B_OUTPUT_OFF', (101, 150)),
+            # Следствие уже было активно до срабатывания "причины"
+            'B_COOLING_OFF_1': activity('B_COOLING_OFF', (130, 140), (500, 510)),
+        })
+        chains = {chain.chain_id: chain for chain in self.analyze(report).causal_chains}
+
+        self.assertEqual(chains['ordered'].temporal_score, 1.0)
+        self.assertEqual(chains['reversed'].temporal_score, 0.0)
+        self.assertEqual(chains['ordered'].activation_times['B_SUPPLY_LOST'], datetime(2024, 1, 1, 0, 1, 30))
+        self.assertEqual(chains['ordered'].timestamp, datetime(2024, 1, 1, 0, 1, 40))
+        self.assertEqual(chains['reversed'].confidence, 0.5)
+        self.assertEqual([c.chain_id for c in self.analyze(report).causal_chains], ['ordered', 'reversed'])
+
+    def test_unknown_order_keeps_presence_confidence(self):
+        result = self.analyze(None)
+        chains = {chain.chain_id: chain for chain in result.causal_chains}
+        self.assertIsNone(chains['ordered'].temporal_score)
+        self.assertEqual(chains['ordered'].confidence, 1.0)
+        self.assertEqual(chains['reversed'].confidence, 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
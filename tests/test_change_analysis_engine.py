@@ -0,0 +1,228 @@
+import threading
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.core.domain.services.change_analysis_engine import ChangeAnalysisEngine
+from src.core.domain.services.column_parallel_backend import ColumnParallelBackend, MAX_DEFAULT_WORKERS
+from src.core.domain.services.time_range_service import TimeRangeService
+
+
+class TestChangeAnalysisEngine(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        rows = 500
+        gaps = rng.normal(0, 0.05, rows)
+        gaps[::7] = np.nan
+        self.data = pd.DataFrame({
+            'timestamp': pd.date_range('2024-01-01', periods=rows, freq='100ms'),
+            'analog': rng.normal(100, 5, rows),
+            'constant': np.full(rows, 3.0),
+            'switch': (np.arange(rows) // 50) % 2,
+            'gaps': gaps,
+            'text': ['a', 'b'] * (rows // 2),
+        })
+        self.columns = ['analog', 'constant', 'switch', 'gaps', 'text']
+        self.engine = ChangeAnalysisEngine()
+
+    def test_statistics_match_pandas(self):
+        stats = self.engine.compute(self.data, self.columns, slice(50, 450))
+        for column in self.columns:
+            series = self.data[column].iloc[50:450].dropna()
+            i = stats.position(column)
+            self.assertEqual(stats.valid_values[i], len(series))
+            self.assertEqual(stats.unique_values[i], len(series.unique()))
+            self.assertEqual(stats.change_count[i], int((series != series.shift()).sum()) - 1)
+            if column != 'text':
+                self.assertEqual(stats.mean[i], series.mean())
+                self.assertEqual(stats.std[i], series.std())
+
+    def test_variation_mask_matches_time_range_service(self):
+        service = TimeRangeService()
+        stats = self.engine.compute(self.data, self.columns)
+        for threshold in (0.0, 0.01, 0.1, 0.5):
+            mask = self.engine.variation_mask(stats, threshold)
+            expected = [service._is_parameter_changed(self.data[c], threshold) for c in self.columns]
+            self.assertEqual(list(mask), expected)
+
+    def test_resolve_rows_uses_inclusive_time_bounds(self):
+        start = self.data['timestamp'].iloc[10]
+        end = self.data['timestamp'].iloc[20]
+        rows = self.engine.resolve_rows(self.data, start, end)
+        self.assertEqual(rows, slice(10, 21))
+
+    def test_range_index_decisions_match_exact_masks(self):
+        for lo, hi in ((0, 500), (3, 40), (100, 101), (37, 433), (255, 300)):
+            stats = self.engine.compute(self.data, self.columns, slice(lo, hi))
+            for threshold in (0.01, 0.1, 0.5):
+                for rule, mask_function in (('variation', self.engine.variation_mask),
+                                            ('loader', self.engine.loader_mask)):
+                    mask = mask_function(stats, threshold)
+                    expected = {c for c, flag in zip(stats.columns, mask) if flag}
+                    changed = self.engine.changed_columns(self.data, self.columns, slice(lo, hi),
+                                                          threshold, rule)
+                    self.assertEqual(changed, expected)
+
+    def test_range_index_without_matrix(self):
+        # Матрица не укладывается в бюджет: индекс строится по группам столбцов DataFrame
+        data = pd.concat([self.data] * 10, ignore_index=True)
+        engine = ChangeAnalysisEngine(matrix_budget_mb=0.0005)
+        self.assertIsNone(engine.get_matrix(data))
+        index = engine.get_range_index(data)
+        self.assertTrue(index.indexed.any())
+        # Префиксы укрупняются под бюджет
+        self.assertEqual(index.block_size, 1024)
+        for lo, hi in ((0, 5000), (3, 40), (37, 4333), (1000, 3100), (1030, 3000)):
+            stats = self.engine.compute(data, self.columns, slice(lo, hi))
+            for threshold in (0.01, 0.1, 0.5):
+                expected = {c for c, flag in zip(stats.columns, self.engine.variation_mask(stats, threshold)) if flag}
+                self.assertEqual(engine.changed_columns(data, self.columns, slice(lo, hi), threshold), expected)
+        self.assertIs(engine.get_range_index(data), index)
+        self.assertGreater(engine.get_window_statistics()['slides'], 0)
+
+    def test_sliding_window_matches_exact_masks(self):
+        lo, hi = 100, 300
+        for shift_lo, shift_hi in ((5, 5), (-3, 0), (0, 40), (20, -10), (-60, -60), (150, 150)):
+            lo, hi = lo + shift_lo, hi + shift_hi
+            stats = self.engine.compute(self.data, self.columns, slice(lo, hi))
+            expected = {c for c, flag in zip(stats.columns, self.engine.variation_mask(stats, 0.1)) if flag}
+            changed = self.engine.changed_columns(self.data, self.columns, slice(lo, hi), 0.1)
+            self.assertEqual(changed, expected)
+        self.assertGreater(self.engine.get_window_statistics()['slides'], 0)
+
+    def test_scores_reproduce_masks_for_any_threshold(self):
+        stats = self.engine.compute(self.data, self.columns, slice(20, 480))
+        for rule, mask_function in (('variation', self.engine.variation_mask),
+                                    ('loader', self.engine.loader_mask),
+                                    ('uniqueness', self.engine.uniqueness_mask)):
+            scores = self.engine.compute_scores(self.data, self.columns, slice(20, 480), rule)
+            for threshold in (0.0, 0.004, 0.01, 0.05, 0.1, 0.5, 1.0):
+                np.testing.assert_array_equal(scores.mask(threshold), mask_function(stats, threshold))
+
+        ranked = scores.ranked(0.0)
+        self.assertEqual([s for _, s in ranked], sorted((s for _, s in ranked), reverse=True))
+
+    def test_process_pool_matches_inline_statistics(self):
+        expected = self.engine.compute(self.data, self.columns, slice(10, 490))
+        for budget_mb in (512.0, 0.001):
+            engine = ChangeAnalysisEngine(matrix_budget_mb=budget_mb, parallel_backend=ColumnParallelBackend(
+                max_workers=2, min_cells=0, min_columns_per_worker=1))
+            try:
+                stats = engine.compute(self.data, self.columns, slice(10, 490))
+                self.assertGreater(engine.get_parallel_statistics()['parallel_runs'], 0)
+            finally:
+                engine.shutdown()
+            for name in ('valid_values', 'unique_values', 'change_count', 'mean', 'std', 'min_value', 'max_value'):
+                np.testing.assert_array_equal(getattr(stats, name), getattr(expected, name))
+
+    def test_process_pool_without_shared_memory_runs_inline(self):
+        expected = self.engine.compute(self.data, self.columns, slice(10, 490))
+        for budget_mb in (512.0, 0.001):
+            backend = ColumnParallelBackend(max_workers=2, min_cells=0, min_columns_per_worker=1)
+            backend._has_room = lambda nbytes: False
+            engine = ChangeAnalysisEngine(matrix_budget_mb=budget_mb, parallel_backend=backend)
+            extracted = []
+            extract = engine._extract_block
+            engine._extract_block = lambda *args, **kwargs: extracted.append(args[1]) or extract(*args, **kwargs)
+            try:
+                stats = engine.compute(self.data, self.columns, slice(10, 490))
+            finally:
+                engine.shutdown()
+            # Столбцы читаются один раз - для расчета в текущем процессе, пул не запускается
+            self.assertEqual(len(extracted), 0 if budget_mb > 1 else 1)
+            self.assertEqual(backend.stats['parallel_runs'], 0)
+            self.assertIsNone(backend._executor)
+            np.testing.assert_array_equal(stats.std, expected.std)
+
+    def test_process_pool_created_once_across_threads(self):
+        self.assertLessEqual(ColumnParallelBackend().max_workers, MAX_DEFAULT_WORKERS)
+        backend = ColumnParallelBackend(max_workers=2)
+        barrier = threading.Barrier(8)
+        executors = []
+
+        def request():
+            barrier.wait()
+            executors.append(backend._get_executor())
+
+        threads = [threading.Thread(target=request) for _ in range(8)]
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(len({id(executor) for executor in executors}), 1)
+        finally:
+            backend.shutdown()
+        self.assertIsNone(backend._executor)
+
+    def test_transitions_match_row_walk(self):
+        start = self.data['timestamp'].iloc[30]
+        end = self.data['timestamp'].iloc[400]
+        events = self.engine.query_transitions(self.data, ['switch', 'gaps'], start, end)
+
+        expected = []
+        for order, column in enumerate(['switch', 'gaps']):
+            previous = None
+            for row in range(30, 401):
+                value = self.data[column].iloc[row]
+                if pd.isna(value):
+                    continue
+                if previous is not None and value != previous:
+                    expected.append((row, order, column, previous, value))
+                previous = value
+        expected.sort()
+
+        self.assertEqual(list(events['row']), [e[0] for e in expected])
+        self.assertEqual(list(events['column']), [e[2] for e in expected])
+        self.assertEqual(list(events['old_value']), [e[3] for e in expected])
+        self.assertEqual(list(events['new_value']), [e[4] for e in expected])
+        self.assertEqual(self.engine.count_transitions(self.data, ['switch'], start, end),
+                         {'switch': sum(1 for e in expected if e[2] == 'switch')})
+
+    def test_text_transitions_keep_labels(self):
+        data = pd.DataFrame({
+            'timestamp': pd.date_range('2024-01-01', periods=8, freq='s'),
+            'state': ['OFF', 'OFF', None, 'ON', 'ON', 'FAULT', None, 'OFF'],
+            'numeric_text': ['1', '1', '2', None, '2', '3', '3', '3'],
+        })
+        events = self.engine.query_transitions(data, ['state'], data['timestamp'].iloc[0], data['timestamp'].iloc[-1])
+        self.assertEqual(list(events['row']), [3, 5, 7])
+        self.assertEqual(list(events['old_value']), ['OFF', 'ON', 'FAULT'])
+        self.assertEqual(list(events['new_value']), ['ON', 'FAULT', 'OFF'])
+
+        change_points = self.engine.get_change_points(data)
+        state = change_points.transitions('state')
+        self.assertTrue(state.categorical)
+        self.assertEqual((state.first_row, state.first_value), (0, 'OFF'))
+        # Числа в виде строк по-прежнему сравниваются как числа
+        numeric = change_points.transitions('numeric_text')
+        self.assertFalse(numeric.categorical)
+        self.assertEqual(list(numeric.new_values), [2.0, 3.0])
+        self.assertEqual(self.engine.count_transitions(self.data, ['text'], self.data['timestamp'].iloc[0],
+                                                       self.data['timestamp'].iloc[9]), {'text': 9})
+
+    def test_activity_matrix_matches_bucket_rescan(self):
+        columns = ['analog', 'switch', 'gaps']
+        changes = self.engine.activity_matrix(self.data, columns, bucket_seconds=7)
+        variance = self.engine.activity_matrix(self.data, columns, bucket_seconds=7, metric='variance')
+        buckets = (self.data['timestamp'] - self.data['timestamp'].iloc[0]) // pd.Timedelta(seconds=7)
+        self.assertEqual(changes.bucket_count, buckets.max() + 1)
+
+        for i, column in enumerate(columns):
+            # Переход относится к корзине строки нового значения
+            series = self.data[column].dropna()
+            changed = series != series.shift()
+            changed.iloc[0] = False
+            expected_counts = changed.groupby(buckets[series.index]).sum()
+            expected_variance = series.groupby(buckets[series.index]).var().fillna(0.0)
+            for bucket in range(changes.bucket_count):
+                self.assertEqual(changes.values[i, bucket], expected_counts.get(bucket, 0))
+                self.assertAlmostEqual(variance.values[i, bucket], expected_variance[bucket], places=9)
+
+        start, end = changes.time_range(2, 3)
+        self.assertEqual(start, '2024-01-01 00:00:14')
+        self.assertEqual(end, '2024-01-01 00:00:27')
+
+if __name__ == "__main__":
+    unittest.main()
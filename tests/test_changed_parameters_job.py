@@ -0,0 +1,188 @@
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+
+from src.core.models.data_model import DataModel
+from src.ui.controllers.filter_controller import FilterController
+
+THRESHOLD = 0.05
+
+
+def write_recording(path, rows=6000, seed=5):
+    """CSV в формате бортовой записи: составной timestamp, сигналы по четырем вагонам"""
+    rng = np.random.default_rng(seed)
+    times = pd.date_range('2024-03-01 10:00:00', periods=rows, freq='s')
+    columns = {
+        'W_TIMESTAMP_YEAR_1': times.year, 'BY_TIMESTAMP_MONTH_1': times.month, 'BY_TIMESTAMP_DAY_1': times.day,
+        'BY_TIMESTAMP_HOUR_1': times.hour, 'BY_TIMESTAMP_MINUTE_1': times.minute,
+        'BY_TIMESTAMP_SECOND_1': times.second, 'BY_TIMESTAMP_SMALLSECOND_1': np.zeros(rows, dtype=int),
+    }
+    for wagon in range(1, 5):
+        # Изменяемость сигналов зависит от участка записи
+        quiet = np.where(np.arange(rows) < rows * wagon // 5, 0.1, 8.0)
+        columns[f'F_PSN_U_{wagon}'] = np.round(110 + rng.normal(0, 1, rows) * quiet, 1)
+        columns[f'B_DOOR_OPEN_{wagon}'] = (rng.random(rows) < 0.01 * wagon).cumsum() % 2
+        columns[f'F_CONST_{wagon}'] = np.full(rows, 5.0)
+    headers = [f"{code}::L_CAN_BLOCK_1_1|Сигнал" for code in columns]
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("Date: 01.03.2024;\nCase: 1;\nVehicle number: 0001;\n")
+        f.write(';'.join(headers) + '\n')
+        for row in zip(*columns.values()):
+            f.write(';'.join(str(value) for value in row) + '\n')
+    return times
+
+
+class TestChangedParametersJob(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.path = os.path.join(cls.directory, 'recording.csv')
+        cls.times = write_recording(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def setUp(self):
+        self.model = DataModel()
+        self.assertTrue(self.model.load_csv_file(self.path))
+        self.model.define_virtual_channel('F_PSN_U_SUM', 'sum(F_PSN_U)')
+
+    def tearDown(self):
+        self.model.cleanup()
+
+    def time(self, row):
+        return self.times[row].strftime('%Y-%m-%d %H:%M:%S')
+
+    def columns(self, parameters):
+        return sorted(parameter.full_column for parameter in parameters)
+
+    def test_range_change_during_background_analysis(self):
+        job = self.model.prepare_changed_parameters_job(self.time(1000), self.time(2600), THRESHOLD)
+        expected = self.columns(job.run())
+        self.assertTrue(any('L_VIRTUAL' in column for column in expected))
+
+        results, errors = [], []
+        started = threading.Event()
+
+        def background():
+            try:
+                for _ in range(15):
+                    started.set()
+                    results.append(self.columns(job.run()))
+            except Exception as e:
+                errors.append(e)
+
+        worker = threading.Thread(target=background)
+        worker.start()
+        self.assertTrue(started.wait(5))
+        # Поток UI тем временем сдвигает окно и пересчитывает его общим движком
+        windows = [(lo, lo + 700) for lo in range(200, 5000, 350)]
+        while worker.is_alive():
+            for lo, hi in windows:
+                self.assertTrue(self.model.set_user_time_range(self.time(lo), self.time(hi)))
+                self.model.find_changed_parameters_in_range(THRESHOLD)
+        worker.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(results, [expected] * 15)
+        self.assertEqual(self.model.get_time_range_fields()['from_time'], self.time(windows[-1][0]))
+
+        # Результат фонового задания совпадает с расчетом общего движка для того же окна
+        self.assertEqual(self.columns(self.model.find_changed_parameters_in_range(THRESHOLD)),
+                         self.columns(self.model.prepare_changed_parameters_job(
+                             self.time(windows[-1][0]), self.time(windows[-1][1]), THRESHOLD).run()))
+        self.model.set_user_time_range(self.time(1000), self.time(2600))
+        self.assertEqual(self.columns(self.model.find_changed_parameters_in_range(THRESHOLD)), expected)
+
+    def test_controller_touches_model_only_on_ui_thread(self):
+        ui_thread = threading.get_ident()
+        callbacks = queue.Queue()
+        view = MagicMock()
+        view.root.after = lambda delay, callback: callbacks.put(callback)
+        ui_controller = MagicMock()
+        controller = FilterController(self.model, view, MagicMock(), ui_controller)
+        controller.analysis_debounce_seconds = 0
+        controller.change_threshold = THRESHOLD
+
+        # Любое обращение к модели из рабочего потока - ошибка теста
+        touched_from = set()
+        for name in ('set_user_time_range', 'find_changed_parameters_in_range', 'get_change_scores',
+                     'prepare_changed_parameters_job', 'complete_changed_parameters_job'):
+            method = getattr(self.model, name)
+
+            def tracked(*args, _method=method, **kwargs):
+                touched_from.add(threading.get_ident())
+                return _method(*args, **kwargs)
+            setattr(self.model, name, tracked)
+
+        controller._get_time_range_unified = lambda: (self.time(1000), self.time(2600))
+        try:
+            controller._apply_priority_filters_with_criteria({})
+            # Смена диапазона в потоке UI, пока задание в работе
+            self.model.set_user_time_range(self.time(3000), self.time(3500))
+            while not ui_controller.update_parameters.called and not view.show_warning.called:
+                callbacks.get(timeout=10)()
+        finally:
+            controller.cleanup()
+
+        self.assertEqual(touched_from, {ui_thread})
+        shown = ui_controller.update_parameters.call_args[0][0]
+        expected = self.model.prepare_changed_parameters_job(self.time(1000), self.time(2600), THRESHOLD).run()
+        self.assertEqual(sorted(row['full_column'] for row in shown), self.columns(expected))
+
+    def test_threshold_sweep_result_is_cached_with_virtual_channels(self):
+        self.assertTrue(self.model.set_user_time_range(self.time(1000), self.time(2600)))
+        self.model.find_changed_parameters_in_range(THRESHOLD)
+
+        # Второй порог на том же окне считается по оценкам окна
+        for threshold in (0.2, 0.01):
+            with self.subTest(threshold=threshold):
+                swept = self.model.find_changed_parameters_in_range(threshold)
+                self.assertIs(self.model.get_parameters_by_type('changed'), swept)
+                self.assertEqual(len(self.columns(swept)), len(set(self.columns(swept))))
+                # Тот же набор, что и полный расчет окна на этом пороге
+                fresh = DataModel()
+                try:
+                    self.assertTrue(fresh.load_csv_file(self.path))
+                    fresh.define_virtual_channel('F_PSN_U_SUM', 'sum(F_PSN_U)')
+                    fresh.set_user_time_range(self.time(1000), self.time(2600))
+                    self.assertEqual(self.columns(swept), self.columns(fresh.find_changed_parameters_in_range(threshold)))
+                finally:
+                    fresh.cleanup()
+                self.assertTrue(any('L_VIRTUAL' in column for column in self.columns(swept)))
+
+        # Задание по готовым оценкам тоже попадает в кэш
+        job = self.model.prepare_changed_parameters_job(self.time(1000), self.time(2600), 0.3)
+        self.assertIsNotNone(job.result)
+        self.assertEqual(list(job.result), self.model.get_parameters_by_type('changed'))
+
+    def test_synchronous_path_matches_background_job(self):
+        # Без корня Tk фонового исполнителя нет - задание выполняется сразу
+        view = MagicMock(spec=['show_warning', 'show_progress', 'update_status'])
+        ui_controller = MagicMock()
+        controller = FilterController(self.model, view, MagicMock(), ui_controller)
+        controller.change_threshold = THRESHOLD
+        controller._get_time_range_unified = lambda: (self.time(1000), self.time(2600))
+        self.model.data_loader.filter_changed_params = MagicMock(side_effect=AssertionError)
+        try:
+            self.assertIsNone(controller._get_background_runner())
+            controller._apply_priority_filters_with_criteria({})
+        finally:
+            controller.cleanup()
+
+        shown = ui_controller.update_parameters.call_args[0][0]
+        expected = self.model.prepare_changed_parameters_job(self.time(1000), self.time(2600), THRESHOLD).run()
+        self.assertEqual(sorted(row['full_column'] for row in shown), self.columns(expected))
+        self.assertTrue(any('L_VIRTUAL' in row['full_column'] for row in shown))
+
+
+if __name__ == '__main__':
+    unittest.main()
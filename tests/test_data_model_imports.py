@@ -0,0 +1,77 @@
+import importlib.util
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+import src.core.models.data_model as data_model
+
+MISSING = ('src.core.domain.services.duty_cycle', 'src.core.domain.services.filter_query',
+           'src.core.services.analysis_cache')
+
+
+def load_model_module_without(missing):
+    """Отдельная копия модуля data_model при недоступных модулях missing (None в sys.modules - ImportError)"""
+    name = 'src.core.models._data_model_without_services'
+    spec = importlib.util.spec_from_file_location(name, data_model.__file__)
+    module = importlib.util.module_from_spec(spec)
+    with patch.dict(sys.modules, {**{module_name: None for module_name in missing}, name: module}):
+        spec.loader.exec_module(module)
+    return module
+
+
+class TestOptionalServiceImports(unittest.TestCase):
+    def test_missing_service_disables_only_itself(self):
+        module = load_model_module_without(MISSING)
+        self.assertIsNone(module.DutyCycleAnalyzer)
+        self.assertIsNone(module.FilterQueryCompiler)
+        self.assertIsNone(module.AnalysisCache)
+        self.assertIs(module.FilterQueryError, ValueError)
+        # Доменные сущности и остальные сервисы доступны
+        self.assertIs(module.Parameter, data_model.Parameter)
+        self.assertIs(module.TelemetryData, data_model.TelemetryData)
+        self.assertIs(module.ChangeAnalysisEngine, data_model.ChangeAnalysisEngine)
+
+        model = module.DataModel()
+        try:
+            self.assertIsNone(model.duty_cycle_analyzer)
+            self.assertIsNone(model.analysis_cache)
+            self.assertEqual(model.get_cache_statistics(), {})
+
+            rows = 300
+            times = pd.date_range('2024-03-01 10:00:00', periods=rows, freq='s')
+            model._changed_params_cache['probe'] = []
+            directory = tempfile.mkdtemp()
+            self.addCleanup(shutil.rmtree, directory, True)
+            path = os.path.join(directory, 'recording.csv')
+            columns = {
+                'W_TIMESTAMP_YEAR_1': times.year, 'BY_TIMESTAMP_MONTH_1': times.month,
+                'BY_TIMESTAMP_DAY_1': times.day, 'BY_TIMESTAMP_HOUR_1': times.hour,
+                'BY_TIMESTAMP_MINUTE_1': times.minute, 'BY_TIMESTAMP_SECOND_1': times.second,
+                'BY_TIMESTAMP_SMALLSECOND_1': np.zeros(rows, dtype=int),
+                'F_PSN_U_1': np.round(np.linspace(100, 120, rows), 1), 'F_CONST_1': np.full(rows, 5.0),
+            }
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write("Date: 01.03.2024;\nCase: 1;\nVehicle number: 0001;\n")
+                f.write(';'.join(f"{code}::L_CAN_BLOCK_1_1|Сигнал" for code in columns) + '\n')
+                for row in zip(*columns.values()):
+                    f.write(';'.join(str(value) for value in row) + '\n')
+
+            # Загрузка очищает локальные кэши и работает без общего кэша анализа
+            self.assertTrue(model.load_csv_file(path))
+            self.assertNotIn('probe', model._changed_params_cache)
+            changed = [param.signal_code for param in model.find_changed_parameters_in_range(0.05)]
+            self.assertIn('F_PSN_U_1', changed)
+            self.assertNotIn('F_CONST_1', changed)
+            self.assertIsNone(model.analyze_duty_cycles())
+        finally:
+            model.cleanup()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import random
+import unittest
+from unittest.mock import MagicMock
+
+from src.config.diagnostic_filters_config import CRITICAL_FILTERS, SYSTEM_FILTERS, FUNCTIONAL_FILTERS
+from src.core.domain.services.diagnostic_category_index import (
+    DiagnosticCategoryIndex, DiagnosticPatternMatcher
+)
+from src.ui.controllers.diagnostic_controller import DiagnosticController
+
+GROUPS = {'criticality': CRITICAL_FILTERS, 'systems': SYSTEM_FILTERS, 'functions': FUNCTIONAL_FILTERS}
+PARTS = ['BCU', 'FAULT', 'INV', 'DOOR', 'PSN', 'QF1', 'TEMP', 'PRESSURE', 'LOW', 'STATE', 'BUD',
+         'FIRE', 'ALARM', 'SET', 'CAN', 'ERR', 'AVAILABLE', 'CURRENT', 'X']
+
+
+def make_parameters(count, seed=11):
+    rng = random.Random(seed)
+    return [{
+        'signal_code': f"{rng.choice(['B', 'BY', 'F', 'S'])}_" + '_'.join(rng.sample(PARTS, 3)) + f"_{i}",
+        'description': rng.choice(['', 'Давление тормоза', 'voltage fault', 'Banner#1'])
+    } for i in range(count)]
+
+
+def scan(parameter):
+    text = f"{parameter['signal_code']} {parameter['description']}".upper()
+    return {(group, key) for group, config in GROUPS.items() for key, conf in config.items()
+            if any(pattern.upper() in text for pattern in conf['patterns'])}
+
+
+class TestDiagnosticCategoryIndex(unittest.TestCase):
+    def test_categories_match_pattern_scan(self):
+        parameters = make_parameters(3000)
+        index = DiagnosticCategoryIndex(parameters)
+        matcher = index.matcher
+
+        for i, parameter in enumerate(parameters):
+            bits = index.bits(i)
+            found = {(group, key) for group in GROUPS for key in matcher.keys(bits, group)}
+            self.assertEqual(found, scan(parameter), parameter)
+
+        criteria = {'criticality': ['brake_critical'], 'systems': ['doors', 'climate'], 'functions': []}
+        expected = [i for i, p in enumerate(parameters)
+                    if scan(p) & {('criticality', 'brake_critical'), ('systems', 'doors'), ('systems', 'climate')}]
+        self.assertEqual(index.positions(criteria).tolist(), expected)
+
+    def test_overlapping_patterns_at_same_position(self):
+        matcher = DiagnosticPatternMatcher()
+        bits = matcher.signal_bits('B_BCU_FAULT')
+
+        self.assertEqual(matcher.keys(bits, 'criticality'), ['emergency', 'brake_critical'])
+        self.assertEqual(matcher.keys(bits, 'systems'), ['brakes'])
+        self.assertEqual(matcher.keys(bits, 'functions'), ['faults'])
+        self.assertEqual(matcher.first_key(matcher.signal_bits('S_X'), 'systems'), None)
+
+    def test_controller_filters_by_index(self):
+        parameters = make_parameters(500)
+        ui_controller = MagicMock()
+        controller = DiagnosticController(MagicMock(), MagicMock(), MagicMock(), ui_controller)
+        controller._has_data = MagicMock(return_value=True)
+        controller._get_all_parameters = MagicMock(return_value=parameters)
+
+        controller.apply_diagnostic_filters({'criticality': [], 'systems': ['power'], 'functions': ['controls']})
+        filtered = ui_controller.update_parameters.call_args[0][0]
+
+        self.assertEqual(filtered, [p for p in parameters
+                                    if scan(p) & {('systems', 'power'), ('functions', 'controls')}])
+        index = controller._category_index
+        controller.apply_diagnostic_filters({'systems': ['doors']})
+        self.assertIs(controller._category_index, index)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.core.domain.services.change_point_index import ChangePointIndex
+from src.core.domain.services.duty_cycle import DutyCycleAnalyzer
+
+
+def reference(values, timestamps, start, stop):
+    """Наработка построчным проходом: удержание последнего значения, обрезка границами окна"""
+    held, state, since = None, None, None
+    totals = {True: 0.0, False: 0.0}
+    longest = {True: 0.0, False: 0.0}
+    switches = on_switches = 0
+    first_known = None
+    for i in range(stop):
+        if not np.isnan(values[i]):
+            held = values[i] != 0
+        if i < start or held is None:
+            continue
+        if state is None:
+            state, since, first_known = held, timestamps[i], timestamps[i]
+        elif held != state:
+            duration = (timestamps[i] - since) / 1e9
+            totals[state] += duration
+            longest[state] = max(longest[state], duration)
+            switches += 1
+            on_switches += int(held)
+            state, since = held, timestamps[i]
+    if state is None:
+        return None
+    duration = (timestamps[stop - 1] - since) / 1e9
+    totals[state] += duration
+    longest[state] = max(longest[state], duration)
+    return {'switches': switches, 'on_switches': on_switches, 'on_seconds': totals[True],
+            'off_seconds': totals[False], 'longest_on_seconds': longest[True],
+            'longest_off_seconds': longest[False],
+            'covered_seconds': (timestamps[stop - 1] - first_known) / 1e9}
+
+
+class TestDutyCycleAnalyzer(unittest.TestCase):
+    def setUp(self):
+        rows = 6000
+        rng = np.random.default_rng(21)
+        # Неравномерный шаг записи
+        self.timestamps = pd.Timestamp('2024-01-01') + pd.to_timedelta(
+            np.cumsum(rng.integers(50, 250, rows)), unit='ms')
+        columns = {}
+        for wagon in range(1, 4):
+            columns[f'B_KM_ON_{wagon}'] = ((rng.random(rows) < 0.02).cumsum() % 2).astype(float)
+            columns[f'B_DOOR_OPEN_{wagon}'] = ((rng.random(rows) < 0.005).cumsum() % 2).astype(float)
+        # Пропуски, значения кроме 0/1, позднее начало и пустой столбец
+        columns['B_KM_ON_2'][rng.random(rows) < 0.3] = np.nan
+        columns['B_DOOR_OPEN_3'] = columns['B_DOOR_OPEN_3'] * rng.integers(1, 4, rows)
+        columns['B_LATE'] = np.where(np.arange(rows) < 3500, np.nan, (np.arange(rows) // 40) % 2)
+        columns['B_EMPTY'] = np.full(rows, np.nan)
+        columns['F_SPEED'] = rng.normal(50, 5, rows)
+        self.data = pd.DataFrame({'timestamp': self.timestamps, **columns})
+        self.parameters = [{'signal_code': column, 'full_column': column} for column in columns]
+        self.parameters.append({'signal_code': 'B_VIRTUAL', 'full_column': 'B_VIRTUAL', 'is_virtual': True})
+        self.analyzer = DutyCycleAnalyzer()
+
+    def test_matches_row_scan(self):
+        timestamps = self.timestamps.to_numpy().astype('datetime64[ns]').astype(np.int64)
+        index = ChangePointIndex(self.data)
+        for window in (slice(0, 6000), slice(1234, 4321), slice(3600, 3601), slice(4000, 4000)):
+            report = self.analyzer.analyze(self.data, self.parameters, window, index)
+            self.assertNotIn('F_SPEED', report.columns)
+            self.assertNotIn('B_VIRTUAL', report.columns)
+            frame = report.as_frame().set_index('column')
+            for column in report.columns:
+                with self.subTest(window=window, column=column):
+                    expected = reference(self.data[column].to_numpy(), timestamps, window.start, window.stop) \
+                        if window.stop > window.start else None
+                    row = frame.loc[column]
+                    if expected is None:
+                        self.assertEqual(row['switches'], 0)
+                        self.assertTrue(np.isnan(row['on_seconds']))
+                        continue
+                    for key, value in expected.items():
+                        self.assertAlmostEqual(row[key], value, places=6, msg=key)
+                    self.assertAlmostEqual(row['on_seconds'] + row['off_seconds'], row['covered_seconds'], places=6)
+
+    def test_table_and_rates(self):
+        report = self.analyzer.analyze(self.data, self.parameters, wagon_name=lambda w: f'{w}w')
+        frame = report.as_frame()
+        self.assertEqual(list(frame['signal_code'][:2]), ['B_KM_ON_1', 'B_DOOR_OPEN_1'])
+        self.assertEqual(frame.loc[0, 'wagon_name'], '1w')
+        self.assertTrue(pd.isna(frame.loc[frame['signal_code'] == 'B_LATE', 'wagon']).all())
+
+        row = report.as_dict('B_KM_ON_1')
+        self.assertAlmostEqual(row['switches_per_hour'], row['switches'] * 3600 / row['covered_seconds'])
+        self.assertAlmostEqual(row['duty_cycle'], row['on_seconds'] / row['covered_seconds'])
+
+        pivot = report.pivot('on_switches')
+        self.assertEqual(list(pivot.columns), ['1w', '2w', '3w'])
+        self.assertEqual(pivot.loc['B_KM_ON', '3w'], report.as_dict('B_KM_ON_3')['on_switches'])
+        self.assertEqual(report.ranked('switches', top_n=1)['signal_code'].iloc[0],
+                         frame.loc[frame['switches'].idxmax(), 'signal_code'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.core.domain.services.event_correlation import EventCorrelationEngine
+from src.core.services.diagnostic_analyzer import DiagnosticAnalyzer
+
+
+class TestEventCorrelationEngine(unittest.TestCase):
+    def setUp(self):
+        rows = 6000
+        rng = np.random.default_rng(11)
+        fault = np.zeros(rows)
+        precursor = np.zeros(rows)
+        follower = np.zeros(rows)
+        self.fault_rows = [1000, 2500, 4000, 5200]
+        for row in self.fault_rows:
+            fault[row:row + 100] = 1
+            precursor[row - 20:row + 150] = 1     # за 2 с до срабатывания
+            follower[row + 30:row + 60] = 1       # через 3 с после
+        precursor[3300:3400] = 1                  # одно лишнее включение без неисправности
+
+        self.data = pd.DataFrame({
+            'timestamp': pd.date_range('2024-01-01', periods=rows, freq='100ms'),
+            'B_INV_FAULT_1': fault,
+            'B_PRECURSOR_1': precursor,
+            'B_FOLLOWER_1': follower,
+            'F_NOISE_1': rng.integers(0, 2, rows).astype(float),
+            'B_IDLE_1': np.zeros(rows),
+        })
+        self.candidates = ['B_PRECURSOR_1', 'B_FOLLOWER_1', 'F_NOISE_1', 'B_IDLE_1']
+        self.engine = EventCorrelationEngine()
+
+    def test_counts_match_row_scan(self):
+        window = 5.0
+        result = self.engine.correlate(self.data, ['B_INV_FAULT_1'], self.candidates, window)['B_INV_FAULT_1']
+        self.assertEqual(result.event_count, len(self.fault_rows))
+
+        times = self.data['timestamp']
+        by_column = {c.column: c for c in result.precursors}
+        for column in self.candidates:
+            values = self.data[column].to_numpy()
+            changes = times[np.flatnonzero(values[1:] != values[:-1]) + 1]
+            preceded = 0
+            for row in self.fault_rows:
+                event = times.iloc[row]
+                preceded += bool(((changes >= event - pd.Timedelta(seconds=window)) & (changes < event)).any())
+            self.assertEqual(by_column[column].preceded_events if column in by_column else 0, preceded)
+
+    def test_consistent_precursor_ranks_first(self):
+        result = self.engine.correlate(self.data, ['B_INV_FAULT_1'], self.candidates, 5.0)['B_INV_FAULT_1']
+        top = result.precursors[0]
+        self.assertEqual(top.column, 'B_PRECURSOR_1')
+        self.assertEqual(top.support, 1.0)
+        self.assertAlmostEqual(top.median_lead_seconds, 2.0)
+        self.assertEqual(result.followers[0].column, 'B_FOLLOWER_1')
+        # Шумовой сигнал переключается почти в каждом окне - поправка на случайность обнуляет его
+        noise = next(c for c in result.precursors if c.column == 'F_NOISE_1')
+        self.assertLess(noise.consistency, 0.05)
+
+    def test_candidates_reach_diagnostic_analyzer(self):
+        correlations = self.engine.correlate(self.data, ['B_INV_FAULT_1'], self.candidates, 5.0)
+        signals = [{'signal_code': column[:-2], 'full_column': column, 'description': ''}
+                   for column in ['B_INV_FAULT_1'] + self.candidates]
+        results = DiagnosticAnalyzer().analyze_fault_correlations(correlations, signals)
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0].possible_root_causes[0], 'B_PRECURSOR')
+        self.assertEqual(results[0].data_driven_causes[0]['preceded_events'], 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.core.domain.entities.signal_classifier import SignalClassifier
+from src.core.domain.services.fault_activity import FaultActivityScanner
+from src.core.services.diagnostic_analyzer import DiagnosticAnalyzer
+
+
+def scan_rows(values, times, lo, hi):
+    """Интервалы активности и передние фронты построчным просмотром окна"""
+    before = values[:lo + 1][~np.isnan(values[:lo + 1])]
+    inside = values[lo:hi][~np.isnan(values[lo:hi])]
+    state = bool(before[-1] if len(before) else inside[0])
+    intervals, rising, start = [], [], times[lo] if state else None
+    for row in range(lo + 1, hi):
+        if np.isnan(values[row]) or (values[row] != 0) == state:
+            continue
+        state = not state
+        if state:
+            start = times[row]
+            rising.append(times[row])
+        else:
+            intervals.append((start, times[row]))
+    if state:
+        intervals.append((start, times[hi - 1]))
+    return intervals, rising
+
+
+class TestFaultActivityScanner(unittest.TestCase):
+    def setUp(self):
+        rows = 5000
+        rng = np.random.default_rng(5)
+        self.times = pd.date_range('2024-01-01', periods=rows, freq='100ms')
+        columns = {}
+        for i in range(6):
+            # Случайные включения разной длины, часть с пропусками
+            values = (rng.random(rows) < 0.002).astype(float)
+            values = np.minimum(1, np.convolve(values, np.ones(40 + 10 * i))[:rows])
+            if i % 2:
+                values[rng.integers(0, rows, 300)] = np.nan
+            columns[['B_BCU_FAULT_1', 'B_BRAKE_APPLIED_1'][i] if i < 2 else f'B_UNIT{i}_FAULT_1'] = values
+        columns['B_UNIT9_FAULT_1'] = np.ones(rows)
+        columns['B_IDLE_FAULT_1'] = np.zeros(rows)
+        self.data = pd.DataFrame({'timestamp': self.times, **columns})
+        self.columns = {column: column[:-2] for column in columns}
+        self.scanner = FaultActivityScanner()
+
+    def test_intervals_match_row_scan(self):
+        for lo, hi in [(0, 5000), (1234, 3900), (4999, 5000)]:
+            report = self.scanner.scan(self.data, self.columns, slice(lo, hi))
+            times = self.times.to_numpy()
+            for column, activity in report.activities.items():
+                with self.subTest(column=column, window=(lo, hi)):
+                    intervals, rising = scan_rows(self.data[column].to_numpy(), times, lo, hi)
+                    self.assertEqual([tuple(pair) for pair in activity.intervals], intervals)
+                    self.assertEqual(list(activity.rising_edges), rising)
+                    expected = sum((end - start) / np.timedelta64(1, 's') for start, end in intervals)
+                    self.assertAlmostEqual(activity.active_seconds, expected)
+
+        report = self.scanner.scan(self.data, self.columns, slice(100, 4000))
+        self.assertTrue(report.activities['B_UNIT9_FAULT_1'].active_at_start)
+        self.assertEqual(report.activities['B_UNIT9_FAULT_1'].occurrence_count, 0)
+        self.assertFalse(report.activities['B_IDLE_FAULT_1'].was_active)
+
+    def test_text_state_column_is_skipped(self):
+        data = self.data.assign(B_TEXT_FAULT_1=np.where(np.arange(len(self.data)) < 2500, 'OK', 'FAULT'))
+        with self.assertLogs('FaultActivityScanner', level='WARNING') as logs:
+            report = self.scanner.scan(data, {**self.columns, 'B_TEXT_FAULT_1': 'B_TEXT_FAULT'})
+        self.assertNotIn('B_TEXT_FAULT_1', report.activities)
+        self.assertIn('B_TEXT_FAULT_1', logs.output[0])
+        self.assertEqual(set(report.activities), set(self.columns))
+
+    def test_fault_columns_by_classification(self):
+        parameters = [
+            {'signal_code': 'B_BCU_FAULT', 'full_column': 'B_BCU_FAULT_1', 'description': '', 'data_type': 'B'},
+            {'signal_code': 'BY_BCU_ERR_CODE', 'full_column': 'BY_BCU_ERR_CODE_1', 'description': '', 'data_type': 'BY'},
+            {'signal_code': 'F_MOTOR_FAULT_LEVEL', 'full_column': 'F_X_1', 'description': '', 'data_type': 'F'},
+            {'signal_code': 'B_DOOR_OPENED', 'full_column': 'B_DOOR_OPENED_1', 'description': '', 'data_type': 'B'},
+        ]
+        columns = FaultActivityScanner.fault_columns(parameters, SignalClassifier())
+        self.assertEqual(columns, {'B_BCU_FAULT_1': 'B_BCU_FAULT', 'BY_BCU_ERR_CODE_1': 'BY_BCU_ERR_CODE'})
+
+    def test_analyzer_uses_activations(self):
+        report = self.scanner.scan(self.data, self.columns)
+        analyzer = DiagnosticAnalyzer()
+        analyzer.set_fault_activity(report)
+        signals = [{'signal_code': code, 'full_column': column, 'description': ''}
+                   for column, code in self.columns.items()]
+
+        results = {r.signal_code: r for r in analyzer.analyze_fault_signals(signals, signals)}
+        self.assertNotIn('B_IDLE_FAULT', results)
+        active = report.activities['B_BCU_FAULT_1']
+        result = results['B_BCU_FAULT']
+        self.assertEqual(result.activity['occurrence_count'], active.occurrence_count)
+        # Время цепочки - первое срабатывание в записи, а не момент анализа
+        self.assertEqual(result.causal_chains[0].timestamp, active.first_activation)
+        self.assertLess(active.first_activation, datetime(2024, 1, 2))
+
+        health = analyzer.analyze_system_health(signals)
+        self.assertEqual([a['signal_code'] for a in health['active_faults']],
+                         [a.signal_code for a in report.active()])
+
+
+if __name__ == '__main__':
+    unittest.main()
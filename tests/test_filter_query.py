@@ -0,0 +1,112 @@
+import random
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from src.core.config.filter_presets import FilterPresetStore
+from src.core.domain.services.change_analysis_engine import ChangeScores
+from src.core.domain.services.filter_query import (
+    FilterQueryCompiler, FilterQueryContext, FilterQueryError
+)
+
+BRAKE_PATTERNS = ['BCU_', 'BRAKE_', 'PRESSURE_', 'VALVE_', 'SLIDING_', 'KNORR']
+
+
+def make_parameters(count, seed=5):
+    rng = random.Random(seed)
+    parameters = []
+    for i in range(count):
+        data_type = rng.choice(['B', 'BY', 'W', 'F'])
+        parameters.append({
+            'signal_code': f"{data_type}_{rng.choice(['BCU_', 'INV', 'DOOR_', 'PSN_'])}"
+                           f"{rng.choice(['FAULT', 'STATE', 'PRESSURE'])}{i}",
+            'full_column': f"col_{i}",
+            'description': rng.choice(['', 'Давление в тормозной магистрали']),
+            'line': rng.choice(['L_CAN_BLOK_CH', 'L_CAN_ICU_CH_A', 'L_MVB']),
+            'wagon': str(rng.randint(1, 11)),
+            'data_type': data_type,
+            'is_problematic': i % 37 == 0
+        })
+    return parameters
+
+
+def make_scores(parameters, seed=9):
+    rng = np.random.default_rng(seed)
+    count = len(parameters)
+    return ChangeScores(columns=[p['full_column'] for p in parameters], score=rng.random(count),
+                        coefficient_of_variation=rng.random(count), unique_ratio=rng.random(count),
+                        change_count=rng.integers(0, 100, count))
+
+
+class TestFilterQuery(unittest.TestCase):
+    def setUp(self):
+        self.parameters = make_parameters(3000)
+        self.scores = make_scores(self.parameters)
+        self.compiler = FilterQueryCompiler()
+        self.context = FilterQueryContext(self.parameters)
+        self.context.set_change_scores(self.scores)
+
+    def positions(self, query):
+        return np.flatnonzero(self.context.mask(self.compiler.compile(query))).tolist()
+
+    def expected(self, predicate):
+        return [i for i, p in enumerate(self.parameters) if predicate(i, p)]
+
+    def test_metadata_and_behaviour_terms_match_brute_force(self):
+        score = self.scores.score
+        cases = {
+            'type:B wagon:3..5 line:L_CAN_* changed>0.2 system:brakes':
+                lambda i, p: (p['data_type'] == 'B' and 3 <= int(p['wagon']) <= 5
+                              and p['line'].startswith('L_CAN_') and score[i] > 0.2
+                              and any(x in p['signal_code'] or x in p['description'].upper()
+                                      for x in BRAKE_PATTERNS)),
+            '(type:B OR type:w) -line:L_MVB':
+                lambda i, p: p['data_type'] in ('B', 'W') and p['line'] != 'L_MVB',
+            'wagon:1,11 NOT is:normal':
+                lambda i, p: p['wagon'] in ('1', '11') and p['is_problematic'],
+            'тормозн changes<10 | code:F_INV*':
+                lambda i, p: ('тормозн' in p['description'].lower() and self.scores.change_count[i] < 10)
+                or p['signal_code'].startswith('F_INV'),
+            'is:changed cv>=0.5':
+                lambda i, p: score[i] > 0.1 and self.scores.coefficient_of_variation[i] >= 0.5,
+        }
+        for query, predicate in cases.items():
+            with self.subTest(query=query):
+                self.assertEqual(self.positions(query), self.expected(predicate))
+
+    def test_plan_is_cached_and_ordered_by_cost(self):
+        plan = self.compiler.compile('changed>0.2  fault type:B')
+        self.assertIs(self.compiler.compile('changed>0.2 fault type:B'), plan)
+        self.assertEqual(self.compiler.statistics, {'hits': 1, 'misses': 1})
+        self.assertEqual(plan.describe(), 'type:B "fault" changed>0.2')
+        self.assertTrue(plan.uses_change_scores)
+
+        self.assertEqual(self.positions(''), list(range(len(self.parameters))))
+
+    def test_errors_are_reported(self):
+        for query in ['foo:bar', 'system:nowhere', '(type:B', 'type:B )', 'NOT', 'is:broken']:
+            with self.subTest(query=query):
+                with self.assertRaises(FilterQueryError):
+                    self.context.mask(self.compiler.compile(query))
+
+        context = FilterQueryContext(self.parameters)
+        with self.assertRaises(FilterQueryError):
+            context.mask(self.compiler.compile('changed>0.5'))
+
+    def test_presets_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'presets.json'
+            store = FilterPresetStore(path)
+            self.assertTrue(store.save('Тормоза', 'system:brakes   changed>0.2'))
+
+            reloaded = FilterPresetStore(path)
+            self.assertEqual(reloaded.names(), ['Тормоза'])
+            self.assertEqual(reloaded.get('Тормоза'), 'system:brakes changed>0.2')
+            self.assertTrue(reloaded.delete('Тормоза'))
+            self.assertEqual(FilterPresetStore(path).names(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,263 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.core.domain.services.change_analysis_engine import NumericMatrix
+from src.core.domain.services.monitoring_rules import RuleCompiler, RuleEngine, RuleError
+from src.core.models.data_model import DataModel
+from src.infrastructure.reporting.core.report_manager import ReportManager
+
+WAGONS = 4
+
+
+def reference_intervals(enter, stay, timestamps, min_duration):
+    """Нарушения построчным проходом: триггер с гистерезисом и отбором по длительности"""
+    intervals, active, start = [], False, None
+    for i in range(len(enter)):
+        if not active and enter[i]:
+            active, start = True, i
+        elif active and not stay[i]:
+            intervals.append((start, i))
+            active = False
+    if active:
+        intervals.append((start, len(enter)))
+    last = len(timestamps) - 1
+    return [(timestamps[s], timestamps[min(e, last)]) for s, e in intervals
+            if (timestamps[min(e, last)] - timestamps[s]) / np.timedelta64(1, 's') >= min_duration]
+
+
+class TestRuleCompiler(unittest.TestCase):
+    def setUp(self):
+        self.compiler = RuleCompiler()
+
+    def test_rule_syntax(self):
+        rule = self.compiler.compile('low_voltage: F_U3000 < 2200 for 2s hyst 50')
+        self.assertEqual((rule.name, rule.signals, rule.min_duration, rule.hysteresis),
+                         ('low_voltage', ['F_U3000'], 2.0, 50.0))
+
+        rule = self.compiler.compile('B_DOOR_HINDRANCE while speed > 0 or not (A + B * 2 >= -3) for 1.5 min')
+        self.assertEqual(rule.root.describe(), '(B_DOOR_HINDRANCE and (speed > 0)) or not ((A + (B * 2)) >= -3)')
+        self.assertEqual(rule.min_duration, 90.0)
+        self.assertEqual(rule.name, rule.expression)
+        self.assertIs(self.compiler.compile('B_DOOR_HINDRANCE  while speed > 0 or not (A + B * 2 >= -3) for 1.5 min'),
+                      rule)
+
+    def test_errors(self):
+        for text in ('A <', 'A < 3 for', '(A > 1', 'A 3', 'A < 2s', 'for 2', 'A > 1 hyst x', 'A $ 2'):
+            with self.subTest(text=text):
+                with self.assertRaises(RuleError):
+                    self.compiler.compile(text)
+        with self.assertRaisesRegex(RuleError, 'Строка 3'):
+            self.compiler.compile_rules('a: X > 1\n# комментарий\na: X > 2')
+
+    def test_rule_set_text(self):
+        rules = self.compiler.compile_rules('\n  a: X > 1   # порог\n\nb: Y\n')
+        self.assertEqual([rule.name for rule in rules], ['a', 'b'])
+        self.assertEqual(rules[1].root.operator, 'truthy')
+
+
+class TestRuleEngine(unittest.TestCase):
+    def setUp(self):
+        rows = 4000
+        rng = np.random.default_rng(3)
+        self.times = pd.date_range('2024-01-01', periods=rows, freq='100ms')
+        columns, self.parameters = {}, []
+        for wagon in range(1, WAGONS + 1):
+            columns[f'F_U3000_{wagon}'] = 2250 + np.cumsum(rng.normal(0, 8, rows))
+            columns[f'B_DOOR_HINDRANCE_{wagon}'] = ((rng.random(rows) < 0.01).cumsum() % 2).astype(float)
+        columns['F_SPEED'] = np.clip(np.cumsum(rng.normal(0, 1, rows)), 0, None)
+        columns['F_SPEED'][100:140] = np.nan
+        # Вагон 5 только у напряжения - в правилах с дверями его нет
+        columns['F_U3000_5'] = 2250 + np.cumsum(rng.normal(0, 8, rows))
+        for column in columns:
+            self.parameters.append({'signal_code': column, 'full_column': column})
+        self.data = pd.DataFrame({'timestamp': self.times, **columns})
+        self.compiler = RuleCompiler()
+        self.engine = RuleEngine()
+
+    def violations(self, report, rule):
+        found = {}
+        for violation in report.by_rule()[rule]:
+            found.setdefault(violation.wagon, []).append((violation.start, violation.end))
+        return found
+
+    def test_matches_row_scan(self):
+        rules = self.compiler.compile_rules([
+            'low: F_U3000 < 2200 for 2s hyst 15',
+            'raw: F_U3000 < 2200',
+            'door: B_DOOR_HINDRANCE while F_SPEED > 2 hyst 0.5',
+            'quiet: not (F_SPEED > 1) and F_U3000 > 2250 for 0.5s hyst 0.3',
+        ])
+        report = self.engine.evaluate(self.data, rules, self.parameters, numeric_matrix=NumericMatrix(self.data))
+        self.assertEqual(report.errors, {})
+        timestamps = self.times.to_numpy()
+        speed = self.data['F_SPEED'].to_numpy()
+
+        for wagon in range(1, WAGONS + 2):
+            voltage = self.data[f'F_U3000_{wagon}'].to_numpy()
+            expected = {
+                'low': reference_intervals(voltage < 2200, voltage < 2215, timestamps, 2),
+                'raw': reference_intervals(voltage < 2200, voltage < 2200, timestamps, 0),
+                # Под отрицанием порог удержания сдвигается в обратную сторону
+                'quiet': reference_intervals(~(speed > 1) & (voltage > 2250), ~(speed > 1.3) & (voltage > 2249.7),
+                                             timestamps, 0.5),
+            }
+            if wagon <= WAGONS:
+                door = self.data[f'B_DOOR_HINDRANCE_{wagon}'].to_numpy() != 0
+                expected['door'] = reference_intervals(door & (speed > 2), door & (speed > 1.5), timestamps, 0)
+            for rule, intervals in expected.items():
+                with self.subTest(rule=rule, wagon=wagon):
+                    self.assertEqual(self.violations(report, rule).get(wagon, []), intervals)
+
+        self.assertNotIn(5, self.violations(report, 'door'))
+        self.assertTrue(all(self.violations(report, rule) for rule in ('low', 'raw', 'door', 'quiet')))
+        door = report.by_rule()['door'][0]
+        self.assertEqual(door.columns, (f'B_DOOR_HINDRANCE_{door.wagon}', 'F_SPEED'))
+
+    def test_shared_subexpressions_and_errors(self):
+        rules = self.compiler.compile_rules([
+            'a: F_U3000 < 2200 and F_SPEED > 1',
+            'b: F_U3000 < 2200 and F_SPEED > 1 for 1s',
+            'c: MISSING > 0',
+            'd: F_SPEED > 1',
+        ])
+        report = self.engine.evaluate(self.data, rules, self.parameters)
+        self.assertEqual(list(report.errors), ['c'])
+        for rule in rules[:2] + rules[3:]:
+            alone = self.engine.evaluate(self.data, [rule], self.parameters)
+            self.assertEqual([v.as_dict() for v in alone.violations],
+                             [v.as_dict() for v in report.by_rule()[rule.name]])
+
+        # Общий сигнал без вагона: одна серия на запись, закраска по столбцу
+        speed = report.by_rule()['d']
+        self.assertTrue(all(v.wagon is None for v in speed))
+        self.assertEqual(len(report.intervals('F_SPEED')),
+                         sum(len(report.by_rule()[name]) for name in ('a', 'b', 'd')))
+        summary = {row['rule']: row for row in report.summary()}
+        self.assertEqual(summary['d']['violations'], len(speed))
+        self.assertEqual(summary['c']['error'], report.errors['c'])
+        self.assertEqual(len(report.as_frame()), len(report))
+
+    def test_wagon_aggregates(self):
+        rules = self.compiler.compile_rules([
+            'spread: abs(F_U3000 - mean(F_U3000)) > 40',
+            'doors: any(B_DOOR_HINDRANCE) and max(F_U3000) > 2300',
+        ])
+        self.assertEqual(rules[0].wagon_signals, ['F_U3000'])
+        self.assertEqual(rules[1].root.describe(), 'any(B_DOOR_HINDRANCE) and (max(F_U3000) > 2300)')
+        report = self.engine.evaluate(self.data, rules, self.parameters)
+        self.assertEqual(report.errors, {})
+        timestamps = self.times.to_numpy()
+
+        # Агрегат берется по всем вагонам семейства, в том числе пятому
+        voltage = self.data[[f'F_U3000_{w}' for w in range(1, WAGONS + 2)]].to_numpy()
+        doors = self.data[[f'B_DOOR_HINDRANCE_{w}' for w in range(1, WAGONS + 1)]].to_numpy() != 0
+        for wagon in range(1, WAGONS + 2):
+            spread = np.abs(voltage[:, wagon - 1] - voltage.mean(axis=1)) > 40
+            self.assertEqual(self.violations(report, 'spread').get(wagon, []),
+                             reference_intervals(spread, spread, timestamps, 0))
+        condition = doors.any(axis=1) & (voltage.max(axis=1) > 2300)
+        self.assertEqual(self.violations(report, 'doors').get(None, []),
+                         reference_intervals(condition, condition, timestamps, 0))
+        self.assertEqual(len(report.by_rule()['doors'][0].columns), 2 * WAGONS + 1)
+
+
+
+def write_recording(path, voltage):
+    """CSV в формате бортовой записи с сигналом напряжения F_U3000 по двум вагонам"""
+    times = pd.date_range('2024-03-01 10:00:00', periods=len(voltage), freq='s')
+    columns = {
+        'W_TIMESTAMP_YEAR_1': times.year, 'BY_TIMESTAMP_MONTH_1': times.month, 'BY_TIMESTAMP_DAY_1': times.day,
+        'BY_TIMESTAMP_HOUR_1': times.hour, 'BY_TIMESTAMP_MINUTE_1': times.minute,
+        'BY_TIMESTAMP_SECOND_1': times.second, 'BY_TIMESTAMP_SMALLSECOND_1': np.zeros(len(voltage), dtype=int),
+        'F_U3000_1': voltage, 'F_U3000_2': np.full(len(voltage), 3000.0),
+    }
+    headers = [f"{code}::L_CAN_BLOCK_1_1|Сигнал" for code in columns]
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("Date: 01.03.2024;\nCase: 1;\nVehicle number: 0001;\n")
+        f.write(';'.join(headers) + '\n')
+        for row in zip(*columns.values()):
+            f.write(';'.join(str(value) for value in row) + '\n')
+    return times
+
+
+class TestActiveRuleSet(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        voltage = np.full(600, 3000.0)
+        voltage[100:130] = 2000.0
+        voltage[400:405] = 2000.0
+        self.first = os.path.join(self.directory, 'first.csv')
+        self.times = write_recording(self.first, voltage)
+        voltage[100:130] = 3000.0
+        self.second = os.path.join(self.directory, 'second.csv')
+        write_recording(self.second, voltage)
+        self.model = DataModel()
+        self.column = 'F_U3000_1::L_CAN_BLOCK_1_1|Сигнал'
+
+    def tearDown(self):
+        self.model.cleanup()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_rule_set_follows_loaded_recordings(self):
+        # Набор задается до загрузки и вычисляется для каждой записи
+        self.assertIsNone(self.model.set_monitoring_rules('low_voltage: F_U3000 < 2200 for 2s'))
+        self.assertTrue(self.model.load_csv_file(self.first))
+        report = self.model.get_rule_report()
+        self.assertEqual(len(report.violations), 2)
+        self.assertIs(self.model.data_loader.rule_report, report)
+        intervals = self.model.get_rule_violation_intervals(self.column)
+        self.assertEqual(intervals[0, 0], np.datetime64(self.times[100]))
+        self.assertEqual(len(self.model.get_rule_violation_intervals('F_U3000_2::L_CAN_BLOCK_1_1|Сигнал')), 0)
+
+        self.assertTrue(self.model.load_csv_file(self.second))
+        self.assertEqual(len(self.model.get_rule_report().violations), 1)
+        self.assertTrue(self.model.load_csv_file(self.first))
+        self.assertEqual(len(self.model.data_loader.rule_report.violations), 2)
+
+        # Ошибка в тексте не сбрасывает действующий набор
+        with self.assertRaises(RuleError):
+            self.model.set_monitoring_rules('low_voltage: F_U3000 <')
+        self.assertEqual(self.model.get_monitoring_rules(), 'low_voltage: F_U3000 < 2200 for 2s')
+        self.assertEqual(len(self.model.get_rule_report().violations), 2)
+
+        self.assertIsNone(self.model.set_monitoring_rules('  # отключено\n'))
+        self.assertIsNone(self.model.data_loader.rule_report)
+        self.assertIsNone(self.model.get_rule_violation_intervals(self.column))
+
+    def test_rules_over_virtual_channels(self):
+        self.assertTrue(self.model.load_csv_file(self.first))
+        self.model.set_monitoring_rules('v: F_U3000_MIN < 2200 for 2s')
+        self.assertIn('F_U3000_MIN', self.model.get_rule_report().errors['v'])
+
+        # Определение канала пересчитывает действующий набор правил
+        column = self.model.define_virtual_channel('F_U3000_MIN', 'min(F_U3000)').columns[0]
+        report = self.model.get_rule_report()
+        self.assertEqual(report.errors, {})
+        self.assertEqual(len(report.violations), 2)
+        self.assertEqual(len(self.model.get_rule_violation_intervals(column)), 2)
+
+    def test_report_tables(self):
+        self.assertTrue(self.model.load_csv_file(self.first))
+        self.model.set_monitoring_rules('low_voltage: F_U3000 < 2200 for 2s\nmissing: F_NONE > 1')
+        manager = ReportManager(self.model.data_loader)
+
+        tables = manager._collect_rule_tables(self.times[300].to_pydatetime(), self.times[599].to_pydatetime())
+        self.assertEqual([row['Правило'] for row in tables['rule_summary']], ['low_voltage', 'missing'])
+        self.assertEqual(tables['rule_summary'][0]['Нарушений'], 2)
+        self.assertTrue(tables['rule_summary'][1]['Ошибка'])
+        # За период отчета - только второе нарушение
+        self.assertEqual(tables['rule_violations_total'], 1)
+        self.assertEqual(tables['rule_violations'][0]['Начало'], self.times[400].strftime('%Y-%m-%d %H:%M:%S.000'))
+
+        self.model.set_monitoring_rules('')
+        self.assertEqual(manager._collect_rule_tables(datetime(2024, 3, 1), datetime(2024, 3, 2)), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import itertools
+import time
+import unittest
+
+from src.core.domain.services.filtering_service import ParameterFilteringService
+from src.core.domain.services.parameter_index import ParameterBitsetIndex
+
+
+def make_parameters(count):
+    lines = ['L_CAN_BLOK_CH', 'L_MVB', 'L_ETH']
+    components = ['inverter', 'door', 'brake', 'Unknown']
+    return [{
+        'signal_code': f"{'BSW'[i % 3]}_SIG_{i}",
+        'full_column': f"{'BSW'[i % 3]}_SIG_{i}_{i % 11}",
+        'line': lines[i % 3],
+        'wagon': str(i % 11 + 1),
+        'component_type': components[i % 4],
+        'hardware_type': 'Unknown',
+        'is_problematic': i % 7 == 0
+    } for i in range(count)]
+
+
+class TestParameterBitsetIndex(unittest.TestCase):
+    def test_index_matches_sequential_filters(self):
+        service = ParameterFilteringService(data_loader=None)
+        parameters = make_parameters(500)
+
+        choices = {
+            'signal_types': [[], ['B'], ['S', 'W']],
+            'wagons': [[], ['1'], ['2', '5', '99']],
+            'lines': [[], ['L_MVB'], ['L_ETH', 'L_CAN_BLOK_CH']],
+            'components': [[], ['door'], ['inverter', 'Unknown']],
+            'hardware': [[], ['X']],
+            'problematic': [[], ['problematic'], ['normal'], ['all']]
+        }
+        for values in itertools.product(*choices.values()):
+            criteria = dict(zip(choices, values))
+            with self.subTest(criteria=criteria):
+                self.assertEqual(service.filter_parameters(parameters, criteria),
+                                 service._apply_sequential_filters(parameters, criteria))
+
+        stats = service.get_filter_statistics()
+        self.assertEqual(stats['index_builds'], 1)
+
+    def test_index_rebuilt_for_another_list(self):
+        service = ParameterFilteringService(data_loader=None)
+        first = make_parameters(20)
+        service.filter_parameters(first, {'wagons': ['1']})
+        second = list(reversed(first))
+
+        self.assertEqual(service.filter_parameters(second, {'wagons': ['1']}),
+                         [p for p in second if p['wagon'] == '1'])
+        self.assertEqual(service.get_filter_statistics()['index_builds'], 2)
+
+    def test_selection_on_large_set_is_fast(self):
+        service = ParameterFilteringService(data_loader=None)
+        parameters = make_parameters(20_000)
+        index = ParameterBitsetIndex(parameters, {
+            'signal_types': service._extract_signal_type,
+            'wagons': service._extract_wagon,
+            'lines': service._extract_line,
+            'components': service._extract_component
+        }, service._extract_problematic_status)
+        criteria = {'signal_types': ['B', 'S'], 'wagons': ['1', '2', '3'], 'lines': ['L_MVB'],
+                    'problematic': ['normal']}
+
+        start = time.perf_counter()
+        for _ in range(20):
+            mask = index.mask(criteria)
+        elapsed_ms = (time.perf_counter() - start) / 20 * 1000
+
+        self.assertEqual(int(mask.sum()), len(service._apply_sequential_filters(parameters, criteria)))
+        self.assertLess(elapsed_ms, 5.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
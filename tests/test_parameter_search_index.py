@@ -0,0 +1,73 @@
+import random
+import unittest
+
+from src.core.domain.services.parameter_search_index import ParameterSearchIndex, normalize_search_text
+
+WORDS = ['Напряжение', 'контактной', 'сети', 'Ток', 'двигателя', 'Температура', 'инвертора',
+         'Давление', 'тормозной', 'магистрали', 'Ёмкость', 'Дверь', 'открыта']
+
+
+def make_parameters(count, seed=7):
+    rng = random.Random(seed)
+    return [{
+        'signal_code': f"{rng.choice('BSW')}_{rng.choice(['INV', 'BCU', 'DOOR'])}{i % 20}_"
+                       f"{rng.choice(['FAULT', 'STATE', 'VOLT'])}{i}",
+        'full_column': f"col_{i}",
+        'description': ' '.join(rng.sample(WORDS, 3)),
+        'line': rng.choice(['L_CAN_BLOK_CH', 'L_MVB', 'L_ETH'])
+    } for i in range(count)]
+
+
+def scan(parameters, query):
+    tokens = normalize_search_text(query).split()
+    return [p for p in parameters
+            if all(any(t in normalize_search_text(p[f]) for f in ('signal_code', 'description', 'line'))
+                   for t in tokens)]
+
+
+class TestParameterSearchIndex(unittest.TestCase):
+    def test_results_match_full_scan(self):
+        parameters = make_parameters(2000)
+        index = ParameterSearchIndex().build(parameters)
+
+        for query in ['fault', 'INV1', 'b', 'l_', 'напряж', 'ТОК', 'емкость', 'двиг темп',
+                      'door1_state', 'xyz', 'inv fault1']:
+            with self.subTest(query=query):
+                found = index.search(query)
+                self.assertEqual(len(found), len({id(p) for p in found}))
+                self.assertEqual({id(p) for p in found}, {id(p) for p in scan(parameters, query)})
+
+    def test_ranking_prefers_exact_and_prefix_matches(self):
+        parameters = [
+            {'signal_code': 'B_DOOR_OPEN_INV', 'full_column': 'a', 'description': '', 'line': 'L_MVB'},
+            {'signal_code': 'B_INV', 'full_column': 'b', 'description': '', 'line': 'L_MVB'},
+            {'signal_code': 'S_X', 'full_column': 'c', 'description': 'Ошибка b_inv', 'line': 'L_MVB'},
+            {'signal_code': 'B_INV_FAULT', 'full_column': 'd', 'description': '', 'line': 'L_MVB'},
+            {'signal_code': 'W_BINV', 'full_column': 'e', 'description': '', 'line': 'L_MVB'},
+        ]
+        index = ParameterSearchIndex().build(parameters)
+
+        self.assertEqual([p['full_column'] for p in index.search('b_inv')], ['b', 'd', 'c'])
+        self.assertEqual([p['full_column'] for p in index.search('inv')], ['b', 'd', 'a', 'e', 'c'])
+
+    def test_incremental_update_matches_rebuild(self):
+        parameters = make_parameters(500)
+        index = ParameterSearchIndex().build(parameters)
+
+        changed = parameters[50:] + [
+            dict(parameters[0], description='Новое описание вентилятора'),
+            {'signal_code': 'B_NEW_FAN', 'full_column': 'new', 'description': '', 'line': 'L_ETH'}
+        ]
+        index.update(changed)
+        rebuilt = ParameterSearchIndex().build(changed)
+
+        self.assertEqual(len(index), len(changed))
+        for query in ['вентил', 'fan', 'fault', 'b_inv1', 'сети']:
+            with self.subTest(query=query):
+                self.assertEqual(index.search(query), rebuilt.search(query))
+        self.assertEqual(index.search('вентил'), [changed[-2]])
+        self.assertEqual(index.search(parameters[1]['signal_code']), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.core.domain.services.recording_diff import RecordingDiffEngine
+
+
+class TestRecordingDiffEngine(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        rows = 400
+        self.before = pd.DataFrame({
+            'timestamp': pd.date_range('2024-01-01', periods=rows, freq='100ms'),
+            'A_1': rng.normal(10, 1, rows),
+            'B_1': rng.normal(0, 2, rows),
+            'C_1': (np.arange(rows) // 40) % 2,
+            'D_1': np.full(rows, 5.0),
+            'E_1': ['on', 'off'] * (rows // 2),
+            'OLD_1': rng.normal(0, 1, rows),
+        })
+        self.after = self.before.drop(columns='OLD_1').rename(columns={
+            'A_1': 'A_2', 'B_1': 'B_2', 'C_1': 'C_2', 'D_1': 'D_2', 'E_1': 'E_2'})
+        self.after['B_2'] = self.after['B_2'] + 6.0
+        self.after['C_2'] = (np.arange(rows) // 4) % 2
+        self.after['NEW_2'] = 1.0
+
+        self.before_params = [{'signal_code': c.split('_')[0], 'wagon': '1', 'full_column': c}
+                              for c in self.before.columns if c != 'timestamp']
+        self.after_params = [{'signal_code': c.split('_')[0], 'wagon': '1', 'full_column': c}
+                             for c in self.after.columns if c != 'timestamp']
+        self.engine = RecordingDiffEngine()
+
+    def test_identical_columns_found_by_hash(self):
+        copy = self.before.copy()
+        copy['D_1'] = copy['D_1'].astype(np.int64)
+        hashes = self.engine.content_hashes(self.before, ['A_1', 'D_1', 'E_1'], self.engine.row_weights(400))
+        copy_hashes = self.engine.content_hashes(copy, ['A_1', 'D_1', 'E_1'], self.engine.row_weights(400))
+        np.testing.assert_array_equal(hashes, copy_hashes)
+
+        copy.loc[200, 'A_1'] += 1e-9
+        self.assertNotEqual(self.engine.content_hashes(copy, ['A_1'], self.engine.row_weights(400))[0], hashes[0])
+
+    def test_diff_ranks_changed_signals(self):
+        diff = self.engine.diff(self.before, self.before_params, self.after, self.after_params)
+
+        self.assertEqual(diff.identical_count, 3)
+        self.assertEqual(diff.only_before, ['OLD_1'])
+        self.assertEqual(diff.only_after, ['NEW_2'])
+        self.assertEqual(list(diff.ranked()['signal_code']), ['C', 'B'])
+        self.assertEqual(diff.ranked().iloc[1]['column_after'], 'B_2')
+        self.assertAlmostEqual(diff.ranked().iloc[1]['level_shift'], 0.75, places=1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from src.core.services.session_manager import TelemetrySessionManager, SessionSnapshot
+
+
+class FakeTelemetryData:
+    def __init__(self, rows):
+        self.data = pd.DataFrame({'a': range(rows), 'b': [1.5] * rows})
+
+
+class TestTelemetrySessionManager(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.files = []
+        for name in ("first.csv", "second.csv"):
+            path = os.path.join(self.tmp_dir, name)
+            with open(path, "w") as f:
+                f.write(name)
+            self.files.append(path)
+        self.manager = TelemetrySessionManager(memory_budget_mb=1.0)
+
+    def tearDown(self):
+        self.manager.cleanup()
+
+    def _snapshot(self, path, rows=10):
+        return SessionSnapshot(file_path=path, telemetry_data=FakeTelemetryData(rows),
+                               parameters=['p'], parameter_dicts=[{'signal_code': 'p'}], lines={'L'})
+
+    def test_restore_from_memory(self):
+        self.manager.store(self._snapshot(self.files[0]))
+        snapshot = self.manager.restore(self.files[0])
+        self.assertIsNotNone(snapshot)
+        self.assertEqual(snapshot.parameters, ['p'])
+        self.assertEqual(self.manager.get_statistics()['memory_hits'], 1)
+
+    def test_lru_session_spilled_and_restored(self):
+        self.manager.store(self._snapshot(self.files[0], rows=40000))
+        self.manager.store(self._snapshot(self.files[1], rows=40000))
+        stats = self.manager.get_statistics()
+        self.assertEqual(stats['sessions_spilled'], 1)
+
+        snapshot = self.manager.restore(self.files[0])
+        self.assertIsNotNone(snapshot)
+        self.assertEqual(len(snapshot.telemetry_data.data), 40000)
+        self.assertEqual(self.manager.get_statistics()['disk_hits'], 1)
+
+    def test_changed_file_invalidates_session(self):
+        self.manager.store(self._snapshot(self.files[0]))
+        with open(self.files[0], "a") as f:
+            f.write("changed")
+        self.assertIsNone(self.manager.restore(self.files[0]))
+        self.assertFalse(self.manager.contains(self.files[0]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import random
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from src.core.domain.entities.signal_classifier import SignalClassifier, SignalCriticality
+from src.core.services.classification_store import ClassificationTableStore
+from src.core.services.diagnostic_analyzer import DiagnosticAnalyzer
+
+PARTS = ['BCU', 'FAULT', 'INV', 'DOOR', 'PSN', 'QF1', 'TEMP', 'PRESSURE', 'STATE', 'FIRE', 'SET', 'X']
+
+
+def make_signals(count, seed=3):
+    rng = random.Random(seed)
+    return [{
+        'signal_code': f"{rng.choice(['B', 'BY', 'F', 'S'])}_" + '_'.join(rng.sample(PARTS, 3)) + f"_{i % 13}",
+        'description': rng.choice(['', 'Давление', 'voltage fault'])
+    } for i in range(count)]
+
+
+class TestSignalClassificationTable(unittest.TestCase):
+    def test_bulk_rows_match_single_classification(self):
+        signals = make_signals(1500) + [{'signal_code': '', 'description': 'x'}]
+        classifier = SignalClassifier()
+        rows = classifier.classify_rows(signals)
+
+        self.assertEqual(rows[-1], -1)
+        reference = SignalClassifier()
+        for signal, row in zip(signals[:-1], rows[:-1].tolist()):
+            self.assertEqual(classifier.table.row(row),
+                             reference._perform_classification(signal['signal_code'], signal['description'], {}))
+        self.assertEqual(len(classifier.table), len({(s['signal_code'], s['description']) for s in signals[:-1]}))
+
+    def test_table_persists_per_config_version(self):
+        signals = make_signals(300)
+        with tempfile.TemporaryDirectory() as directory:
+            store = ClassificationTableStore(Path(directory) / 'classification.json')
+            classifier = SignalClassifier(store)
+            expected = classifier.classify_signals_batch(signals)
+            self.assertTrue(classifier.save_table())
+            self.assertFalse(classifier.save_table())
+
+            restored = SignalClassifier(store)
+            self.assertEqual(len(restored.table), len(classifier.table))
+            with patch.object(restored, '_perform_classification', side_effect=AssertionError):
+                self.assertEqual(restored.classify_signals_batch(signals), expected)
+
+            with patch.object(SignalClassifier, 'RULES_VERSION', SignalClassifier.RULES_VERSION + 1):
+                self.assertEqual(len(SignalClassifier(store).table), 0)
+
+            # Поврежденный или чужой файл - пустая таблица, без исключений
+            for content in (b'\x80\x04garbage', b'[1, 2]', b'{"version": "x"}'):
+                store.file_path.write_bytes(content)
+                self.assertEqual(len(SignalClassifier(store).table), 0)
+
+    def test_model_persists_only_with_store(self):
+        from src.core.models.data_model import DataModel
+        signals = make_signals(50)
+        with tempfile.TemporaryDirectory() as directory:
+            model = DataModel()
+            self.assertIsNone(model.diagnostic_analyzer.signal_classifier._table_store)
+            model.cleanup()
+
+            store = ClassificationTableStore(Path(directory) / 'classification.json')
+            model = DataModel(classification_store=store)
+            classifier = model.diagnostic_analyzer.signal_classifier
+            classifier.classify_rows(signals)
+            self.assertTrue(classifier.save_table())
+            model.cleanup()
+            self.assertEqual(len(SignalClassifier(store).table), len(classifier.table))
+
+    def test_system_health_from_table(self):
+        signals = make_signals(800)
+        report = DiagnosticAnalyzer().analyze_system_health(signals)
+
+        classifier = SignalClassifier()
+        classifications = [classifier.classify_signal(s['signal_code'], s['description']) for s in signals]
+        critical = [c.signal_code for c in classifications if c.criticality == SignalCriticality.CRITICAL]
+        self.assertEqual(report['critical_faults'], critical)
+        self.assertEqual(report['overall_status'], 'critical' if critical else 'warning')
+        for system, status in report['systems_status'].items():
+            in_system = [c for c in classifications if c.system.value == system]
+            self.assertEqual(status['critical_count'],
+                             sum(c.criticality == SignalCriticality.CRITICAL for c in in_system))
+            self.assertEqual(status['fault_count'],
+                             sum(c.criticality in (SignalCriticality.HIGH, SignalCriticality.CRITICAL)
+                                 for c in in_system))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.core.domain.services.change_analysis_engine import NumericMatrix
+from src.core.domain.services.signal_family_index import SignalFamilyIndex, WagonOutlierDetector
+
+WAGONS = 8
+
+
+class TestSignalFamilyIndex(unittest.TestCase):
+    def setUp(self):
+        rows = 5000
+        rng = np.random.default_rng(5)
+        columns, self.parameters = {}, []
+        for wagon in range(1, WAGONS + 1):
+            for code, values in (
+                    ('B_DOOR_OPEN', ((rng.random(rows) < 0.01).cumsum() % 2).astype(float)),
+                    ('F_PSN_U', rng.normal(110, 1, rows).round(1)),
+                    ('B_LAMP_ON', np.where(rng.random(rows) < 0.5, 1.0, 0.0))):
+                column = f'{code}_{wagon}::L_CAN_BLOCK_1_1|{code}'
+                columns[column] = values
+                self.parameters.append({'signal_code': f'{code}_{wagon}', 'full_column': column})
+
+        # Отклонения: зависшая дверь, смещенное напряжение, дребезг двери
+        columns['B_DOOR_OPEN_3::L_CAN_BLOCK_1_1|B_DOOR_OPEN'] = np.zeros(rows)
+        columns['F_PSN_U_6::L_CAN_BLOCK_1_1|F_PSN_U'] += 8
+        columns['B_DOOR_OPEN_7::L_CAN_BLOCK_1_1|B_DOOR_OPEN'] = ((rng.random(rows) < 0.2).cumsum() % 2).astype(float)
+        # Пропуски в одном вагоне не должны влиять на остальные
+        columns['B_LAMP_ON_2::L_CAN_BLOCK_1_1|B_LAMP_ON'][::7] = np.nan
+
+        # Одиночный сигнал без пары и сигнал без номера вагона
+        columns['B_SINGLE_4'] = np.zeros(rows)
+        columns['B_GLOBAL'] = np.zeros(rows)
+        self.parameters += [{'signal_code': 'B_SINGLE_4', 'full_column': 'B_SINGLE_4'},
+                            {'signal_code': 'B_GLOBAL', 'full_column': 'B_GLOBAL'}]
+        self.data = pd.DataFrame({'timestamp': pd.date_range('2024-01-01', periods=rows, freq='100ms'),
+                                  **columns})
+        # Вагоны перечислены не по порядку - семейство все равно упорядочено по номеру
+        self.parameters.reverse()
+        self.index = SignalFamilyIndex(self.parameters, wagon_name=lambda w: f'{w}w')
+
+    def test_grouping_by_base_code(self):
+        self.assertEqual(sorted(self.index.families), ['B_DOOR_OPEN', 'B_LAMP_ON', 'F_PSN_U'])
+        family = self.index.families['F_PSN_U']
+        self.assertEqual(family.wagons, list(range(1, WAGONS + 1)))
+        self.assertEqual(family.wagon_names[:2], ['1w', '2w'])
+        self.assertIs(self.index.family_of(family.columns[4]), family)
+        self.assertIsNone(self.index.family_of('B_SINGLE_4'))
+        self.assertEqual(SignalFamilyIndex.split_code('B_BCU_FAULT_11'), ('B_BCU_FAULT', 11))
+        self.assertIsNone(SignalFamilyIndex.split_code('B_GLOBAL'))
+        self.assertTrue(self.index.is_valid_for(self.parameters))
+
+    def test_matrix_view_without_copy(self):
+        # Столбцы одного кода идут по вагонам с постоянным шагом - срез матрицы записи
+        data = self.data
+        matrix = NumericMatrix(data)
+        family = self.index.families['B_DOOR_OPEN']
+        block = family.matrix(data, slice(100, 900), matrix)
+        self.assertTrue(np.shares_memory(block, matrix.values))
+        np.testing.assert_array_equal(block, data[family.columns].to_numpy()[100:900])
+        np.testing.assert_array_equal(family.matrix(data, slice(100, 900)), block)
+
+        # Нарушенный шаг - копия только столбцов семейства
+        shuffled = data[['timestamp'] + family.columns[::-1] + list(data.columns.drop(['timestamp'] + family.columns))]
+        copied = family.matrix(shuffled, slice(100, 900), NumericMatrix(shuffled))
+        np.testing.assert_array_equal(copied, block)
+
+    def test_statistics_match_reference(self):
+        family = self.index.families['B_LAMP_ON']
+        block = family.matrix(self.data)
+        toggles, mean, std, counts = WagonOutlierDetector.column_statistics(block)
+        for j, column in enumerate(family.columns):
+            series = self.data[column].dropna()
+            self.assertEqual(toggles[j], int((series.diff().fillna(0) != 0).sum()))
+            self.assertAlmostEqual(mean[j], series.mean())
+            self.assertAlmostEqual(std[j], series.std())
+            self.assertEqual(counts[j], len(series))
+
+    def test_flags_deviating_wagons(self):
+        detector = WagonOutlierDetector()
+        comparisons = detector.scan(self.data, self.index, numeric_matrix=NumericMatrix(self.data))
+        found = {(o.base_code, o.wagon, o.kind) for o in detector.outliers(comparisons)}
+        self.assertEqual(found, {('B_DOOR_OPEN', 3, 'stuck'), ('B_DOOR_OPEN', 7, 'toggles'),
+                                 ('F_PSN_U', 6, 'mean')})
+        self.assertEqual(detector.outliers(comparisons)[0].kind, 'stuck')
+
+        frame = next(c for c in comparisons if c.family.base_code == 'B_DOOR_OPEN').as_frame()
+        self.assertEqual(frame.loc['3w', 'toggles'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
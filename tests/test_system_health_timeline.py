@@ -0,0 +1,92 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.core.domain.entities.signal_classifier import SignalClassifier, SignalCriticality
+from src.core.domain.services.fault_activity import FaultActivityScanner
+from src.core.domain.services.system_health_timeline import HEALTH_STATUSES, SystemHealthTimelineBuilder
+
+CODES = ['B_BCU_FAULT', 'B_BRAKE_PRESSURE_FAULT', 'B_DOOR_FAULT', 'B_INV_FAULT', 'B_PSN_FAULT',
+         'B_LAMP_ERROR', 'B_DOOR_ERROR']
+
+
+class TestSystemHealthTimeline(unittest.TestCase):
+    def setUp(self):
+        rows = 6000
+        rng = np.random.default_rng(8)
+        self.times = pd.date_range('2024-01-01', periods=rows, freq='100ms')
+        columns = {}
+        for i, code in enumerate(CODES):
+            values = (rng.random(rows) < 0.001).astype(float)
+            values = np.minimum(1, np.convolve(values, np.ones(30 + 40 * i))[:rows])
+            columns[f'{code}_{i % 3 + 1}'] = values
+        self.data = pd.DataFrame({'timestamp': self.times, **columns})
+        self.columns = {column: column[:-2] for column in columns}
+        self.classifier = SignalClassifier()
+        self.report = FaultActivityScanner().scan(self.data, self.columns)
+
+    def expected_status(self, bucket_seconds):
+        """Состояние систем по корзинам перебором строк: худший уровень активных неисправностей"""
+        buckets = ((self.times - self.times[0]) // pd.Timedelta(seconds=bucket_seconds)).to_numpy()
+        expected = {}
+        for column, code in self.columns.items():
+            classification = self.classifier.classify_signal(code)
+            level = 2 if classification.criticality == SignalCriticality.CRITICAL else 1
+            # Активна в корзине, если единица держится хотя бы на одной строке (строка спада не в счет)
+            active = np.unique(buckets[self.data[column].to_numpy() != 0])
+            status = expected.setdefault(classification.system.value, np.zeros(buckets[-1] + 1, dtype=int))
+            status[active] = np.maximum(status[active], level)
+        return expected
+
+    def test_status_matches_row_scan(self):
+        builder = SystemHealthTimelineBuilder()
+        for bucket_seconds in (5, 37.5, 60):
+            with self.subTest(bucket_seconds=bucket_seconds):
+                timeline = builder.build(self.report, self.classifier, bucket_seconds)
+                expected = self.expected_status(bucket_seconds)
+                self.assertEqual(sorted(timeline.systems), sorted(expected))
+                for i, system in enumerate(timeline.systems):
+                    np.testing.assert_array_equal(timeline.status[i], expected[system])
+                np.testing.assert_array_equal(timeline.overall, np.max(list(expected.values()), axis=0))
+
+    def test_trouble_spots_and_counts(self):
+        timeline = SystemHealthTimelineBuilder().build(self.report, self.classifier, 10)
+        flagged = timeline.overall > 0
+        spots = timeline.trouble_spots()
+        self.assertTrue(spots)
+        for first, last in spots:
+            self.assertTrue(flagged[first:last + 1].all())
+            self.assertFalse(first > 0 and flagged[first - 1])
+            self.assertFalse(last + 1 < len(flagged) and flagged[last + 1])
+        self.assertEqual(sum(last - first + 1 for first, last in spots), int(flagged.sum()))
+
+        # Корзины с активными неисправностями - ровно корзины с нарушенным состоянием
+        self.assertTrue(((timeline.fault_counts > 0) == (timeline.status > 0)).all())
+        self.assertEqual({HEALTH_STATUSES[code] for code in np.unique(timeline.status)},
+                         {'healthy', 'warning', 'critical'})
+        self.assertEqual(timeline.time_range(0)[0], '2024-01-01 00:00:00')
+
+    def test_uses_classification_of_selected_faults(self):
+        # Описание делает сигнал критичным: шкала должна совпасть с отбором по описанию
+        parameters = [{'full_column': column, 'signal_code': code, 'data_type': 'B',
+                       'description': 'EMERGENCY lamp' if code == 'B_LAMP_ERROR' else ''}
+                      for column, code in self.columns.items()]
+        scanner = FaultActivityScanner()
+        classification_rows = scanner.classification_rows(parameters, self.classifier)
+        columns = scanner.fault_columns(parameters, self.classifier, classification_rows)
+        report = scanner.scan(self.data, columns, classification_rows=classification_rows)
+        lamp = report.activities['B_LAMP_ERROR_3']
+        self.assertEqual(self.classifier.table.row(lamp.classification_row).criticality, SignalCriticality.CRITICAL)
+
+        rows_before = len(self.classifier.table)
+        timeline = SystemHealthTimelineBuilder().build(report, self.classifier, 10)
+        self.assertEqual(len(self.classifier.table), rows_before)
+
+        system = timeline.systems.index(self.classifier.table.row(lamp.classification_row).system.value)
+        buckets = ((lamp.intervals[:, 0] - report.start) // np.timedelta64(10, 's')).astype(int)
+        self.assertTrue((timeline.status[system, buckets] == HEALTH_STATUSES.index('critical')).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.core.domain.services.change_analysis_engine import ChangeAnalysisEngine, NumericMatrix
+from src.core.domain.services.monitoring_rules import RuleCompiler, RuleEngine, RuleError
+from src.core.domain.services.virtual_channels import VirtualChannelRegistry
+
+WAGONS = 4
+
+
+class TestVirtualChannels(unittest.TestCase):
+    def setUp(self):
+        rows = 3000
+        rng = np.random.default_rng(11)
+        columns, self.parameters = {}, []
+        for wagon in range(1, WAGONS + 1):
+            columns[f'F_TRACTION_I_{wagon}'] = rng.normal(300, 20, rows).round(1)
+            columns[f'F_BRAKE_P1_{wagon}'] = rng.normal(5, 0.2, rows).round(2)
+            columns[f'F_BRAKE_P2_{wagon}'] = rng.normal(4, 0.2, rows).round(2)
+            columns[f'B_DOOR_OPEN_{wagon}'] = ((rng.random(rows) < 0.01).cumsum() % 2).astype(float)
+        columns['F_TRACTION_I_2'][500:520] = np.nan
+        columns['F_SPEED'] = np.clip(np.cumsum(rng.normal(0, 1, rows)), 0, None)
+        for column in columns:
+            self.parameters.append({'signal_code': column, 'full_column': f'{column}::L_CAN_BLOCK_1_1|{column}'})
+        self.data = pd.DataFrame({'timestamp': pd.date_range('2024-01-01', periods=rows, freq='100ms'),
+                                  **{f'{c}::L_CAN_BLOCK_1_1|{c}': v for c, v in columns.items()}})
+        self.matrix = NumericMatrix(self.data)
+        self.registry = VirtualChannelRegistry(cache_budget_mb=1)
+        self.registry.bind(self.data, self.parameters, lambda: self.matrix)
+
+    def column(self, code):
+        return self.data[f'{code}::L_CAN_BLOCK_1_1|{code}']
+
+    def test_definition_and_errors(self):
+        total = self.registry.define('F_TRACTION_I_SUM', 'sum(F_TRACTION_I)', 'Суммарный ток')
+        self.assertEqual(total.columns, ['F_TRACTION_I_SUM::L_VIRTUAL|Суммарный ток'])
+        self.assertTrue(self.registry.is_virtual(total.columns[0]))
+
+        # Семейство вне агрегата - канал на каждый вагон
+        difference = self.registry.define('F_BRAKE_DP', 'F_BRAKE_P1 - F_BRAKE_P2')
+        self.assertEqual(difference.signal_codes, [f'F_BRAKE_DP_{w}' for w in range(1, WAGONS + 1)])
+        self.assertEqual(difference.columns[0], 'F_BRAKE_DP_1::L_VIRTUAL|F_BRAKE_P1 - F_BRAKE_P2')
+
+        for name, expression in (('f_lower', 'F_SPEED'), ('F_X_3', 'F_SPEED'), ('F_X', 'MISSING + 1'),
+                                 ('F_SPEED', 'F_SPEED * 2'), ('F_X', 'F_SPEED > 1 for 2s'), ('F_X', 'foo(F_SPEED)')):
+            with self.subTest(name=name, expression=expression):
+                with self.assertRaises(RuleError):
+                    self.registry.define(name, expression)
+        self.assertEqual([channel.name for channel in self.registry.channels], ['F_TRACTION_I_SUM', 'F_BRAKE_DP'])
+
+        # Запись без нужных сигналов: определение остается, канал неактивен
+        self.registry.bind(self.data[['timestamp', self.column('F_SPEED').name]],
+                           [p for p in self.parameters if p['signal_code'] == 'F_SPEED'])
+        self.assertEqual(self.registry.columns, [])
+        self.registry.bind(self.data, self.parameters)
+        self.assertEqual(len(self.registry.columns), 1 + WAGONS)
+
+    def test_window_values_match_pandas(self):
+        total = self.registry.define('F_TRACTION_I_SUM', 'sum(F_TRACTION_I)').columns[0]
+        difference = self.registry.define('F_BRAKE_DP', 'F_BRAKE_P1 - F_BRAKE_P2')
+        doors = self.registry.define('B_DOORS_MOVING', 'any(B_DOOR_OPEN) and F_SPEED > 2').columns[0]
+        window = slice(400, 1700)
+
+        traction = pd.concat([self.column(f'F_TRACTION_I_{w}') for w in range(1, WAGONS + 1)], axis=1)
+        np.testing.assert_allclose(self.registry.values(total, window), traction.sum(axis=1).to_numpy()[window])
+        np.testing.assert_allclose(self.registry.values(difference.columns[2], window),
+                                   (self.column('F_BRAKE_P1_3') - self.column('F_BRAKE_P2_3')).to_numpy()[window])
+        door_open = pd.concat([self.column(f'B_DOOR_OPEN_{w}') for w in range(1, WAGONS + 1)], axis=1)
+        expected = (door_open.any(axis=1) & (self.column('F_SPEED') > 2)).astype(float).to_numpy()
+        np.testing.assert_array_equal(self.registry.values(doors, window), expected[window])
+
+        # Произвольный набор строк и маска дают те же значения, что и срез
+        rows = np.arange(400, 1700)
+        np.testing.assert_array_equal(self.registry.values(total, rows), self.registry.values(total, window))
+        scattered = np.array([5, 90, 2999])
+        np.testing.assert_allclose(self.registry.values(total, scattered),
+                                   traction.sum(axis=1).to_numpy()[scattered])
+
+        transitions = self.registry.transitions(doors, window)
+        self.assertTrue(len(transitions))
+        self.assertTrue(((transitions.rows >= 400) & (transitions.rows < 1700)).all())
+        np.testing.assert_array_equal(transitions.new_values, expected[transitions.rows])
+        np.testing.assert_array_equal(transitions.old_values, expected[transitions.previous_rows])
+
+    def test_cache_hits_and_eviction(self):
+        total = self.registry.define('F_TRACTION_I_SUM', 'sum(F_TRACTION_I)').columns[0]
+        first = self.registry.values(total, slice(0, 1000))
+        self.assertIs(self.registry.values(total, np.arange(0, 1000)).base, first.base)
+        self.assertEqual(self.registry.get_cache_statistics()['hits'], 1)
+        with self.assertRaises(ValueError):
+            first[0] = 0
+
+        # Бюджет 1 МБ: окна по 8 КБ вытесняют самые старые
+        for start in range(0, 2900, 10):
+            self.registry.values(total, slice(start, start + 1000))
+        statistics = self.registry.get_cache_statistics()
+        self.assertLessEqual(statistics['bytes'], statistics['budget_bytes'])
+        self.assertLess(statistics['entries'], 290)
+
+        # Переопределение заменяет столбец канала и сбрасывает его значения
+        redefined = self.registry.define('F_TRACTION_I_SUM', 'max(F_TRACTION_I)').columns[0]
+        self.assertFalse(self.registry.is_virtual(total))
+        np.testing.assert_allclose(
+            self.registry.values(redefined, slice(0, 10)),
+            np.nanmax(np.column_stack([self.column(f'F_TRACTION_I_{w}')[:10] for w in range(1, WAGONS + 1)]), axis=1))
+
+    def test_change_scores_with_recorded_columns(self):
+        engine = ChangeAnalysisEngine()
+        difference = self.registry.define('F_BRAKE_DP', 'F_BRAKE_P1 - F_BRAKE_P2')
+        self.registry.define('B_CONSTANT', 'F_SPEED >= 0')
+        window = slice(100, 2100)
+
+        columns = self.registry.columns
+        virtual = engine.scores(engine.compute_block(self.registry.values_block(columns, window), columns))
+        recorded = engine.compute_scores(self.data, [self.column('F_SPEED').name], window)
+        scores = recorded.concat(virtual)
+        self.assertEqual(scores.columns, [self.column('F_SPEED').name] + columns)
+
+        # Те же оценки, что и у записанного столбца с такими значениями
+        reference = self.data.iloc[window][['timestamp']].copy()
+        reference['dp'] = (self.column('F_BRAKE_P1_1') - self.column('F_BRAKE_P2_1')).to_numpy()[window]
+        expected = engine.compute_scores(reference, ['dp'], slice(0, len(reference)))
+        self.assertAlmostEqual(scores.as_dict()[difference.columns[0]], float(expected.score[0]))
+        self.assertNotIn('B_CONSTANT::L_VIRTUAL|F_SPEED >= 0', scores.changed(0.1))
+
+    def test_rows_outside_recording_rejected(self):
+        total = self.registry.define('F_TRACTION_I_SUM', 'sum(F_TRACTION_I)').columns[0]
+        # -1 от get_indexer для строки, которой нет в записи
+        for rows in (np.array([-1, 5, 6]), np.array([10, 3000])):
+            with self.subTest(rows=rows):
+                with self.assertRaises(IndexError):
+                    self.registry.values(total, rows)
+
+    def test_rules_over_virtual_channels(self):
+        total = self.registry.define('F_TRACTION_I_SUM', 'sum(F_TRACTION_I)').columns[0]
+        difference = self.registry.define('F_BRAKE_DP', 'F_BRAKE_P1 - F_BRAKE_P2')
+        parameters = self.parameters + [
+            {'signal_code': column.split('::')[0], 'full_column': column}
+            for column in [total] + difference.columns]
+        rules = RuleCompiler().compile_rules('high: F_TRACTION_I_SUM > 1250\ndp: F_BRAKE_DP > 1.6')
+        window = slice(200, 2800)
+
+        report = RuleEngine().evaluate(self.data, rules, parameters, window, self.matrix, virtual=self.registry)
+        self.assertEqual(report.errors, {})
+        traction = pd.concat([self.column(f'F_TRACTION_I_{w}') for w in range(1, WAGONS + 1)],
+                             axis=1).sum(axis=1).to_numpy()[window]
+        high = report.by_rule()['high']
+        self.assertTrue(high)
+        self.assertTrue(all(list(v.columns) == [total] for v in high))
+        starts = self.data['timestamp'].to_numpy()[window][np.flatnonzero(np.diff(
+            np.concatenate([[False], traction > 1250]).astype(int)) == 1)]
+        np.testing.assert_array_equal(np.sort([v.start for v in high]), starts)
+
+        # Виртуальное семейство по вагонам - нарушения в каждом вагоне отдельно
+        for wagon in range(1, WAGONS + 1):
+            dp = (self.column(f'F_BRAKE_P1_{wagon}') - self.column(f'F_BRAKE_P2_{wagon}')).to_numpy()[window]
+            found = [v for v in report.by_rule()['dp'] if list(v.columns) == [difference.columns[wagon - 1]]]
+            self.assertEqual(len(found), int(np.count_nonzero(np.diff(np.concatenate([[0], dp > 1.6]).astype(int)) == 1)))
+
+        # Без реестра виртуальные сигналы недоступны
+        report = RuleEngine().evaluate(self.data, rules, parameters, window, self.matrix)
+        self.assertEqual(set(report.errors), {'high', 'dp'})
+
+
+if __name__ == '__main__':
+    unittest.main()